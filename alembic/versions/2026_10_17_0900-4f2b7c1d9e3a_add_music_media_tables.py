@@ -0,0 +1,132 @@
+"""Add music media tables
+
+Revision ID: 4f2b7c1d9e3a
+Revises: cd609a05822b
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2b7c1d9e3a'
+down_revision = 'cd609a05822b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('MUSIC_ARTIST',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('name', sa.String(length=256), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_MUSIC_ARTIST_name'), 'MUSIC_ARTIST', ['name'], unique=True)
+
+    op.create_table('MUSIC_MEDIA',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('media_type', sa.String(length=16), nullable=False),
+                    sa.Column('hash', sa.String(length=32), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('title', sa.String(length=512), nullable=False),
+                    sa.Column('year', sa.Integer(), nullable=True),
+                    sa.Column('mixer_id', sa.Integer(), nullable=True),
+                    sa.Column('artist_particles', sa.Text(), nullable=True),
+                    sa.Column('digest', sa.String(length=32), nullable=False),
+                    sa.ForeignKeyConstraint(['mixer_id'], ['MUSIC_ARTIST.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_MUSIC_MEDIA_media_type'), 'MUSIC_MEDIA', ['media_type'], unique=False)
+    op.create_index(op.f('ix_MUSIC_MEDIA_hash'), 'MUSIC_MEDIA', ['hash'], unique=False)
+    op.create_index(op.f('ix_MUSIC_MEDIA_title'), 'MUSIC_MEDIA', ['title'], unique=False)
+    op.create_index(op.f('ix_MUSIC_MEDIA_year'), 'MUSIC_MEDIA', ['year'], unique=False)
+
+    op.create_table('MUSIC_MEDIA_ARTIST',
+                    sa.Column('media_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('artist_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['media_id'], ['MUSIC_MEDIA.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('media_id', 'position'))
+    op.create_index(op.f('ix_MUSIC_MEDIA_ARTIST_artist_id'), 'MUSIC_MEDIA_ARTIST', ['artist_id'], unique=False)
+
+    op.create_table('MUSIC_MEDIA_COMPOSER',
+                    sa.Column('media_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('artist_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['media_id'], ['MUSIC_MEDIA.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('media_id', 'position'))
+    op.create_index(op.f('ix_MUSIC_MEDIA_COMPOSER_artist_id'), 'MUSIC_MEDIA_COMPOSER', ['artist_id'], unique=False)
+
+    op.create_table('MUSIC_TRACKLIST',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('media_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('name', sa.String(length=512), nullable=True),
+                    sa.Column('track_artist_id', sa.Integer(), nullable=True),
+                    sa.Column('side_mixer_id', sa.Integer(), nullable=True),
+                    sa.Column('track_year', sa.Integer(), nullable=True),
+                    sa.ForeignKeyConstraint(['media_id'], ['MUSIC_MEDIA.id'], ondelete='CASCADE'),
+                    sa.ForeignKeyConstraint(['side_mixer_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['track_artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_MUSIC_TRACKLIST_media_id'), 'MUSIC_TRACKLIST', ['media_id'], unique=False)
+
+    op.create_table('MUSIC_SONG',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('tracklist_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('title', sa.String(length=512), nullable=True),
+                    sa.Column('main_artist_id', sa.Integer(), nullable=True),
+                    sa.Column('exp_main_artist', sa.Boolean(), nullable=False),
+                    sa.Column('main_artist_sequel', sa.String(length=256), nullable=True),
+                    sa.Column('album', sa.String(length=512), nullable=True),
+                    sa.Column('classical_work', sa.String(length=512), nullable=True),
+                    sa.Column('country', sa.String(length=128), nullable=True),
+                    sa.Column('year', sa.Integer(), nullable=True),
+                    sa.Column('mix', sa.String(length=256), nullable=True),
+                    sa.Column('featured_in', sa.String(length=512), nullable=True),
+                    sa.Column('parts', sa.Text(), nullable=True),
+                    sa.ForeignKeyConstraint(['main_artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['tracklist_id'], ['MUSIC_TRACKLIST.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_MUSIC_SONG_tracklist_id'), 'MUSIC_SONG', ['tracklist_id'], unique=False)
+    op.create_index(op.f('ix_MUSIC_SONG_title'), 'MUSIC_SONG', ['title'], unique=False)
+    op.create_index(op.f('ix_MUSIC_SONG_main_artist_id'), 'MUSIC_SONG', ['main_artist_id'], unique=False)
+
+    op.create_table('MUSIC_SONG_ARTIST',
+                    sa.Column('song_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('artist_id', sa.Integer(), nullable=False),
+                    sa.Column('prequel', sa.String(length=256), nullable=False),
+                    sa.Column('sequel', sa.String(length=256), nullable=False),
+                    sa.ForeignKeyConstraint(['artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['song_id'], ['MUSIC_SONG.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('song_id', 'position'))
+    op.create_index(op.f('ix_MUSIC_SONG_ARTIST_artist_id'), 'MUSIC_SONG_ARTIST', ['artist_id'], unique=False)
+
+    op.create_table('MUSIC_SONG_COMPOSER',
+                    sa.Column('song_id', sa.Integer(), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('artist_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['artist_id'], ['MUSIC_ARTIST.id']),
+                    sa.ForeignKeyConstraint(['song_id'], ['MUSIC_SONG.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('song_id', 'position'))
+    op.create_index(op.f('ix_MUSIC_SONG_COMPOSER_artist_id'), 'MUSIC_SONG_COMPOSER', ['artist_id'], unique=False)
+
+    op.create_table('MUSIC_MEDIA_STORE',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('saved_ns', sa.BigInteger(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+
+
+def downgrade() -> None:
+    op.drop_table('MUSIC_MEDIA_STORE')
+    op.drop_table('MUSIC_SONG_COMPOSER')
+    op.drop_table('MUSIC_SONG_ARTIST')
+    op.drop_table('MUSIC_SONG')
+    op.drop_table('MUSIC_TRACKLIST')
+    op.drop_table('MUSIC_MEDIA_COMPOSER')
+    op.drop_table('MUSIC_MEDIA_ARTIST')
+    op.drop_table('MUSIC_MEDIA')
+    op.drop_table('MUSIC_ARTIST')
@@ -1,6 +1,8 @@
+import atexit
 from dotenv import load_dotenv
 import logging
 import os
+import time
 
 from flask import Flask
 from flask_bootstrap import Bootstrap5
@@ -12,7 +14,7 @@ from flask_talisman import Talisman
 from flask_wtf import CSRFProtect
 from sqlalchemy import inspect
 
-from app.musicmedia.musicmedia_objects import MEDIA
+from app.musicmedia.musicmedia_objects import Artists, MEDIA
 
 import config
 
@@ -81,14 +83,73 @@ def create_app(name=None):
     # Turn off SQL modificationt tracking
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    db.init_app(app)
+
     # Load in the music media html file
+    app.music_media_load_report = None
+    MEDIA.set_storage_format(app.config.get('MUSIC_MEDIA_STORAGE_FORMAT', 'html'))
+    if MEDIA._storage_format == 'sql':
+        from app.musicmedia.musicmedia_sql import MusicMediaSQLStore
+        with app.app_context():
+            sql_store = MusicMediaSQLStore(db.engine)
+        sql_store.create_tables()
+        MEDIA.set_sql_store(sql_store)
+    Artists.set_normalized_matching(app.config.get('MUSIC_MEDIA_ARTIST_NORMALIZED_MATCHING', False))
+    if app.config.get('MUSIC_MEDIA_ARTIST_ALIASES') is not None:
+        logger.info('Loaded {} music artist aliases'.format(Artists.load_aliases(app.config['MUSIC_MEDIA_ARTIST_ALIASES'])))
+    MEDIA.set_html_write_lock(app.config.get('MUSIC_MEDIA_WRITE_LOCK', False))
     if app.config.get('MUSIC_MEDIA_HTML_FILE', None) is not None:
-        MEDIA.from_html_file(app.config['MUSIC_MEDIA_HTML_FILE'])
+        load_report = MEDIA.from_html_file(app.config['MUSIC_MEDIA_HTML_FILE'],
+                                           streaming=app.config.get('MUSIC_MEDIA_STREAMING_LOAD', False),
+                                           parser=app.config.get('MUSIC_MEDIA_PARSER', None),
+                                           snapshot=app.config.get('MUSIC_MEDIA_SNAPSHOT', False),
+                                           workers=app.config.get('MUSIC_MEDIA_LOAD_WORKERS', 1),
+                                           lazy=app.config.get('MUSIC_MEDIA_LAZY_TRACKS', False),
+                                           profile=app.config.get('MUSIC_MEDIA_LOAD_PROFILE', False),
+                                           profile_memory=app.config.get('MUSIC_MEDIA_LOAD_PROFILE_MEMORY', False))
+        if load_report is not None:
+            from app.musicmedia.musicmedia_profile import format_load_report
+            logger.info(format_load_report(load_report))
+            app.music_media_load_report = load_report
+        if app.config.get('MUSIC_MEDIA_JOURNAL', False):
+            from app.musicmedia.musicmedia_journal import MusicMediaJournal
+            # Workers writing the same html file each keep a journal of their own
+            worker = '{}-{}'.format(os.getpid(), time.time_ns()) if app.config.get('MUSIC_MEDIA_WRITE_LOCK', False) else None
+            journal = MusicMediaJournal(app.config['MUSIC_MEDIA_HTML_FILE'],
+                                        max_bytes=app.config.get('MUSIC_MEDIA_JOURNAL_MAX_BYTES', 1024 * 1024),
+                                        max_age=app.config.get('MUSIC_MEDIA_JOURNAL_MAX_AGE', 3600),
+                                        parser=app.config.get('MUSIC_MEDIA_PARSER', None),
+                                        worker=worker)
+            MEDIA.open_journal(journal)
+        if app.config.get('MUSIC_MEDIA_HOT_RELOAD', False) or app.config.get('MUSIC_MEDIA_WRITE_LOCK', False):
+            # The watcher also refreshes the library when another worker wrote the file first
+            from app.musicmedia.musicmedia_watcher import MusicMediaFileWatcher
+            watcher = MusicMediaFileWatcher(app.config['MUSIC_MEDIA_HTML_FILE'],
+                                            parser=app.config.get('MUSIC_MEDIA_PARSER', None),
+                                            interval=app.config.get('MUSIC_MEDIA_HOT_RELOAD_INTERVAL', 2))
+            MEDIA._html_file_watcher = watcher
+            if app.config.get('MUSIC_MEDIA_SNAPSHOT', False):
+                # Registered before the writer so it runs after the writer has written out the last changes
+                atexit.register(watcher.write_stale_snapshot)
+            if app.config.get('MUSIC_MEDIA_HOT_RELOAD', False):
+                app.before_request(watcher.check)
+        if app.config.get('MUSIC_MEDIA_BACKGROUND_WRITE', False):
+            from app.musicmedia.musicmedia_writer import MusicMediaWriter
+            writer = MusicMediaWriter(app.config['MUSIC_MEDIA_HTML_FILE'],
+                                      delay=app.config.get('MUSIC_MEDIA_WRITE_DELAY', 2),
+                                      max_delay=app.config.get('MUSIC_MEDIA_WRITE_MAX_DELAY', 30))
+            writer.start()
+            atexit.register(writer.stop)
+            MEDIA.set_html_writer(writer)
     if app.config.get('MUSIC_MEDIA_HTML_FILE_RETENTION_COUNT') is not None:
         MEDIA.set_html_file_rentention_count(app.config['MUSIC_MEDIA_HTML_FILE_RETENTION_COUNT'])
+    if app.config.get('MUSIC_MEDIA_BACKUP_COMPRESSION') is not None:
+        MEDIA.set_html_backup_compression(app.config['MUSIC_MEDIA_BACKUP_COMPRESSION'])
+    if app.config.get('MUSIC_MEDIA_BACKUP_FULL_EVERY') is not None:
+        MEDIA.set_html_backup_full_every(app.config['MUSIC_MEDIA_BACKUP_FULL_EVERY'])
+    MEDIA.set_render_workers(app.config.get('MUSIC_MEDIA_RENDER_WORKERS', 1), app.config.get('MUSIC_MEDIA_PARALLEL_RENDER_THRESHOLD'))
 
     bootstrap.init_app(app)
-    db.init_app(app)
     login_manager.init_app(app)
     moment.init_app(app)
     pagedown.init_app(app)
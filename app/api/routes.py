@@ -1,11 +1,42 @@
-from flask import url_for
+from http import HTTPStatus
+
+from flask import abort, request, url_for
 
 from . import api
 from app import db
-from app.musicmedia.musicmedia_objects import CASSETTEs, CDs, ELPs, LPs, MINI_CDs, MediaException, MediaType
+from app.musicmedia.musicmedia_objects import CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs, MediaType
 from app.queries import get_all_dvds
 
 
+def summarize_musicmedia(musicmedia):
+    """ Return the summary of a music media returned by the music media apis """
+    pythonic_media_type = musicmedia.media_type.value.replace('-', '_')
+    if musicmedia.artist_particles is None:
+        artists = str(musicmedia.artists[0].name)
+    else:
+        artists = str(musicmedia.artists[0].name)
+        for i, particle in enumerate(musicmedia.artist_particles):
+            if i == len(musicmedia.artists) - 1:
+                # Handle dangling particle
+                artists += particle
+            else:
+                artists += particle + str(musicmedia.artists[i + 1].name)
+
+    if musicmedia.classical_composers is None:
+        classical_composers = ''
+    else:
+        classical_composers = ', '.join([classical_composer.name for classical_composer in musicmedia.classical_composers])
+    mixer = '' if musicmedia.mixer is None else str(musicmedia.mixer.name)
+    return {'id': musicmedia.index,
+            'title': musicmedia.title,
+            'artists': artists,
+            'classical_composers': classical_composers,
+            'mixer': mixer,
+            'year': musicmedia.year,
+            'expand_url_title': '<a href="{}">{}</a>'.format(url_for(pythonic_media_type + 's.expand_' + pythonic_media_type, id=musicmedia.index), musicmedia.title)
+            }
+
+
 @api.route('/dvds')
 def dvds_data():
     """ API returning all DVDs in the DVD library  """
@@ -17,7 +48,6 @@ def dvds_data():
 @api.route('/musicmedia_data/<media_type>', methods=['GET'])
 def musicmedia_data(media_type):
     """ API returning a summary of all music media of the specified type in Music Media library """
-    pythonic_media_type = media_type.replace('-', '_')
     musicmedia_summary = []
     if media_type == MediaType.LP.value:
         musicmedia_list = LPs().lps
@@ -30,36 +60,60 @@ def musicmedia_data(media_type):
     elif media_type == MediaType.MINI_CD.value:
         musicmedia_list = MINI_CDs().mini_cds
     else:
-        raise MediaException('Unknown Music Media Type: {}'.format(media_type))
+        abort(HTTPStatus.BAD_REQUEST)
 
     for musicmedia in musicmedia_list:
         if musicmedia is None:  # Skip holes in the list due to deletions
             continue
-        if musicmedia.artist_particles is None:
-            artists = str(musicmedia.artists[0].name)
-        else:
-            artists = str(musicmedia.artists[0].name)
-            for i, particle in enumerate(musicmedia.artist_particles):
-                if i == len(musicmedia.artists) - 1:
-                    # Handle dangling particle
-                    artists += particle
-                else:
-                    artists += particle + str(musicmedia.artists[i + 1].name)
-
-        if musicmedia.classical_composers is None:
-            classical_composers = ''
-        else:
-            classical_composers = ', '.join([classical_composer.name for classical_composer in musicmedia.classical_composers])
-        mixer = '' if musicmedia.mixer is None else str(musicmedia.mixer.name)
-        media_data = {'id': musicmedia.index,
-                      'title': musicmedia.title,
-                      'artists': artists,
-                      'classical_composers': classical_composers,
-                      'mixer': mixer,
-                      'year': musicmedia.year,
-                      'expand_url_title': '<a href="{}">{}</a>'.format(url_for(pythonic_media_type + 's.expand_' + pythonic_media_type, id=musicmedia.index), musicmedia.title)
-                      }
-        musicmedia_summary.append(media_data)
+        musicmedia_summary.append(summarize_musicmedia(musicmedia))
     musicmedia_summary = sorted(musicmedia_summary, key=lambda d: d['title'])
 
-    return {'data': musicmedia_summary}
\ No newline at end of file
+    return {'data': musicmedia_summary}
+
+
+@api.route('/musicmedia_years/<int:first_year>/<int:last_year>', methods=['GET'])
+def musicmedia_years(first_year, last_year):
+    """ API returning a summary of the music media produced from the first to the last year, e.g. a decade
+        with /musicmedia_years/1970/1979. Optionally limited to one type of music media with ?media_type=lp
+    """
+    media_type = request.args.get('media_type')
+    if media_type is None:
+        media_types = None
+    elif media_type in [musicmedia_type.value for musicmedia_type in MediaType]:
+        media_types = [MediaType(media_type)]
+    else:
+        abort(HTTPStatus.BAD_REQUEST)
+
+    musicmedia_summary = []
+    for musicmedia in MEDIA.find_by_year_range(first_year, last_year, media_types=media_types):
+        media_data = summarize_musicmedia(musicmedia)
+        media_data['media_type'] = musicmedia.media_type.value
+        musicmedia_summary.append(media_data)
+
+    return {'data': musicmedia_summary}
+
+
+@api.route('/songs', methods=['GET'])
+def songs():
+    """ API returning the songs of a title across all music media, e.g. /songs?title=Imagine.
+        Optionally limited to the songs of one artist with &artist=John Lennon
+    """
+    title = request.args.get('title')
+    if title is None or title.strip() == '':
+        abort(HTTPStatus.BAD_REQUEST)
+
+    songs_found = []
+    for musicmedia, track_id, song_id in MEDIA.find_songs(title, artist=request.args.get('artist')):
+        tracklist = musicmedia.tracks[track_id]
+        song = tracklist.song_list[song_id]
+        song_artist = song.main_artist or tracklist.track_artist or (musicmedia.artists[0] if musicmedia.artists else None)
+        songs_found.append({'title': song.title,
+                            'artist': '' if song_artist is None else song_artist.name,
+                            'mix': '' if song.mix is None else song.mix,
+                            'media_type': musicmedia.media_type.value,
+                            'track_id': track_id,
+                            'song_id': song_id,
+                            'musicmedia': summarize_musicmedia(musicmedia)
+                            })
+
+    return {'data': songs_found}
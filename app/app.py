@@ -26,6 +26,7 @@ from app import (
     login_manager
 )
 from app.models import User
+from app.musicmedia.musicmedia_objects import MEDIA
 from app.auth import is_safe_url
 from app.queries import get_user
 from app.updates import db_update_user_password
@@ -131,6 +132,28 @@ def csp_report():
         return response
 
 
+def load_report():
+    """ Report of the phases of loading the music media library at startup """
+    if app.music_media_load_report is None:
+        abort(HTTPStatus.NOT_FOUND)
+    return app.music_media_load_report
+
+
+def write_status():
+    """ State of the background writer of the music media library """
+    writer = MEDIA.html_writer()
+    if writer is None:
+        abort(HTTPStatus.NOT_FOUND)
+    return writer.status()
+
+
+# The diagnostics of the music media library show internal file paths and timings so are
+# only served where they are turned on, such as in development
+if app.config.get('MUSIC_MEDIA_DIAGNOSTICS', False):
+    app.add_url_rule('/load-report', view_func=login_required(load_report))
+    app.add_url_rule('/write-status', view_func=login_required(write_status))
+
+
 @app.route('/main')
 @login_required
 def main():
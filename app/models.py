@@ -86,6 +86,104 @@ class User(UserMixin, DB.Model):
         return result
 
 
+class MusicArtist(DB.Model):
+    __tablename__ = 'MUSIC_ARTIST'
+
+    id = DB.Column(DB.Integer, primary_key=True)
+    name = DB.Column(DB.String(256), nullable=False, unique=True, index=True)
+
+
+class MusicMedia(DB.Model):
+    __tablename__ = 'MUSIC_MEDIA'
+
+    id = DB.Column(DB.Integer, primary_key=True)
+    media_type = DB.Column(DB.String(16), nullable=False, index=True)
+    hash = DB.Column(DB.String(32), nullable=False, index=True)  # Identity of the media in its library. Kept when the title is edited
+    position = DB.Column(DB.Integer, nullable=False)  # Order of the media in the html data file
+    title = DB.Column(DB.String(512), nullable=False, index=True)
+    year = DB.Column(DB.Integer, default=None, nullable=True, index=True)
+    mixer_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), default=None, nullable=True)
+    artist_particles = DB.Column(DB.Text, default=None, nullable=True)  # JSON list of the text joining the artists
+    digest = DB.Column(DB.String(32), nullable=False)  # Digest of the html block the media was last saved from
+
+
+class MusicMediaArtist(DB.Model):
+    __tablename__ = 'MUSIC_MEDIA_ARTIST'
+
+    media_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_MEDIA.id', ondelete='CASCADE'), primary_key=True)
+    position = DB.Column(DB.Integer, primary_key=True)
+    artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), nullable=False, index=True)
+
+
+class MusicMediaComposer(DB.Model):
+    __tablename__ = 'MUSIC_MEDIA_COMPOSER'
+
+    media_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_MEDIA.id', ondelete='CASCADE'), primary_key=True)
+    position = DB.Column(DB.Integer, primary_key=True)
+    artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), nullable=False, index=True)
+
+
+class MusicTrackList(DB.Model):
+    __tablename__ = 'MUSIC_TRACKLIST'
+
+    id = DB.Column(DB.Integer, primary_key=True)
+    media_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_MEDIA.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = DB.Column(DB.Integer, nullable=False)
+    name = DB.Column(DB.String(512), default=None, nullable=True)
+    track_artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), default=None, nullable=True)
+    side_mixer_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), default=None, nullable=True)
+    track_year = DB.Column(DB.Integer, default=None, nullable=True)
+
+
+class MusicSong(DB.Model):
+    __tablename__ = 'MUSIC_SONG'
+
+    id = DB.Column(DB.Integer, primary_key=True)
+    tracklist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_TRACKLIST.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = DB.Column(DB.Integer, nullable=False)
+    title = DB.Column(DB.String(512), default=None, nullable=True, index=True)
+    main_artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), default=None, nullable=True, index=True)
+    exp_main_artist = DB.Column(DB.Boolean, default=False, nullable=False)
+    main_artist_sequel = DB.Column(DB.String(256), default=None, nullable=True)
+    album = DB.Column(DB.String(512), default=None, nullable=True)
+    classical_work = DB.Column(DB.String(512), default=None, nullable=True)
+    country = DB.Column(DB.String(128), default=None, nullable=True)
+    year = DB.Column(DB.Integer, default=None, nullable=True)
+    mix = DB.Column(DB.String(256), default=None, nullable=True)
+    featured_in = DB.Column(DB.String(512), default=None, nullable=True)
+    parts = DB.Column(DB.Text, default=None, nullable=True)  # JSON list of the parts of the song
+
+
+class MusicSongArtist(DB.Model):
+    __tablename__ = 'MUSIC_SONG_ARTIST'
+
+    song_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_SONG.id', ondelete='CASCADE'), primary_key=True)
+    position = DB.Column(DB.Integer, primary_key=True)
+    artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), nullable=False, index=True)
+    prequel = DB.Column(DB.String(256), default='', nullable=False)
+    sequel = DB.Column(DB.String(256), default='', nullable=False)
+
+
+class MusicSongComposer(DB.Model):
+    __tablename__ = 'MUSIC_SONG_COMPOSER'
+
+    song_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_SONG.id', ondelete='CASCADE'), primary_key=True)
+    position = DB.Column(DB.Integer, primary_key=True)
+    artist_id = DB.Column(DB.Integer, DB.ForeignKey('MUSIC_ARTIST.id'), nullable=False, index=True)
+
+
+class MusicMediaStore(DB.Model):
+    __tablename__ = 'MUSIC_MEDIA_STORE'
+
+    id = DB.Column(DB.Integer, primary_key=True)
+    saved_ns = DB.Column(DB.BigInteger, nullable=False)  # Wall clock time of the last save in nanoseconds
+
+
+MUSIC_MEDIA_TABLES = [MusicArtist.__table__, MusicMedia.__table__, MusicMediaArtist.__table__, MusicMediaComposer.__table__,
+                      MusicTrackList.__table__, MusicSong.__table__, MusicSongArtist.__table__, MusicSongComposer.__table__,
+                      MusicMediaStore.__table__]
+
+
 def load_initial_users(db):
    user = User()
    user.username = 'Andy'
@@ -0,0 +1,177 @@
+"""
+Safe writing of the music media html file and recovery from its backups.
+
+The html file is never written in place. A new version is written to a
+temporary file in the same directory, synced to disk and renamed over the html
+file, so the html file always holds either the old or the new version even if
+the worker is killed part way through a write.
+
+The versions of the html file are backed up in the store of
+:mod:`app.musicmedia.musicmedia_backup`. Older versions of the application kept
+each backup next to the html file, named after it with the time of the write as
+its suffix, e.g. ``music.html.1700000000``. If the html file is found cut short
+when it is loaded, such as after it was copied in by hand or written by an older
+version of the application, it is recovered from the newest complete backup.
+"""
+
+from contextlib import suppress
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HTML_FILE_END = b'</html>'
+BROKEN_SUFFIX = '.broken'
+
+# Read once at import while there is only one thread as reading it means setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def fsync_directory(dirpath: Path) -> None:
+    """ Sync a directory to disk so the files renamed into it survive a crash.
+
+        :param dirpath:  The directory to sync
+        :type dirpath:   :class:`pathlib.Path`
+    """
+    if not hasattr(os, 'O_DIRECTORY'):  # Directories cannot be opened on Windows
+        return
+    dir_fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def write_file_atomically(filepath: str, chunks: Iterable[bytes]) -> None:
+    """ Replace a file with new content so it is never left part written.
+
+        :param filepath:  The file path of the file to write
+        :type filepath:   str | :class:`pathlib.Path`
+
+        :param chunks:    The content of the file
+        :type chunks:     iterable(bytes)
+    """
+    path = Path(filepath)
+    temp_fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix='.' + path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(temp_fd, 'wb') as temp_fp:
+            temp_fp.writelines(chunks)
+            temp_fp.flush()
+            os.fsync(temp_fp.fileno())
+        # Temporary files are only readable by their owner
+        try:
+            shutil.copymode(path, temp_name)
+        except FileNotFoundError:
+            with suppress(OSError):
+                os.chmod(temp_name, 0o666 & ~_UMASK)
+        except OSError:
+            pass
+        os.replace(temp_name, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(temp_name)
+        raise
+    fsync_directory(path.parent)
+
+
+def backup_paths(filepath: str) -> List[Path]:
+    """ Return the backups kept next to an html file by older versions of the application newest first.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The file paths of the backups
+        :rtype:           list(:class:`pathlib.Path`)
+    """
+    path = Path(filepath)
+    backups = []
+    for f in path.parent.iterdir():
+        # Skip the snapshot, index, journal and other files named after the html file
+        if f.stem == path.name and f.suffix[1:].isdigit():
+            backups.append(f)
+    backups.sort(key=lambda f: int(f.suffix[1:]), reverse=True)
+    return backups
+
+
+def html_is_complete(content: bytes) -> bool:
+    """ Return whether html content runs to its closing html tag.
+
+        :param content:  The html content
+        :type content:   bytes
+
+        :returns:        False if the content is empty or cut short
+        :rtype:          bool
+    """
+    return content[-64:].rstrip().endswith(HTML_FILE_END)
+
+
+def html_file_is_complete(filepath: str) -> bool:
+    """ Return whether an html file runs to its closing html tag.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         False if the file is missing, empty or cut short
+        :rtype:           bool
+    """
+    try:
+        with open(filepath, 'rb') as html_fp:
+            html_fp.seek(0, os.SEEK_END)
+            size = html_fp.tell()
+            html_fp.seek(max(size - 64, 0))
+            tail = html_fp.read()
+    except OSError:
+        return False
+    return html_is_complete(tail)
+
+
+def recover_html_file(filepath: str) -> Optional[str]:
+    """ Replace a missing or cut short html file with its newest complete backup.
+
+        A cut short html file is kept next to it with a ``.broken`` suffix.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The name of the backup the html file was recovered from or None if it did not
+                          need recovering or there is no complete backup
+        :rtype:           str | None
+    """
+    from .musicmedia_backup import MusicMediaBackupStore
+
+    path = Path(filepath)
+    if html_file_is_complete(path) or not path.parent.is_dir():
+        return None
+
+    content = backup = None
+    backup_store = MusicMediaBackupStore(filepath)
+    for entry in backup_store.entries:
+        try:
+            content = backup_store.read(entry)
+        except (OSError, ValueError) as e:
+            logger.warning('Skipping unreadable backup {} of music media file {}: {}'.format(entry.object, filepath, e))
+            continue
+        if html_is_complete(content):
+            backup = str(backup_store.directory / entry.object)
+            break
+    else:
+        for backup_path in backup_paths(filepath):
+            if html_file_is_complete(backup_path):
+                with open(backup_path, 'rb') as backup_fp:
+                    content = backup_fp.read()
+                backup = str(backup_path)
+                break
+    if backup is None:
+        logger.error('Music media file {} is incomplete and there is no complete backup to recover it from'.format(filepath))
+        return None
+
+    if path.exists():
+        os.replace(path, path.with_name(path.name + BROKEN_SUFFIX))
+    write_file_atomically(filepath, [content])
+    logger.warning('Recovered incomplete music media file {} from backup {}'.format(filepath, backup))
+    return backup
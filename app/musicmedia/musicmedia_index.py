@@ -0,0 +1,357 @@
+"""
+Byte offset index of the music media blocks in the music media html file.
+
+The index maps each music media of the library, by its media type, index and
+hash, to the byte range of its ``<p>`` block in the html file together with a
+digest of the block. The html file is read through ``mmap`` so a single music
+media can be re-read, re-validated or compared with the library without
+reading the rest of the file.
+
+Building the index parses the header of every block once. The index is then
+kept next to the html file and reused as long as the size and modification
+time of the html file are unchanged:
+
+    {"version": 1,
+     "size": 1843912,
+     "mtime": 1718000000000000000,
+     "entries": [["lp", 0, "<media hash>", 126, 1549, "<block digest>"], ...]}
+
+Blocks which did not match a music media of the library when the index was
+built keep an entry with no index so that every block of the file is listed.
+"""
+
+from contextlib import contextmanager
+from hashlib import md5
+import json
+import locale
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .musicmedia_files import write_file_atomically
+from .musicmedia_loader import BLOCK_END, html_block_digests, html_block_header_records, media_records_from_html, resolve_parser
+from .musicmedia_objects import _MEDIA, MEDIA, media_to_hash, MediaException, MediaType
+
+logger = logging.getLogger(__name__)
+
+# Bump when the format of the persisted index changes
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.index'
+
+
+class BlockIndexEntry(NamedTuple):
+    """ Location of a music media block in the music media html file. """
+    media_type: Optional[str]
+    index: Optional[int]
+    hash: Optional[str]
+    start: int
+    end: int
+    digest: str
+
+
+def block_index_path(filepath: str) -> Path:
+    """ Return the path of the block index of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The file path of the block index
+        :rtype:           :class:`pathlib.Path`
+    """
+    return Path(filepath).with_suffix(INDEX_SUFFIX)
+
+
+@contextmanager
+def mapped_html_file(filepath: str) -> Iterator[Tuple[int, int, bytes]]:
+    """ Map a music media html file into memory.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The size and modification time of the file and its read only mapping
+        :rtype:           tuple(int, int, :class:`mmap.mmap`)
+    """
+    with open(filepath, 'rb') as fp:
+        file_stat = os.fstat(fp.fileno())
+        if file_stat.st_size == 0:  # Empty files can not be mapped
+            yield file_stat.st_size, file_stat.st_mtime_ns, b''
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            yield file_stat.st_size, file_stat.st_mtime_ns, content
+
+
+class MusicMediaBlockIndex():
+    """ Byte offset index of the music media blocks in a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :param size:      The size of the html file the index was built from
+        :type size:       int
+
+        :param mtime:     The modification time in nanoseconds of the html file the index was built from
+        :type mtime:      int
+
+        :param entries:   The entry of each block in file order
+        :type entries:    list(:class:`BlockIndexEntry`)
+
+        :param parser:    The parser backend to use or None for the default
+        :type parser:     str | None
+    """
+
+    def __init__(self, filepath: str, size: int, mtime: int, entries: List[BlockIndexEntry], parser: Optional[str] = None) -> None:
+        self._filepath = filepath
+        self._size = size
+        self._mtime = mtime
+        self._entries = entries
+        self._parser = resolve_parser(parser)
+        self._entry_by_key = {(entry.media_type, entry.index, entry.hash): entry for entry in entries if entry.index is not None}
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def mtime(self) -> int:
+        return self._mtime
+
+    @property
+    def entries(self) -> List[BlockIndexEntry]:
+        return self._entries
+
+    @classmethod
+    def build(cls, filepath: str, parser: Optional[str] = None) -> 'MusicMediaBlockIndex':
+        """ Build the index of a music media html file matching its blocks to the music media in the library.
+
+            :param filepath:  The file path of the html file
+            :type filepath:   str
+
+            :param parser:    The parser backend to use or None for the default
+            :type parser:     str | None
+
+            :returns:         The block index
+            :rtype:           :class:`MusicMediaBlockIndex`
+        """
+        media_by_hash = {}
+        for media_type in MediaType:
+            for media in MEDIA._media_list(media_type):
+                if media is not None:
+                    media_by_hash.setdefault(media.hash, media)
+
+        entries = []
+        with mapped_html_file(filepath) as (size, mtime, content):
+            for digest, start, end in html_block_digests(content):
+                media_type = index = media_hash = None
+                for record in html_block_header_records(content, start, end, parser=parser):
+                    media_type = record['media_type']
+                    media_hash = media_to_hash(MediaType(media_type), record['title'], record['artists'][0])
+                    media = media_by_hash.get(media_hash)
+                    if media is not None:
+                        index = media.index
+                entries.append(BlockIndexEntry(media_type, index, media_hash, start, end, digest))
+        return cls(filepath, size, mtime, entries, parser=parser)
+
+    @classmethod
+    def from_written_blocks(cls, filepath: str, size: int, mtime: int, header: str, written_blocks: List[Tuple[_MEDIA, int, str]],
+                            parser: Optional[str] = None) -> 'MusicMediaBlockIndex':
+        """ Build the index of a music media html file from the blocks it was just written with.
+
+            :param filepath:        The file path of the html file
+            :type filepath:         str
+
+            :param size:            The size of the written html file
+            :type size:             int
+
+            :param mtime:           The modification time in nanoseconds of the written html file
+            :type mtime:            int
+
+            :param header:          The html written before the first block
+            :type header:           str
+
+            :param written_blocks:  Each music media written with the size and digest of its block in file order
+            :type written_blocks:   list(tuple(:class:`_MEDIA`, int, str))
+
+            :param parser:          The parser backend to use or None for the default
+            :type parser:           str | None
+
+            :returns:               The block index
+            :rtype:                 :class:`MusicMediaBlockIndex`
+        """
+        entries = []
+        start = len(header.encode(locale.getpreferredencoding(False)))
+        for media, block_size, digest in written_blocks:
+            entries.append(BlockIndexEntry(media.media_type.value, media.index, media.hash, start, start + block_size, digest))
+            start += block_size
+        if entries:
+            # The last block runs to the end of the file
+            entries[-1] = entries[-1]._replace(end=size)
+        return cls(filepath, size, mtime, entries, parser=parser)
+
+    @classmethod
+    def from_file(cls, filepath: str, parser: Optional[str] = None) -> Optional['MusicMediaBlockIndex']:
+        """ Return the persisted index of a music media html file if it is still valid.
+
+            :param filepath:  The file path of the html file
+            :type filepath:   str
+
+            :param parser:    The parser backend to use or None for the default
+            :type parser:     str | None
+
+            :returns:         The block index or None if it is missing, stale or unreadable
+            :rtype:           :class:`MusicMediaBlockIndex` | None
+        """
+        path = block_index_path(filepath)
+        if not path.is_file():
+            return None
+        try:
+            with open(path, 'r') as fp:
+                persisted_index = json.load(fp)
+            if persisted_index.get('version') != INDEX_VERSION:
+                return None
+            block_index = cls(filepath, persisted_index['size'], persisted_index['mtime'],
+                              [BlockIndexEntry(*entry) for entry in persisted_index['entries']], parser=parser)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning('Ignoring unreadable music media block index {}: {}'.format(path, e))
+            return None
+        if not block_index.is_current():
+            return None
+        return block_index
+
+    @classmethod
+    def open(cls, filepath: str, parser: Optional[str] = None) -> 'MusicMediaBlockIndex':
+        """ Return the persisted index of a music media html file or build and persist a new one.
+
+            :param filepath:  The file path of the html file
+            :type filepath:   str
+
+            :param parser:    The parser backend to use or None for the default
+            :type parser:     str | None
+
+            :returns:         The block index
+            :rtype:           :class:`MusicMediaBlockIndex`
+        """
+        block_index = cls.from_file(filepath, parser=parser)
+        if block_index is None:
+            block_index = cls.build(filepath, parser=parser)
+            try:
+                block_index.save()
+            except OSError as e:
+                logger.warning('Failed to write music media block index for {}: {}'.format(filepath, e))
+        return block_index
+
+    def save(self) -> Path:
+        """ Persist the index next to the html file.
+
+            :returns:  The file path of the block index
+            :rtype:    :class:`pathlib.Path`
+        """
+        path = block_index_path(self._filepath)
+        content = json.dumps({'version': INDEX_VERSION,
+                              'size': self._size,
+                              'mtime': self._mtime,
+                              'entries': [list(entry) for entry in self._entries]})
+        write_file_atomically(path, [content.encode('utf-8')])
+        return path
+
+    def is_current(self) -> bool:
+        """ True if the html file has not changed since the index was built.
+
+            :returns:  True if the index matches the html file
+            :rtype:    bool
+        """
+        try:
+            file_stat = os.stat(self._filepath)
+        except OSError:
+            return False
+        return file_stat.st_size == self._size and file_stat.st_mtime_ns == self._mtime
+
+    def entry(self, media: _MEDIA) -> Optional[BlockIndexEntry]:
+        """ Return the entry of the block of a music media.
+
+            :param media:  The music media
+            :type media:   :class:`_MEDIA`
+
+            :returns:      The entry or None if the music media is not in the html file
+            :rtype:        :class:`BlockIndexEntry` | None
+        """
+        return self._entry_by_key.get((media.media_type.value, media.index, media.hash))
+
+    def media(self, entry: BlockIndexEntry) -> Optional[_MEDIA]:
+        """ Return the music media of the library in a block.
+
+            :param entry:  The entry of the block
+            :type entry:   :class:`BlockIndexEntry`
+
+            :returns:      The music media or None if no music media of the library matches the block
+            :rtype:        :class:`_MEDIA` | None
+        """
+        if entry.index is None:
+            return None
+        library_media = MEDIA._media_list(MediaType(entry.media_type))
+        if entry.index >= len(library_media):
+            return None
+        media = library_media[entry.index]
+        if media is None or media.hash != entry.hash:
+            return None
+        return media
+
+    def read_block(self, media: _MEDIA) -> bytes:
+        """ Read the block of a music media from the html file.
+
+            Only the block itself is read from the file. The block runs from its ``<p>`` to its ``</p>``.
+
+            :param media:            The music media
+            :type media:             :class:`_MEDIA`
+
+            :returns:                The block
+            :rtype:                  bytes
+
+            :raises MediaException:  If the music media is not in the index or the html file changed
+        """
+        entry = self.entry(media)
+        if entry is None:
+            raise MediaException('{} is not in the block index of {}'.format(media.title, self._filepath))
+        with mapped_html_file(self._filepath) as (size, mtime, content):
+            if size != self._size or mtime != self._mtime:
+                raise MediaException('{} changed since the block index was built'.format(self._filepath))
+            block_end = content.find(BLOCK_END, entry.start, entry.end)
+            block_end = entry.end if block_end == -1 else block_end + len(BLOCK_END)
+            block = content[entry.start:block_end]
+        if md5(block).hexdigest() != entry.digest:  # nosec
+            raise MediaException('Block of {} in {} does not match the block index'.format(media.title, self._filepath))
+        return block
+
+    def read_record(self, media: _MEDIA) -> dict:
+        """ Parse the media record of a music media from its block in the html file.
+
+            :param media:            The music media
+            :type media:             :class:`_MEDIA`
+
+            :returns:                The media record
+            :rtype:                  dict
+
+            :raises MediaException:  If the music media is not in the index or the html file changed
+        """
+        records = media_records_from_html(self.read_block(media).decode(locale.getpreferredencoding(False)), parser=self._parser)
+        if len(records) != 1:
+            raise MediaException('Expected one music media in the block of {}. Found {}'.format(media.title, len(records)))
+        return records[0]
+
+    def block_matches(self, media: _MEDIA) -> bool:
+        """ True if a music media of the library is written out exactly as its block in the html file.
+
+            :param media:            The music media
+            :type media:             :class:`_MEDIA`
+
+            :returns:                True if the music media is unchanged from the html file
+            :rtype:                  bool
+
+            :raises MediaException:  If the music media is not in the index or the html file changed
+        """
+        return self.read_block(media) == media.to_html().rstrip('\n').encode(locale.getpreferredencoding(False))
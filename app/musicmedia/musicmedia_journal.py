@@ -0,0 +1,419 @@
+"""
+Write-ahead journal of the changes made to the music library.
+
+Writing out the music media html file renders and writes the whole library, so
+it is only done once in a while. Until then the changes made through the music
+media routes would be lost if the worker stopped. The journal makes each change
+durable as it is made by appending a small record to a file next to the html
+file and syncing it to disk.
+
+Each record holds the html block of the changed music media, or notes that it
+was deleted, so the cost of journaling a change grows with the size of the
+changed music media and not with the size of the library:
+
+    {"op": "put", "media_type": "lp", "target": "<digest>", "digest": "<digest>", "html": "<p>...</p>\\n", "time": 1700000000.0}
+    {"op": "delete", "media_type": "lp", "target": "<digest>", "time": 1700000000.0}
+
+A record identifies the music media it changes by the digest of the block last
+made durable for it, either its block in the html file or the block of its last
+journal record. A new music media has no target.
+
+At startup the journal is replayed on top of the library loaded from the html
+file. Once the journal grows past a size or age limit it is compacted by
+writing out the html file, which then holds all the journaled changes, and
+emptying the journal. The changes journaled while the html file is written are
+kept in the journal as they may not be in the file. Replaying a journal whose changes are already in the html
+file, such as when the worker stopped between writing the html file and
+emptying the journal, leaves the library unchanged.
+
+When several workers write the html file, see :mod:`app.musicmedia.musicmedia_lock`,
+each worker keeps a journal of its own, e.g. ``music.html.journal.4242-1700000000``,
+so writing out the html file only empties the journal of the changes it holds.
+A worker holds a lock on its journal for as long as it runs. At startup a worker
+also replays the journals left unlocked by the workers that stopped, in the order
+the changes were made, and removes them once it has written out the html file.
+"""
+
+from contextlib import suppress
+import heapq
+import json
+import locale
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .musicmedia_files import write_file_atomically
+from .musicmedia_loader import html_block_digest, media_records_from_html, resolve_parser
+from .musicmedia_objects import _MEDIA, MEDIA
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def journal_path(filepath: str, worker: Optional[str] = None) -> Path:
+    """ Return the file path of the journal of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :param worker:    The worker keeping the journal or None for the journal of a single worker
+        :type worker:     str | None
+
+        :returns:         The file path of the journal
+        :rtype:           :class:`pathlib.Path`
+    """
+    return Path(filepath + JOURNAL_SUFFIX + ('' if worker is None else '.' + worker))
+
+
+def lock_journal_file(path: Path, wait: bool = False) -> Optional[BinaryIO]:
+    """ Open a journal file and take its lock, showing the worker keeping it is running.
+
+        The lock is only kept if the file was not replaced or removed while it was taken.
+
+        :param path:  The file path of the journal
+        :type path:   :class:`pathlib.Path`
+
+        :param wait:  Wait for another worker to release the lock rather than give up
+        :type wait:   bool
+
+        :returns:     The open journal file holding the lock or None if another worker holds it
+        :rtype:       file | None
+    """
+    if fcntl is None:
+        return None
+    while True:
+        journal_fp = open(path, 'ab')
+        try:
+            fcntl.flock(journal_fp.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if os.fstat(journal_fp.fileno()).st_ino == os.stat(path).st_ino:
+                return journal_fp
+        except BlockingIOError:
+            journal_fp.close()
+            return None
+        except FileNotFoundError:
+            pass  # Removed while the lock was taken
+        journal_fp.close()
+        if not wait:
+            return None
+
+
+class MusicMediaJournal():
+    """ Append-only journal of the changes made to the music media of a music media html file.
+
+        :param filepath:   The file path of the html file loaded into the library
+        :type filepath:    str
+
+        :param max_bytes:  Size of the journal in bytes past which it is due for compaction
+        :type max_bytes:   int
+
+        :param max_age:    Age in seconds of the oldest journaled change past which the journal is due for compaction
+        :type max_age:     float
+
+        :param parser:     The parser backend to use or None for the default
+        :type parser:      str | None
+
+        :param worker:     A name unique to the worker, e.g. its pid and start time, for it to keep a journal
+                           of its own among several workers, or None for the journal of a single worker
+        :type worker:      str | None
+    """
+
+    def __init__(self, filepath: str, max_bytes: int = 1024 * 1024, max_age: float = 3600, parser: Optional[str] = None,
+                 worker: Optional[str] = None) -> None:
+        self._filepath = filepath
+        self._worker = worker
+        self._path = journal_path(filepath, worker)
+        self._journal_fp = None  # Open journal of the worker holding its lock
+        self._adopted = []  # Journals of stopped workers replayed and locked until the html file is written out
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._parser = resolve_parser(parser)
+        self._lock = threading.Lock()
+        self._size = 0
+        self._first_change_time = None
+        self._digests = {}  # Digest of the last durable block of each music media changed since the last compaction
+        self._record_ends = {}  # Offset of the end of the last record of each music media in self._digests
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _append(self, record: dict) -> None:
+        """ Append a record to the journal and sync it to disk. """
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with open(self._path, 'ab') as journal_fd:
+            journal_fd.write(line)
+            journal_fd.flush()
+            os.fsync(journal_fd.fileno())
+        self._size += len(line)
+        if self._first_change_time is None:
+            self._first_change_time = record['time']
+
+    def _target(self, media: _MEDIA) -> Optional[str]:
+        """ Return the digest of the last durable block of a music media or None if it has none. """
+        if media in self._digests:
+            return self._digests[media]
+        entry = MEDIA.html_block_index(parser=self._parser).entry(media)
+        return None if entry is None else entry.digest
+
+    def record_change(self, media: _MEDIA) -> None:
+        """ Journal the current state of a changed music media.
+
+            A music media no longer in the library is journaled as deleted.
+
+            :param media:  The changed music media
+            :type media:   :class:`_MEDIA`
+        """
+        html = None
+        if MEDIA._media_library(media.media_type).exists(media):
+            # Rendered into the cache under the render lock, taken before the journal lock like the writes of the
+            # html file do, so a write never caches html older than the change. Saves rendering it again then.
+            with MEDIA._render_lock:
+                if media._html is None:
+                    media._html = media.to_html()
+                html = media._html
+
+        with self._lock:
+            target = self._target(media)
+            if html is None:
+                self._digests.pop(media, None)
+                self._record_ends.pop(media, None)
+                if target is not None:  # Never made durable so nothing to delete
+                    self._append({'op': 'delete', 'media_type': media.media_type.value, 'target': target, 'time': time.time()})
+                return
+
+            digest = html_block_digest(html.encode(locale.getpreferredencoding(False)))
+            self._append({'op': 'put', 'media_type': media.media_type.value, 'target': target, 'digest': digest, 'html': html,
+                          'time': time.time()})
+            self._digests[media] = digest
+            self._record_ends[media] = self._size
+
+    def _read_records(self, path: Path) -> Iterator[Tuple[dict, int]]:
+        """ Return the records of a journal with the offset of their end.
+
+            A record cut short by the worker stopping while it was appended ends the journal
+            and is cut off so later records are not appended after it.
+        """
+        if not path.is_file():
+            return
+        good_size = 0
+        with open(path, 'rb') as journal_fd:
+            for line in journal_fd:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_size += len(line)
+                yield record, good_size
+            else:
+                return
+        logger.warning('Discarding incomplete record at byte {} of music media journal {}'.format(good_size, path))
+        os.truncate(path, good_size)
+
+    def _adopt_journals(self) -> List[Path]:
+        """ Lock the journals of the workers that stopped so they are replayed by this worker alone.
+
+            Empty journals are removed straight away.
+
+            :returns:  The file paths of the journals adopted
+            :rtype:    list(:class:`pathlib.Path`)
+        """
+        if self._journal_fp is None:
+            return []
+        adopted_paths = [path for path, _ in self._adopted]
+        for path in sorted(self._path.parent.glob(journal_path(Path(self._filepath).name).name + '*')):
+            if path == self._path or path in adopted_paths:
+                continue
+            journal_fp = lock_journal_file(path)
+            if journal_fp is None:
+                continue  # Kept by a running worker
+            if os.fstat(journal_fp.fileno()).st_size == 0:
+                path.unlink()
+                journal_fp.close()
+                continue
+            self._adopted.append((path, journal_fp))
+            adopted_paths.append(path)
+        return adopted_paths
+
+    def _release_adopted(self) -> None:
+        """ Remove the journals adopted from stopped workers once the html file holds their changes. """
+        for path, journal_fp in self._adopted:
+            with suppress(FileNotFoundError):
+                path.unlink()
+            journal_fp.close()
+        self._adopted = []
+
+    def replay(self) -> int:
+        """ Apply the journaled changes to the library loaded from the html file.
+
+            A worker keeping a journal of its own also applies the changes left in the journals
+            of the workers that stopped.
+
+            :returns:  The number of changes applied
+            :rtype:    int
+        """
+        with self._lock:
+            self._size = 0
+            self._first_change_time = None
+            self._digests = {}
+            self._record_ends = {}
+            if self._worker is not None and self._journal_fp is None:
+                self._journal_fp = lock_journal_file(self._path, wait=True)
+
+            # Open the block index while the library still matches the html file so music media
+            # deleted before their first change is journaled can still be found in it
+            block_index = MEDIA.html_block_index(parser=self._parser)
+            adopted_paths = self._adopt_journals()
+            if not self._path.is_file() and not adopted_paths:
+                return 0
+
+            media_by_digest = {}
+            for entry in block_index.entries:
+                media = block_index.media(entry)
+                if media is not None:
+                    media_by_digest[entry.digest] = media
+
+            # The changes of the stopped workers are dropped with their journal once the html file is
+            # written out, so their records end at the start of the journal of this worker
+            journals = [self._read_records(self._path)]
+            journals.extend(((record, 0) for record, _ in self._read_records(path)) for path in adopted_paths)
+            applied_count = 0
+            for record, record_end in heapq.merge(*journals, key=lambda journaled: journaled[0]['time']):
+                if self._first_change_time is None:
+                    self._first_change_time = record['time']
+                if record['op'] == 'put' and record['digest'] in media_by_digest:
+                    continue  # Already in the html file
+                target = media_by_digest.pop(record['target'], None) if record['target'] is not None else None
+                if target is not None and not MEDIA._media_library(target.media_type).exists(target):
+                    target = None
+                if record['op'] == 'delete':
+                    if target is not None:
+                        self._digests.pop(target, None)
+                        self._record_ends.pop(target, None)
+                        MEDIA.remove_media(target)
+                        applied_count += 1
+                    continue
+
+                media_record = media_records_from_html(record['html'], parser=self._parser)[0]
+                if target is None:
+                    media = MEDIA.bulk_load([media_record])[0]
+                else:
+                    self._digests.pop(target, None)
+                    self._record_ends.pop(target, None)
+                    media = MEDIA.replace_media(target, media_record)
+                media_by_digest[record['digest']] = media
+                self._digests[media] = record['digest']
+                self._record_ends[media] = record_end
+                applied_count += 1
+
+            self._size = self._path.stat().st_size if self._path.is_file() else 0
+            if applied_count:
+                MEDIA.changes_to_write = True
+                logger.info('Replayed {} changes from music media journal {}'.format(applied_count, ', '.join(
+                    str(path) for path in [self._path] + adopted_paths)))
+            return applied_count
+
+    def compaction_due(self) -> bool:
+        """ Return whether the journal has grown past its size or age limit.
+
+            :returns:  True if the html file should be written out to compact the journal
+            :rtype:    bool
+        """
+        if self._first_change_time is None:
+            return False
+        return self._size >= self._max_bytes or time.time() - self._first_change_time >= self._max_age
+
+    def mark(self) -> int:
+        """ Return the offset of the end of the journal.
+
+            Taken before the library is rendered to write out the html file so the changes
+            journaled while it is written are kept when the journal is cleared.
+
+            :returns:  The offset of the end of the last journaled change
+            :rtype:    int
+        """
+        with self._lock:
+            return self._size
+
+    def _rewrite(self, content: bytes) -> None:
+        """ Replace the journal with new content in one step.
+
+            The journal of a worker is locked before it replaces the old one so the other
+            workers never take it for the journal of a stopped worker.
+        """
+        if self._journal_fp is None:
+            write_file_atomically(self._path, [content])
+            return
+        temp_fd, temp_name = tempfile.mkstemp(dir=self._path.parent, prefix='.' + self._path.name + '.', suffix='.tmp')
+        journal_fp = os.fdopen(temp_fd, 'ab')
+        try:
+            fcntl.flock(journal_fp.fileno(), fcntl.LOCK_EX)
+            journal_fp.write(content)
+            journal_fp.flush()
+            os.fsync(journal_fp.fileno())
+            os.replace(temp_name, self._path)
+        except BaseException:
+            journal_fp.close()
+            with suppress(OSError):
+                os.remove(temp_name)
+            raise
+        self._journal_fp.close()
+        self._journal_fp = journal_fp
+
+    def close(self) -> None:
+        """ Release the lock of the journal of the worker and of the journals it adopted, keeping their changes. """
+        with self._lock:
+            for _, journal_fp in self._adopted:
+                journal_fp.close()
+            self._adopted = []
+            if self._journal_fp is not None:
+                self._journal_fp.close()
+                self._journal_fp = None
+
+    def clear(self, offset: Optional[int] = None) -> None:
+        """ Empty the journal once the html file holds all the journaled changes.
+
+            :param offset:  The offset returned by :meth:`mark` before the html file was rendered to
+                            only empty the journal up to it, or None to empty all of it
+            :type offset:   int | None
+        """
+        with self._lock:
+            self._release_adopted()
+            if offset is None or offset >= self._size:
+                if self._path.is_file():
+                    with open(self._path, 'wb') as journal_fd:
+                        os.fsync(journal_fd.fileno())
+                self._size = 0
+                self._first_change_time = None
+                self._digests = {}
+                self._record_ends = {}
+                return
+
+            # Keep the changes journaled since the offset was taken
+            with open(self._path, 'rb') as journal_fd:
+                journal_fd.seek(offset)
+                kept_records = journal_fd.read(self._size - offset)
+            self._rewrite(kept_records)
+            self._size = len(kept_records)
+            self._first_change_time = json.loads(kept_records[:kept_records.index(b'\n')])['time']
+            self._digests = {media: digest for media, digest in self._digests.items() if self._record_ends[media] > offset}
+            self._record_ends = {media: self._record_ends[media] - offset for media in self._digests}
@@ -0,0 +1,853 @@
+"""
+Streaming loader for the music media html file.
+
+The music media html file is a flat sequence of ``<p>`` blocks, one block per
+music media item. Rather than building a document tree of the whole file, the
+loader feeds the file in chunks to an incremental tag/event parser. The events
+of each block are turned into a media record as soon as the block closes and
+the block is then thrown away, so memory use stays flat as the file grows.
+
+A media record holds plain python values only with all artists kept by name:
+
+    {'media_type': 'lp',
+     'title': 'Christmas',
+     'artists': ['Michael Buble'],
+     'artist_particles': [],
+     'classical_composers': [],
+     'mixer': None,
+     'year': 2011,
+     'tracks': [{'name': 'Side A',
+                 'track_artist': None,
+                 'side_mixer': None,
+                 'track_year': None,
+                 'songs': [{'title': 'Jingle Bells',
+                            'main_artist': 'Michael Buble',
+                            'exp_main_artist': False,
+                            'main_artist_sequel': None,
+                            'additional_artists': [['      featuring ', 'The Puppini Sisters', '']],
+                            'album': None,
+                            'classical_composers': None,
+                            'classical_work': None,
+                            'country': None,
+                            'year': None,
+                            'mix': None,
+                            'featured_in': None,
+                            'parts': []}]}]}
+
+Records are built into music media objects by :func:`MEDIA.from_record`. The
+text of each record is extracted with the same rules as the document tree
+loader so both loaders build the same library.
+
+The events can come from one of several parser backends:
+
+    + ``lxml``: the libxml2 html parser, the fastest and the default when installed
+    + ``html.parser``: the python standard library html parser, always available
+    + ``html5lib``: the html5lib tokenizer, the slowest but a pure python HTML5 tokenizer
+
+When the requested backend is not installed the loader falls back to ``html.parser``.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+from html.parser import HTMLParser
+import io
+import locale
+import logging
+import os
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover
+    etree = None
+
+try:
+    from html5lib._tokenizer import HTMLTokenizer
+    from html5lib.constants import tokenTypes
+except ImportError:  # pragma: no cover
+    HTMLTokenizer = None
+
+from .musicmedia_objects import Artists, MediaException, MediaType
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+BLOCK_START = b'\n<p>'      # Each music media block starts on a new line
+BLOCK_END = b'</p>'
+RANGES_PER_WORKER = 4       # Smaller block ranges keep all the workers busy until the end
+
+LXML_PARSER = 'lxml'
+HTML_PARSER = 'html.parser'
+HTML5LIB_PARSER = 'html5lib'
+PARSERS = (LXML_PARSER, HTML_PARSER, HTML5LIB_PARSER)
+
+# BeautifulSoup collapses strings made up only of ASCII white space into a
+# single newline or space. We do the same so the text seen by both loaders match.
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+ASCII_SPACES_TABLE = str.maketrans('', '', ASCII_SPACES)
+
+VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'param', 'source', 'track', 'wbr'])
+
+# Song anchors where only the first anchor found in the song is used
+SONG_TEXT_RELS = ('song', 'song-album', 'song-classical-work', 'song-country',
+                  'song-date', 'song-mix', 'song-featured-in')
+
+
+class _Element():
+    """ An open element of the music media block being parsed. """
+    __slots__ = ('tag', 'attrs', 'rel', 'text', 'children', 'anchors', 'node', 'sibling', 'artist_anchor')
+
+    def __init__(self, tag: str, attrs: Dict[str, str]) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.rel = attrs['rel'].split() if 'rel' in attrs else None
+        self.text = None           # Collected text when we need the text of the element
+        self.children = None       # Direct children of <h3> elements
+        self.anchors = None        # Anchors found under <h3> and <h4> elements
+        self.node = None           # Structure of <b> elements used to compare them
+        self.sibling = None        # String immediately following the element
+        self.artist_anchor = None  # First song artist anchor under a <b> element
+
+    def get_text(self) -> str:
+        return '' if self.text is None else ''.join(self.text)
+
+
+class _Song():
+    """ Song data collected from a top level <li> element. """
+
+    def __init__(self, track: dict) -> None:
+        self.track = track
+        self.anchors = {}
+        self.br_found = False
+        self.br_sibling = None
+        self.bold_elements = []
+        self.open_bolds = []
+
+
+class _Block():
+    """ State of the <p> block being parsed. """
+
+    def __init__(self) -> None:
+        self.record = None
+        self.sides = []
+        self.implicit_side = None
+        self.implicit_side_element = None
+        self.h4 = None
+        self.li_depth = 0
+        self.song = None
+        self.mixers = []
+
+
+def new_media_record(media_type: str) -> dict:
+    """ Return an empty media record of the passed media type. """
+    return {'media_type': media_type,
+            'title': None,
+            'artists': [],
+            'artist_particles': [],
+            'classical_composers': [],
+            'mixer': None,
+            'year': None,
+            'tracks': []}
+
+
+def new_track_record() -> dict:
+    """ Return an empty tracklist record. """
+    return {'name': None,
+            'track_artist': None,
+            'side_mixer': None,
+            'track_year': None,
+            'songs': []}
+
+
+class MediaRecordBuilder():
+    """ Parser target turning tag/data events into media records.
+
+        The builder follows the parser target interface of lxml (``start``, ``end``,
+        ``data`` and ``close``) so any incremental parser can drive it. Each media record
+        is passed to the ``on_record`` callback as soon as its ``<p>`` block closes.
+
+        Songs are collected into the most recently opened side rather than into whatever
+        element is open at the time so the records do not depend on where the parser
+        closes the side anchors.
+    """
+
+    def __init__(self, on_record: Callable[[dict], None]) -> None:
+        self._on_record = on_record
+        self._data = []
+        self._stack = []
+        self._block = None
+        self._awaiting_sibling = None
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        self._flush()
+        if tag == 'p':
+            self._end_block()
+            self._block = _Block()
+            return
+        block = self._block
+        if block is None:
+            return
+
+        element = _Element(tag, attrs)
+        if block.record is None:
+            if tag != 'a' or not element.rel:
+                raise MediaException('Music media block must start with a media type anchor, found <{}>'.format(tag))
+            block.record = new_media_record(MediaType(element.rel[0]).value)
+            self._stack.append(element)
+            return
+
+        parent = self._stack[-1] if self._stack else None
+        self._open(block, element, parent)
+        if tag in VOID_TAGS:
+            if tag == 'br' and block.song is not None and not block.song.br_found:
+                block.song.br_found = True
+                self._awaiting_sibling = block.song
+        else:
+            self._stack.append(element)
+
+    def end(self, tag: str) -> None:
+        if tag in VOID_TAGS:
+            return  # Never pushed on the stack
+        self._flush()
+        if tag == 'p':
+            self._end_block()
+            return
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position].tag == tag:
+                break
+        else:
+            return  # Stray closing tag
+        while len(self._stack) > position:
+            element = self._stack.pop()
+            self._close(element)
+        self._awaiting_sibling = element
+
+    def data(self, data: str) -> None:
+        self._data.append(data)
+
+    def close(self) -> None:
+        self._flush()
+        self._end_block()
+
+    def _flush(self) -> None:
+        """ Hand out the string collected since the last tag to the open elements. """
+        awaiting_sibling = self._awaiting_sibling
+        self._awaiting_sibling = None
+        if not self._data:
+            return
+        string = ''.join(self._data)
+        self._data = []
+        if self._block is None:
+            return
+        if string.translate(ASCII_SPACES_TABLE) == '':
+            string = '\n' if '\n' in string else ' '
+
+        if awaiting_sibling is not None:
+            if isinstance(awaiting_sibling, _Song):
+                awaiting_sibling.br_sibling = string
+            else:
+                awaiting_sibling.sibling = string
+        for element in self._stack:
+            if element.text is not None:
+                element.text.append(string)
+        if self._stack:
+            parent = self._stack[-1]
+            if parent.children is not None:
+                parent.children.append(string)
+            if parent.node is not None:
+                parent.node[2].append(string)
+
+    def _open(self, block: _Block, element: _Element, parent: Optional[_Element]) -> None:
+        """ Set up the collection of whatever information the new element holds. """
+        tag = element.tag
+        song = block.song
+
+        # Keep the structure of <b> elements as that is how the bold blocks are compared
+        if parent is not None and parent.node is not None:
+            element.node = [tag, tuple(sorted(element.attrs.items())), []]
+            parent.node[2].append(element.node)
+
+        if parent is not None and parent.children is not None:
+            element.text = []
+            parent.children.append(element)
+
+        if tag == 'h3':
+            element.text = []
+            element.children = []
+            element.anchors = []
+        elif tag == 'h4':
+            if block.sides:
+                element.text = []
+                element.anchors = []
+                block.h4 = element
+        elif tag == 'a':
+            if element.rel is not None and 'side' in element.rel:
+                block.sides.append(new_track_record())
+            for open_element in self._stack:
+                if open_element.anchors is not None:
+                    element.text = []
+                    open_element.anchors.append(element)
+            if song is not None and element.rel is not None:
+                element.text = []
+                for rel_value in element.rel:
+                    song.anchors.setdefault(rel_value, []).append(element)
+                if 'song-artist' in element.rel:
+                    for bold_element in song.open_bolds:
+                        if bold_element.artist_anchor is None:
+                            bold_element.artist_anchor = element
+        elif tag == 'ol':
+            if not block.sides and block.implicit_side is None and block.li_depth == 0:
+                # No labelled sides, like a CD, so the first list holds the songs
+                block.implicit_side = new_track_record()
+                block.implicit_side_element = element
+        elif tag == 'li':
+            if block.li_depth == 0:
+                if block.sides:
+                    block.song = _Song(block.sides[-1])
+                elif block.implicit_side_element is not None:
+                    block.song = _Song(block.implicit_side)
+            block.li_depth += 1
+        elif tag == 'b':
+            if song is not None:
+                if element.node is None:
+                    element.node = [tag, tuple(sorted(element.attrs.items())), []]
+                song.open_bolds.append(element)
+                song.bold_elements.append(element)
+
+    def _close(self, element: _Element) -> None:
+        """ Process the information collected by an element once it closes. """
+        block = self._block
+        tag = element.tag
+        if tag == 'h3':
+            self._process_h3(block, element)
+        elif tag == 'h4':
+            if element is block.h4:
+                self._process_h4(block, element)
+                block.h4 = None
+        elif tag == 'ol':
+            if element is block.implicit_side_element:
+                block.implicit_side_element = None
+        elif tag == 'li':
+            block.li_depth -= 1
+            if block.li_depth == 0 and block.song is not None:
+                block.song.track['songs'].append(self._song_record(block, block.song))
+                block.song = None
+        elif tag == 'b':
+            if block.song is not None and element in block.song.open_bolds:
+                block.song.open_bolds.remove(element)
+
+    def _process_h3(self, block: _Block, h3: _Element) -> None:
+        """ Extract the music media metadata held by a <h3> element. """
+        record = block.record
+        if not h3.children:
+            return
+        first_child = h3.children[0]
+        if isinstance(first_child, _Element):
+            if first_child.rel is None:
+                return
+            rel_value = first_child.rel[0]
+            if rel_value == 'title':
+                record['title'] = first_child.get_text().strip()
+            elif rel_value == 'artist':
+                # Artists are separated by particle strings such as " & " or " and "
+                position = 0
+                while position < len(h3.children):
+                    child = h3.children[position]
+                    record['artists'].append(child.get_text().strip())
+                    if position + 1 < len(h3.children) and isinstance(h3.children[position + 1], str):
+                        record['artist_particles'].append(h3.children[position + 1])
+                        position += 2
+                    else:
+                        position += 1
+            elif rel_value == 'classical-composer':
+                for anchor in h3.anchors:
+                    if anchor.rel is not None and 'classical-composer' in anchor.rel:
+                        record['classical_composers'].append(anchor.get_text().strip())
+            elif rel_value == 'date':
+                record['year'] = int(first_child.get_text().strip())
+        else:
+            # Mixer entry starts as "Mixed By"
+            for anchor in h3.anchors:
+                if anchor.rel is not None and 'mixer' in anchor.rel:
+                    block.mixers.append(anchor.get_text().strip())
+
+    def _process_h4(self, block: _Block, h4: _Element) -> None:
+        """ Extract the side metadata held by a <h4> element. """
+        track = block.sides[-1]
+
+        def rel_text(rel_value: str) -> Optional[str]:
+            for anchor in h4.anchors:
+                if anchor.rel is not None and rel_value in anchor.rel:
+                    return anchor.get_text().strip()
+            return None
+
+        side_mixer = rel_text('side-mixer')
+        if side_mixer is not None:
+            track['side_mixer'] = side_mixer
+            return
+        track_artist = rel_text('track-artist')
+        if track_artist is not None:
+            track['track_artist'] = track_artist
+            return
+        track_year = rel_text('track-year')
+        if track_year is not None:
+            track['track_year'] = int(track_year)
+            return
+        track['name'] = h4.get_text().strip()
+
+    def _song_record(self, block: _Block, song: _Song) -> dict:
+        """ Build the song record from the data collected under a song <li> element. """
+        def rel_text(rel_value: str) -> Optional[str]:
+            anchors = song.anchors.get(rel_value)
+            return None if not anchors else anchors[0].get_text().strip()
+
+        # Determine the main song artist, the additional song artists with prequel and sequel
+        # information and if the main artist should be exposed.
+        media_artist = block.record['artists'][0]
+        main_artist = media_artist
+        additional_artists = []
+        exp_main_artist = False
+        main_artist_sequel = None
+        if song.br_found:
+            first_prequel = ''
+            if song.br_sibling is not None:
+                first_prequel = song.br_sibling.split('\n')[1]
+            if song.bold_elements:
+                first_node = song.bold_elements[0].node
+                for bold_element in song.bold_elements:
+                    if bold_element.artist_anchor is None:
+                        continue
+                    first_block = False
+                    prequel = sequel = ''
+                    artist_name = bold_element.artist_anchor.get_text().strip()
+                    if bold_element.node == first_node:
+                        first_block = True
+                        prequel = first_prequel
+                        if media_artist.upper() == Artists.VARIOUS_ARTISTS:
+                            main_artist = artist_name
+                        elif artist_name.upper() == media_artist.upper():
+                            exp_main_artist = True
+                    if bold_element.sibling is not None:
+                        sequel = bold_element.sibling.split('\n')[0]
+                        if first_block and exp_main_artist:
+                            main_artist_sequel = sequel
+                    if (first_block and not exp_main_artist) or not first_block:
+                        additional_artists.append([prequel, artist_name, sequel])
+
+        classical_composers = [anchor.get_text().strip() for anchor in song.anchors.get('song-classical-composer', [])]
+        song_year = rel_text('song-date')
+        return {'title': rel_text('song'),
+                'main_artist': main_artist,
+                'exp_main_artist': exp_main_artist,
+                'main_artist_sequel': main_artist_sequel,
+                'additional_artists': additional_artists if additional_artists != [] else None,
+                'album': rel_text('song-album'),
+                'classical_composers': classical_composers if classical_composers != [] else None,
+                'classical_work': rel_text('song-classical-work'),
+                'country': rel_text('song-country'),
+                'year': None if song_year is None else int(song_year),
+                'mix': rel_text('song-mix'),
+                'featured_in': rel_text('song-featured-in'),
+                'parts': [anchor.get_text().strip() for anchor in song.anchors.get('song-part', [])]}
+
+    def _end_block(self) -> None:
+        """ Finish the record of the current block and hand it out. """
+        block = self._block
+        self._block = None
+        self._stack = []
+        self._awaiting_sibling = None
+        if block is None or block.record is None:
+            return
+        record = block.record
+        if len(record['classical_composers']) > 2:
+            raise MediaException('{} has more than two classical composer credits'.format(record['title']))
+        if len(block.mixers) > 1:
+            raise MediaException('{} has more than one mixer credit'.format(record['title']))
+        if block.mixers:
+            record['mixer'] = block.mixers[0]
+        if block.sides:
+            record['tracks'] = block.sides
+        elif block.implicit_side is not None:
+            record['tracks'] = [block.implicit_side]
+        self._on_record(record)
+
+
+class _HTMLParserEvents(HTMLParser):
+    """ Forward the events of the standard library incremental html parser to a parser target. """
+
+    def __init__(self, target: MediaRecordBuilder) -> None:
+        super().__init__(convert_charrefs=True)
+        self._target = target
+
+    def handle_starttag(self, tag, attrs):
+        self._target.start(tag, {name: '' if value is None else value for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self._target.end(tag)
+
+    def handle_endtag(self, tag):
+        self._target.end(tag)
+
+    def handle_data(self, data):
+        self._target.data(data)
+
+    def close(self):
+        super().close()
+        self._target.close()
+
+
+def _html_parser_records(fp: TextIO) -> Iterator[dict]:
+    """ Stream media records using the standard library html parser. """
+    records = []
+    parser = _HTMLParserEvents(MediaRecordBuilder(records.append))
+    for chunk in iter(lambda: fp.read(READ_CHUNK_SIZE), ''):
+        parser.feed(chunk)
+        yield from records
+        records.clear()
+    parser.close()
+    yield from records
+
+
+def _lxml_records(fp: TextIO) -> Iterator[dict]:
+    """ Stream media records using the lxml html parser with the record builder as its target. """
+    records = []
+    parser = etree.HTMLParser(target=MediaRecordBuilder(records.append))
+    for chunk in iter(lambda: fp.read(READ_CHUNK_SIZE), ''):
+        parser.feed(chunk)
+        yield from records
+        records.clear()
+    parser.close()
+    yield from records
+
+
+def _html5lib_records(fp: TextIO) -> Iterator[dict]:
+    """ Stream media records using the html5lib tokenizer.
+
+        Only the tokenizer is used as the html5lib tree construction would move the
+        block elements out of the anchors.
+    """
+    records = []
+    builder = MediaRecordBuilder(records.append)
+    start_tag, empty_tag, end_tag = tokenTypes['StartTag'], tokenTypes['EmptyTag'], tokenTypes['EndTag']
+    character_tokens = (tokenTypes['Characters'], tokenTypes['SpaceCharacters'])
+    for token in HTMLTokenizer(fp):
+        token_type = token['type']
+        if token_type == start_tag or token_type == empty_tag:
+            builder.start(token['name'], dict(token['data']))
+            if token_type == empty_tag:
+                builder.end(token['name'])
+        elif token_type == end_tag:
+            builder.end(token['name'])
+        elif token_type in character_tokens:
+            builder.data(token['data'])
+        if records:
+            yield from records
+            records.clear()
+    builder.close()
+    yield from records
+
+
+_PARSER_BACKENDS = {LXML_PARSER: _lxml_records,
+                    HTML_PARSER: _html_parser_records,
+                    HTML5LIB_PARSER: _html5lib_records}
+
+
+def parser_available(parser: str) -> bool:
+    """ Return if the named parser backend is installed. """
+    if parser == LXML_PARSER:
+        return etree is not None
+    elif parser == HTML5LIB_PARSER:
+        return HTMLTokenizer is not None
+    return parser == HTML_PARSER
+
+
+def resolve_parser(parser: Optional[str] = None) -> str:
+    """ Return the parser backend to use for the requested one.
+
+        :param parser:           The name of the requested parser backend or None for the default
+        :type parser:            str | None
+
+        :returns:                The requested parser or ``html.parser`` if it is not installed
+        :rtype:                  str
+
+        :raises MediaException:  If the parser backend is unknown
+    """
+    if parser is None:
+        parser = LXML_PARSER
+    if parser not in PARSERS:
+        raise MediaException('Unknown music media parser {}. Expected one of {}'.format(parser, ', '.join(PARSERS)))
+    if not parser_available(parser):
+        logger.warning('Music media parser {} is not installed. Falling back to {}'.format(parser, HTML_PARSER))
+        parser = HTML_PARSER
+    return parser
+
+
+def iter_html_file_records(filepath: str, parser: Optional[str] = None) -> Iterator[dict]:
+    """ Stream the media records of a music media html file.
+
+        The file is read and parsed in chunks and the records are yielded in file
+        order as soon as their block closes.
+
+        :param filepath:  The file path of the html file to read
+        :type filepath:   str
+
+        :param parser:    The parser backend to use or None for the default
+        :type parser:     str | None
+
+        :returns:         An iterator over the media records in the file
+        :rtype:           iterator(dict)
+    """
+    records_from = _PARSER_BACKENDS[resolve_parser(parser)]
+    with open(filepath, 'r') as fp:
+        yield from records_from(fp)
+
+
+def media_records_from_html(html: str, parser: Optional[str] = None) -> List[dict]:
+    """ Return the media records found in a music media html string.
+
+        :param html:    Html of one or more music media blocks
+        :type html:     str
+
+        :param parser:  The parser backend to use or None for the default
+        :type parser:   str | None
+
+        :returns:       The media records in document order
+        :rtype:         list(dict)
+    """
+    records_from = _PARSER_BACKENDS[resolve_parser(parser)]
+    return list(records_from(io.StringIO(html)))
+
+
+def html_block_ranges(content: bytes) -> List[Tuple[int, int]]:
+    """ Return the byte ranges of the music media blocks in the content of a music media html file.
+
+        Each range runs from the ``<p>`` of the block to the start of the next block so the
+        last range also holds the html closer.
+
+        :param content:  The content of a music media html file
+        :type content:   bytes | :class:`mmap.mmap`
+
+        :returns:        The start and end byte offsets of each block in file order
+        :rtype:          list(tuple(int, int))
+    """
+    block_starts = [0] if content[:len(BLOCK_START) - 1] == BLOCK_START[1:] else []
+    position = content.find(BLOCK_START)
+    while position != -1:
+        block_starts.append(position + 1)
+        position = content.find(BLOCK_START, position + 1)
+    return list(zip(block_starts, block_starts[1:] + [len(content)]))
+
+
+def html_block_digest(block: bytes) -> str:
+    """ Return the digest of a music media block.
+
+        The digest only covers the block from its ``<p>`` to its ``</p>`` so it does not
+        change with the html following the block.
+
+        :param block:  The block starting with its ``<p>``
+        :type block:   bytes
+
+        :returns:      The digest of the block
+        :rtype:        str
+    """
+    block_end = block.find(BLOCK_END)
+    block_end = len(block) if block_end == -1 else block_end + len(BLOCK_END)
+    return md5(block[:block_end]).hexdigest()  # nosec
+
+
+def html_block_digests(content: bytes) -> List[Tuple[str, int, int]]:
+    """ Return the digest and byte range of each music media block in a music media html file.
+
+        :param content:  The content of a music media html file
+        :type content:   bytes | :class:`mmap.mmap`
+
+        :returns:        The digest, start and end byte offsets of each block in file order
+        :rtype:          list(tuple(str, int, int))
+    """
+    block_digests = []
+    for start, end in html_block_ranges(content):
+        block_end = content.find(BLOCK_END, start, end)
+        block_end = end if block_end == -1 else block_end + len(BLOCK_END)
+        block_digests.append((md5(content[start:block_end]).hexdigest(), start, end))  # nosec
+    return block_digests
+
+
+def split_html_file(filepath: str, range_count: int) -> List[Tuple[int, int]]:
+    """ Split a music media html file into byte ranges of whole music media blocks.
+
+        The ranges cover the whole file so the first range includes the html header
+        and the last range the html closer.
+
+        :param filepath:     The file path of the html file to split
+        :type filepath:      str
+
+        :param range_count:  The number of ranges wanted
+        :type range_count:   int
+
+        :returns:            The start and end byte offsets of each range in file order
+        :rtype:              list(tuple(int, int))
+    """
+    with open(filepath, 'rb') as fp:
+        content = fp.read()
+    block_starts = [start for start, _ in html_block_ranges(content)]
+    if not block_starts:
+        return [(0, len(content))]
+
+    range_count = max(1, min(range_count, len(block_starts)))
+    range_starts = [0] + [block_starts[(len(block_starts) * index) // range_count] for index in range(1, range_count)]
+    range_ends = range_starts[1:] + [len(content)]
+    return list(zip(range_starts, range_ends))
+
+
+def _html_file_range_records(filepath: str, start: int, end: int, parser: Optional[str]) -> List[dict]:
+    """ Return the media records of a byte range of a music media html file. Runs in a worker process. """
+    with open(filepath, 'rb') as fp:
+        fp.seek(start)
+        content = fp.read(end - start)
+    return media_records_from_html(content.decode(locale.getpreferredencoding(False)), parser=parser)
+
+
+def iter_html_file_records_parallel(filepath: str, parser: Optional[str] = None, workers: Optional[int] = None) -> Iterator[dict]:
+    """ Parse the media records of a music media html file in a pool of worker processes.
+
+        The file is split into ranges of whole music media blocks which are parsed in
+        parallel. The records are yielded in file order so building the library from
+        them gives exactly the same artists and indexes as a serial load.
+
+        :param filepath:  The file path of the html file to read
+        :type filepath:   str
+
+        :param parser:    The parser backend to use or None for the default
+        :type parser:     str | None
+
+        :param workers:   The number of worker processes or None for the number of CPUs
+        :type workers:    int | None
+
+        :returns:         An iterator over the media records in the file
+        :rtype:           iterator(dict)
+    """
+    parser = resolve_parser(parser)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    block_ranges = split_html_file(filepath, workers * RANGES_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        range_records = pool.map(_html_file_range_records,
+                                 [filepath] * len(block_ranges),
+                                 [start for start, _ in block_ranges],
+                                 [end for _, end in block_ranges],
+                                 [parser] * len(block_ranges))
+        for records in range_records:
+            yield from records
+
+
+class MediaBlockSource():
+    """ Location of a music media block in a music media html file.
+
+        Used to parse the tracks of a music media loaded lazily the first time they
+        are needed. The size and modification time of the file are kept to make sure
+        the block is still where it was found. When the file changed since, the block
+        is looked up again by its digest.
+    """
+    __slots__ = ('filepath', 'start', 'end', 'size', 'mtime', 'parser', 'digest')
+
+    def __init__(self, filepath: str, start: int, end: int, size: int, mtime: int, parser: str, digest: str) -> None:
+        self.filepath = filepath
+        self.start = start
+        self.end = end
+        self.size = size
+        self.mtime = mtime
+        self.parser = parser
+        self.digest = digest
+
+    def read_record(self) -> dict:
+        """ Parse the full media record of the block.
+
+            :returns:                The media record
+            :rtype:                  dict
+
+            :raises MediaException:  If the block is no longer in the html file
+        """
+        with open(self.filepath, 'rb') as fp:
+            file_stat = os.fstat(fp.fileno())
+            if file_stat.st_size != self.size or file_stat.st_mtime_ns != self.mtime:
+                self._relocate(fp.read(), file_stat.st_size, file_stat.st_mtime_ns)
+            fp.seek(self.start)
+            content = fp.read(self.end - self.start)
+        records = media_records_from_html(content.decode(locale.getpreferredencoding(False)), parser=self.parser)
+        if len(records) != 1:
+            raise MediaException('Expected one music media at offset {} of {}. Found {}'.format(self.start, self.filepath, len(records)))
+        return records[0]
+
+    def _relocate(self, content: bytes, size: int, mtime: int) -> None:
+        """ Find the block again in the changed content of the html file.
+
+            :param content:          The current content of the html file
+            :type content:           bytes
+
+            :param size:             The current size of the html file
+            :type size:              int
+
+            :param mtime:            The current modification time of the html file in nanoseconds
+            :type mtime:             int
+
+            :raises MediaException:  If the block is no longer in the html file
+        """
+        for digest, start, end in html_block_digests(content):
+            if digest == self.digest:
+                self.start, self.end, self.size, self.mtime = start, end, size, mtime
+                return
+        raise MediaException('Music media block at offset {} of {} is no longer in the file'.format(self.start, self.filepath))
+
+
+def iter_html_file_headers(filepath: str, parser: Optional[str] = None) -> Iterator[Tuple[dict, MediaBlockSource]]:
+    """ Stream the media headers of a music media html file.
+
+        Only the start of each music media block up to its last ``<h3>`` element is
+        parsed so the records hold the title, artists, classical composers, mixer
+        and year but no tracks.
+
+        :param filepath:  The file path of the html file to read
+        :type filepath:   str
+
+        :param parser:    The parser backend to use or None for the default
+        :type parser:     str | None
+
+        :returns:         An iterator over the header only media records in the file together
+                          with the location of their block
+        :rtype:           iterator(tuple(dict, :class:`MediaBlockSource`))
+    """
+    parser = resolve_parser(parser)
+    with open(filepath, 'rb') as fp:
+        file_stat = os.fstat(fp.fileno())
+        content = fp.read()
+    for digest, start, end in html_block_digests(content):
+        for record in html_block_header_records(content, start, end, parser=parser):
+            yield record, MediaBlockSource(filepath, start, end, file_stat.st_size, file_stat.st_mtime_ns, parser, digest)
+
+
+def html_block_header_records(content: bytes, start: int, end: int, parser: Optional[str] = None) -> List[dict]:
+    """ Return the header only media records of a music media block.
+
+        :param content:  The content of a music media html file
+        :type content:   bytes | :class:`mmap.mmap`
+
+        :param start:    The byte offset of the start of the block
+        :type start:     int
+
+        :param end:      The byte offset of the end of the block
+        :type end:       int
+
+        :param parser:   The parser backend to use or None for the default
+        :type parser:    str | None
+
+        :returns:        The media records found without their tracks
+        :rtype:          list(dict)
+    """
+    header_end = content.rfind(b'</h3>', start, end)
+    header_end = end if header_end == -1 else header_end + len(b'</h3>')
+    records = media_records_from_html(content[start:header_end].decode(locale.getpreferredencoding(False)), parser=parser)
+    for record in records:
+        record['tracks'] = []
+    return records
@@ -0,0 +1,124 @@
+"""
+Coordination of the workers writing the music media html file.
+
+Each worker of the application loads its own copy of the library and writes it
+out on its own. Left at that, the last worker to write the file overwrites the
+changes written by the others since it loaded the file. Writes are coordinated
+through two files kept next to the html file:
+
+    + ``music.html.lock``: Advisory lock held while the file is written so only one
+      worker writes it at a time
+    + ``music.html.version``: The version of the html file, raised by one on each write
+
+    {"version": 12, "pid": 4242, "time": 1700000000.0}
+
+A worker remembers the version of the file it loaded. Holding the lock, it compares
+that version with the current one before writing. When another worker wrote the file
+in between, the library is stale and is refreshed from the file first, keeping its
+own unwritten changes, so the write holds the changes of both workers. Once written
+the version is raised. This is a compare and swap on the version of the file. A
+music media changed by both workers is a conflict and the write is refused with a
+:class:`StaleLibraryException` rather than drop either change.
+
+The html file is always replaced before its version, so the content of the file is
+never older than the version read before it. A worker reading the version and then
+the file at worst takes itself for stale and refreshes for nothing.
+
+The lock uses ``fcntl.flock`` and is not taken on platforms without it.
+"""
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+import time
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .musicmedia_files import write_file_atomically
+
+logger = logging.getLogger(__name__)
+
+LOCK_SUFFIX = '.lock'
+VERSION_SUFFIX = '.version'
+
+
+def lock_path(filepath: str) -> Path:
+    """ Return the file path of the write lock of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The file path of the lock file
+        :rtype:           :class:`pathlib.Path`
+    """
+    return Path(str(filepath) + LOCK_SUFFIX)
+
+
+def version_path(filepath: str) -> Path:
+    """ Return the file path of the version of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The file path of the version file
+        :rtype:           :class:`pathlib.Path`
+    """
+    return Path(str(filepath) + VERSION_SUFFIX)
+
+
+def read_version(filepath: str) -> int:
+    """ Return the version of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The version of the file or 0 if it was never written with a version
+        :rtype:           int
+    """
+    try:
+        with open(version_path(filepath), 'rb') as version_fp:
+            return int(json.loads(version_fp.read())['version'])
+    except FileNotFoundError:
+        return 0
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning('Ignoring unreadable music media version file {}: {}'.format(version_path(filepath), e))
+        return 0
+
+
+def write_version(filepath: str, version: int) -> None:
+    """ Set the version of a music media html file. Only called holding the write lock.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :param version:   The new version of the file
+        :type version:    int
+    """
+    content = json.dumps({'version': version, 'pid': os.getpid(), 'time': time.time()}).encode('utf-8')
+    write_file_atomically(version_path(filepath), [content])
+
+
+@contextmanager
+def write_lock(filepath: str) -> Iterator[None]:
+    """ Hold the write lock of a music media html file, waiting for other writers to release it.
+
+        The lock is taken on its own open file so it also keeps out the other threads of the worker.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path(filepath), 'a') as lock_fp:
+        fcntl.flock(lock_fp.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_fp.fileno(), fcntl.LOCK_UN)
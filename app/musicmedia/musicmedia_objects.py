@@ -27,14 +27,20 @@ there last media being deleted or they are only associated with a song(s) on
 a media tracklist.
 """
 
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from enum import Enum
 from hashlib import md5
+import heapq
 from html import escape
+import json
+import locale
+import multiprocessing
 import os
-from pathlib import Path
-import shutil
-import time
-from typing import List, Optional, Set
+import threading
+import unicodedata
+from typing import Callable, Iterable, Iterator, List, Optional, Set
 
 from bs4 import BeautifulSoup
 from bs4.element import NavigableString, Tag
@@ -94,6 +100,60 @@ class TrackListException(Exception):
     pass
 
 
+class StaleLibraryException(Exception):
+    """ Indicates the html data file was written by another worker since the library was loaded. """
+    pass
+
+
+def _fold_text(text: str) -> str:
+    """ Return the text case folded, stripped of diacritics and with its whitespace collapsed. """
+    folded = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(char for char in folded if not unicodedata.combining(char)).split())
+
+
+def normalize_artist_name(name: str) -> str:
+    """ Return the form of an artist name that other spellings of the name share.
+
+        The name is case folded, stripped of diacritics and its whitespace collapsed. A
+        leading ``The`` or trailing ``, The`` is dropped unless only another ``The`` is
+        left. ``The Beatles``, ``Beatles, The`` and ``the beatles `` all normalize to
+        ``beatles`` while ``The The`` stays ``the the``.
+
+        :param name:  The name of the artist
+        :type name:   str
+
+        :returns:     The normalized name
+        :rtype:       str
+    """
+    folded = _fold_text(name)
+    if folded.endswith(', the'):
+        rest = folded[:-len(', the')]
+    elif folded.startswith('the '):
+        rest = folded[len('the '):]
+    else:
+        return folded
+    return folded if rest in ('', 'the') else rest
+
+
+def loose_artist_key(name: str) -> str:
+    """ Return the normalized name of an artist without punctuation or spaces and with ``&`` read as ``and``. """
+    return ''.join(char for char in normalize_artist_name(name).replace('&', 'and') if char.isalnum())
+
+
+def normalize_song_title(title: str) -> str:
+    """ Return the form of a song title that other spellings of the title share.
+
+        The title is case folded, stripped of diacritics and its whitespace collapsed.
+
+        :param title:  The title of the song
+        :type title:   str
+
+        :returns:      The normalized title
+        :rtype:        str
+    """
+    return _fold_text(title)
+
+
 class MediaType(Enum):
     LP = 'lp'
     CASSETTE = 'cassette'
@@ -133,6 +193,11 @@ class _Artist():
     def name(self) -> str:
         return self._name
 
+    @property
+    def artist(self) -> '_Artist':
+        """ The artist the name is credited to. """
+        return self
+
     def __init__(self, name: str, index: int) -> None:
         self._name = name
         self._lps = set()
@@ -304,7 +369,10 @@ class _Artist():
             :param new_name:  The new name of the artist
             :type new_name:   str
         """
-        self._name = new_name
+        Artists._rename_artist(self, new_name)
+        artist_media = self.lps | self.cds | self.cassettes | self.elps | self.mini_cds
+        if artist_media:
+            MEDIA.mark_changed(*artist_media)
 
     def to_html(self, song_artist=False):
         """ Return a html string representation of an artist.
@@ -328,10 +396,57 @@ class _Artist():
         return self.name
 
 
+class _ArtistCredit(_Artist):
+    """ An existing artist credited under another spelling of their name or an alias.
+
+        The credit shares the index and music media of the artist it is credited to but
+        keeps the name it is credited under, so the music media show the name as it was
+        given. A credit is equal to the artist it is credited to. Should only be
+        instantiated by :func:`Artists().create_Artist`.
+    """
+
+    @property
+    def artist(self) -> _Artist:
+        """ The artist the name is credited to. """
+        return self._artist
+
+    def __init__(self, artist: _Artist, name: str) -> None:
+        self._artist = artist
+        self._name = name
+        self._lps = artist._lps
+        self._cassettes = artist._cassettes
+        self._cds = artist._cds
+        self._elps = artist._elps
+        self._mini_cds = artist._mini_cds
+        self._index = artist._index
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Artist) and other.artist is self._artist
+
+    def __hash__(self) -> int:
+        return hash(self._artist)
+
+
 class Artists():
-    """ A singleton set of all music artists. """
+    """ A singleton set of all music artists.
+
+        The artists are also kept in dictionaries by name and by normalized name, see
+        :func:`normalize_artist_name`, so finding or creating an artist by name does not
+        scan the whole set. Only this class, :meth:`_Artist.update_name` and the bulk
+        loader change the set and the dictionaries, always together.
+
+        With normalized matching turned on, an artist created under another spelling of
+        the name of an existing artist, such as ``Beatles, The`` for ``The Beatles``, is
+        credited to the existing artist. Aliases map other names, such as ``Fab Four``, to
+        the name of the artist they stand for whether normalized matching is on or not.
+        Either way the music media keep the name they credit.
+    """
     _instance = None
     _artists = set()
+    _artists_by_name = {}
+    _artists_by_key = {}         # Artists by normalized name
+    _aliases = {}                # Canonical artist names by normalized alias
+    _normalized_matching = False  # Resolve artist names to existing artists by their normalized name
     _max_index = 0
     VARIOUS_ARTISTS = 'VARIOUS ARTISTS'
 
@@ -347,14 +462,113 @@ class Artists():
 
     @classmethod
     def _clean_artists(cls):
-        """ Private method to remove all artists from the collection. Useful in testing. """
+        """ Private method to remove all artists, aliases and the matching mode from the collection. Useful in testing. """
         cls._artists = set()
+        cls._artists_by_name = {}
+        cls._artists_by_key = {}
+        cls._aliases = {}
+        cls._normalized_matching = False
         cls._max_index = 0
 
+    @classmethod
+    def set_normalized_matching(cls, normalized_matching: bool) -> None:
+        """ Turn on or off resolving artist names to existing artists by their normalized name. """
+        cls._normalized_matching = normalized_matching
+
+    @classmethod
+    def add_alias(cls, alias: str, name: str) -> None:
+        """ Make an alias stand for the name of an artist when creating artists.
+
+            :param alias:             The other name of the artist. Matched on its normalized form.
+            :type alias:              str
+
+            :param name:              The name of the artist the alias stands for
+            :type name:               str
+
+            :raises ArtistException:  If the alias or name is empty
+        """
+        if not alias or not name:
+            raise ArtistException('An artist alias must have an alias and a name')
+        cls._aliases[normalize_artist_name(alias)] = name
+
+    @classmethod
+    def load_aliases(cls, filepath: str) -> int:
+        """ Add the aliases of a JSON file holding an object of artist names by alias.
+
+            :param filepath:  The file path of the aliases file
+            :type filepath:   str
+
+            :returns:         The number of aliases added
+            :rtype:           int
+        """
+        with open(filepath, 'r', encoding='utf-8') as aliases_fp:
+            aliases = json.load(aliases_fp)
+        for alias, name in aliases.items():
+            cls.add_alias(alias, name)
+        return len(aliases)
+
+    @classmethod
+    def canonical_name(cls, name: str) -> str:
+        """ Return the name of the artist an alias stands for, or the name itself if it is not an alias.
+
+            :param name:  The name of the artist
+            :type name:   str
+
+            :returns:     The canonical name of the artist
+            :rtype:       str
+        """
+        if cls._aliases:
+            return cls._aliases.get(normalize_artist_name(name), name)
+        return name
+
+    @classmethod
+    def _index_artists(cls) -> None:
+        """ Rebuild the dictionaries of the artists from the set of all artists, e.g. after restoring a snapshot. """
+        cls._artists_by_name = {}
+        cls._artists_by_key = {}
+        for artist in cls._artists:
+            cls._index_artist(artist)
+
+    @classmethod
+    def _index_artist(cls, artist: _Artist) -> None:
+        """ Add an artist of the set of all artists to the dictionaries unless another artist holds its name. """
+        cls._artists_by_name.setdefault(artist.name, artist)
+        cls._artists_by_key.setdefault(normalize_artist_name(artist.name), artist)
+
+    @classmethod
+    def _unindex_artist(cls, artist: _Artist, name: str) -> None:
+        """ Drop the name of an artist leaving the set or changing name from the dictionaries. """
+        others = len(cls._artists) - (1 if artist in cls._artists else 0)
+        for index, key, key_of in ((cls._artists_by_name, name, None), (cls._artists_by_key, normalize_artist_name(name), normalize_artist_name)):
+            if index.get(key) is artist:
+                del index[key]
+                if len(index) < others:
+                    # Some artists share a name. Hand the name over to the next artist holding it.
+                    for other_artist in cls._artists:
+                        if other_artist is not artist and (other_artist.name if key_of is None else key_of(other_artist.name)) == key:
+                            index[key] = other_artist
+                            break
+
+    @classmethod
+    def _rename_artist(cls, artist: _Artist, new_name: str) -> None:
+        """ Change the name of an artist keeping the dictionaries of the artists in step.
+
+            A credit only changes the name it is credited under. The artist it is credited to stays
+            in the dictionaries under their own name.
+        """
+        old_name = artist.name
+        artist._name = new_name
+        if artist.artist is artist and artist in cls._artists:
+            cls._unindex_artist(artist, old_name)
+            cls._index_artist(artist)
+
     @classmethod
     def create_Artist(cls, name: str, skip_adding_to_artists_set: bool = False) -> _Artist:
         """ Return the named artist if they exist or create a new artist.
 
+            An alias stands for the artist of the name it maps to. With normalized matching
+            turned on, a name stands for an existing artist of the same normalized name.
+            Such a name is returned as a credit of that artist keeping the name as given.
             By default a new artist is added to the set of all artists.
 
             :param name:                          The name of the new artist
@@ -370,14 +584,16 @@ class Artists():
         """
         if name is None or name == '':
             raise ArtistException('An artist must have a name')
-        result = cls.find_artist(name)
-        if result is not None:
-            return result
-        new_artist = _Artist(name, cls._max_index)
-        cls._max_index += 1
-        if not skip_adding_to_artists_set:
-            cls.add_artist(new_artist)
-        return new_artist
+        canonical_name = cls.canonical_name(name)
+        result = cls.find_artist(canonical_name)
+        if result is None and cls._normalized_matching:
+            result = cls._artists_by_key.get(normalize_artist_name(canonical_name))
+        if result is None:
+            result = _Artist(canonical_name, cls._max_index)
+            cls._max_index += 1
+            if not skip_adding_to_artists_set:
+                cls.add_artist(result)
+        return result if result.name == name else _ArtistCredit(result, name)
 
     @classmethod
     def add_artist(cls, artist: _Artist) -> None:
@@ -391,9 +607,10 @@ class Artists():
         """
         if type(artist) is not _Artist:
             raise ArtistException('{} is not an Artist object'.format(artist))
-        if artist in cls._artists or cls.find_artist(artist.name) is not None:
+        if artist in cls._artists or artist.name in cls._artists_by_name:
             raise ArtistException('Artist {} already exists'.format(artist))
         cls._artists.add(artist)
+        cls._index_artist(artist)
 
     @classmethod
     def delete_artist(cls, artist: _Artist) -> None:
@@ -404,11 +621,34 @@ class Artists():
 
             :raises ArtistException:  If artist does not exist in the set
         """
+        artist = artist.artist
         if artist not in cls._artists:
             raise ArtistException('Artist {} does not exist'.format(artist))
         else:
+            cls._unindex_artist(artist, artist.name)
             cls._artists.remove(artist)
 
+    @classmethod
+    def likely_duplicates(cls) -> List[List[_Artist]]:
+        """ Return the groups of artists whose names likely stand for the same artist.
+
+            Names are compared on their normalized form without punctuation or spaces and
+            with ``&`` read as ``and``, so ``Bob Marley & The Wailers`` and ``Bob Marley And The Wailers``
+            or ``M.C. Hammer`` and ``MC Hammer`` are grouped. Add aliases to merge them.
+
+            :returns:  The groups of artists, each with the artist on the most music media first
+            :rtype:    list(list(:class:`_Artist`))
+        """
+        groups = {}
+        for artist in cls._artists:
+            groups.setdefault(loose_artist_key(artist.name), []).append(artist)
+
+        def media_count(artist):
+            return len(artist.lps) + len(artist.cds) + len(artist.cassettes) + len(artist.elps) + len(artist.mini_cds)
+
+        duplicates = [sorted(group, key=lambda artist: (-media_count(artist), artist.name)) for group in groups.values() if len(group) > 1]
+        return sorted(duplicates, key=lambda group: group[0].name.casefold())
+
     @classmethod
     def artist_exists(cls, artist: _Artist) -> bool:
         """ True if the artist is in the set of artists.
@@ -419,7 +659,7 @@ class Artists():
             :returns:       True if the artist exists in the set of all artists
             :rtype:         bool
         """
-        return artist in cls._artists
+        return artist.artist in cls._artists
 
     @classmethod
     def find_artist(cls, artist_name: str) -> Optional[_Artist]:
@@ -431,9 +671,7 @@ class Artists():
             :returns:            The artist if an artist of that name is found. Otherwise None
             :rtype:              :class:`_Artist` if found, otherwise None
         """
-        for artist in cls._artists:
-            if artist.name == artist_name:
-                return artist
+        return cls._artists_by_name.get(artist_name)
 
     @classmethod
     def __str__(cls) -> str:
@@ -484,7 +722,7 @@ class AdditionalArtist():
 
             :raises ArtistException:  If the addition artist is not a :class:`_Artist`
         """
-        if type(artist) is not _Artist:
+        if not isinstance(artist, _Artist):
             raise ArtistException('{} is not an Artist object'.format(artist))
         self._artist = artist
         self._prequel = '' if prequel is None else prequel
@@ -508,6 +746,7 @@ class AdditionalArtist():
 
 class Song():
     """ A song found on an album. """
+    _tracklist = None  # Tracklist of the song once its music media is in the song index of the library
 
     @property
     def title(self) -> str:
@@ -516,6 +755,8 @@ class Song():
     @title.setter
     def title(self, new_title) -> None:
         self._title = new_title
+        if self._tracklist is not None:
+            self._tracklist._songs_changed()
 
     @property
     def main_artist(self) -> _Artist:
@@ -523,7 +764,7 @@ class Song():
 
     @main_artist.setter
     def main_artist(self, new_artist) -> None:
-        if new_artist is not None and type(new_artist) is not _Artist:
+        if new_artist is not None and not isinstance(new_artist, _Artist):
             raise ArtistException('{} is not an Artist object'.format(new_artist))
         self._main_artist = new_artist
 
@@ -569,7 +810,7 @@ class Song():
     @classical_composers.setter
     def classical_composers(self, new_composers) -> None:
         for composer in new_composers:
-            if composer is not None and type(composer) is not _Artist:
+            if composer is not None and not isinstance(composer, _Artist):
                 raise ArtistException('{} is not an Artist object'.format(composer))
         self._classical_composers = None if new_composers == [] else new_composers
 
@@ -683,7 +924,7 @@ class Song():
             :raises AdditionalArtistException:  If pass list of additional artists are not all of type
                                                 :class:`Additional_Artist`
             """
-        if main_artist is not None and type(main_artist) is not _Artist:
+        if main_artist is not None and not isinstance(main_artist, _Artist):
             raise ArtistException('{} is not an Artist object'.format(main_artist))
         if additional_artists is not None:
             for artist in additional_artists:
@@ -726,58 +967,90 @@ class Song():
         """ Add the part from the song parts list """
         pass
 
+    def to_record(self, default_artist: Optional[str] = None) -> dict:
+        """ Return the song record of a song as produced by the streaming loader.
+
+            :param default_artist:  The name of the main artist of a song without one, usually the music media artist
+            :type default_artist:   str | None
+
+            :returns:               The song record referencing artists by name
+            :rtype:                 dict
+        """
+        return {'title': self.title,
+                'main_artist': default_artist if self.main_artist is None else self.main_artist.name,
+                'exp_main_artist': bool(self.exp_main_artist),
+                'main_artist_sequel': self.main_artist_sequel,
+                'additional_artists': None if not self.additional_artists else
+                [[additional_artist.prequel, additional_artist.artist.name, additional_artist.sequel]
+                 for additional_artist in self.additional_artists],
+                'album': self.album,
+                'classical_composers': None if not self.classical_composers else [composer.name for composer in self.classical_composers],
+                'classical_work': self.classical_work,
+                'country': self.country,
+                'year': self.year,
+                'mix': self.mix,
+                'featured_in': self.featured_in,
+                'parts': [] if self.parts is None else list(self.parts)}
+
     def to_html(self):
         """ Return an html representation of a song.
 
             :returns:    An html representation of a song
             :rtype:      str
         """
+        return ''.join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
+        """ Generate the html representation of a song a fragment at a time.
+
+            :returns:    The fragments of an html representation of a song
+            :rtype:      iterator(str)
+        """
         def spaceit(line: str, spaces: int) -> str:
             """ Ensure an indentation of the specified number of spaces. """
             spaced_line = ' ' * spaces + line.lstrip()
             return spaced_line
 
         if self.title is None:
-            html_str = '  <li>'
+            yield '  <li>'
         else:
-            html_str = '  <li><a rel="song">{title}</a>'.format(title=escape(self.title, quote=False))
+            yield '  <li><a rel="song">{title}</a>'.format(title=escape(self.title, quote=False))
         if self.exp_main_artist:
-            html_str += '<br>\n'
-            html_str += spaceit('{artist}'.format(artist=self.main_artist.to_html(song_artist=True)), 6)
+            yield '<br>\n'
+            yield spaceit('{artist}'.format(artist=self.main_artist.to_html(song_artist=True)), 6)
             if self.main_artist_sequel is not None:
-                html_str += '{}'.format(escape(self.main_artist_sequel))
+                yield '{}'.format(escape(self.main_artist_sequel))
         if self.additional_artists is not None:
             if not self.exp_main_artist:
-                html_str += '<br>'
+                yield '<br>'
             for additional_artist in self.additional_artists:
-                html_str += '\n' + spaceit('{artist}'.format(artist=additional_artist.to_html()), 6)
+                yield '\n' + spaceit('{artist}'.format(artist=additional_artist.to_html()), 6)
         if self.mix is not None:
-            html_str += '<br>\n      (<a rel="song-mix">{mix}</a>)'.format(mix=escape(self.mix, quote=False))
+            yield '<br>\n      (<a rel="song-mix">{mix}</a>)'.format(mix=escape(self.mix, quote=False))
         if self.classical_work is not None:
             # must appear before the composer
-            html_str += '<br>\n      from <i><a rel="song-classical-work">{work}</a></i>'.format(work=escape(self.classical_work, quote=False))
+            yield '<br>\n      from <i><a rel="song-classical-work">{work}</a></i>'.format(work=escape(self.classical_work, quote=False))
         if self.classical_composers is not None:
-            html_str += '<br>\n      by '
+            yield '<br>\n      by '
             for index, classical_composer in enumerate(self.classical_composers):
-                html_str += '<b><a rel="song-classical-composer">{composer}</a></b>'.format(composer=escape(classical_composer.name, quote=False))
+                yield '<b><a rel="song-classical-composer">{composer}</a></b>'.format(composer=escape(classical_composer.name, quote=False))
                 if index < len(self.classical_composers) - 1:
-                    html_str += ' and\n      '
+                    yield ' and\n      '
         if self.year is not None:
-            html_str += '<br>\n      - <a rel="song-date">{date}</a>'.format(date=self.year)
+            yield '<br>\n      - <a rel="song-date">{date}</a>'.format(date=self.year)
         if self.country is not None:
-            html_str += '<br>\n      - <a rel="song-country">{country}</a>'.format(country=self.country)
+            yield '<br>\n      - <a rel="song-country">{country}</a>'.format(country=self.country)
         if self.featured_in is not None:
-            html_str += '<br>\n      (featured in <a rel="song-featured-in">{movie_or_show}</a>)'.format(movie_or_show=escape(self.featured_in, quote=False))
+            yield '<br>\n      (featured in <a rel="song-featured-in">{movie_or_show}</a>)'.format(movie_or_show=escape(self.featured_in, quote=False))
         if self.parts is not None and self.parts != []:
-            html_str += '\n'
-            html_str += spaceit('<ol type=I>\n', 4)
+            yield '\n'
+            yield spaceit('<ol type=I>\n', 4)
             for song_part in self.parts:
-                html_str += spaceit('<li><a rel="song-part">{part}</a></li>\n'.format(part=escape(song_part, quote=False)), 6)
-            html_str += spaceit('</ol>\n', 4)
-            html_str += spaceit('</li>\n', 4)
+                yield spaceit('<li><a rel="song-part">{part}</a></li>\n'.format(part=escape(song_part, quote=False)), 6)
+            yield spaceit('</ol>\n', 4)
+            yield spaceit('</li>\n', 4)
         else:
-            html_str += '</li>\n'
-        return html_str
+            yield '</li>\n'
 
     def __str__(self) -> str:
         string = '{}\n'.format(self.title)
@@ -808,6 +1081,7 @@ class Song():
 
 class TrackList():
     """ A list of songs (tracklist) on one side of a music media item"""
+    _media = None  # Music media of the tracklist once in the song index of the library
 
     @property
     def name(self) -> Optional[str]:
@@ -870,10 +1144,10 @@ class TrackList():
             :raises ArtistException:  If side_mixer is not a :class:`Artist`
         """
         self._name = side_name
-        if track_artist is not None and type(track_artist) is not _Artist:
+        if track_artist is not None and not isinstance(track_artist, _Artist):
             raise ArtistException('Track Artist {} is not an Artist object'.format(track_artist))
         self._track_artist = track_artist
-        if side_mixer_artist is not None and type(side_mixer_artist) is not _Artist:
+        if side_mixer_artist is not None and not isinstance(side_mixer_artist, _Artist):
             raise ArtistException('Track Mixer {} is not an Artist object'.format(side_mixer_artist))
         self._side_mixer = side_mixer_artist
         self._track_year = track_year
@@ -892,6 +1166,7 @@ class TrackList():
                 self._song_list = [song]
             else:
                 self._song_list.append(song)
+            self._songs_changed()
         else:
             raise SongException('{} is not a song'.format(song))
 
@@ -903,6 +1178,14 @@ class TrackList():
         """
         if song in self.song_list:
             self._song_list.remove(song)
+            if song._tracklist is self:
+                song._tracklist = None
+            self._songs_changed()
+
+    def _songs_changed(self) -> None:
+        """ Bring the song index of the library up to date with a change to the songs of the tracklist. """
+        if self._media is not None:
+            MEDIA._index_media_songs(self._media)
 
     def has_song(self, song: Song) -> bool:
         """ True is the passed song can be found in the tracklist.
@@ -928,30 +1211,51 @@ class TrackList():
             if song.title == song_title:
                 return song
 
+    def to_record(self, default_artist: Optional[str] = None) -> dict:
+        """ Return the tracklist record of a tracklist as produced by the streaming loader.
+
+            :param default_artist:  The name of the main artist of the songs without one
+            :type default_artist:   str | None
+
+            :returns:               The tracklist record referencing artists by name
+            :rtype:                 dict
+        """
+        return {'name': self.name,
+                'track_artist': None if self.track_artist is None else self.track_artist.name,
+                'side_mixer': None if self.side_mixer is None else self.side_mixer.name,
+                'track_year': self.track_year,
+                'songs': [song.to_record(default_artist) for song in (self.song_list or [])]}
+
     def to_html(self):
         """ Return an html representation of a tracklist.
 
             :returns:  An html representation of a tracklist
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
+        """ Generate the html representation of a tracklist a fragment at a time.
+
+            :returns:  The fragments of an html representation of a tracklist
+            :rtype:    iterator(str)
+        """
         if self.name is not None:
-            html_str += '<a rel="side">\n'
-            html_str += '<h4><blockquote>{side_title}</blockquote></h4>\n'.format(side_title=escape(self.name, quote=False))
+            yield '<a rel="side">\n'
+            yield '<h4><blockquote>{side_title}</blockquote></h4>\n'.format(side_title=escape(self.name, quote=False))
         if self.track_artist is not None:
-            html_str += '<h4>Track Artist: <a rel="track-artist">{artist_name}</a></h4>\n'.format(artist_name=self.track_artist.name)
+            yield '<h4>Track Artist: <a rel="track-artist">{artist_name}</a></h4>\n'.format(artist_name=self.track_artist.name)
         if self.side_mixer is not None:
-            html_str += '<h4>Mixed By <a rel="side-mixer">{mixer_name}</a></h4>\n'.format(mixer_name=self.side_mixer.name)
+            yield '<h4>Mixed By <a rel="side-mixer">{mixer_name}</a></h4>\n'.format(mixer_name=self.side_mixer.name)
         if self.track_year is not None:
-            html_str += '<h4>Released: <a rel="track-year">{track_year}</a></h4>\n'.format(track_year=self.track_year)
-        html_str += '<ol>\n'
+            yield '<h4>Released: <a rel="track-year">{track_year}</a></h4>\n'.format(track_year=self.track_year)
+        yield '<ol>\n'
         if self.song_list is not None:
             for song in self.song_list:
-             html_str += song.to_html()
-        html_str += '</ol>\n'
+                yield from song.iter_html()
+        yield '</ol>\n'
         if self.name is not None:
-            html_str += '</a>\n'
-        return html_str
+            yield '</a>\n'
 
     def __str__(self) -> str:
         if self.name is not None:
@@ -1018,7 +1322,10 @@ class _MEDIA():
 
     @title.setter
     def title(self, value) -> None:
+        old_title, old_hash = self._title, self._hash
         self._title = value
+        self._html = None
+        self._rehash(old_title, old_hash)
 
     @property
     def artists(self) -> List[_Artist]:
@@ -1031,7 +1338,10 @@ class _MEDIA():
         for artist in new_artists:
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not an Artist object'.format(artist))
+        old_hash = self._hash
         self._artists = new_artists
+        self._html = None
+        self._rehash(self._title, old_hash)
 
     @property
     def artist_particles(self) -> Optional[List[str]]:
@@ -1040,6 +1350,7 @@ class _MEDIA():
     @artist_particles.setter
     def artist_particles(self, particle_list) -> None:
         self._artist_particles = particle_list
+        self._html = None
 
     @property
     def artists_text(self) -> str:
@@ -1057,7 +1368,14 @@ class _MEDIA():
 
     @year.setter
     def year(self, value) -> None:
+        old_year = self._year
         self._year = value
+        self._html = None
+        if value != old_year:
+            library = MEDIA._media_library(self._media_type)
+            if _media_indexed(library, self):
+                _unindex_media_year(library, self, old_year)
+                _index_media_year(library, self)
 
     @property
     def mixer(self) -> Optional[_Artist]:
@@ -1066,6 +1384,7 @@ class _MEDIA():
     @mixer.setter
     def mixer(self, value) -> None:
         self._mixer = value
+        self._html = None
 
     @property
     def classical_composers(self) -> Optional[_Artist]:
@@ -1074,9 +1393,12 @@ class _MEDIA():
     @classical_composers.setter
     def classical_composers(self, value) -> None:
         self._classical_composers = value
+        self._html = None
 
     @property
     def tracks(self) -> List[TrackList]:
+        if self._tracks_source is not None:
+            MEDIA.hydrate_tracks(self)
         return self._tracks
 
     def __init__(self,
@@ -1107,14 +1429,14 @@ class _MEDIA():
         elif isinstance(self, _CASSETTE) and year is not None and not isinstance(year, int):  # Cassettes can have None or int year
             raise TypeError('Year must be an int value')
         self._year = year
-        if mixer is not None and type(mixer) is not _Artist:
+        if mixer is not None and not isinstance(mixer, _Artist):
             raise ArtistException('{} is not an Artist object'.format(mixer))
         self._mixer = mixer
         if classical_composers is not None:
             if not isinstance(classical_composers, list):
                 raise ArtistException('{} is not a list of Artist objects'.format(classical_composers))
             for classical_composer in classical_composers:
-                if type(classical_composer) is not _Artist:
+                if not isinstance(classical_composer, _Artist):
                     raise ArtistException('{} is not an Artist object'.format(classical_composer))
         self._classical_composers = classical_composers
         # Create id hash based on first artist and title
@@ -1127,6 +1449,38 @@ class _MEDIA():
         # updated through an instance level call to "add_track[]".
         self._tracks = []
 
+        # Where to parse the tracks from when the music media was loaded lazily
+        self._tracks_source = None
+
+        # Html last rendered for the music media file. None when not rendered yet or changed since.
+        self._html = None
+
+        # Record last encoded for the records file and the html it was encoded along with
+        self._record_cache = None
+
+    def __getstate__(self) -> dict:
+        """ Return the state to pickle, without the rendered html and encoded record which are cheaper to render again. """
+        state = self.__dict__.copy()
+        state['_html'] = None
+        state['_record_cache'] = None
+        return state
+
+    def _rehash(self, old_title: str, old_hash: str) -> None:
+        """ Update the hash of the music media after a change of title or artists and move it in the dictionaries of its singleton.
+
+            :param old_title:  The title of the music media before the change
+            :type old_title:   str
+
+            :param old_hash:   The hash of the music media before the change
+            :type old_hash:    str
+        """
+        self._hash = media_to_hash(self._media_type, self._title, self._artists[0].name if self._artists else '')
+        if self._title != old_title or self._hash != old_hash:
+            library = MEDIA._media_library(self._media_type)
+            if _media_indexed(library, self, old_title):
+                _unindex_media(library, self, old_title, old_hash)
+                _index_media(library, self)
+
     def add_track(self, track: TrackList) -> None:
         """ Append a tracklist to the list of tracks on the album. Thus an ordered list.
 
@@ -1136,7 +1490,9 @@ class _MEDIA():
             :raises TrackListException:  If not passed a :class:`TrackList`
         """
         if isinstance(track, TrackList):
-            self._tracks.append(track)
+            self.tracks.append(track)
+            self._html = None
+            MEDIA._index_media_songs(self)
         else:
             raise TrackListException('{} is not a track list'.format(track))
 
@@ -1151,7 +1507,7 @@ class _MEDIA():
 
             :raises SongException:  If not passed a :class:`Song`
         """
-        for track in self._tracks:
+        for track in self.tracks:
             if track.has_song(song):
                 return True
         return False
@@ -1165,41 +1521,65 @@ class _MEDIA():
             :returns:           The song is found. None otherwise
             :rtype:             :class:`Song` | None
         """
-        for track in self._tracks:
+        for track in self.tracks:
             result = track.get_song_from_title(song_title)
             if result is not None:
                 return result
 
+    def to_record(self) -> dict:
+        """ Return the media record of the album as produced by the streaming loader.
+
+            Loading the record with :meth:`MEDIA.bulk_load` gives back the same album.
+
+            :returns:   The media record referencing artists by name
+            :rtype:     dict
+        """
+        return {'media_type': self.media_type.value,
+                'title': self.title,
+                'artists': [artist.name for artist in self.artists],
+                'artist_particles': list(self.artist_particles or []),
+                'classical_composers': [composer.name for composer in (self.classical_composers or [])],
+                'mixer': None if self.mixer is None or self.mixer == '' else str(self.mixer),
+                'year': self.year,
+                'tracks': [track.to_record(self.artists[0].name) for track in self.tracks]}
+
     def to_html(self):
         """ Return an html representation of the album
 
             :returns:   An html representation of the album
             :rtype:     str
         """
-        html_str = '<p>\n'
-        html_str += '<a rel="{media_type}">\n'.format(media_type=self.media_type.value)
-        html_str += '<h3><a rel="title">{title}</a></h3>\n'.format(title=escape(self.title, quote=False))
-        html_str += '<h3>'
+        return ''.join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
+        """ Generate the html representation of the album a fragment at a time.
+
+            :returns:   The fragments of an html representation of the album
+            :rtype:     iterator(str)
+        """
+        yield '<p>\n'
+        yield '<a rel="{media_type}">\n'.format(media_type=self.media_type.value)
+        yield '<h3><a rel="title">{title}</a></h3>\n'.format(title=escape(self.title, quote=False))
+        yield '<h3>'
         for index, artist in enumerate(self.artists):
-            html_str += '<a rel="artist">{artist}</a>'.format(artist=escape(artist.name, quote=False))
+            yield '<a rel="artist">{artist}</a>'.format(artist=escape(artist.name, quote=False))
             if self._artist_particles is not None and index < len(self._artist_particles):
-                html_str += escape(self._artist_particles[index], quote=False)
-        html_str += '</h3>\n'
+                yield escape(self._artist_particles[index], quote=False)
+        yield '</h3>\n'
         if self.classical_composers is not None:
-            html_str += '<h3><a rel="classical-composer">{composer}</a>'.format(composer=escape(self.classical_composers[0].name, quote=False))
+            yield '<h3><a rel="classical-composer">{composer}</a>'.format(composer=escape(self.classical_composers[0].name, quote=False))
             if len(self.classical_composers) == 2:
-                html_str += ' and <a rel="classical-composer">{composer}</a></h3>\n'.format(composer=escape(self.classical_composers[1].name, quote=False))
+                yield ' and <a rel="classical-composer">{composer}</a></h3>\n'.format(composer=escape(self.classical_composers[1].name, quote=False))
             else:
-                html_str += '</h3>\n'
+                yield '</h3>\n'
         if self.mixer is not None and self.mixer != '':
-            html_str += '<h3>Mixed By <a rel="mixer">{mixer_name}</a></h3>\n'.format(mixer_name=self.mixer)
+            yield '<h3>Mixed By <a rel="mixer">{mixer_name}</a></h3>\n'.format(mixer_name=self.mixer)
         if self.year is not None:  # Only can be None for a cassette
-            html_str += '<h3><a rel="date">{year}</a></h3>\n'.format(year=self.year)
+            yield '<h3><a rel="date">{year}</a></h3>\n'.format(year=self.year)
         for track in self.tracks:
-            html_str += track.to_html()
-        html_str += '</a>\n'
-        html_str += '</p>\n'
-        return html_str
+            yield from track.iter_html()
+        yield '</a>\n'
+        yield '</p>\n'
 
     def __str__(self) -> str:
         string = '{}\n'.format(self.media_type.value)
@@ -1215,43 +1595,981 @@ class _MEDIA():
         return string
 
 
-class _CD(_MEDIA):
-    pass
+class _CD(_MEDIA):
+    pass
+
+
+class _CASSETTE(_MEDIA):
+    pass
+
+
+class _LP(_MEDIA):
+    pass
+
+
+class _ELP(_MEDIA):
+    pass
+
+
+class _MINI_CD(_MEDIA):
+    pass
+
+
+def check_media_record(record: dict) -> None:
+    """ Check a media record holds the values expected of each field.
+
+        :param record:           The media record to check
+        :type record:            dict
+
+        :raises MediaException:  If the record is not a valid media record
+    """
+    def check(valid: bool, message: str) -> None:
+        if not valid:
+            raise MediaException('Invalid media record {}: {}'.format(record.get('title') if isinstance(record, dict) else record, message))
+
+    def is_name_list(value, allow_none: bool = False) -> bool:
+        if value is None:
+            return allow_none
+        return isinstance(value, list) and all(isinstance(name, str) and name != '' for name in value)
+
+    def is_optional(value, value_type) -> bool:
+        return value is None or isinstance(value, value_type)
+
+    check(isinstance(record, dict), 'not a dictionary')
+    try:
+        media_type = MediaType(record.get('media_type'))
+    except ValueError:
+        raise MediaException('Invalid media record {}: unknown media type {}'.format(record.get('title'), record.get('media_type')))
+    check(isinstance(record.get('title'), str) and record['title'] != '', 'missing title')
+    check(is_name_list(record.get('artists')) and record['artists'] != [], 'missing artists')
+    check(isinstance(record.get('artist_particles'), list) and all(isinstance(particle, str) for particle in record['artist_particles']),
+          'artist particles must be a list of strings')
+    check(is_name_list(record.get('classical_composers')) and len(record['classical_composers']) <= 2, 'at most two classical composers')
+    check(is_optional(record.get('mixer'), str) and record.get('mixer') != '', 'mixer must be an artist name')
+    if media_type == MediaType.CASSETTE:
+        check(is_optional(record.get('year'), int), 'year must be an integer')
+    else:
+        check(isinstance(record.get('year'), int), 'year must be an integer')
+    check(isinstance(record.get('tracks'), list), 'tracks must be a list')
+    for track in record['tracks']:
+        check(isinstance(track, dict) and isinstance(track.get('songs'), list), 'track must have a list of songs')
+        check(is_optional(track.get('name'), str), 'track name must be a string')
+        check(is_optional(track.get('track_artist'), str) and track.get('track_artist') != '', 'track artist must be an artist name')
+        check(is_optional(track.get('side_mixer'), str) and track.get('side_mixer') != '', 'side mixer must be an artist name')
+        check(is_optional(track.get('track_year'), int), 'track year must be an integer')
+        for song in track['songs']:
+            check(isinstance(song, dict) and isinstance(song.get('main_artist'), str) and song['main_artist'] != '', 'song must have a main artist')
+            check(is_name_list(song.get('classical_composers'), allow_none=True), 'song classical composers must be artist names')
+            additional_artists = song.get('additional_artists')
+            check(additional_artists is None or (isinstance(additional_artists, list) and
+                                                 all(isinstance(additional_artist, (list, tuple)) and len(additional_artist) == 3 and
+                                                     isinstance(additional_artist[1], str) and additional_artist[1] != ''
+                                                     for additional_artist in additional_artists)),
+                  'song additional artists must be prequel, artist name and sequel triples')
+            check(is_optional(song.get('year'), int), 'song year must be an integer')
+            check(isinstance(song.get('parts'), list), 'song parts must be a list')
+
+
+class _MediaBatch():
+    """ Staging area for :func:`MEDIA.bulk_load`.
+
+        Artists and music media are looked up by name and hash in copies of the
+        dictionaries of the library. New artists and music media are given the indexes they
+        would get if created one at a time but are only added to the singletons, and
+        to the media of their artists, by :func:`commit`.
+    """
+
+    def __init__(self) -> None:
+        self._artists_by_name = dict(Artists._artists_by_name)
+        self._artists_by_key = dict(Artists._artists_by_key) if Artists._normalized_matching else None
+        self._new_artists = []
+        self._next_artist_index = Artists._max_index
+
+        self._libraries = {MediaType.LP: (LPs, _LP, '_lps'),
+                           MediaType.CASSETTE: (CASSETTEs, _CASSETTE, '_cassettes'),
+                           MediaType.CD: (CDs, _CD, '_cds'),
+                           MediaType.ELP: (ELPs, _ELP, '_elps'),
+                           MediaType.MINI_CD: (MINI_CDs, _MINI_CD, '_mini_cds')}
+        self._media_by_hash = {}
+        self._new_media = {}
+        self._next_media_index = {}
+        for media_type, (library, _, _) in self._libraries.items():
+            self._media_by_hash[media_type] = dict(library._media_by_hash)
+            self._new_media[media_type] = []
+            self._next_media_index[media_type] = library._max_index
+
+        self._tracks = []
+        self._credits = []
+        self._credited = set()
+
+    def artist(self, name: str) -> _Artist:
+        """ Return the named artist creating the artist if they do not exist yet. """
+        if name is None or name == '':
+            raise ArtistException('An artist must have a name')
+        canonical_name = Artists.canonical_name(name)
+        artist = self._artists_by_name.get(canonical_name)
+        if artist is None and self._artists_by_key is not None:
+            artist = self._artists_by_key.get(normalize_artist_name(canonical_name))
+        if artist is None:
+            artist = _Artist(canonical_name, self._next_artist_index)
+            self._next_artist_index += 1
+            self._artists_by_name[canonical_name] = artist
+            if self._artists_by_key is not None:
+                self._artists_by_key.setdefault(normalize_artist_name(canonical_name), artist)
+            self._new_artists.append(artist)
+        return artist if artist.name == name else _ArtistCredit(artist, name)
+
+    def credit(self, artist: _Artist, media: _MEDIA) -> None:
+        """ Add the music media to the media of the artist on commit. """
+        key = (id(artist.artist), id(media))
+        if key not in self._credited:
+            self._credited.add(key)
+            self._credits.append((artist, media))
+
+    def add_record(self, record: dict) -> _MEDIA:
+        """ Stage the music media of a media record.
+
+            :param record:  The media record to stage
+            :type record:   dict
+
+            :returns:       The new music media or the existing one of the same title and artist
+            :rtype:         :class:`_MEDIA`
+        """
+        media_type = MediaType(record['media_type'])
+        media_artists = [self.artist(name) for name in record['artists']]
+        media_classical_composers = [self.artist(name) for name in record['classical_composers']]
+        media_mixer = None if record['mixer'] is None else self.artist(record['mixer'])
+        media_tracklist, media_song_artists = MEDIA._tracks_from_record(record, create_artist=self.artist)
+        if media_classical_composers == []:
+            media_classical_composers = None
+
+        media_hash = media_to_hash(media_type, record['title'], media_artists[0].name)
+        media = self._media_by_hash[media_type].get(media_hash)
+        if media is None:
+            _, media_class, _ = self._libraries[media_type]
+            media = media_class(media_type, record['title'], media_artists, record['year'], self._next_media_index[media_type],
+                                media_mixer, media_classical_composers, list(record['artist_particles']))
+            self._next_media_index[media_type] += 1
+            self._media_by_hash[media_type][media_hash] = media
+            self._new_media[media_type].append(media)
+            for artist in media_artists:
+                self.credit(artist, media)
+            if media_mixer is not None:
+                self.credit(media_mixer, media)
+            if media_classical_composers is not None:
+                for classical_composer in media_classical_composers:
+                    self.credit(classical_composer, media)
+
+        self._tracks.append((media, media_tracklist))
+        music_media_artist_credits = media.artists.copy()
+        if media.classical_composers is not None:
+            music_media_artist_credits.extend(media.classical_composers)
+        for artist in media_song_artists:
+            if artist not in music_media_artist_credits:
+                self.credit(artist, media)
+        return media
+
+    def commit(self) -> None:
+        """ Add all the staged artists and music media to the library. """
+        Artists._artists.update(self._new_artists)
+        for artist in self._new_artists:
+            Artists._index_artist(artist)
+        Artists._max_index = self._next_artist_index
+        for media_type, (library, _, list_name) in self._libraries.items():
+            getattr(library, list_name).extend(self._new_media[media_type])
+            for media in self._new_media[media_type]:
+                _index_media(library, media)
+            library._max_index = self._next_media_index[media_type]
+        for media, media_tracklist in self._tracks:
+            if media_tracklist:
+                media.tracks.extend(media_tracklist)
+                media._html = None
+                MEDIA._index_media_songs(media)
+        for artist, media in self._credits:
+            try:
+                artist.add_media(media)
+            except MediaException:
+                pass  # Already credited on an existing music media
+
+
+def _render_media(media_type: MediaType, indexes: List[int]) -> List[str]:
+    """ Return the html blocks of music media of one type. Runs in a worker process forked with the library. """
+    media_list = MEDIA._media_list(media_type)
+    return [media_list[index].to_html() for index in indexes]
+
+
+class MEDIA():
+    _html_file_retention_count = 5   # Number of backup html data files to store
+    _html_backup_compression = None  # Compression of the backup html data files. Defaults to gzip
+    _html_backup_full_every = 50     # Store every this many backups of the html data file in full
+    _html_backup_store = None        # Backup store of the html data file last written
+    _html_data_file = None
+    _html_snapshot = False            # Keep a binary snapshot of the library next to the html data file
+    _html_file_watcher = None         # Watcher reloading external changes to the html data file
+    _load_profile = None              # Profile of the load in progress if it is being profiled
+    _html_block_index = None          # Byte offset index of the music media blocks in the html data file
+    _html_journal = None              # Write-ahead journal of the changes not yet written to the html data file
+    _html_writer = None               # Background writer of the html data file
+    _storage_format = 'html'          # Format the library is stored in. The html data file is an export for the others
+    _sql_store = None                 # Database store of the library for the sql storage format
+    _html_write_lock = False          # Coordinate writing the html data file with the other workers
+    _html_version = None              # Version of the html data file the library holds. See musicmedia_lock
+    _render_lock = threading.RLock()  # Keeps changes flagged while the music media are rendered from being lost
+    _change_count = 0                 # Number of changes flagged. Orders the changes against the writes of the html data file
+    _unwritten_media = {}             # Music media flagged as changed since the html data file was written to the count of their last change
+    _render_workers = 1               # Processes rendering the music media when written out. None for one per CPU
+    _parallel_render_threshold = 2000  # Fewest music media to render for parallel rendering to pay off
+    _songs_by_title = None            # Normalized song title to the music media with songs of that title. Built by the first song lookup
+    _song_titles_by_media = {}        # Music media to the normalized titles of their songs in the song index
+    RENDER_CHUNKS_PER_WORKER = 4      # Smaller chunks keep all the workers busy until the end
+    changes_to_write = False
+
+    HTML_HEADER = """<!DOCTYPE PUBLIC "-//W3C//DTD HTML 4.01//EN" "http://www.w3.org/TR/html4/strict.dtd">
+<html lang="en">
+<head>
+<title>Music List</title>
+</head>
+<body>
+<h2>Audio Media</h2>
+"""
+    HTML_CLOSER = """</body>
+</html>
+"""
+
+    @classmethod
+    def mark_changed(cls, *media: _MEDIA) -> None:
+        """ Flag music media as changed so they are rendered again when the library is next written out.
+
+            Changes made through the music media properties are picked up by themselves. Changes to
+            the artist lists, tracks or songs of a music media must be flagged with this call.
+
+            When the library keeps a journal the changes are also journaled so they are not lost
+            before the library is next written out. Flag deleted music media after deleting them.
+            When the library has a background writer it is signalled to write out the changes.
+
+            :param media:  The changed music media
+            :type media:   :class:`_MEDIA`
+        """
+        with cls._render_lock:
+            cls._change_count += 1
+            for changed_media in media:
+                changed_media._html = None
+                cls._unwritten_media[changed_media] = cls._change_count
+            cls.changes_to_write = True
+        for changed_media in media:
+            cls._index_media_songs(changed_media)
+        if cls._html_journal is not None:
+            for changed_media in media:
+                cls._html_journal.record_change(changed_media)
+        if cls._html_writer is not None and (cls._html_journal is None or cls._html_journal.compaction_due()):
+            cls._html_writer.notify()
+
+    @classmethod
+    def open_journal(cls, journal) -> int:
+        """ Replay a journal on top of the library loaded from its html data file and journal later changes to it.
+
+            :param journal:  The journal of the html data file
+            :type journal:   :class:`app.musicmedia.musicmedia_journal.MusicMediaJournal`
+
+            :returns:        The number of journaled changes applied to the library
+            :rtype:          int
+        """
+        cls._html_journal = None
+        applied_count = journal.replay()
+        cls._html_journal = journal
+        return applied_count
+
+    @classmethod
+    def set_html_file_rentention_count(cls, rentention_count) -> None:
+        """ Override the default html data file backup retention count. """
+        cls._html_file_retention_count = rentention_count
+
+    @classmethod
+    def set_storage_format(cls, storage_format) -> None:
+        """ Override the default html storage format of the library. See :mod:`app.musicmedia.musicmedia_records`. """
+        from .musicmedia_records import resolve_storage_format
+        cls._storage_format = resolve_storage_format(storage_format)
+
+    @classmethod
+    def set_sql_store(cls, sql_store) -> None:
+        """ Set the database store the library is kept in with the sql storage format. See :mod:`app.musicmedia.musicmedia_sql`. """
+        cls._sql_store = sql_store
+
+    @classmethod
+    def set_html_write_lock(cls, write_lock) -> None:
+        """ Turn on or off coordinating writes of the html data file with the other workers. See :mod:`app.musicmedia.musicmedia_lock`. """
+        cls._html_write_lock = write_lock
+
+    @classmethod
+    def set_html_writer(cls, writer) -> None:
+        """ Set the background writer of the html data file. None leaves the writes to the requests. See :mod:`app.musicmedia.musicmedia_writer`. """
+        cls._html_writer = writer
+
+    @classmethod
+    def html_writer(cls):
+        """ Return the background writer of the html data file, or None if there is none. """
+        return cls._html_writer
+
+    @classmethod
+    def set_html_backup_compression(cls, compression) -> None:
+        """ Override the default compression of the html data file backups. """
+        cls._html_backup_compression = compression
+
+    @classmethod
+    def set_html_backup_full_every(cls, full_every) -> None:
+        """ Override how many html data file backups apart the backups stored in full are. """
+        cls._html_backup_full_every = full_every
+
+    @classmethod
+    def _backup_store(cls, filepath: str):
+        """ Return the backup store of an html file, reusing the last one while the settings hold. """
+        from .musicmedia_backup import MusicMediaBackupStore
+
+        settings = (filepath, cls._html_file_retention_count, cls._html_backup_compression, cls._html_backup_full_every)
+        store = cls._html_backup_store
+        if store is None or store.settings != settings:
+            store = MusicMediaBackupStore(filepath, retention_count=cls._html_file_retention_count,
+                                          compression=cls._html_backup_compression, full_every=cls._html_backup_full_every)
+            cls._html_backup_store = store
+        return store
+
+    @classmethod
+    def from_html_file(cls, filepath: str, streaming: bool = False, parser: Optional[str] = None, snapshot: bool = False,
+                       workers: int = 1, lazy: bool = False, profile: bool = False, profile_memory: bool = False) -> Optional[dict]:
+        """ Load the library from an html file.
+
+            The document tree loader always uses the ``html.parser`` backend as the other
+            tree builders move the music media blocks out of their anchors.
+
+            With snapshots enabled, a still valid snapshot of the html file replaces the
+            library instead of parsing the file. Otherwise the file is parsed and a new
+            snapshot is written. The snapshot is also refreshed each time the library is
+            written back to the html file.
+
+            Loading lazily only parses the music media headers. The tracks of each music media
+            are parsed from the file the first time they are used. Artists only credited on
+            songs are added to the library at that time.
+
+            :param filepath:        The file path of the html file to load
+            :type filepath:         str
+
+            :param streaming:       Stream the file through the event driven loader instead of
+                                    parsing the whole file into a document tree
+            :type streaming:        bool
+
+            :param parser:          The parser backend of the streaming loader. One of ``lxml``,
+                                    ``html.parser`` or ``html5lib``. Defaults to ``lxml`` falling
+                                    back to ``html.parser`` if lxml is not installed.
+            :type parser:           str | None
+
+            :param snapshot:        Load from and keep a binary snapshot of the library next to the file
+            :type snapshot:         bool
+
+            :param workers:         The number of processes parsing the file with the streaming loader.
+                                    More than one worker always uses the streaming loader.
+            :type workers:          int
+
+            :param lazy:            Only load the music media headers and parse the tracks on demand
+            :type lazy:             bool
+
+            :param profile:         Time the phases of the load and return a report of the load
+            :type profile:          bool
+
+            :param profile_memory:  Also trace the peak memory of the load. Roughly doubles the load time.
+            :type profile_memory:   bool
+
+            :returns:               The load report if the load is profiled. See :mod:`app.musicmedia.musicmedia_profile`
+            :rtype:                 dict | None
+        """
+        from .musicmedia_files import html_file_is_complete, recover_html_file
+        from .musicmedia_profile import load_phase, LoadProfile
+        from .musicmedia_records import HTML_FORMAT, iter_records_file, records_path, SQL_FORMAT
+        from .musicmedia_snapshot import read_snapshot, restore_snapshot, write_snapshot
+
+        # The records file or SQL store holds the library unless the html file was changed since it was written
+        sql_store = None
+        if cls._storage_format == SQL_FORMAT:
+            if cls._sql_store is None:
+                raise ValueError('No SQL store set for the {} storage format'.format(SQL_FORMAT))
+            sql_store = cls._sql_store
+        records_file = None if cls._storage_format in (HTML_FORMAT, SQL_FORMAT) else records_path(filepath, cls._storage_format)
+        html_file_complete = html_file_is_complete(filepath)
+        if sql_store is not None:
+            store_ns = sql_store.modified_ns()
+            load_records = store_ns is not None and (not html_file_complete or store_ns >= os.stat(filepath).st_mtime_ns)
+        else:
+            load_records = records_file is not None and records_file.exists() and \
+                (not html_file_complete or os.stat(records_file).st_mtime_ns >= os.stat(filepath).st_mtime_ns)
+
+        # Read before the file as the file is never older than its version
+        if cls._html_write_lock:
+            from .musicmedia_lock import read_version
+            cls._html_version = read_version(filepath)
+        else:
+            cls._html_version = None
+
+        # A worker killed while writing the file with an older version of the application may have left it cut short
+        if not load_records:
+            recover_html_file(filepath)
+            html_file_complete = html_file_is_complete(filepath)
+
+        # Set the file path for the html data file in case we write out a new version
+        cls._html_data_file = filepath
+        cls._html_snapshot = snapshot
+        cls._html_block_index = None
+        cls._unwritten_media = {}
+
+        load_profile = None
+        if profile:
+            load_profile = LoadProfile(trace_memory=profile_memory)
+            load_profile.start(filepath)
+        cls._load_profile = load_profile
+        try:
+            library_snapshot = None
+            if snapshot and html_file_complete:
+                with load_phase(load_profile, 'snapshot_read'):
+                    library_snapshot = read_snapshot(filepath)
+
+            if library_snapshot is not None:
+                loader = 'snapshot'
+                with load_phase(load_profile, 'snapshot_restore'):
+                    restore_snapshot(library_snapshot)
+            elif load_records:
+                if sql_store is not None:
+                    loader = 'sql'
+                    records = sql_store.iter_records()
+                else:
+                    loader = 'records'
+                    records = iter_records_file(records_file, cls._storage_format)
+                if load_profile is not None:
+                    records = load_profile.timed_iter('parse', records)
+                cls.bulk_load(records)
+                if not html_file_complete:
+                    # Generate the html data file again. Written after the records are loaded so it is not taken as newer.
+                    from .musicmedia_files import write_file_atomically
+                    media_blocks = cls._media_blocks()
+                    write_file_atomically(filepath, cls._html_file_segments(media_blocks))
+                    cls._store_records(filepath, media_blocks)
+            else:
+                if lazy:
+                    loader = 'lazy'
+                    cls._from_html_headers(filepath, parser=parser)
+                elif streaming or workers > 1:
+                    loader = 'stream'
+                    cls._from_html_stream(filepath, parser=parser, workers=workers)
+                else:
+                    loader = 'tree'
+                    cls._from_html_tree(filepath)
+
+                if records_file is not None or sql_store is not None:
+                    # Move to the records file or SQL store, or take in the changes made to the html file
+                    cls._store_records(filepath)
+
+                if snapshot:
+                    with load_phase(load_profile, 'snapshot_write'):
+                        write_snapshot(filepath)
+        finally:
+            cls._load_profile = None
+
+        if load_profile is None:
+            return None
+        load_profile.set_loader(loader)
+        return load_profile.stop()
+
+    @classmethod
+    def html_block_index(cls, parser: Optional[str] = None):
+        """ Return the byte offset index of the music media blocks in the html data file.
+
+            The index is read from next to the html data file, or built and kept there when it
+            is missing or the html data file changed.
+
+            :param parser:              The parser backend to use or None for the default
+            :type parser:               str | None
+
+            :returns:                   The block index
+            :rtype:                     :class:`app.musicmedia.musicmedia_index.MusicMediaBlockIndex`
+
+            :raises FileNotFoundError:  If no html data file was loaded
+        """
+        from .musicmedia_index import MusicMediaBlockIndex
+
+        if cls._html_data_file is None:
+            raise FileNotFoundError('No html data file loaded.')
+        if cls._html_block_index is None or cls._html_block_index.filepath != cls._html_data_file or not cls._html_block_index.is_current():
+            cls._html_block_index = MusicMediaBlockIndex.open(cls._html_data_file, parser=parser)
+        return cls._html_block_index
+
+    @classmethod
+    def _from_html_stream(cls, filepath: str, parser: Optional[str] = None, workers: int = 1) -> None:
+        """ Load the library from an html file one music media block at a time.
+
+            :param filepath:  The file path of the html file to load
+            :type filepath:   str
+
+            :param parser:    The parser backend to use or None for the default
+            :type parser:     str | None
+
+            :param workers:   The number of processes parsing the file
+            :type workers:    int
+        """
+        from .musicmedia_loader import iter_html_file_records, iter_html_file_records_parallel
+
+        if workers > 1:
+            records = iter_html_file_records_parallel(filepath, parser=parser, workers=workers)
+        else:
+            records = iter_html_file_records(filepath, parser=parser)
+        if cls._load_profile is not None:
+            records = cls._load_profile.timed_iter('parse', records)
+        cls.bulk_load(records)
+
+    @classmethod
+    def bulk_load(cls, records: Iterable[dict], trusted: bool = True) -> List[_MEDIA]:
+        """ Create the music media of many media records in one batch.
+
+            Creating music media one at a time searches the whole library for an existing
+            artist or music media of the same name, which makes loading a library quadratic.
+            The batch looks artists and music media up in dictionaries built once instead and
+            only adds the new artists and music media to the singletons once all the records
+            have been processed. The result is the same as calling :func:`MEDIA.from_record`
+            for each record in turn.
+
+            :param records:          The media records to load
+            :type records:           iterable(dict)
+
+            :param trusted:          Skip checking each record, as for records produced by the loader
+            :type trusted:           bool
+
+            :returns:                The music media of each record in record order
+            :rtype:                  list(:class:`_MEDIA`)
+
+            :raises MediaException:  If a record is not a valid media record. Nothing is loaded.
+        """
+        from .musicmedia_profile import load_phase
+
+        batch = _MediaBatch()
+        add_record = batch.add_record
+        if cls._load_profile is not None:
+            batch.artist = cls._load_profile.timed('artist_lookup', batch.artist)
+            add_record = cls._load_profile.timed('build', add_record)
+        loaded_media = []
+        for record in records:
+            if not trusted:
+                check_media_record(record)
+            loaded_media.append(add_record(record))
+        with load_phase(cls._load_profile, 'commit'):
+            batch.commit()
+        return loaded_media
+
+    @classmethod
+    def _from_html_headers(cls, filepath: str, parser: Optional[str] = None) -> None:
+        """ Load the music media headers from an html file leaving the tracks to be parsed on demand.
+
+            :param filepath:  The file path of the html file to load
+            :type filepath:   str
+
+            :param parser:    The parser backend to use or None for the default
+            :type parser:     str | None
+        """
+        from .musicmedia_loader import iter_html_file_headers
+
+        block_sources = []
+
+        def header_records():
+            for record, block_source in iter_html_file_headers(filepath, parser=parser):
+                block_sources.append(block_source)
+                yield record
+
+        records = header_records()
+        if cls._load_profile is not None:
+            records = cls._load_profile.timed_iter('parse', records)
+        for new_media, block_source in zip(cls.bulk_load(records), block_sources):
+            new_media._tracks_source = block_source
+
+    @classmethod
+    def hydrate_tracks(cls, media: _MEDIA) -> None:
+        """ Parse the tracks of a lazily loaded music media from the html file.
+
+            :param media:            The music media to load the tracks of
+            :type media:             :class:`_MEDIA`
+
+            :raises MediaException:  If the html file changed since the music media was loaded
+        """
+        block_source = media._tracks_source
+        if block_source is None:
+            return
+        record = block_source.read_record()
+        media._tracks_source = None
+        media_tracklist, media_song_artists = cls._tracks_from_record(record)
+        media._tracks.extend(media_tracklist)
+        cls._credit_song_artists(media, media_song_artists)
+        cls._index_media_songs(media)
+
+    @classmethod
+    def remove_media(cls, media: _MEDIA) -> None:
+        """ Remove a music media from the library and from all the artists credited on it.
+
+            Unlike deleting the music media from its singleton, this also removes the music
+            media from its classical composers and the artists of its songs. Artists left
+            without any music media are removed from the library.
+
+            :param media:  The music media to remove
+            :type media:   :class:`_MEDIA`
+        """
+        credited_artists = list(media.artists)
+        if media.mixer is not None:
+            credited_artists.append(media.mixer)
+        if media.classical_composers is not None:
+            credited_artists.extend(media.classical_composers)
+        if media._tracks_source is None:  # Song artists are only credited once the tracks are loaded
+            for track in media._tracks:
+                credited_artists.extend([artist for artist in (track.track_artist, track.side_mixer) if artist is not None])
+                for song in track.song_list:
+                    credited_artists.append(song.main_artist)
+                    if song.additional_artists is not None:
+                        credited_artists.extend([additional_artist.artist for additional_artist in song.additional_artists])
+                    if song.classical_composers is not None:
+                        credited_artists.extend(song.classical_composers)
+
+        cls._media_library(media.media_type).delete(media)
+        for artist in set(credited_artists):
+            try:
+                artist.delete_media(media)
+            except MediaException:
+                pass  # Not credited or already removed by the singleton
+            if not (artist.lps or artist.cds or artist.cassettes or artist.elps or artist.mini_cds) and Artists.artist_exists(artist):
+                Artists.delete_artist(artist)
+
+    @classmethod
+    def replace_media(cls, media: _MEDIA, record: dict) -> _MEDIA:
+        """ Replace a music media with the music media of a media record in the same place of the library.
+
+            :param media:   The music media to replace
+            :type media:    :class:`_MEDIA`
+
+            :param record:  The media record to replace it with
+            :type record:   dict
+
+            :returns:       The new music media or the existing music media of the same title and artist
+            :rtype:         :class:`_MEDIA`
+        """
+        library = cls._media_library(media.media_type)
+        index = media.index
+        cls.remove_media(media)
+        new_media = cls.bulk_load([record])[0]
+
+        # Move the new music media from the end of the library into the hole left by the replaced one
+        library_media = cls._media_list(media.media_type)
+        if library_media[-1] is new_media and new_media.index != index:
+            library_media.pop()
+            library_media[index] = new_media
+            _unindex_media(library, new_media, new_media.title, new_media.hash)
+            new_media._index = index
+            _index_media(library, new_media)
+            library._max_index -= 1
+        return new_media
+
+    @classmethod
+    def _media_library(cls, media_type: MediaType):
+        """ Return the singleton holding the music media of the passed type.
+
+            :param media_type:  The type of music media
+            :type media_type:   :class:`MediaType`
+
+            :returns:           The music media singleton
+            :rtype:             :class:`LPs` | :class:`CDs` | :class:`CASSETTEs` | :class:`ELPs` | :class:`MINI_CDs`
+        """
+        if media_type == MediaType.CD:
+            return CDs
+        elif media_type == MediaType.LP:
+            return LPs
+        elif media_type == MediaType.CASSETTE:
+            return CASSETTEs
+        elif media_type == MediaType.ELP:
+            return ELPs
+        elif media_type == MediaType.MINI_CD:
+            return MINI_CDs
+        raise MediaTypeException('Unknown music media type {}'.format(media_type))
+
+    @classmethod
+    def _media_list(cls, media_type: MediaType) -> List[Optional[_MEDIA]]:
+        """ Return the list of the music media of the passed type including the holes left by deletions.
+
+            :param media_type:  The type of music media
+            :type media_type:   :class:`MediaType`
+
+            :returns:           The list of music media of the singleton
+            :rtype:             list(:class:`_MEDIA` | None)
+        """
+        if media_type == MediaType.CD:
+            return CDs._cds
+        elif media_type == MediaType.LP:
+            return LPs._lps
+        elif media_type == MediaType.CASSETTE:
+            return CASSETTEs._cassettes
+        elif media_type == MediaType.ELP:
+            return ELPs._elps
+        elif media_type == MediaType.MINI_CD:
+            return MINI_CDs._mini_cds
+        raise MediaTypeException('Unknown music media type {}'.format(media_type))
+
+    @classmethod
+    def _index_libraries(cls) -> None:
+        """ Rebuild the title, hash and year dictionaries of all music media singletons, e.g. after restoring a snapshot. """
+        cls._reset_song_index()
+        for media_type in MediaType:
+            library = cls._media_library(media_type)
+            library._media_by_title = {}
+            library._media_by_hash = {}
+            library._media_by_year = {}
+            library._years = []
+            for media in cls._media_list(media_type):
+                if media is not None:  # Skip holes in the list due to deletions
+                    _index_media(library, media)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int, media_types: Optional[Iterable[MediaType]] = None) -> List[_MEDIA]:
+        """ Return the music media of all types produced from the first to the last year, ordered by year.
+
+            Music media of the same year are ordered by media type and then as in their singleton.
+
+            :param first_year:   The first year of the range
+            :type first_year:    int
+
+            :param last_year:    The last year of the range, included
+            :type last_year:     int
+
+            :param media_types:  The types of music media to return. All types by default.
+            :type media_types:   iterable(:class:`MediaType`) | None
+
+            :returns:            The music media produced in the range of years
+            :rtype:              list(:class:`_MEDIA`)
+        """
+        if media_types is None:
+            media_types = list(MediaType)
+        return list(heapq.merge(*[cls._media_library(media_type).find_by_year_range(first_year, last_year) for media_type in media_types],
+                                key=lambda media: media.year))
+
+    @classmethod
+    def find_songs(cls, title: str, artist: Optional[str] = None) -> List[tuple[_MEDIA, int, int]]:
+        """ Return where the songs of a title are found across all music media.
+
+            Titles are matched on their normalized form (see :func:`normalize_song_title`) and artists
+            on their normalized name. The artist of a song is its main artist, falling back on the artist
+            of its tracklist and then of its music media, or one of its additional artists.
+
+            The song index is built by the first lookup, which loads the tracks of lazily loaded music
+            media, and is kept up to date from then on.
+
+            :param title:   The title of the songs to find
+            :type title:    str
 
+            :param artist:  Only find the songs of this artist
+            :type artist:   str | None
 
-class _CASSETTE(_MEDIA):
-    pass
+            :returns:       The music media, index of the tracklist and index of the song in the tracklist
+                            of each song found, ordered by media type and then as in their singleton
+            :rtype:         list(tuple(:class:`_MEDIA`, int, int))
+        """
+        if cls._songs_by_title is None:
+            cls._index_songs()
+        title_key = normalize_song_title(title)
+        artist_key = None if artist is None else normalize_artist_name(artist)
+        media_types = list(MediaType)
+        songs_found = []
+        for media in sorted(cls._songs_by_title.get(title_key, []), key=lambda titled: (media_types.index(titled.media_type), titled.index)):
+            for track_index, track in enumerate(media.tracks):
+                for song_index, song in enumerate(track.song_list or []):
+                    if normalize_song_title(song.title) != title_key:
+                        continue
+                    if artist_key is not None:
+                        song_artists = [song.main_artist or track.track_artist or (media.artists[0] if media.artists else None)]
+                        if song.additional_artists is not None:
+                            song_artists.extend(additional_artist.artist for additional_artist in song.additional_artists)
+                        if not any(song_artist is not None and normalize_artist_name(song_artist.name) == artist_key for song_artist in song_artists):
+                            continue
+                    songs_found.append((media, track_index, song_index))
+        return songs_found
 
+    @classmethod
+    def _reset_song_index(cls) -> None:
+        """ Drop the song index. It is built again by the next song lookup. """
+        cls._songs_by_title = None
+        cls._song_titles_by_media = {}
 
-class _LP(_MEDIA):
-    pass
+    @classmethod
+    def _index_songs(cls) -> None:
+        """ Build the song index from the songs of all music media. """
+        cls._songs_by_title = {}
+        cls._song_titles_by_media = {}
+        for media_type in MediaType:
+            for media in cls._media_list(media_type):
+                if media is not None:  # Skip holes in the list due to deletions
+                    cls._index_media_songs(media)
 
+    @classmethod
+    def _index_media_songs(cls, media: _MEDIA) -> None:
+        """ Bring the song index up to date with the songs of a music media, dropping the music media once deleted.
 
-class _ELP(_MEDIA):
-    pass
+            Does nothing until the song index is built. Tracklists and songs are linked back to their music media
+            so adding, removing and renaming songs keeps the index up to date.
 
+            :param media:  The music media to index the songs of
+            :type media:   :class:`_MEDIA`
+        """
+        if cls._songs_by_title is None:
+            return
+        tracks = media.tracks  # Loads the tracks of a lazily loaded music media, indexing them first
+        cls._unindex_media_songs(media)
+        if not _media_indexed(cls._media_library(media.media_type), media):
+            return
+        song_titles = set()
+        for track in tracks:
+            track._media = media
+            for song in track.song_list or []:
+                song._tracklist = track
+                song_titles.add(normalize_song_title(song.title))
+        for song_title in song_titles:
+            cls._songs_by_title.setdefault(song_title, []).append(media)
+        cls._song_titles_by_media[media] = song_titles
 
-class _MINI_CD(_MEDIA):
-    pass
+    @classmethod
+    def _unindex_media_songs(cls, media: _MEDIA) -> None:
+        """ Drop the songs of a music media from the song index.
 
+            :param media:  The music media to drop the songs of
+            :type media:   :class:`_MEDIA`
+        """
+        for song_title in cls._song_titles_by_media.pop(media, ()):
+            titled_media = cls._songs_by_title[song_title]
+            _remove_media(titled_media, media)
+            if not titled_media:
+                del cls._songs_by_title[song_title]
 
-class MEDIA():
-    _html_file_retention_count = 5   # Number of backup html data files to store
-    _html_data_file = None
-    changes_to_write = False
+    @classmethod
+    def from_record(cls, record: dict) -> _MEDIA:
+        """ Create a music media and its artists from a media record.
+
+            Media records are produced by the streaming loader in
+            :mod:`app.musicmedia.musicmedia_loader` and reference artists by name.
+
+            :param record:  The media record to create the music media from
+            :type record:   dict
+
+            :returns:       The new music media
+            :rtype:         :class:`_MEDIA`
+        """
+        media_type = MediaType(record['media_type'])
+        media_artists = [Artists.create_Artist(name) for name in record['artists']]
+        media_classical_composers = [Artists.create_Artist(name) for name in record['classical_composers']]
+        media_mixer = None if record['mixer'] is None else Artists.create_Artist(record['mixer'])
+        media_tracklist, media_song_artists = cls._tracks_from_record(record)
+
+        if media_classical_composers == []:
+            media_classical_composers = None
+        new_media = cls._media_library(media_type).create(media_type=media_type,
+                                                          title=record['title'],
+                                                          artists=media_artists,
+                                                          year=record['year'],
+                                                          mixer=media_mixer,
+                                                          classical_composers=media_classical_composers,
+                                                          artist_particles=list(record['artist_particles']))
+        for tracklist in media_tracklist:
+            new_media.add_track(tracklist)
+        cls._credit_song_artists(new_media, media_song_artists)
+        return new_media
 
     @classmethod
-    def set_html_file_rentention_count(cls, rentention_count) -> None:
-        """ Override the default html data file backup retention count. """
-        cls._html_file_retention_count = rentention_count
+    def _tracks_from_record(cls, record: dict, create_artist: Optional[Callable[[str], _Artist]] = None) -> tuple[List[TrackList], List[_Artist]]:
+        """ Create the tracklists of a media record.
+
+            :param record:         The media record holding the tracks
+            :type record:          dict
+
+            :param create_artist:  Return the artist of a name. Defaults to :func:`Artists.create_Artist`
+            :type create_artist:   callable | None
+
+            :returns:              The tracklists and all the artists credited on them
+            :rtype:                tuple(list(:class:`TrackList`), list(:class:`_Artist`))
+        """
+        if create_artist is None:
+            create_artist = Artists.create_Artist
+        media_song_artists = []
+        media_tracklist = []
+        for track in record['tracks']:
+            track_artist = None
+            if track['track_artist'] is not None:
+                track_artist = create_artist(track['track_artist'])
+                media_song_artists.append(track_artist)
+            side_mixer = None
+            if track['side_mixer'] is not None:
+                side_mixer = create_artist(track['side_mixer'])
+                media_song_artists.append(side_mixer)
+
+            side_songs = []
+            for song in track['songs']:
+                main_artist = create_artist(song['main_artist'])
+                additional_artists = None
+                if song['additional_artists'] is not None:
+                    additional_artists = []
+                    for prequel, artist_name, sequel in song['additional_artists']:
+                        song_artist = create_artist(artist_name)
+                        media_song_artists.append(song_artist)
+                        additional_artists.append(AdditionalArtist(song_artist, prequel=prequel, sequel=sequel))
+                song_classical_composers = None
+                if song['classical_composers'] is not None:
+                    song_classical_composers = [create_artist(name) for name in song['classical_composers']]
+                    media_song_artists.extend(song_classical_composers)
+                side_songs.append(Song(title=song['title'],
+                                       main_artist=main_artist,
+                                       exp_main_artist=song['exp_main_artist'],
+                                       main_artist_sequel=song['main_artist_sequel'],
+                                       additional_artists=additional_artists,
+                                       album=song['album'],
+                                       classical_composers=song_classical_composers,
+                                       classical_work=song['classical_work'],
+                                       country=song['country'],
+                                       year=song['year'],
+                                       mix=song['mix'],
+                                       featured_in=song['featured_in'],
+                                       parts=list(song['parts'])))
+            media_tracklist.append(TrackList(side_name=track['name'],
+                                             track_artist=track_artist,
+                                             side_mixer_artist=side_mixer,
+                                             track_year=track['track_year'],
+                                             songs=side_songs))
+        return media_tracklist, media_song_artists
 
     @classmethod
-    def from_html_file(cls, filepath: str) -> None:
-        """ Load the library from an html file.
+    def _credit_song_artists(cls, media: _MEDIA, song_artists: List[_Artist]) -> None:
+        """ Add the music media to all the artists credited on its songs.
+
+            :param media:         The music media
+            :type media:          :class:`_MEDIA`
+
+            :param song_artists:  The artists credited on the songs of the music media
+            :type song_artists:   list(:class:`_Artist`)
+        """
+        # Add music media to all song artists found once we dedupe them skipping any that
+        # also have the music media credit as artists since they have already been added
+        music_media_artist_credits = media.artists.copy()
+        if media.classical_composers is not None:
+            music_media_artist_credits.extend(media.classical_composers)
+        for artist in set(song_artists):
+            if artist not in music_media_artist_credits:
+                artist.add_media(media)
+
+    @classmethod
+    def _from_html_tree(cls, filepath: str) -> None:
+        """ Load the library from an html file parsed into a document tree.
 
             :param filepath:  The file path of the html file to load
             :type filepath:   str
         """
+        from .musicmedia_profile import load_phase
+
+        profile = cls._load_profile
+        create_artist = Artists.create_Artist if profile is None else profile.timed('artist_lookup', Artists.create_Artist)
+
         def rel_element_text(head_node, rel_value) -> str:
             rel_text = None
             rel_node = head_node.find('a', rel=rel_value)
@@ -1292,7 +2610,7 @@ class MEDIA():
                             next_tag = anchor_tag
                             while next_tag is not None:
                                 lp_artist_name = next_tag.text.strip()
-                                media_artists.append(Artists.create_Artist(lp_artist_name))
+                                media_artists.append(create_artist(lp_artist_name))
                                 if isinstance(next_tag.next_sibling, NavigableString):
                                     next_tag = next_tag.next_sibling
                                     media_artist_particles.append(next_tag.text)
@@ -1301,7 +2619,7 @@ class MEDIA():
                             media_classical_composer_elements = h3_element.find_all('a', rel='classical-composer')
                             for media_classical_composer_element in media_classical_composer_elements:
                                 media_classical_composer_name = media_classical_composer_element.text.strip()
-                                media_classical_composer = Artists.create_Artist(media_classical_composer_name)
+                                media_classical_composer = create_artist(media_classical_composer_name)
                                 media_classical_composers.append(media_classical_composer)
                         elif rel_value == 'date':
                             media_year = int(anchor_tag.text.strip())
@@ -1310,7 +2628,7 @@ class MEDIA():
                     media_mixer_elements = h3_element.find_all('a', rel='mixer')
                     for media_mixer_element in media_mixer_elements:
                         media_mixer_name = media_mixer_element.text.strip()
-                        media_mixers.append(Artists.create_Artist(media_mixer_name))
+                        media_mixers.append(create_artist(media_mixer_name))
 
             # Track down albums with more than two classical composer credits
             if len(media_classical_composers) > 2:
@@ -1372,7 +2690,7 @@ class MEDIA():
                             first_block = False
                             prequel = sequel = ''
                             artist_name = artist_name_block.text.strip()
-                            song_artist = Artists.create_Artist(artist_name)
+                            song_artist = create_artist(artist_name)
                             if artist_block == all_artist_blocks[0]:
                                 # Special handling of first block for the prequel and main artist
                                 first_block = True
@@ -1396,13 +2714,16 @@ class MEDIA():
 
             return main_artist, other_artists, exp_main_artist, main_artist_sequel
 
-        # Set the file path for the html data file in case we write out a new version
-        cls._html_data_file = filepath
+        if profile is not None:
+            get_media_metadata = profile.timed('media_metadata', get_media_metadata)
+            get_song_additional_artists = profile.timed('song_artists', get_song_additional_artists)
 
         with open(filepath, 'r') as fp:
             # Parse the formatted file for LPs
-            html = fp.read()
-            parsed_html = BeautifulSoup(html, features="html.parser")
+            with load_phase(profile, 'read'):
+                html = fp.read()
+            with load_phase(profile, 'parse'):
+                parsed_html = BeautifulSoup(html, features="html.parser")
 
             # Parse out all the LPs which start with <p> tags
             all_p_elements = parsed_html.find_all('p')
@@ -1435,12 +2756,12 @@ class MEDIA():
                             if side_metadata_element.find('a', rel='side-mixer'):
                                 side_mixer_name = rel_element_text(side_metadata_element, 'side-mixer')
                                 if side_mixer_name is not None:
-                                    side_mixer = Artists.create_Artist(side_mixer_name)
+                                    side_mixer = create_artist(side_mixer_name)
                                     media_song_artists.append(side_mixer)
                             elif side_metadata_element.find('a', rel='track-artist'):
                                 track_artist_name = rel_element_text(side_metadata_element, 'track-artist')
                                 if track_artist_name is not None:
-                                    track_artist = Artists.create_Artist(track_artist_name)
+                                    track_artist = create_artist(track_artist_name)
                                     media_song_artists.append(track_artist)
                             elif side_metadata_element.find('a', rel='track-year'):
                                 track_year = rel_element_text(side_metadata_element, 'track-year')
@@ -1488,7 +2809,7 @@ class MEDIA():
                         song_classical_composers = []
                         if song_classical_composer_nodes is not None:
                             for song_classical_composer_node in song_classical_composer_nodes:
-                                song_classical_composer = Artists.create_Artist(song_classical_composer_node.text.strip())
+                                song_classical_composer = create_artist(song_classical_composer_node.text.strip())
                                 song_classical_composers.append(song_classical_composer)
                                 media_song_artists.append(song_classical_composer)
                         if song_classical_composers == []:
@@ -1551,70 +2872,133 @@ class MEDIA():
                 # updates to each individual media singleton. Perhaps
                 # we could use inheritance from a "MEDIAs" superclass?
 
-                # Handle CD music media
-                if media_type == MediaType.CD:
-                    new_media = CDs.create(media_type=media_type,
-                                           title=media_title,
-                                           artists=media_artists,
-                                           year=media_year,
-                                           mixer=media_mixer,
-                                           classical_composers=media_classical_composers,
-                                           artist_particles=media_artist_particles)
-
-                # Handle LP music media
-                elif media_type == MediaType.LP:
-                    new_media = LPs.create(media_type=media_type,
-                                           title=media_title,
-                                           artists=media_artists,
-                                           year=media_year,
-                                           mixer=media_mixer,
-                                           classical_composers=media_classical_composers,
-                                           artist_particles=media_artist_particles)
-                # Handle CASSETTE music media
-                elif media_type == MediaType.CASSETTE:
-                    new_media = CASSETTEs.create(media_type=media_type,
-                                                 title=media_title,
-                                                 artists=media_artists,
-                                                 year=media_year,
-                                                 mixer=media_mixer,
-                                                 classical_composers=media_classical_composers,
-                                                 artist_particles=media_artist_particles)
-                # Handle ELP music media
-                elif media_type == MediaType.ELP:
-                    new_media = ELPs.create(media_type=media_type,
-                                            title=media_title,
-                                            artists=media_artists,
-                                            year=media_year,
-                                            mixer=media_mixer,
-                                            classical_composers=media_classical_composers,
-                                            artist_particles=media_artist_particles)
-
-                # Handle mini CD music media
-                elif media_type == MediaType.MINI_CD:
-                    new_media = MINI_CDs.create(media_type=media_type,
+                with load_phase(profile, 'create'):
+                    # Handle CD music media
+                    if media_type == MediaType.CD:
+                        new_media = CDs.create(media_type=media_type,
+                                               title=media_title,
+                                               artists=media_artists,
+                                               year=media_year,
+                                               mixer=media_mixer,
+                                               classical_composers=media_classical_composers,
+                                               artist_particles=media_artist_particles)
+
+                    # Handle LP music media
+                    elif media_type == MediaType.LP:
+                        new_media = LPs.create(media_type=media_type,
+                                               title=media_title,
+                                               artists=media_artists,
+                                               year=media_year,
+                                               mixer=media_mixer,
+                                               classical_composers=media_classical_composers,
+                                               artist_particles=media_artist_particles)
+                    # Handle CASSETTE music media
+                    elif media_type == MediaType.CASSETTE:
+                        new_media = CASSETTEs.create(media_type=media_type,
+                                                     title=media_title,
+                                                     artists=media_artists,
+                                                     year=media_year,
+                                                     mixer=media_mixer,
+                                                     classical_composers=media_classical_composers,
+                                                     artist_particles=media_artist_particles)
+                    # Handle ELP music media
+                    elif media_type == MediaType.ELP:
+                        new_media = ELPs.create(media_type=media_type,
                                                 title=media_title,
                                                 artists=media_artists,
                                                 year=media_year,
                                                 mixer=media_mixer,
                                                 classical_composers=media_classical_composers,
                                                 artist_particles=media_artist_particles)
-                for tracklist in media_tracklist:
-                    new_media.add_track(tracklist)
 
-                # Add music media to all song artists found once we dedupe them
-                for artist in set(media_song_artists):
-                    # Need to skip any that also have the music media credit as artists since they have
-                    # already been added
-                    music_media_artist_credits = media_artists.copy()
-                    if media_classical_composers is not None:
-                        music_media_artist_credits.extend(media_classical_composers)
-                    if artist not in music_media_artist_credits:
-                        artist.add_media(new_media)
+                    # Handle mini CD music media
+                    elif media_type == MediaType.MINI_CD:
+                        new_media = MINI_CDs.create(media_type=media_type,
+                                                    title=media_title,
+                                                    artists=media_artists,
+                                                    year=media_year,
+                                                    mixer=media_mixer,
+                                                    classical_composers=media_classical_composers,
+                                                    artist_particles=media_artist_particles)
+                    for tracklist in media_tracklist:
+                        new_media.add_track(tracklist)
+
+                    # Add music media to all song artists found once we dedupe them
+                    for artist in set(media_song_artists):
+                        # Need to skip any that also have the music media credit as artists since they have
+                        # already been added
+                        music_media_artist_credits = media_artists.copy()
+                        if media_classical_composers is not None:
+                            music_media_artist_credits.extend(media_classical_composers)
+                        if artist not in music_media_artist_credits:
+                            artist.add_media(new_media)
+
+    @classmethod
+    def from_records_file(cls, filepath: str) -> List[_MEDIA]:
+        """ Load the music media of a records file into the library.
+
+            :param filepath:  The file path of the records file
+            :type filepath:   str
+
+            :returns:         The music media of each record in file order
+            :rtype:           list(:class:`_MEDIA`)
+        """
+        from .musicmedia_records import iter_records_file
+        return cls.bulk_load(iter_records_file(filepath))
+
+    @classmethod
+    def to_records_file(cls, filepath: str) -> None:
+        """ Write the library to a records file.
+
+            The music media are written in the order of the html file. The record of a music
+            media is only encoded again when its html was rendered again, i.e. when it changed.
+
+            :param filepath:  The file path of the records file. Its suffix gives the storage format.
+            :type filepath:   str
+        """
+        from .musicmedia_records import encode_record, records_format, write_records_file
+
+        storage_format = records_format(filepath)
+
+        def encoded_records():
+            for library_media in (CASSETTEs._cassettes, CDs._cds, LPs._lps, ELPs._elps, MINI_CDs._mini_cds):
+                for media in library_media:
+                    if media is None:  # Skip holes in the list due to deletions
+                        continue
+                    record_cache = media._record_cache
+                    if record_cache is None or media._html is None or record_cache[0] is not media._html or record_cache[1] != storage_format:
+                        record_cache = (media._html, storage_format, encode_record(media.to_record(), storage_format))
+                        media._record_cache = record_cache
+                    yield record_cache[2]
+
+        write_records_file(filepath, encoded_records(), storage_format)
+
+    @classmethod
+    def _store_records(cls, filepath: str, media_blocks: Optional[List[tuple]] = None) -> None:
+        """ Write the library to the records file or SQL store it is kept in besides its html file.
+
+            :param filepath:      The file path of the html file
+            :type filepath:       str
+
+            :param media_blocks:  The music media with their html blocks if already rendered
+            :type media_blocks:   list(tuple(:class:`_MEDIA`, str)) | None
+        """
+        from .musicmedia_records import HTML_FORMAT, records_path, SQL_FORMAT
+
+        if cls._storage_format == SQL_FORMAT:
+            cls._sql_store.save(cls._media_blocks() if media_blocks is None else media_blocks)
+        elif cls._storage_format != HTML_FORMAT:
+            cls.to_records_file(records_path(filepath, cls._storage_format))
 
     @classmethod
     def to_html_file(cls, filepath: str = None) -> None:
         """ Write the library to an html file.
 
+            When writes are coordinated with the other workers, the html data file is written
+            holding its write lock. If another worker wrote the file since the library was
+            loaded or last written, the library is first refreshed from the file so the changes
+            of the other worker are kept. See :mod:`app.musicmedia.musicmedia_lock`.
+
             :param filepath:  The file path of the html file to write to or use class
                               preset value
             :type filepath:   str
@@ -1623,27 +3007,241 @@ class MEDIA():
         if data_file is None:
             raise FileNotFoundError('No html data file specified to write into.')
 
-        # Create a backup of the current html data file
-        data_filepath = Path(data_file)
-        timestamp = time.time()
-        backup_data_filepath = Path(data_file + '.{}'.format(int(timestamp)))
-        shutil.copyfile(data_filepath, backup_data_filepath)
+        if not cls._html_write_lock or data_file != cls._html_data_file:
+            cls._write_html_file(data_file)
+            return
+
+        from .musicmedia_lock import read_version, write_lock, write_version
+
+        with write_lock(data_file):
+            version = read_version(data_file)
+            if cls._html_version is not None and version != cls._html_version:
+                cls._refresh_stale_library(data_file, version)
+            cls._write_html_file(data_file)
+            write_version(data_file, version + 1)
+            cls._html_version = version + 1
+
+    @classmethod
+    def _refresh_stale_library(cls, filepath: str, version: int) -> None:
+        """ Take in the changes another worker wrote to the html data file, keeping the unwritten changes of the library.
+
+            The file watcher applies the music media added, removed or changed in the file. Music
+            media changed both in the file and in the library, as flagged by :meth:`mark_changed`,
+            are a conflict. The library is then left as it is rather than drop either change.
+
+            :param filepath:                The file path of the html data file
+            :type filepath:                 str
+
+            :param version:                 The current version of the file
+            :type version:                  int
+
+            :raises StaleLibraryException:  If the library has no watcher of the file to refresh it with or
+                                            music media changed both in the file and in the library
+        """
+        watcher = cls._html_file_watcher
+        if watcher is None or watcher.filepath != filepath:
+            raise StaleLibraryException('Music media file {} is at version {} but the library holds version {} and cannot be refreshed. '
+                                        'Not overwriting the changes of the other workers.'.format(filepath, version, cls._html_version))
+        watcher.reload(wait=True, keep_changes=True)
+
+    @classmethod
+    def _write_html_file(cls, data_file: str) -> None:
+        """ Write the library to an html file, backing up the file it replaces.
+
+            :param data_file:  The file path of the html file to write to
+            :type data_file:   str
+        """
+        from .musicmedia_files import write_file_atomically
+
+        # Make sure the current html data file is backed up. It already is unless it was changed
+        # outside of the application as each write backs up what it writes.
+        backup_store = cls._backup_store(data_file)
+        backup_store.backup_file()
+
+        # Write out the new html data file. Only the music media changed since the last write are
+        # rendered again. The blocks are rendered, encoded and written one at a time so the file is
+        # never held in memory. The new file replaces the old one in one step so a crash part way
+        # through the write leaves the old file in place, and lazily loaded music media read their
+        # tracks from the old file until then. The changes journaled from here on may not be
+        # rendered so they are kept in the journal.
+        cls._render_parallel()
+        with cls._render_lock:
+            journal_offset = cls._html_journal.mark() if cls._html_journal is not None else None
+            written_change_count = cls._change_count
+            written_media = cls._written_media()
+        written_blocks = []
+        write_file_atomically(data_file, cls._html_file_segments(cls._iter_media_blocks(written_media), written_blocks))
+        file_stat = os.stat(data_file)
+        try:
+            backup_store.backup_file()  # Reads back what was written through a memory map
+        except OSError:
+            pass  # Backed up by the next write instead
+
+        # Store the records after the html data file so they are taken as the newer of the two
+        if data_file == cls._html_data_file:
+            cls._store_records(data_file)
+
+        if data_file == cls._html_data_file:
+            # The blocks have moved. Index them from what was written rather than parsing the file again.
+            from .musicmedia_index import MusicMediaBlockIndex
+            cls._html_block_index = MusicMediaBlockIndex.from_written_blocks(data_file, file_stat.st_size, file_stat.st_mtime_ns,
+                                                                             cls.HTML_HEADER, written_blocks)
+            try:
+                cls._html_block_index.save()
+            except OSError:
+                pass  # Rebuilt when next needed
+
+            # Our own changes do not need to be reloaded
+            if cls._html_file_watcher is not None:
+                cls._html_file_watcher.sync(cls._html_block_index)
+
+            # The html data file now holds the changes journaled or flagged before it was rendered
+            if cls._html_journal is not None and journal_offset is not None:
+                cls._html_journal.clear(journal_offset)
+            with cls._render_lock:
+                cls._unwritten_media = {media: change_count for media, change_count in cls._unwritten_media.items()
+                                        if change_count > written_change_count}
+
+        # Keep the snapshot in step with the html data file
+        if cls._html_snapshot and data_file == cls._html_data_file:
+            from .musicmedia_snapshot import write_snapshot
+            write_snapshot(data_file)  # A snapshot left stale is ignored on the next load
+
+    @classmethod
+    def _media_blocks(cls) -> List[tuple[_MEDIA, str]]:
+        """ Return the html block of each music media in the order they are written out.
+
+            Only music media changed since they were last rendered are rendered again.
+
+            :returns:  Each music media with its html block
+            :rtype:    list(tuple(:class:`_MEDIA`, str))
+        """
+        cls._render_parallel()
+        return list(cls._iter_media_blocks(cls._written_media()))
+
+    @classmethod
+    def _written_media(cls) -> List[_MEDIA]:
+        """ Return the music media in the order they are written out.
+
+            :returns:  The music media of all the singletons
+            :rtype:    list(:class:`_MEDIA`)
+        """
+        return [media for library_media in (CASSETTEs._cassettes, CDs._cds, LPs._lps, ELPs._elps, MINI_CDs._mini_cds)
+                for media in library_media if media is not None]  # Skip holes in the list due to deletions
+
+    @classmethod
+    def _iter_media_blocks(cls, media_list: Iterable[_MEDIA]) -> Iterator[tuple[_MEDIA, str]]:
+        """ Generate the html block of each music media a block at a time.
+
+            Only music media changed since they were last rendered are rendered again.
+
+            :param media_list:  The music media in the order they are written out
+            :type media_list:   iterable(:class:`_MEDIA`)
+
+            :returns:           Each music media with its html block
+            :rtype:             iterator(tuple(:class:`_MEDIA`, str))
+        """
+        for media in media_list:
+            with cls._render_lock:
+                if media._html is None:
+                    media._html = media.to_html()
+                html = media._html
+            yield media, html
+
+    @classmethod
+    def _render_parallel(cls, workers: Optional[int] = None, threshold: Optional[int] = None) -> bool:
+        """ Render the music media changed since they were last rendered in a pool of worker processes.
+
+            The workers are forked with the library so only the html blocks are passed back. The
+            music media are only rendered in parallel if there are enough of them for it to pay off,
+            as measured by ``utils/benchmark_musicmedia_render.py``. Otherwise, or if the worker
+            processes cannot be forked, they are left to be rendered as they are written out.
+
+            A worker forked while another thread holds a lock, such as the background writer, the
+            file watcher or a request handler, inherits the lock held and can deadlock on it. So the
+            workers are only forked from a process running a single thread, such as the command line
+            utilities, and never while holding the render lock.
+
+            :param workers:    The number of worker processes or None for the configured number
+            :type workers:     int | None
+
+            :param threshold:  The fewest music media to render in parallel or None for the configured number
+            :type threshold:   int | None
+
+            :returns:          True if the music media were rendered in parallel
+            :rtype:            bool
+        """
+        if workers is None:
+            workers = cls._render_workers if cls._render_workers is not None else (os.cpu_count() or 1)
+        if threshold is None:
+            threshold = cls._parallel_render_threshold
+        if workers < 2 or 'fork' not in multiprocessing.get_all_start_methods() or threading.active_count() > 1:
+            return False
+        unrendered = {}
+        for media_type in (MediaType.CASSETTE, MediaType.CD, MediaType.LP, MediaType.ELP, MediaType.MINI_CD):
+            media_list = cls._media_list(media_type)
+            indexes = [index for index, media in enumerate(media_list) if media is not None and media._html is None]
+            if indexes:
+                unrendered[media_type] = indexes
+        if sum(len(indexes) for indexes in unrendered.values()) < max(threshold, 1):
+            return False
+
+        # Split each type into chunks so the workers share the work evenly
+        chunk_size = max(sum(len(indexes) for indexes in unrendered.values()) // (workers * cls.RENDER_CHUNKS_PER_WORKER), 1)
+        chunks = [(media_type, indexes[start:start + chunk_size])
+                  for media_type, indexes in unrendered.items() for start in range(0, len(indexes), chunk_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                rendered = pool.map(_render_media, [media_type for media_type, _ in chunks], [indexes for _, indexes in chunks])
+                for (media_type, indexes), html_blocks in zip(chunks, rendered):
+                    media_list = cls._media_list(media_type)
+                    for index, html in zip(indexes, html_blocks):
+                        media_list[index]._html = html
+        except (OSError, BrokenProcessPool):
+            return False  # Whatever was not rendered is rendered as it is written out
+        return True
+
+    @classmethod
+    def set_render_workers(cls, workers: Optional[int], threshold: Optional[int] = None) -> None:
+        """ Override the number of processes rendering the music media when the library is written out.
+
+            :param workers:    The number of worker processes, 1 to always render serially or None for one per CPU
+            :type workers:     int | None
+
+            :param threshold:  The fewest music media to render in parallel or None to keep the current one
+            :type threshold:   int | None
+        """
+        cls._render_workers = workers
+        if threshold is not None:
+            cls._parallel_render_threshold = threshold
+
+    @classmethod
+    def _html_file_segments(cls, media_blocks: Iterable[tuple[_MEDIA, str]], written_blocks: Optional[list] = None) -> Iterator[bytes]:
+        """ Generate the encoded content of the html file split into its header and music media blocks.
+
+            The split is the one :func:`app.musicmedia.musicmedia_backup.html_segments` makes, with the
+            html closer held by the last block. Each block is only encoded when it is reached.
+
+            :param media_blocks:    Each music media with its html block as generated by :meth:`_iter_media_blocks`
+            :type media_blocks:     iterable(tuple(:class:`_MEDIA`, str))
 
-        # Write out the new html data file
-        with open(data_filepath, 'w') as html_fd:
-            html_fd.write(cls.to_html())
+            :param written_blocks:  A list to add each music media to with the size and digest of its block
+                                    as it is generated, or None
+            :type written_blocks:   list | None
 
-        # Check if exceeded the count of backups of html data files and remove oldest
-        data_filepath_parent = data_filepath.parent
-        backup_html_data_files = []
-        for f in data_filepath_parent.iterdir():
-            if f.stem == data_filepath.parts[-1]:
-                backup_html_data_files.append(f)
-        backup_html_data_files.sort(reverse=True)
+            :returns:               The segments of the html file
+            :rtype:                 iterator(bytes)
+        """
+        from .musicmedia_loader import html_block_digest
 
-        if len(backup_html_data_files) > cls._html_file_retention_count:
-            for f in backup_html_data_files[cls._html_file_retention_count:]:
-                os.remove(f)
+        encoding = locale.getpreferredencoding(False)
+        segment = cls.HTML_HEADER.encode(encoding)
+        for media, html in media_blocks:
+            yield segment
+            segment = html.encode(encoding)
+            if written_blocks is not None:
+                written_blocks.append((media, len(segment), html_block_digest(segment)))
+        yield segment + cls.HTML_CLOSER.encode(encoding)
 
     @classmethod
     def to_html(cls):
@@ -1652,31 +3250,145 @@ class MEDIA():
             :returns:  An html representation of all music media
             :rtype:    str
         """
-        HTML_HEADER = """<!DOCTYPE PUBLIC "-//W3C//DTD HTML 4.01//EN" "http://www.w3.org/TR/html4/strict.dtd">
-<html lang="en">
-<head>
-<title>Music List</title>
-</head>
-<body>
-<h2>Audio Media</h2>
-"""
-        HTML_CLOSER = """</body>
-</html>
-"""
-        html_str = HTML_HEADER
-        html_str += CASSETTEs.to_html()
-        html_str += CDs.to_html()
-        html_str += LPs.to_html()
-        html_str += ELPs.to_html()
-        html_str += MINI_CDs.to_html()
-        html_str += HTML_CLOSER
-        return html_str
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all music media a fragment at a time.
+
+            :returns:  The fragments of an html representation of all music media
+            :rtype:    iterator(str)
+        """
+        yield cls.HTML_HEADER
+        yield from CASSETTEs.iter_html()
+        yield from CDs.iter_html()
+        yield from LPs.iter_html()
+        yield from ELPs.iter_html()
+        yield from MINI_CDs.iter_html()
+        yield cls.HTML_CLOSER
+
+
+def _insert_media(media_list: List[_MEDIA], media: _MEDIA) -> None:
+    """ Add a music media to a list of music media kept in the order of the list of their singleton. """
+    media_list.append(media)
+    if len(media_list) > 1 and media_list[-2].index > media.index:
+        media_list.sort(key=lambda listed: listed.index)
+
+
+def _remove_media(media_list: List[_MEDIA], media: _MEDIA) -> None:
+    """ Drop a music media from a list of music media. """
+    for position, listed in enumerate(media_list):
+        if listed is media:
+            del media_list[position]
+            break
+
+
+def _index_media(library, media: _MEDIA) -> None:
+    """ Add a music media of a singleton to its title, hash and year dictionaries and to the song index.
+
+        The music media of a title or year are kept in the order of the list of the singleton. A hash
+        held by another music media of the same title and artist stays with it.
+
+        :param library:  The singleton of the music media
+        :type library:   :class:`LPs` | :class:`CDs` | :class:`CASSETTEs` | :class:`ELPs` | :class:`MINI_CDs`
+
+        :param media:    The music media to add
+        :type media:     :class:`_MEDIA`
+    """
+    _insert_media(library._media_by_title.setdefault(media.title, []), media)
+    library._media_by_hash.setdefault(media.hash, media)
+    _index_media_year(library, media)
+    MEDIA._index_media_songs(media)
+
+
+def _unindex_media(library, media: _MEDIA, title: str, media_hash: str) -> None:
+    """ Drop a music media of a singleton from its title, hash and year dictionaries and from the song index.
+
+        :param library:     The singleton of the music media
+        :type library:      :class:`LPs` | :class:`CDs` | :class:`CASSETTEs` | :class:`ELPs` | :class:`MINI_CDs`
+
+        :param media:       The music media to drop
+        :type media:        :class:`_MEDIA`
+
+        :param title:       The title the music media was added under
+        :type title:        str
+
+        :param media_hash:  The hash the music media was added under
+        :type media_hash:   str
+    """
+    titled_media = library._media_by_title.get(title, [])
+    _remove_media(titled_media, media)
+    if not titled_media:
+        library._media_by_title.pop(title, None)
+    if library._media_by_hash.get(media_hash) is media:
+        del library._media_by_hash[media_hash]
+        # Music media of the same title and artist share the hash. Hand it over to the next one.
+        for titled in titled_media:
+            if titled.hash == media_hash:
+                library._media_by_hash[media_hash] = titled
+                break
+    _unindex_media_year(library, media, media.year)
+    MEDIA._unindex_media_songs(media)
+
+
+def _index_media_year(library, media: _MEDIA) -> None:
+    """ Add a music media of a singleton to its year dictionary and its sorted list of years. """
+    year_media = library._media_by_year.get(media.year)
+    if year_media is None:
+        year_media = library._media_by_year[media.year] = []
+        if media.year is not None:  # Cassettes may not have a year
+            insort(library._years, media.year)
+    _insert_media(year_media, media)
+
+
+def _unindex_media_year(library, media: _MEDIA, year: Optional[int]) -> None:
+    """ Drop a music media of a singleton from its year dictionary, dropping the year once it has no music media. """
+    year_media = library._media_by_year.get(year)
+    if year_media is None:
+        return
+    _remove_media(year_media, media)
+    if not year_media:
+        del library._media_by_year[year]
+        if year is not None:
+            del library._years[bisect_left(library._years, year)]
+
+
+def _media_in_years(library, first_year: int, last_year: int) -> List[_MEDIA]:
+    """ Return the music media of a singleton released from the first to the last year, ordered by year. """
+    media_found = []
+    for year in library._years[bisect_left(library._years, first_year):bisect_right(library._years, last_year)]:
+        media_found.extend(library._media_by_year[year])
+    return media_found
+
+
+def _media_indexed(library, media: _MEDIA, title: Optional[str] = None) -> bool:
+    """ Return True if the music media is in the list of its singleton, looking it up in the title dictionary.
+
+        :param library:  The singleton of the music media
+        :type library:   :class:`LPs` | :class:`CDs` | :class:`CASSETTEs` | :class:`ELPs` | :class:`MINI_CDs`
+
+        :param media:    The music media to look up
+        :type media:     :class:`_MEDIA`
+
+        :param title:    The title the music media was added under. Its current title by default.
+        :type title:     str | None
+
+        :returns:        True if the music media is in the singleton
+        :rtype:          bool
+    """
+    if media is None:
+        return False
+    return any(titled is media for titled in library._media_by_title.get(media.title if title is None else title, []))
 
 
 class LPs():
     """ A singleton list of all music LPs. """
     _instance = None
     _lps = []
+    _media_by_title = {}  # Title to the list of its music media
+    _media_by_hash = {}   # Hash to the music media
+    _media_by_year = {}   # Year to the list of its music media
+    _years = []           # Sorted years of the music media
     _max_index = 0
 
     @property
@@ -1697,7 +3409,12 @@ class LPs():
     def _clean_lps(cls):
         """ Private method to remove all albums from the collection. Useful in testing. """
         cls._lps = []
+        cls._media_by_title = {}
+        cls._media_by_hash = {}
+        cls._media_by_year = {}
+        cls._years = []
         cls._max_index = 0
+        MEDIA._reset_song_index()
 
     @classmethod
     def create(cls,
@@ -1748,13 +3465,9 @@ class LPs():
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not a an artist'.format(artist))
 
-        results = cls.find_by_title(title)
-        if len(results) > 0:
-            # Need to check hash id
-            new_album_hash = media_to_hash(media_type, title, artists[0].name)
-            for result in results:
-                if result._hash == new_album_hash:
-                    return result
+        result = cls.find_by_hash(media_to_hash(media_type, title, artists[0].name))
+        if result is not None:
+            return result
         # Create the new album
         new_lp = _LP(media_type, title, artists, year, cls._max_index, mixer, classical_composers, artist_particles)
         cls._max_index += 1
@@ -1780,9 +3493,10 @@ class LPs():
         """
         if type(lp) is not _LP:
             raise LPException('{} is not an LP object'.format(lp))
-        if lp in cls._lps:
+        if cls.exists(lp):
             raise LPException('LP {} already exists'.format(lp))
         cls._lps.append(lp)
+        _index_media(cls, lp)
 
     @classmethod
     def delete(cls, lp: _LP) -> None:
@@ -1798,13 +3512,14 @@ class LPs():
             :param lp:  The album to add
             :type lp:   :class:`_LP`
         """
-        if lp in cls._lps:
+        if cls.exists(lp):
             for artist in lp.artists:
                 artist.delete_media(lp)
             if lp.mixer is not None:
                 lp.mixer.delete_media(lp)
             make_hole_index = lp.index
             cls._lps[make_hole_index] = None
+            _unindex_media(cls, lp, lp.title, lp.hash)
 
     @classmethod
     def exists(cls, lp: _LP) -> bool:
@@ -1816,7 +3531,7 @@ class LPs():
             :returns:   True if the album exists in the list of all albums
             :rtype:     bool
         """
-        return lp in cls._lps
+        return _media_indexed(cls, lp)
 
     @classmethod
     def find_by_index(cls, index: int) -> Optional[_LP]:
@@ -1845,12 +3560,19 @@ class LPs():
             :returns:      The album if found. None, otherwise
             :rtype:        list(:class:`_LP` )
          """
-        result = []
-        for lp in cls._lps:
-            if lp is not None:  # Skip holes in the list due to deletions
-                if lp.title == title:
-                    result.append(lp)
-        return result
+        return list(cls._media_by_title.get(title, []))
+
+    @classmethod
+    def find_by_hash(cls, media_hash: str) -> Optional[_LP]:
+        """ Return the album of the passed hash of its title and artist or None if not found.
+
+            :param media_hash:  The hash of the album as returned by :func:`media_to_hash`
+            :type media_hash:   str
+
+            :returns:           The album or None
+            :rtype:             :class:`_LP` | None
+        """
+        return cls._media_by_hash.get(media_hash)
 
     @classmethod
     def find_by_year(cls, year: int) -> Optional[List[_LP]]:
@@ -1862,14 +3584,25 @@ class LPs():
             :returns:     A list of albums produced in that year
             :rtype:       list(:class:`_LP`) | None
         """
-        lps_found = []
-        for lp in cls._lps:
-            if lp is not None:  # Skip holes in the list due to deletions
-                if lp.year == year:
-                    lps_found.append(lp)
-        if lps_found == []:
+        lps_found = cls._media_by_year.get(year)
+        if not lps_found:
             return None
-        return lps_found
+        return list(lps_found)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int) -> List[_LP]:
+        """ Return the albums produced from the first to the last year, ordered by year.
+
+            :param first_year:  The first year of the range
+            :type first_year:   int
+
+            :param last_year:   The last year of the range, included
+            :type last_year:    int
+
+            :returns:           The albums produced in the range of years
+            :rtype:             list(:class:`_LP`)
+        """
+        return _media_in_years(cls, first_year, last_year)
 
     @classmethod
     def to_html(cls):
@@ -1878,11 +3611,18 @@ class LPs():
             :returns:  An html representation of all albums
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all albums a fragment at a time.
+
+            :returns:  The fragments of an html representation of all albums
+            :rtype:    iterator(str)
+        """
         for lp in cls._lps:
             if lp is not None:  # Skip holes in the list due to deletions
-                html_str += lp.to_html()
-        return html_str
+                yield from lp.iter_html()
 
     def __str__(self) -> str:
         string = ''
@@ -1896,6 +3636,10 @@ class CASSETTEs():
     """ A singleton list of all music Cassettes. """
     _instance = None
     _cassettes = []
+    _media_by_title = {}  # Title to the list of its music media
+    _media_by_hash = {}   # Hash to the music media
+    _media_by_year = {}   # Year to the list of its music media
+    _years = []           # Sorted years of the music media
     _max_index = 0
 
     @property
@@ -1916,7 +3660,12 @@ class CASSETTEs():
     def _clean_cassettes(cls):
         """ Private method to remove all cassettes from the collection. Useful in testing. """
         cls._cassettes = []
+        cls._media_by_title = {}
+        cls._media_by_hash = {}
+        cls._media_by_year = {}
+        cls._years = []
         cls._max_index = 0
+        MEDIA._reset_song_index()
 
     @classmethod
     def create(cls,
@@ -1967,13 +3716,9 @@ class CASSETTEs():
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not a an artist'.format(artist))
 
-        results = cls.find_by_title(title)
-        if len(results) > 0:
-            # Need to check hash id
-            new_cassette_hash = media_to_hash(media_type, title, artists[0].name)
-            for result in results:
-                if result._hash == new_cassette_hash:
-                    return result
+        result = cls.find_by_hash(media_to_hash(media_type, title, artists[0].name))
+        if result is not None:
+            return result
         # Create the new album
         new_cassette = _CASSETTE(media_type, title, artists, year, cls._max_index, mixer, classical_composers, artist_particles)
         cls._max_index += 1
@@ -1999,9 +3744,10 @@ class CASSETTEs():
         """
         if type(cassette) is not _CASSETTE:
             raise CassetteException('{} is not an CASSETTE object'.format(cassette))
-        if cassette in cls._cassettes:
+        if cls.exists(cassette):
             raise CassetteException('LP {} already exists'.format(cassette))
         cls._cassettes.append(cassette)
+        _index_media(cls, cassette)
 
     @classmethod
     def delete(cls, cassette: _CASSETTE) -> None:
@@ -2017,13 +3763,14 @@ class CASSETTEs():
             :param cassette:  The cassette to add
             :type cassette:   :class:`_CASSETTE`
         """
-        if cassette in cls._cassettes:
+        if cls.exists(cassette):
             for artist in cassette.artists:
                 artist.delete_media(cassette)
             if cassette.mixer is not None:
                 cassette.mixer.delete_media(cassette)
             make_hole_index = cassette.index
             cls._cassettes[make_hole_index] = None
+            _unindex_media(cls, cassette, cassette.title, cassette.hash)
 
     @classmethod
     def exists(cls, cassette: _CASSETTE) -> bool:
@@ -2035,7 +3782,7 @@ class CASSETTEs():
             :returns:         True if the cassette exists in the list of all cassettes
             :rtype:           bool
         """
-        return cassette in cls._cassettes
+        return _media_indexed(cls, cassette)
 
     @classmethod
     def find_by_index(cls, index: int) -> Optional[_CASSETTE]:
@@ -2064,12 +3811,19 @@ class CASSETTEs():
             :returns:      The cassette if found. None, otherwise
             :rtype:        list(:class:`_CASSETTE` )
          """
-        result = []
-        for cassette in cls._cassettes:
-            if cassette is not None:  # Skip holes in the list due to deletions
-                if cassette.title == title:
-                    result.append(cassette)
-        return result
+        return list(cls._media_by_title.get(title, []))
+
+    @classmethod
+    def find_by_hash(cls, media_hash: str) -> Optional[_CASSETTE]:
+        """ Return the cassette of the passed hash of its title and artist or None if not found.
+
+            :param media_hash:  The hash of the cassette as returned by :func:`media_to_hash`
+            :type media_hash:   str
+
+            :returns:           The cassette or None
+            :rtype:             :class:`_CASSETTE` | None
+        """
+        return cls._media_by_hash.get(media_hash)
 
     @classmethod
     def find_by_year(cls, year: int) -> Optional[List[_CASSETTE]]:
@@ -2081,14 +3835,25 @@ class CASSETTEs():
             :returns:     A list of cassettes produced in that year
             :rtype:       list(:class:`_CASSETTE`) | None
         """
-        cassettes_found = []
-        for cassette in cls._cassettes:
-            if cassette is not None:  # Skip holes in the list due to deletions
-                if cassette.year == year:
-                    cassettes_found.append(cassette)
-        if cassettes_found == []:
+        cassettes_found = cls._media_by_year.get(year)
+        if not cassettes_found:
             return None
-        return cassettes_found
+        return list(cassettes_found)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int) -> List[_CASSETTE]:
+        """ Return the cassettes produced from the first to the last year, ordered by year.
+
+            :param first_year:  The first year of the range
+            :type first_year:   int
+
+            :param last_year:   The last year of the range, included
+            :type last_year:    int
+
+            :returns:           The cassettes produced in the range of years
+            :rtype:             list(:class:`_CASSETTE`)
+        """
+        return _media_in_years(cls, first_year, last_year)
 
     @classmethod
     def to_html(cls):
@@ -2097,11 +3862,18 @@ class CASSETTEs():
             :returns:  An html representation of all cassettes
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all cassettes a fragment at a time.
+
+            :returns:  The fragments of an html representation of all cassettes
+            :rtype:    iterator(str)
+        """
         for cassette in cls._cassettes:
             if cassette is not None:  # Skip holes in the list due to deletions
-                html_str += cassette.to_html()
-        return html_str
+                yield from cassette.iter_html()
 
     def __str__(self) -> str:
         string = ''
@@ -2115,6 +3887,10 @@ class CDs():
     """ A singleton list of all music CDs. """
     _instance = None
     _cds = []
+    _media_by_title = {}  # Title to the list of its music media
+    _media_by_hash = {}   # Hash to the music media
+    _media_by_year = {}   # Year to the list of its music media
+    _years = []           # Sorted years of the music media
     _max_index = 0
 
     @property
@@ -2135,7 +3911,12 @@ class CDs():
     def _clean_cds(cls):
         """ Private method to remove all albums from the collection. Useful in testing. """
         cls._cds = []
+        cls._media_by_title = {}
+        cls._media_by_hash = {}
+        cls._media_by_year = {}
+        cls._years = []
         cls._max_index = 0
+        MEDIA._reset_song_index()
 
     @classmethod
     def create(cls,
@@ -2186,13 +3967,9 @@ class CDs():
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not a an artist'.format(artist))
 
-        results = cls.find_by_title(title)
-        if len(results) > 0:
-            # Need to check hash id
-            new_cd_hash = media_to_hash(media_type, title, artists[0].name)
-            for result in results:
-                if result._hash == new_cd_hash:
-                    return result
+        result = cls.find_by_hash(media_to_hash(media_type, title, artists[0].name))
+        if result is not None:
+            return result
         # Create the new album
         new_cd = _CD(media_type, title, artists, year, cls._max_index, mixer, classical_composers, artist_particles)
         cls._max_index += 1
@@ -2219,9 +3996,10 @@ class CDs():
         """
         if type(cd) is not _CD:
             raise CDException('{} is not a CD object'.format(cd))
-        if cd in cls._cds:
+        if cls.exists(cd):
             raise CDException('CD {} already exists'.format(cd))
         cls._cds.append(cd)
+        _index_media(cls, cd)
 
     @classmethod
     def delete(cls, cd: _LP) -> None:
@@ -2237,13 +4015,14 @@ class CDs():
             :param cd:  The cd to add
             :type cd:   :class:`_CD`
         """
-        if cd in cls._cds:
+        if cls.exists(cd):
             for artist in cd.artists:
                 artist.delete_media(cd)
             if cd.mixer is not None:
                 cd.mixer.delete_media(cd)
             make_hole_index = cd.index
             cls._cds[make_hole_index] = None
+            _unindex_media(cls, cd, cd.title, cd.hash)
 
     @classmethod
     def exists(cls, cd: _CD) -> bool:
@@ -2255,7 +4034,7 @@ class CDs():
             :returns:   True if the cd exists in the list of all cds
             :rtype:     bool
         """
-        return cd in cls._cds
+        return _media_indexed(cls, cd)
 
     @classmethod
     def find_by_index(cls, index: int) -> Optional[_CD]:
@@ -2284,12 +4063,19 @@ class CDs():
             :returns:      The cd if found. None, otherwise
             :rtype:        list(:class:`_CD` )
          """
-        result = []
-        for cd in cls._cds:
-            if cd is not None:  # Skip holes in the list due to deletions
-                if cd.title == title:
-                    result.append(cd)
-        return result
+        return list(cls._media_by_title.get(title, []))
+
+    @classmethod
+    def find_by_hash(cls, media_hash: str) -> Optional[_CD]:
+        """ Return the cd of the passed hash of its title and artist or None if not found.
+
+            :param media_hash:  The hash of the cd as returned by :func:`media_to_hash`
+            :type media_hash:   str
+
+            :returns:           The cd or None
+            :rtype:             :class:`_CD` | None
+        """
+        return cls._media_by_hash.get(media_hash)
 
     @classmethod
     def find_by_year(cls, year: int) -> Optional[List[_LP]]:
@@ -2301,14 +4087,25 @@ class CDs():
             :returns:     A list of cds produced in that year
             :rtype:       list(:class:`_CD`) | None
         """
-        cds_found = []
-        for cd in cls._cds:
-            if cd is not None:  # Skip holes in the list due to deletions
-                if cd.year == year:
-                    cds_found.append(cd)
-        if cds_found == []:
+        cds_found = cls._media_by_year.get(year)
+        if not cds_found:
             return None
-        return cds_found
+        return list(cds_found)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int) -> List[_CD]:
+        """ Return the cds produced from the first to the last year, ordered by year.
+
+            :param first_year:  The first year of the range
+            :type first_year:   int
+
+            :param last_year:   The last year of the range, included
+            :type last_year:    int
+
+            :returns:           The cds produced in the range of years
+            :rtype:             list(:class:`_CD`)
+        """
+        return _media_in_years(cls, first_year, last_year)
 
     @classmethod
     def to_html(cls):
@@ -2317,11 +4114,18 @@ class CDs():
             :returns:  An html representation of all cds
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all cds a fragment at a time.
+
+            :returns:  The fragments of an html representation of all cds
+            :rtype:    iterator(str)
+        """
         for cd in cls._cds:
             if cd is not None:  # Skip holes in the list due to deletions
-                html_str += cd.to_html()
-        return html_str
+                yield from cd.iter_html()
 
     def __str__(self) -> str:
         string = ''
@@ -2335,6 +4139,10 @@ class ELPs():
     """ A singleton list of all music ELPs. """
     _instance = None
     _elps = []
+    _media_by_title = {}  # Title to the list of its music media
+    _media_by_hash = {}   # Hash to the music media
+    _media_by_year = {}   # Year to the list of its music media
+    _years = []           # Sorted years of the music media
     _max_index = 0
 
     @property
@@ -2355,7 +4163,12 @@ class ELPs():
     def _clean_elps(cls):
         """ Private method to remove all elps from the collection. Useful in testing. """
         cls._elps = []
+        cls._media_by_title = {}
+        cls._media_by_hash = {}
+        cls._media_by_year = {}
+        cls._years = []
         cls._max_index = 0
+        MEDIA._reset_song_index()
 
     @classmethod
     def create(cls,
@@ -2406,13 +4219,9 @@ class ELPs():
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not a an artist'.format(artist))
 
-        results = cls.find_by_title(title)
-        if len(results) > 0:
-            # Need to check hash id
-            new_elp_hash = media_to_hash(media_type, title, artists[0].name)
-            for result in results:
-                if result._hash == new_elp_hash:
-                    return result
+        result = cls.find_by_hash(media_to_hash(media_type, title, artists[0].name))
+        if result is not None:
+            return result
         # Create the new elp
         new_elp = _ELP(media_type, title, artists, year, cls._max_index, mixer, classical_composers, artist_particles)
         cls._max_index += 1
@@ -2439,9 +4248,10 @@ class ELPs():
         """
         if type(elp) is not _ELP:
             raise ELPException('{} is not an ELP object'.format(elp))
-        if elp in cls._elps:
+        if cls.exists(elp):
             raise ELPException('ELP {} already exists'.format(elp))
         cls._elps.append(elp)
+        _index_media(cls, elp)
 
     @classmethod
     def delete(cls, elp: _ELP) -> None:
@@ -2457,13 +4267,14 @@ class ELPs():
             :param elp:  The elp to add
             :type elp:   :class:`_ELP`
         """
-        if elp in cls._elps:
+        if cls.exists(elp):
             for artist in elp.artists:
                 artist.delete_media(elp)
             if elp.mixer is not None:
                 elp.mixer.delete_media(elp)
             make_hole_index = elp.index
-            cls.elps[make_hole_index] = None
+            cls._elps[make_hole_index] = None
+            _unindex_media(cls, elp, elp.title, elp.hash)
 
     @classmethod
     def exists(cls, elp: _ELP) -> bool:
@@ -2475,7 +4286,7 @@ class ELPs():
             :returns:    True if the elp exists in the list of all elps
             :rtype:      bool
         """
-        return elp in cls._elps
+        return _media_indexed(cls, elp)
 
     @classmethod
     def find_by_index(cls, index: int) -> Optional[_ELP]:
@@ -2504,12 +4315,19 @@ class ELPs():
             :returns:      The elp if found. None, otherwise
             :rtype:        list(:class:`_ELP` )
          """
-        result = []
-        for elp in cls._elps:
-            if elp is not None:  # Skip holes in the list due to deletions
-                if elp.title == title:
-                    result.append(elp)
-        return result
+        return list(cls._media_by_title.get(title, []))
+
+    @classmethod
+    def find_by_hash(cls, media_hash: str) -> Optional[_ELP]:
+        """ Return the extended play album of the passed hash of its title and artist or None if not found.
+
+            :param media_hash:  The hash of the extended play album as returned by :func:`media_to_hash`
+            :type media_hash:   str
+
+            :returns:           The extended play album or None
+            :rtype:             :class:`_ELP` | None
+        """
+        return cls._media_by_hash.get(media_hash)
 
     @classmethod
     def find_by_year(cls, year: int) -> Optional[List[_ELP]]:
@@ -2521,14 +4339,25 @@ class ELPs():
             :returns:     A list of elps produced in that year
             :rtype:       list(:class:`_ELP`) | None
         """
-        elps_found = []
-        for elp in cls._elps:
-            if elp is not None:  # Skip holes in the list due to deletions
-                if elp.year == year:
-                    elps_found.append(elp)
-        if elps_found == []:
+        elps_found = cls._media_by_year.get(year)
+        if not elps_found:
             return None
-        return elps_found
+        return list(elps_found)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int) -> List[_ELP]:
+        """ Return the extended play albums produced from the first to the last year, ordered by year.
+
+            :param first_year:  The first year of the range
+            :type first_year:   int
+
+            :param last_year:   The last year of the range, included
+            :type last_year:    int
+
+            :returns:           The extended play albums produced in the range of years
+            :rtype:             list(:class:`_ELP`)
+        """
+        return _media_in_years(cls, first_year, last_year)
 
     @classmethod
     def to_html(cls):
@@ -2537,11 +4366,18 @@ class ELPs():
             :returns:  An html representation of all elps
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all elps a fragment at a time.
+
+            :returns:  The fragments of an html representation of all elps
+            :rtype:    iterator(str)
+        """
         for elp in cls._elps:
             if elp is not None:  # Skip holes in the list due to deletions
-                html_str += elp.to_html()
-        return html_str
+                yield from elp.iter_html()
 
     def __str__(self) -> str:
         string = ''
@@ -2555,6 +4391,10 @@ class MINI_CDs():
     """ A singleton list of all music mini CDs. """
     _instance = None
     _mini_cds = []
+    _media_by_title = {}  # Title to the list of its music media
+    _media_by_hash = {}   # Hash to the music media
+    _media_by_year = {}   # Year to the list of its music media
+    _years = []           # Sorted years of the music media
     _max_index = 0
 
     @property
@@ -2575,7 +4415,12 @@ class MINI_CDs():
     def _clean_mini_cds(cls):
         """ Private method to remove all mini CDs from the collection. Useful in testing. """
         cls._mini_cds = []
+        cls._media_by_title = {}
+        cls._media_by_hash = {}
+        cls._media_by_year = {}
+        cls._years = []
         cls._max_index = 0
+        MEDIA._reset_song_index()
 
     @classmethod
     def create(cls,
@@ -2626,13 +4471,9 @@ class MINI_CDs():
             if not isinstance(artist, _Artist):
                 raise ArtistException('{} is not a an artist'.format(artist))
 
-        results = cls.find_by_title(title)
-        if len(results) > 0:
-            # Need to check hash id
-            new_mini_cd_hash = media_to_hash(media_type, title, artists[0].name)
-            for result in results:
-                if result._hash == new_mini_cd_hash:
-                    return result
+        result = cls.find_by_hash(media_to_hash(media_type, title, artists[0].name))
+        if result is not None:
+            return result
         # Create the new mini CD
         new_mini_cd = _MINI_CD(media_type, title, artists, year, cls._max_index, mixer, classical_composers, artist_particles)
         cls._max_index += 1
@@ -2659,9 +4500,10 @@ class MINI_CDs():
         """
         if type(mini_cd) is not _MINI_CD:
             raise MiniCDException('{} is not an mini CD object'.format(mini_cd))
-        if mini_cd in cls._mini_cds:
+        if cls.exists(mini_cd):
             raise MiniCDException('Mini CD {} already exists'.format(mini_cd))
         cls._mini_cds.append(mini_cd)
+        _index_media(cls, mini_cd)
 
     @classmethod
     def delete(cls, mini_cd: _MINI_CD) -> None:
@@ -2677,13 +4519,14 @@ class MINI_CDs():
             :param mini_cd:  The mini CD to add
             :type mini_cd:   :class:`_MINI_CD`
         """
-        if mini_cd in cls._mini_cds:
+        if cls.exists(mini_cd):
             for artist in mini_cd.artists:
                 artist.delete_media(mini_cd)
             if mini_cd.mixer is not None:
                 mini_cd.mixer.delete_media(mini_cd)
             make_hole_index = mini_cd.index
             cls._mini_cds[make_hole_index] = None
+            _unindex_media(cls, mini_cd, mini_cd.title, mini_cd.hash)
 
     @classmethod
     def exists(cls, mini_cd: _MINI_CD) -> bool:
@@ -2695,7 +4538,7 @@ class MINI_CDs():
             :returns:        True if the mini CD exists in the list of all mini CDs
             :rtype:          bool
         """
-        return mini_cd in cls._mini_cds
+        return _media_indexed(cls, mini_cd)
 
     @classmethod
     def find_by_index(cls, index: int) -> Optional[_MINI_CD]:
@@ -2724,15 +4567,22 @@ class MINI_CDs():
             :returns:      The mini CD if found. None, otherwise
             :rtype:        list(:class:`_MINI_CD` )
          """
-        result = []
-        for mini_cd in cls._mini_cds:
-            if mini_cd is not None:  # Skip holes in the list due to deletions
-                if mini_cd.title == title:
-                    result.append(mini_cd)
-        return result
+        return list(cls._media_by_title.get(title, []))
+
+    @classmethod
+    def find_by_hash(cls, media_hash: str) -> Optional[_MINI_CD]:
+        """ Return the mini CD of the passed hash of its title and artist or None if not found.
+
+            :param media_hash:  The hash of the mini CD as returned by :func:`media_to_hash`
+            :type media_hash:   str
+
+            :returns:           The mini CD or None
+            :rtype:             :class:`_MINI_CD` | None
+        """
+        return cls._media_by_hash.get(media_hash)
 
     @classmethod
-    def find__by_year(cls, year: int) -> Optional[List[_MINI_CD]]:
+    def find_by_year(cls, year: int) -> Optional[List[_MINI_CD]]:
         """ Return a list of mini CDs produced in the passed year.
 
             :param year:  Find mini CDs produced in this year
@@ -2741,14 +4591,25 @@ class MINI_CDs():
             :returns:     A list of mini CDs produced in that year
             :rtype:       list(:class:`_MINI_CD`) | None
         """
-        mini_cds_found = []
-        for mini_cd in cls._mini_cds:
-            if mini_cd is not None:  # Skip holes in the list due to deletions
-                if mini_cd.year == year:
-                    mini_cds_found.append(mini_cd)
-        if mini_cds_found == []:
+        mini_cds_found = cls._media_by_year.get(year)
+        if not mini_cds_found:
             return None
-        return mini_cds_found
+        return list(mini_cds_found)
+
+    @classmethod
+    def find_by_year_range(cls, first_year: int, last_year: int) -> List[_MINI_CD]:
+        """ Return the mini CDs produced from the first to the last year, ordered by year.
+
+            :param first_year:  The first year of the range
+            :type first_year:   int
+
+            :param last_year:   The last year of the range, included
+            :type last_year:    int
+
+            :returns:           The mini CDs produced in the range of years
+            :rtype:             list(:class:`_MINI_CD`)
+        """
+        return _media_in_years(cls, first_year, last_year)
 
     @classmethod
     def to_html(cls):
@@ -2757,11 +4618,18 @@ class MINI_CDs():
             :returns:  An html representation of all mini CDs
             :rtype:    str
         """
-        html_str = ''
+        return ''.join(cls.iter_html())
+
+    @classmethod
+    def iter_html(cls) -> Iterator[str]:
+        """ Generate the html representation of all mini CDs a fragment at a time.
+
+            :returns:  The fragments of an html representation of all mini CDs
+            :rtype:    iterator(str)
+        """
         for mini_cd in cls._mini_cds:
             if mini_cd is not None:  # Skip holes in the list due to deletions
-                html_str += mini_cd.to_html()
-        return html_str
+                yield from mini_cd.iter_html()
 
     def __str__(self) -> str:
         string = ''
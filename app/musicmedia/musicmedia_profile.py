@@ -0,0 +1,253 @@
+"""
+Profiling of loading the music library from the music media html file.
+
+A :class:`LoadProfile` is handed to the loaders while :func:`MEDIA.from_html_file`
+runs. The loaders time their phases with it and the profile turns the timings
+into a report once the library is loaded:
+
+    {'filepath': 'data/music.html',
+     'loader': 'stream',
+     'seconds': 0.81,
+     'phases': {'parse': {'seconds': 0.52, 'calls': 1}, ...},
+     'media': {'lp': 912, 'cd': 1830, ...},
+     'songs': 31204,
+     'artists': {'created': 8120, 'reused': 30110, 'total': 8120},
+     'peak_rss_bytes': 81264640,
+     'peak_traced_bytes': None}
+
+Phases nest so the time of a phase includes the time of the phases called
+within it, e.g. the ``artist_lookup`` calls made while parsing the
+``media_metadata`` of the legacy loader.
+
+Tracing the python memory allocations doubles the load time so the peak traced
+memory of the load is only measured when asked for. The peak resident memory
+of the process is always reported where the platform supports it.
+"""
+
+from contextlib import contextmanager, nullcontext
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from .musicmedia_objects import Artists, CASSETTEs, CDs, ELPs, LPs, MediaType, MINI_CDs
+
+logger = logging.getLogger(__name__)
+
+
+class LoadProfile():
+    """ Wall time and call counts of the phases of loading the music library.
+
+        :param trace_memory:  Trace the python memory allocations to report the peak memory of the load
+        :type trace_memory:   bool
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self._trace_memory = trace_memory
+        self._started_tracing = False
+        self._phases = {}
+        self._filepath = None
+        self._loader = None
+        self._start = None
+        self._start_artist_count = 0
+
+    def start(self, filepath: str) -> None:
+        """ Start profiling the load of a music media html file.
+
+            :param filepath:  The file path of the html file being loaded
+            :type filepath:   str
+        """
+        self._filepath = filepath
+        self._start_artist_count = len(Artists._artists)
+        if self._trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+        self._start = time.perf_counter()
+
+    def set_loader(self, loader: str) -> None:
+        """ Record which loader the library was loaded with.
+
+            :param loader:  One of ``snapshot``, ``lazy``, ``stream`` or ``tree``
+            :type loader:   str
+        """
+        self._loader = loader
+
+    def add(self, name: str, seconds: float) -> None:
+        """ Add a call of a phase.
+
+            :param name:     The name of the phase
+            :type name:      str
+
+            :param seconds:  The wall time of the call
+            :type seconds:   float
+        """
+        phase = self._phases.get(name)
+        if phase is None:
+            self._phases[name] = [seconds, 1]
+        else:
+            phase[0] += seconds
+            phase[1] += 1
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """ Time a block of code as a call of a phase.
+
+            :param name:  The name of the phase
+            :type name:   str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """ Wrap a function so each call is timed as a call of a phase.
+
+            :param name:  The name of the phase
+            :type name:   str
+
+            :param func:  The function to time
+            :type func:   callable
+
+            :returns:     The wrapped function
+            :rtype:       callable
+        """
+        def timed_func(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return timed_func
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """ Wrap an iterable so the time spent producing its items is timed as one call of a phase.
+
+            :param name:      The name of the phase
+            :type name:       str
+
+            :param iterable:  The iterable to time
+            :type iterable:   iterable
+
+            :returns:         The items of the iterable
+            :rtype:           iterator
+        """
+        seconds = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - start
+                yield item
+        finally:
+            self.add(name, seconds)
+
+    def stop(self) -> dict:
+        """ Stop profiling and return the report of the load.
+
+            :returns:  The load report
+            :rtype:    dict
+        """
+        seconds = time.perf_counter() - self._start
+        peak_traced_bytes = None
+        if self._trace_memory:
+            peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+        media_counts = {}
+        song_count = 0
+        for media_type, library_media in ((MediaType.LP, LPs._lps),
+                                          (MediaType.CASSETTE, CASSETTEs._cassettes),
+                                          (MediaType.CD, CDs._cds),
+                                          (MediaType.ELP, ELPs._elps),
+                                          (MediaType.MINI_CD, MINI_CDs._mini_cds)):
+            media_count = 0
+            for media in library_media:
+                if media is not None:
+                    media_count += 1
+                    # Do not load the tracks of lazily loaded music media
+                    song_count += sum(len(track.song_list) for track in media._tracks)
+            media_counts[media_type.value] = media_count
+
+        artist_count = len(Artists._artists)
+        created_count = artist_count - self._start_artist_count
+        lookup_count = self._phases.get('artist_lookup', [0.0, 0])[1]
+
+        return {'filepath': self._filepath,
+                'loader': self._loader,
+                'seconds': seconds,
+                'phases': {name: {'seconds': phase_seconds, 'calls': calls} for name, (phase_seconds, calls) in self._phases.items()},
+                'media': media_counts,
+                'songs': song_count,
+                'artists': {'created': created_count,
+                            'reused': max(lookup_count - created_count, 0),
+                            'total': artist_count},
+                'peak_rss_bytes': peak_rss_bytes(),
+                'peak_traced_bytes': peak_traced_bytes}
+
+
+def load_phase(profile: Optional[LoadProfile], name: str) -> ContextManager:
+    """ Time a block of code as a call of a phase if the load is being profiled.
+
+        :param profile:  The profile of the load or None
+        :type profile:   :class:`LoadProfile` | None
+
+        :param name:     The name of the phase
+        :type name:      str
+
+        :returns:        A context manager timing the block
+        :rtype:          context manager
+    """
+    if profile is None:
+        return nullcontext()
+    return profile.phase(name)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """ Return the peak resident memory of the process.
+
+        :returns:  The peak resident memory in bytes or None if the platform does not report it
+        :rtype:    int | None
+    """
+    if resource is None:
+        return None
+    # Linux reports the peak in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def format_load_report(report: Dict[str, Any]) -> str:
+    """ Return a load report as readable text for logging.
+
+        :param report:  A load report returned by :func:`LoadProfile.stop`
+        :type report:   dict
+
+        :returns:       The formatted report
+        :rtype:         str
+    """
+    def megabytes(value):
+        return 'n/a' if value is None else '{:.1f}MB'.format(value / (1024 * 1024))
+
+    lines = ['Loaded music media file {} with the {} loader in {:.3f}s'.format(report['filepath'], report['loader'], report['seconds'])]
+    for name, phase in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append('  {:<16} {:>9.3f}s {:>9} calls'.format(name, phase['seconds'], phase['calls']))
+    lines.append('  media: {}'.format(', '.join('{} {}'.format(count, media_type) for media_type, count in report['media'].items())))
+    lines.append('  songs: {}'.format(report['songs']))
+    lines.append('  artists: {created} created, {reused} reused, {total} total'.format(**report['artists']))
+    lines.append('  peak memory: {} resident, {} traced'.format(megabytes(report['peak_rss_bytes']), megabytes(report['peak_traced_bytes'])))
+    return '\n'.join(lines)
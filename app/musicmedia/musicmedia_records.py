@@ -0,0 +1,301 @@
+"""
+Compact record storage of the music library.
+
+The library can be kept in a records file instead of the music media html file.
+A records file holds a header followed by one media record per music media, the
+same records the streaming loader of :mod:`app.musicmedia.musicmedia_loader`
+parses out of the html file, referencing artists by name. Reading a record back
+is a single JSON or msgpack decode instead of parsing html.
+
+Records are stored compacted. Fields holding their default value, including song
+main artists which are the first music media artist, are left out and filled back
+in when the record is read, so a record only holds what is particular to it:
+
+    {"format": "musicmedia-records", "version": 1}
+    {"media_type": "lp", "title": "Christmas", "artists": ["Michael Buble"], "year": 2011, "tracks": [{"songs": [...]}]}
+
+Two encodings are supported:
+
+    + ``jsonl``: JSON Lines, one JSON object per line, e.g. ``music.jsonl``
+    + ``msgpack``: A stream of msgpack maps, e.g. ``music.msgpack``. Needs the ``msgpack``
+      package, which is not in the requirements, to be installed
+
+When the library is stored in a records file, the html file next to it is
+generated from the library each time the library is written out. The library can
+also be kept in the ``sql`` storage format, see :mod:`app.musicmedia.musicmedia_sql`.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+from .musicmedia_files import write_file_atomically
+from .musicmedia_loader import iter_html_file_records, new_media_record, new_track_record
+
+logger = logging.getLogger(__name__)
+
+HTML_FORMAT = 'html'
+JSONL_FORMAT = 'jsonl'
+MSGPACK_FORMAT = 'msgpack'
+SQL_FORMAT = 'sql'
+STORAGE_FORMATS = {HTML_FORMAT: '.html', JSONL_FORMAT: '.jsonl', MSGPACK_FORMAT: '.msgpack'}
+
+RECORDS_FORMAT = 'musicmedia-records'
+RECORDS_VERSION = 1
+
+
+def resolve_storage_format(storage_format: Optional[str] = None) -> str:
+    """ Return the storage format to use for the requested one.
+
+        :param storage_format:  The name of the requested storage format or None for html
+        :type storage_format:   str | None
+
+        :returns:               The requested storage format
+        :rtype:                 str
+
+        :raises ValueError:     If the storage format is unknown or msgpack is requested but not installed
+    """
+    if storage_format is None:
+        storage_format = HTML_FORMAT
+    if storage_format not in STORAGE_FORMATS and storage_format != SQL_FORMAT:
+        raise ValueError('Unknown storage format {}. Expected one of {}'.format(storage_format, ', '.join(list(STORAGE_FORMATS) + [SQL_FORMAT])))
+    if storage_format == MSGPACK_FORMAT and msgpack is None:
+        raise ValueError('Storage format {} needs the msgpack package which is not installed. Install it or use {}'.format(
+            storage_format, JSONL_FORMAT))
+    return storage_format
+
+
+def records_path(filepath: str, storage_format: str) -> Path:
+    """ Return the path of the records file kept next to a music media html file.
+
+        :param filepath:        The file path of the html file
+        :type filepath:         str
+
+        :param storage_format:  The storage format of the records file
+        :type storage_format:   str
+
+        :returns:               The file path of the records file
+        :rtype:                 :class:`pathlib.Path`
+    """
+    return Path(filepath).with_suffix(STORAGE_FORMATS[storage_format])
+
+
+def records_format(filepath: str) -> str:
+    """ Return the storage format of a records file from its suffix.
+
+        :param filepath:     The file path of the records file
+        :type filepath:      str
+
+        :returns:            The storage format
+        :rtype:              str
+
+        :raises ValueError:  If the file is not a records file
+    """
+    for storage_format, suffix in STORAGE_FORMATS.items():
+        if storage_format != HTML_FORMAT and Path(filepath).suffix == suffix:
+            return storage_format
+    raise ValueError('{} is not a records file. Expected a {} file'.format(filepath, ' or '.join([JSONL_FORMAT, MSGPACK_FORMAT])))
+
+
+def _new_song_record() -> dict:
+    """ Return the song record of a song holding only default values. """
+    return {'title': None,
+            'main_artist': None,
+            'exp_main_artist': False,
+            'main_artist_sequel': None,
+            'additional_artists': None,
+            'album': None,
+            'classical_composers': None,
+            'classical_work': None,
+            'country': None,
+            'year': None,
+            'mix': None,
+            'featured_in': None,
+            'parts': []}
+
+
+def _compact(record: dict, defaults: dict) -> dict:
+    return {field: value for field, value in record.items() if field not in defaults or value != defaults[field]}
+
+
+def _media_defaults() -> dict:
+    """ Return the fields of a media record that can be left out with their default value. """
+    defaults = new_media_record(None)
+    del defaults['media_type']  # Always stored
+    return defaults
+
+
+def _expand(record: dict, defaults: dict) -> dict:
+    defaults.update(record)
+    return defaults
+
+
+def compact_record(record: dict) -> dict:
+    """ Return a media record without the fields holding their default value.
+
+        :param record:  The media record
+        :type record:   dict
+
+        :returns:       The compacted media record
+        :rtype:         dict
+    """
+    media_defaults = _media_defaults()
+    song_defaults = _new_song_record()
+    song_defaults['main_artist'] = record['artists'][0] if record['artists'] else None
+    compacted = _compact(record, media_defaults)
+    tracks = []
+    for track in record['tracks']:
+        compacted_track = _compact(track, new_track_record())
+        if track['songs']:
+            compacted_track['songs'] = [_compact(song, song_defaults) for song in track['songs']]
+        tracks.append(compacted_track)
+    if tracks:
+        compacted['tracks'] = tracks
+    return compacted
+
+
+def expand_record(record: dict) -> dict:
+    """ Return a compacted media record with all its fields.
+
+        :param record:  The compacted media record
+        :type record:   dict
+
+        :returns:       The media record
+        :rtype:         dict
+    """
+    expanded = _expand(record, _media_defaults())
+    main_artist = expanded['artists'][0] if expanded['artists'] else None
+    tracks = []
+    for track in expanded['tracks']:
+        track = _expand(track, new_track_record())
+        songs = []
+        for song in track['songs']:
+            song_record = _new_song_record()
+            song_record['main_artist'] = main_artist
+            songs.append(_expand(song, song_record))
+        track['songs'] = songs
+        tracks.append(track)
+    expanded['tracks'] = tracks
+    return expanded
+
+
+def _header() -> dict:
+    return {'format': RECORDS_FORMAT, 'version': RECORDS_VERSION}
+
+
+def _check_header(filepath: str, header) -> None:
+    if not isinstance(header, dict) or header.get('format') != RECORDS_FORMAT:
+        raise ValueError('{} is not a music media records file'.format(filepath))
+    if header.get('version') != RECORDS_VERSION:
+        raise ValueError('Records file {} is of version {}. Expected version {}'.format(filepath, header.get('version'), RECORDS_VERSION))
+
+
+def encode_record(record: dict, storage_format: str) -> bytes:
+    """ Return the encoding of a media record in a records file.
+
+        :param record:          The media record
+        :type record:           dict
+
+        :param storage_format:  The storage format of the records file
+        :type storage_format:   str
+
+        :returns:               The compacted record encoded for the records file
+        :rtype:                 bytes
+    """
+    if storage_format == MSGPACK_FORMAT:
+        return msgpack.packb(compact_record(record), use_bin_type=True)
+    return json.dumps(compact_record(record), ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def write_records_file(filepath: str, encoded_records: Iterable[bytes], storage_format: Optional[str] = None) -> None:
+    """ Replace a records file with new records so it is never left part written.
+
+        :param filepath:         The file path of the records file
+        :type filepath:          str
+
+        :param encoded_records:  The media records encoded by :func:`encode_record`
+        :type encoded_records:   iterable(bytes)
+
+        :param storage_format:   The storage format or None to take it from the file suffix
+        :type storage_format:    str | None
+    """
+    if storage_format is None:
+        storage_format = records_format(filepath)
+    if storage_format == MSGPACK_FORMAT:
+        header = msgpack.packb(_header(), use_bin_type=True)
+    else:
+        header = json.dumps(_header()).encode('utf-8') + b'\n'
+
+    def chunks():
+        yield header
+        yield from encoded_records
+
+    write_file_atomically(filepath, chunks())
+
+
+def iter_records_file(filepath: str, storage_format: Optional[str] = None) -> Iterator[dict]:
+    """ Stream the media records of a records file.
+
+        :param filepath:        The file path of the records file
+        :type filepath:         str
+
+        :param storage_format:  The storage format or None to take it from the file suffix
+        :type storage_format:   str | None
+
+        :returns:               An iterator over the media records in file order
+        :rtype:                 iterator(dict)
+
+        :raises ValueError:     If the file is not a records file this version of the application reads
+    """
+    if storage_format is None:
+        storage_format = records_format(filepath)
+    with open(filepath, 'rb') as records_fp:
+        if storage_format == MSGPACK_FORMAT:
+            if msgpack is None:
+                raise ValueError('Records file {} is encoded with msgpack which is not installed'.format(filepath))
+            records = msgpack.Unpacker(records_fp, raw=False)
+        else:
+            records = (json.loads(line) for line in records_fp if line.strip())
+        first = True
+        for record in records:
+            if first:
+                _check_header(filepath, record)
+                first = False
+                continue
+            yield expand_record(record)
+        if first:
+            raise ValueError('{} is not a music media records file'.format(filepath))
+
+
+def html_to_records_file(html_filepath: str, filepath: str, parser: Optional[str] = None) -> int:
+    """ Convert a music media html file to a records file one music media block at a time.
+
+        :param html_filepath:  The file path of the html file
+        :type html_filepath:   str
+
+        :param filepath:       The file path of the records file. Its suffix gives the storage format.
+        :type filepath:        str
+
+        :param parser:         The parser backend to use or None for the default
+        :type parser:          str | None
+
+        :returns:              The number of media records converted
+        :rtype:                int
+    """
+    storage_format = records_format(filepath)
+    count = 0
+
+    def encoded_records():
+        nonlocal count
+        for record in iter_html_file_records(html_filepath, parser=parser):
+            count += 1
+            yield encode_record(record, storage_format)
+
+    write_records_file(filepath, encoded_records(), storage_format)
+    return count
@@ -89,8 +89,8 @@ def delete(media_type, id):
 
         musicmedia_library.delete(musicmedia_data)
 
-        # Set flag to write out changes when main library page is displayed
-        MEDIA.changes_to_write = True
+        # Flag the change to write out when main library page is displayed
+        MEDIA.mark_changed(musicmedia_data)
 
         return redirect(url_for(INDEX_PAGE_URL))
 
@@ -139,15 +139,10 @@ def add_media(media_type):
 
                 # Check item does not already exist
                 unique = True
-                results = musicmedia_library.find_by_title(title)
-                if len(results) > 0:
-                    # Need to check hash id
-                    new_item_hash = media_to_hash(media_type, title, artist_str)
-                    for result in results:
-                        if result._hash == new_item_hash:
-                            unique = False
-                            flash('{} already exists in music media library!'.format(musicmedia_str))
-                            raise FormValidateException()
+                if musicmedia_library.find_by_hash(media_to_hash(media_type, title, artist_str)) is not None:
+                    unique = False
+                    flash('{} already exists in music media library!'.format(musicmedia_str))
+                    raise FormValidateException()
                 if unique:
                     # Start processing the new album data
                     if artist_str is not None or artist_str != '':
@@ -190,8 +185,8 @@ def add_media(media_type):
                                                          classical_composers=classical_composers,
                                                          artist_particles=artist_particles)
 
-                    # Set flag to write out changes when main library page is displayed
-                    MEDIA.changes_to_write = True
+                    # Flag the change to write out when main library page is displayed
+                    MEDIA.mark_changed(new_item)
 
                     return redirect(url_for('.add_' + pythonic_musicmedia_str + '_track', media_type=media_type, id=new_item.index, track_id=0))
         except FormValidateException:
@@ -351,8 +346,8 @@ def add_track(media_type, id, track_id):
                     except MediaException as e:
                         app.app.logger.warning('{} Exception {} ignored. Assumed to be associated with multiple songs'.format(musicmedia_str, e))
 
-            # Set flag to write out changes when main library page is displayed
-            MEDIA.changes_to_write = True
+            # Flag the change to write out when main library page is displayed
+            MEDIA.mark_changed(item)
 
             if form.add_track.data:
                 track_id += 1
@@ -444,14 +439,9 @@ def modify(media_type, id):
                     # Check title change
                     if title != item.title:
                         # Check LP does not already exist
-                        results = musicmedia_library.find_by_title(title)
-                        if len(results) > 0:
-                            # Need to check hash id
-                            new_item_hash = media_to_hash(media_type, title, artist_str)
-                            for result in results:
-                                if result._hash == new_item_hash:
-                                    flash('{} already exists in music media library!'.format(musicmedia_str))
-                                    raise FormValidateException
+                        if musicmedia_library.find_by_hash(media_to_hash(media_type, title, artist_str)) is not None:
+                            flash('{} already exists in music media library!'.format(musicmedia_str))
+                            raise FormValidateException
                         changes = True
                         item.title = title
 
@@ -461,10 +451,10 @@ def modify(media_type, id):
 
                         item.artists[0].delete_media(item)  # TO DO: perhaps they artist is still associated with a sone on the LP
                         if artist_str == '':
-                            item.artists.remove(item.artists[0])
+                            item.artists = item.artists[1:]
                         else:
                             new_artist = Artists.create_Artist(artist_str)
-                            item.artists[0] = new_artist
+                            item.artists = [new_artist] + item.artists[1:]
                             try:
                                 new_artist.add_media(item)
                             except MediaException as e:
@@ -544,8 +534,8 @@ def modify(media_type, id):
                         flash('No changes made that need to be saved.')
                         raise FormValidateException
 
-                    # Set flag to write out changes when main library page is displayed
-                    MEDIA.changes_to_write = True
+                    # Flag the change to write out when main library page is displayed
+                    MEDIA.mark_changed(item)
 
                     if form.save.data:
                         return redirect(url_for(INDEX_PAGE_URL))
@@ -625,38 +615,38 @@ def modify_track(media_type, id, track_id):
                                           track_year=track_release_year)
                 item.tracks.append(new_tracklist)
 
-                # Set flag to write out changes when main library page is displayed
-                MEDIA.changes_to_write = True
+                # Flag the change to write out when main library page is displayed
+                MEDIA.mark_changed(item)
             else:
                 if track_name != item.tracks[track_id].name:
                     item.tracks[track_id].name = track_name
-                    MEDIA.changes_to_write = True
+                    MEDIA.mark_changed(item)
 
                 if item.tracks[track_id].track_artist is None:
                     if track_artist_str is not None:
                         item.tracks[track_id].track_artist = Artists.create_Artist(track_artist_str)
-                        MEDIA.changes_to_write = True
+                        MEDIA.mark_changed(item)
                 elif track_artist_str is None or track_artist_str != item.tracks[track_id].track_artist.name:
                     if track_artist_str is not None:
                         item.tracks[track_id].track_artist = Artists.create_Artist(track_artist_str)
                     else:
                         item.tracks[track_id].track_artist = None
-                    MEDIA.changes_to_write = True
+                    MEDIA.mark_changed(item)
 
                 if item.tracks[track_id].side_mixer is None:
                     if track_mixer_str is not None:
                         item.tracks[track_id].side_mixer = Artists.create_Artist(track_mixer_str)
-                        MEDIA.changes_to_write = True
+                        MEDIA.mark_changed(item)
                 elif track_mixer_str is None or track_mixer_str != item.tracks[track_id].side_mixer.name:
                     if track_mixer_str is not None:
                         item.tracks[track_id].side_mixer = Artists.create_Artist(track_mixer_str)
                     else:
                         item.tracks[track_id].side_mixer = None
-                    MEDIA.changes_to_write = True
+                    MEDIA.mark_changed(item)
 
                 if track_release_year != item.tracks[track_id].track_year:
                     item.tracks[track_id].track_year = track_release_year
-                    MEDIA.changes_to_write = True
+                    MEDIA.mark_changed(item)
 
             if form.modify_next_track.data:
                 return redirect(url_for(MODIFY_MEDIA_PAGE_URL_PREFIX + pythonic_musicmedia_str + '_track', id=id, track_id=track_id + 1))
@@ -784,8 +774,8 @@ def modify_track_song(media_type, id, track_id, song_id):
                 new_display_song_id = song_id
             del tracklist.song_list[song_id]  # TODP: Handle removal of LP from song artists
 
-            # Set flag to write out changes when main library page is displayed
-            MEDIA.changes_to_write = True
+            # Flag the change to write out when main library page is displayed
+            MEDIA.mark_changed(item)
 
             return redirect(url_for(MODIFY_MEDIA_PAGE_URL_PREFIX + pythonic_musicmedia_str + '_track_song', id=id, track_id=track_id, song_id=new_display_song_id))
 
@@ -948,8 +938,8 @@ def modify_track_song(media_type, id, track_id, song_id):
                                                                                      additional_artists_prequel_list,
                                                                                      additional_artists_sequel_list,
                                                                                      item)
-                # Set flag to write out changes when main library page is displayed
-                MEDIA.changes_to_write = True
+                # Flag the change to write out when main library page is displayed
+                MEDIA.mark_changed(item)
 
                 if form.save_and_finish.data:
                     return redirect(url_for(INDEX_PAGE_URL))
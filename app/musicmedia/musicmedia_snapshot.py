@@ -0,0 +1,141 @@
+"""
+Binary snapshot of the in memory music library.
+
+Parsing the music media html file is by far the slowest part of starting up
+a worker. Once a library has been loaded, a snapshot of the whole library is
+written next to the html file: the Artists set and the five music media
+singletons including any holes left in them by deleted media, with all the
+tracklists, songs and additional artists they reference.
+
+The snapshot records the size, modification time and content hash of the html
+file it was taken from. It is only used while all three still match the html
+file, otherwise the html file is parsed again and a new snapshot written.
+
+The snapshot is a pickle so it must only ever be read from the data directory
+the application itself writes to.
+"""
+
+from hashlib import sha256
+import logging
+import os
+from pathlib import Path
+import pickle  # nosec
+from typing import Optional
+
+from .musicmedia_files import write_file_atomically
+from .musicmedia_objects import Artists, CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs
+
+logger = logging.getLogger(__name__)
+
+# Bump when the music media classes change in a way that old snapshots can not be loaded
+SNAPSHOT_VERSION = 5
+SNAPSHOT_SUFFIX = '.snapshot'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def snapshot_path(filepath: str) -> Path:
+    """ Return the path of the snapshot of a music media html file.
+
+        The snapshot replaces the file suffix so it is not taken for one of the
+        timestamped backups of the html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The file path of the snapshot
+        :rtype:           :class:`pathlib.Path`
+    """
+    return Path(filepath).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def html_file_key(filepath: str) -> dict:
+    """ Return the key identifying the current content of a music media html file.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The size, modification time and content hash of the file
+        :rtype:           dict
+    """
+    file_stat = os.stat(filepath)
+    content_hash = sha256()
+    with open(filepath, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b''):
+            content_hash.update(chunk)
+    return {'size': file_stat.st_size,
+            'mtime': file_stat.st_mtime_ns,
+            'hash': content_hash.hexdigest()}
+
+
+def write_snapshot(filepath: str) -> Optional[Path]:
+    """ Write a snapshot of the music library taken from a music media html file.
+
+        The snapshot is written to a temporary file of its own first so a partly
+        written snapshot is never picked up, even with workers writing it at the
+        same time. The snapshot is only a cache so failing to write it is logged
+        and otherwise ignored.
+
+        :param filepath:  The file path of the html file the library matches
+        :type filepath:   str
+
+        :returns:         The file path of the snapshot or None if it could not be written
+        :rtype:           :class:`pathlib.Path` | None
+    """
+    snapshot = {'version': SNAPSHOT_VERSION,
+                'key': html_file_key(filepath),
+                'artists': (Artists._artists, Artists._max_index),
+                'lps': (LPs._lps, LPs._max_index),
+                'cassettes': (CASSETTEs._cassettes, CASSETTEs._max_index),
+                'cds': (CDs._cds, CDs._max_index),
+                'elps': (ELPs._elps, ELPs._max_index),
+                'mini_cds': (MINI_CDs._mini_cds, MINI_CDs._max_index)}
+    path = snapshot_path(filepath)
+    try:
+        write_file_atomically(path, [pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)])
+    except OSError as e:
+        logger.warning('Could not write snapshot {} of music media file {}: {}'.format(path, filepath, e))
+        return None
+    return path
+
+
+def read_snapshot(filepath: str) -> Optional[dict]:
+    """ Return the snapshot of a music media html file if it is still valid.
+
+        :param filepath:  The file path of the html file
+        :type filepath:   str
+
+        :returns:         The snapshot or None if it is missing, stale or unreadable
+        :rtype:           dict | None
+    """
+    path = snapshot_path(filepath)
+    if not path.is_file():
+        return None
+    try:
+        with open(path, 'rb') as fp:
+            snapshot = pickle.load(fp)  # nosec - only snapshots written by write_snapshot are read
+    except Exception as e:
+        logger.warning('Ignoring unreadable music media snapshot {}: {}'.format(path, e))
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.info('Ignoring music media snapshot {} from another version'.format(path))
+        return None
+    if snapshot.get('key') != html_file_key(filepath):
+        logger.info('Ignoring stale music media snapshot {}'.format(path))
+        return None
+    return snapshot
+
+
+def restore_snapshot(snapshot: dict) -> None:
+    """ Replace the music library with the content of a snapshot.
+
+        :param snapshot:  A snapshot returned by :func:`read_snapshot`
+        :type snapshot:   dict
+    """
+    Artists._artists, Artists._max_index = snapshot['artists']
+    Artists._index_artists()
+    LPs._lps, LPs._max_index = snapshot['lps']
+    CASSETTEs._cassettes, CASSETTEs._max_index = snapshot['cassettes']
+    CDs._cds, CDs._max_index = snapshot['cds']
+    ELPs._elps, ELPs._max_index = snapshot['elps']
+    MINI_CDs._mini_cds, MINI_CDs._max_index = snapshot['mini_cds']
+    MEDIA._index_libraries()
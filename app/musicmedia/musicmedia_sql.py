@@ -0,0 +1,299 @@
+"""
+SQL storage of the music library.
+
+The library can be kept in the database the DVDs live in instead of the music media
+html file. The music media are stored in normalized tables, see :mod:`app.models`:
+
+    + ``MUSIC_ARTIST``: Every artist, mixer and composer name once
+    + ``MUSIC_MEDIA``: A row per music media in the order of the html data file
+    + ``MUSIC_MEDIA_ARTIST`` and ``MUSIC_MEDIA_COMPOSER``: The artists and classical composers of a music media
+    + ``MUSIC_TRACKLIST``: The tracklists of a music media
+    + ``MUSIC_SONG``: The songs of a tracklist
+    + ``MUSIC_SONG_ARTIST`` and ``MUSIC_SONG_COMPOSER``: The additional artists and classical composers of a song
+    + ``MUSIC_MEDIA_STORE``: When the library was last saved
+
+Every worker of the application reads the same store, and loading it is a handful of
+indexed queries instead of parsing html. Each music media row keeps the digest of the
+html block it was saved from, so saving the library only rewrites the music media which
+changed since the last save. The html data file is generated from the library each time
+the library is written out, as for the records files of :mod:`app.musicmedia.musicmedia_records`.
+"""
+
+import json
+import logging
+import time
+from hashlib import md5
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.models import (
+    MUSIC_MEDIA_TABLES,
+    MusicArtist,
+    MusicMedia,
+    MusicMediaArtist,
+    MusicMediaComposer,
+    MusicMediaStore,
+    MusicSong,
+    MusicSongArtist,
+    MusicSongComposer,
+    MusicTrackList
+)
+
+logger = logging.getLogger(__name__)
+
+ARTIST = MusicArtist.__table__
+MEDIA_TABLE = MusicMedia.__table__
+MEDIA_ARTIST = MusicMediaArtist.__table__
+MEDIA_COMPOSER = MusicMediaComposer.__table__
+TRACKLIST = MusicTrackList.__table__
+SONG = MusicSong.__table__
+SONG_ARTIST = MusicSongArtist.__table__
+SONG_COMPOSER = MusicSongComposer.__table__
+STORE = MusicMediaStore.__table__
+
+STORE_ID = 1
+
+
+def block_digest(html: str) -> str:
+    """ Return the digest of the html block of a music media kept with its row. """
+    return md5(html.encode('utf-8')).hexdigest()  # nosec
+
+
+class MusicMediaSQLStore():
+    """ The music library kept in the tables of a database.
+
+        :param engine:  The engine of the database
+        :type engine:   :class:`sqlalchemy.engine.Engine`
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+
+    def create_tables(self) -> None:
+        """ Create the music media tables which do not exist yet. """
+        MEDIA_TABLE.metadata.create_all(self.engine, tables=MUSIC_MEDIA_TABLES, checkfirst=True)
+
+    def modified_ns(self) -> Optional[int]:
+        """ Return when the library was last saved to the store.
+
+            :returns:  The wall clock time of the last save in nanoseconds or None if the library was never saved
+            :rtype:    int | None
+        """
+        with self.engine.connect() as connection:
+            return connection.execute(select(STORE.c.saved_ns).where(STORE.c.id == STORE_ID)).scalar()
+
+    def iter_records(self) -> Iterator[dict]:
+        """ Return the media records of the library in the order of the html data file.
+
+            Each table is read in one query and the records are put together from the rows.
+
+            :returns:  An iterator over the media records referencing artists by name
+            :rtype:    iterator(dict)
+        """
+        with self.engine.connect() as connection:
+            artists = dict(connection.execute(select(ARTIST.c.id, ARTIST.c.name)).all())
+            artists[None] = None
+            media_rows = connection.execute(select(MEDIA_TABLE.c.id, MEDIA_TABLE.c.media_type, MEDIA_TABLE.c.title, MEDIA_TABLE.c.artist_particles,
+                                                   MEDIA_TABLE.c.mixer_id, MEDIA_TABLE.c.year).order_by(MEDIA_TABLE.c.position)).all()
+            media_artists = self._names_by_owner(connection, MEDIA_ARTIST, MEDIA_ARTIST.c.media_id, artists)
+            media_composers = self._names_by_owner(connection, MEDIA_COMPOSER, MEDIA_COMPOSER.c.media_id, artists)
+            tracklist_rows = connection.execute(select(TRACKLIST.c.id, TRACKLIST.c.media_id, TRACKLIST.c.name, TRACKLIST.c.track_artist_id,
+                                                       TRACKLIST.c.side_mixer_id, TRACKLIST.c.track_year)
+                                                .order_by(TRACKLIST.c.media_id, TRACKLIST.c.position)).all()
+            song_rows = connection.execute(select(SONG.c.id, SONG.c.tracklist_id, SONG.c.title, SONG.c.main_artist_id, SONG.c.exp_main_artist,
+                                                  SONG.c.main_artist_sequel, SONG.c.album, SONG.c.classical_work, SONG.c.country, SONG.c.year,
+                                                  SONG.c.mix, SONG.c.featured_in, SONG.c.parts)
+                                           .order_by(SONG.c.tracklist_id, SONG.c.position)).all()
+            song_composers = self._names_by_owner(connection, SONG_COMPOSER, SONG_COMPOSER.c.song_id, artists)
+            song_artists = {}
+            for song_id, prequel, artist_id, sequel in connection.execute(select(SONG_ARTIST.c.song_id, SONG_ARTIST.c.prequel, SONG_ARTIST.c.artist_id,
+                                                                                 SONG_ARTIST.c.sequel)
+                                                                          .order_by(SONG_ARTIST.c.song_id, SONG_ARTIST.c.position)):
+                song_artists.setdefault(song_id, []).append([prequel, artists[artist_id], sequel])
+
+        # Rows are unpacked as tuples as reading their attributes by name takes most of the load
+        songs = {}
+        for song_id, tracklist_id, title, main_artist_id, exp_main_artist, main_artist_sequel, album, classical_work, \
+                country, year, mix, featured_in, parts in song_rows:
+            songs.setdefault(tracklist_id, []).append(
+                {'title': title,
+                 'main_artist': artists[main_artist_id],
+                 'exp_main_artist': bool(exp_main_artist),
+                 'main_artist_sequel': main_artist_sequel,
+                 'additional_artists': song_artists.get(song_id),
+                 'album': album,
+                 'classical_composers': song_composers.get(song_id),
+                 'classical_work': classical_work,
+                 'country': country,
+                 'year': year,
+                 'mix': mix,
+                 'featured_in': featured_in,
+                 'parts': [] if parts is None else json.loads(parts)})
+        tracklists = {}
+        for tracklist_id, media_id, name, track_artist_id, side_mixer_id, track_year in tracklist_rows:
+            tracklists.setdefault(media_id, []).append(
+                {'name': name,
+                 'track_artist': artists[track_artist_id],
+                 'side_mixer': artists[side_mixer_id],
+                 'track_year': track_year,
+                 'songs': songs.get(tracklist_id, [])})
+        for media_id, media_type, title, artist_particles, mixer_id, year in media_rows:
+            yield {'media_type': media_type,
+                   'title': title,
+                   'artists': media_artists.get(media_id, []),
+                   'artist_particles': [] if artist_particles is None else json.loads(artist_particles),
+                   'classical_composers': media_composers.get(media_id, []),
+                   'mixer': artists[mixer_id],
+                   'year': year,
+                   'tracks': tracklists.get(media_id, [])}
+
+    @staticmethod
+    def _names_by_owner(connection, table, owner_column, artists: Dict[int, str]) -> Dict[int, List[str]]:
+        """ Return the artist names of a link table in order, by the row they are linked to. """
+        names = {}
+        for owner_id, artist_id in connection.execute(select(owner_column, table.c.artist_id).order_by(owner_column, table.c.position)):
+            names.setdefault(owner_id, []).append(artists[artist_id])
+        return names
+
+    def save(self, media_blocks: List[tuple]) -> dict:
+        """ Save the library to the store in one transaction.
+
+            Music media are matched to their rows by their type and hash. Only the music media
+            whose html block changed since they were saved are written again, along with their
+            tracklists and songs. The rows of music media no longer in the library are deleted
+            and the others are moved to their new place in the library.
+
+            :param media_blocks:  Each music media with its html block, as given by :meth:`MEDIA._media_blocks`
+            :type media_blocks:   list(tuple(:class:`app.musicmedia.musicmedia_objects._MEDIA`, str))
+
+            :returns:             The number of music media ``written``, ``moved`` and ``deleted``
+            :rtype:               dict
+        """
+        with self.engine.begin() as connection:
+            stored = {}
+            for row in connection.execute(select(MEDIA_TABLE.c.id, MEDIA_TABLE.c.media_type, MEDIA_TABLE.c.hash,
+                                                 MEDIA_TABLE.c.position, MEDIA_TABLE.c.digest).order_by(MEDIA_TABLE.c.position)):
+                stored.setdefault((row.media_type, row.hash), []).append(row)
+
+            written = []
+            moved = []
+            replaced = []
+            for position, (media, html) in enumerate(media_blocks):
+                digest = block_digest(html)
+                rows = stored.get((media.media_type.value, media._hash))
+                row = rows.pop(0) if rows else None
+                if row is not None and row.digest == digest:
+                    if row.position != position:
+                        moved.append({'media_id': row.id, 'new_position': position})
+                    continue
+                if row is not None:
+                    replaced.append(row.id)
+                written.append({'position': position, 'hash': media._hash, 'digest': digest, 'record': media.to_record()})
+            deleted = [row.id for rows in stored.values() for row in rows]
+
+            self._delete_media(connection, replaced + deleted)
+            if moved:
+                connection.execute(update(MEDIA_TABLE).where(MEDIA_TABLE.c.id == bindparam('media_id')).values(position=bindparam('new_position')),
+                                   moved)
+            self._insert_media(connection, written)
+
+            if connection.execute(update(STORE).where(STORE.c.id == STORE_ID).values(saved_ns=time.time_ns())).rowcount == 0:
+                connection.execute(insert(STORE).values(id=STORE_ID, saved_ns=time.time_ns()))
+
+        logger.debug('Saved the music library to the SQL store: {} written, {} moved, {} deleted'.format(len(written), len(moved), len(deleted)))
+        return {'written': len(written), 'moved': len(moved), 'deleted': len(deleted)}
+
+    @staticmethod
+    def _delete_media(connection, media_ids: List[int]) -> None:
+        """ Delete music media rows and every row hanging off them. """
+        if not media_ids:
+            return
+        tracklist_ids = select(TRACKLIST.c.id).where(TRACKLIST.c.media_id.in_(media_ids))
+        song_ids = select(SONG.c.id).where(SONG.c.tracklist_id.in_(tracklist_ids))
+        connection.execute(delete(SONG_ARTIST).where(SONG_ARTIST.c.song_id.in_(song_ids)))
+        connection.execute(delete(SONG_COMPOSER).where(SONG_COMPOSER.c.song_id.in_(song_ids)))
+        connection.execute(delete(SONG).where(SONG.c.tracklist_id.in_(tracklist_ids)))
+        connection.execute(delete(TRACKLIST).where(TRACKLIST.c.media_id.in_(media_ids)))
+        connection.execute(delete(MEDIA_ARTIST).where(MEDIA_ARTIST.c.media_id.in_(media_ids)))
+        connection.execute(delete(MEDIA_COMPOSER).where(MEDIA_COMPOSER.c.media_id.in_(media_ids)))
+        connection.execute(delete(MEDIA_TABLE).where(MEDIA_TABLE.c.id.in_(media_ids)))
+
+    @staticmethod
+    def _insert_media(connection, written: List[dict]) -> None:
+        """ Insert the rows of music media records along with their tracklists and songs.
+
+            The row ids are handed out here so each table is inserted in a single batch.
+        """
+        if not written:
+            return
+        next_ids = {table: (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1 for table in (ARTIST, MEDIA_TABLE, TRACKLIST, SONG)}
+
+        def next_id(table):
+            row_id = next_ids[table]
+            next_ids[table] += 1
+            return row_id
+
+        artists = {name: artist_id for artist_id, name in connection.execute(select(ARTIST.c.id, ARTIST.c.name))}
+        rows = {table: [] for table in (ARTIST, MEDIA_TABLE, MEDIA_ARTIST, MEDIA_COMPOSER, TRACKLIST, SONG, SONG_ARTIST, SONG_COMPOSER)}
+
+        def artist_id(name):
+            if name is None:
+                return None
+            if name not in artists:
+                artists[name] = next_id(ARTIST)
+                rows[ARTIST].append({'id': artists[name], 'name': name})
+            return artists[name]
+
+        def links(table, owner, owner_id, names):
+            rows[table].extend({owner: owner_id, 'position': position, 'artist_id': artist_id(name)} for position, name in enumerate(names or []))
+
+        for media in written:
+            record = media['record']
+            media_id = next_id(MEDIA_TABLE)
+            rows[MEDIA_TABLE].append({'id': media_id,
+                                      'media_type': record['media_type'],
+                                      'hash': media['hash'],
+                                      'position': media['position'],
+                                      'title': record['title'],
+                                      'year': record['year'],
+                                      'mixer_id': artist_id(record['mixer']),
+                                      'artist_particles': json.dumps(record['artist_particles']) if record['artist_particles'] else None,
+                                      'digest': media['digest']})
+            links(MEDIA_ARTIST, 'media_id', media_id, record['artists'])
+            links(MEDIA_COMPOSER, 'media_id', media_id, record['classical_composers'])
+            for track_position, track in enumerate(record['tracks']):
+                tracklist_id = next_id(TRACKLIST)
+                rows[TRACKLIST].append({'id': tracklist_id,
+                                        'media_id': media_id,
+                                        'position': track_position,
+                                        'name': track['name'],
+                                        'track_artist_id': artist_id(track['track_artist']),
+                                        'side_mixer_id': artist_id(track['side_mixer']),
+                                        'track_year': track['track_year']})
+                for song_position, song in enumerate(track['songs']):
+                    song_id = next_id(SONG)
+                    rows[SONG].append({'id': song_id,
+                                       'tracklist_id': tracklist_id,
+                                       'position': song_position,
+                                       'title': song['title'],
+                                       'main_artist_id': artist_id(song['main_artist']),
+                                       'exp_main_artist': song['exp_main_artist'],
+                                       'main_artist_sequel': song['main_artist_sequel'],
+                                       'album': song['album'],
+                                       'classical_work': song['classical_work'],
+                                       'country': song['country'],
+                                       'year': song['year'],
+                                       'mix': song['mix'],
+                                       'featured_in': song['featured_in'],
+                                       'parts': json.dumps(song['parts']) if song['parts'] else None})
+                    rows[SONG_ARTIST].extend({'song_id': song_id, 'position': position, 'prequel': prequel,
+                                              'artist_id': artist_id(name), 'sequel': sequel}
+                                             for position, (prequel, name, sequel) in enumerate(song['additional_artists'] or []))
+                    links(SONG_COMPOSER, 'song_id', song_id, song['classical_composers'])
+
+        # Parents before the rows referencing them
+        for table, table_rows in rows.items():
+            if table_rows:
+                connection.execute(insert(table), table_rows)
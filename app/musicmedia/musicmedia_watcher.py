@@ -0,0 +1,336 @@
+"""
+Hot reload of the music media html file.
+
+A worker loads the music media html file once at startup. When the file is
+edited outside of the worker, for example by hand or by another worker saving
+its changes, the watcher picks up the changes without restarting the worker.
+
+Each music media block of the file is identified by a digest of its content.
+When the size or modification time of the file changes, the digests of the
+blocks are matched in file order to the digests of the blocks last seen, so a
+music media listed twice keeps both its blocks. Only the blocks that are new are
+parsed and loaded, and only the music media whose block has gone are removed. A
+block changed in place replaces its music media in the same place of the
+library so the index of the music media does not change. So the cost of a
+reload grows with the number of edited music media and not with the size of the
+library. The snapshot of the library a reload leaves stale is written out at
+shutdown, or by the next write of the file, rather than in the request.
+
+The block index of :mod:`app.musicmedia.musicmedia_index` matches the blocks to
+the music media of the library and is kept up to date after each reload.
+
+Reloading also refreshes a library found stale when it is written out, see
+:mod:`app.musicmedia.musicmedia_lock`. The music media changed in the library
+but not in the file keep their unwritten changes as their block is unchanged.
+A music media changed both in the library and in the file is a conflict which
+stops the refresh rather than drop either change.
+"""
+
+from difflib import SequenceMatcher
+import locale
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .musicmedia_index import BlockIndexEntry, mapped_html_file, MusicMediaBlockIndex
+from .musicmedia_loader import html_block_digest, html_block_digests, media_records_from_html, MediaBlockSource, resolve_parser
+from .musicmedia_lock import read_version
+from .musicmedia_objects import _MEDIA, MEDIA, StaleLibraryException
+from .musicmedia_snapshot import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class MusicMediaFileWatcher():
+    """ Reload the music media changed in the music media html file.
+
+        :param filepath:  The file path of the html file loaded into the library
+        :type filepath:   str
+
+        :param parser:    The parser backend to use or None for the default
+        :type parser:     str | None
+
+        :param interval:  Minimum number of seconds between checks of the file
+        :type interval:   float
+    """
+
+    def __init__(self, filepath: str, parser: Optional[str] = None, interval: float = 2.0) -> None:
+        self._filepath = filepath
+        self._parser = resolve_parser(parser)
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._file_key = None
+        self._blocks = []  # Digest and music media, or None, of each block of the file in order
+        self._snapshot_stale = False
+        self.sync()
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    def _set_block_index(self, block_index: MusicMediaBlockIndex) -> None:
+        if MEDIA._html_data_file == self._filepath:
+            MEDIA._html_block_index = block_index
+
+    @staticmethod
+    def _same_as_block(media: _MEDIA, digest: str) -> bool:
+        """ Return whether a music media still in the library renders the same as a block of the html file. """
+        if not MEDIA._media_library(media.media_type).exists(media):
+            return False
+        html = media._html if media._html is not None else media.to_html()
+        return html_block_digest(html.encode(locale.getpreferredencoding(False))) == digest
+
+    @staticmethod
+    def _replaceable(media: Optional[_MEDIA]) -> bool:
+        """ Return whether the music media of a block is still in the library. """
+        return media is not None and MEDIA._media_library(media.media_type).exists(media)
+
+    @staticmethod
+    def _pair_changed_blocks(old_blocks: List[tuple], old_positions: List[int], new_positions: List[int],
+                             block_records: Dict[str, list], new_digests: List[str]) -> Dict[int, int]:
+        """ Pair the new blocks of a stretch of the file changed in place with the old blocks they replace.
+
+            Blocks are paired on the same music media type and title first and then in file order.
+
+            :returns:  The position of the old block by the position of the new block
+            :rtype:    dict
+        """
+        old_positions = [position for position in old_positions if old_blocks[position][1] is not None]
+        new_positions = [position for position in new_positions if len(block_records[new_digests[position]]) == 1]
+        changed_blocks = {}
+        for same_title in (True, False):
+            for new_position in list(new_positions):
+                record = block_records[new_digests[new_position]][0]
+                for old_position in old_positions:
+                    media = old_blocks[old_position][1]
+                    if record['media_type'] == media.media_type.value and (not same_title or record['title'] == media.title):
+                        changed_blocks[new_position] = old_position
+                        new_positions.remove(new_position)
+                        old_positions.remove(old_position)
+                        break
+        return changed_blocks
+
+    def sync(self, block_index: Optional[MusicMediaBlockIndex] = None) -> None:
+        """ Match the blocks of the html file to the music media in the library without changing the library.
+
+            Used when the library and the file are known to be the same such as after loading
+            the library or writing it out.
+
+            :param block_index:  The block index of the html file or None to open it
+            :type block_index:   :class:`MusicMediaBlockIndex` | None
+        """
+        with self._lock:
+            if block_index is None:
+                block_index = MusicMediaBlockIndex.open(self._filepath, parser=self._parser)
+            self._file_key = (block_index.size, block_index.mtime)
+            self._blocks = [(entry.digest, block_index.media(entry)) for entry in block_index.entries]
+            self._snapshot_stale = False  # The snapshot is written with the file
+            self._set_block_index(block_index)
+
+    def write_stale_snapshot(self) -> bool:
+        """ Write out the snapshot of the library if a reload left it stale. Called at shutdown.
+
+            :returns:  True if the snapshot was written out
+            :rtype:    bool
+        """
+        with self._lock:
+            if not self._snapshot_stale or not MEDIA._html_snapshot or MEDIA._html_data_file != self._filepath:
+                return False
+            try:
+                write_snapshot(self._filepath)
+            except OSError as e:
+                logger.warning('Failed to write music media snapshot for {}: {}'.format(self._filepath, e))
+                return False
+            self._snapshot_stale = False
+            return True
+
+    def check(self) -> Optional[Dict[str, int]]:
+        """ Reload the html file if it changed since the last check.
+
+            The file is only looked at once per interval. Errors are logged rather than
+            raised so a bad edit of the file does not break the application.
+
+            :returns:  The number of music media added, replaced and removed or None if nothing was reloaded
+            :rtype:    dict | None
+        """
+        now = time.monotonic()
+        if now - self._last_check < self._interval:
+            return None
+        self._last_check = now
+        try:
+            file_stat = os.stat(self._filepath)
+            if (file_stat.st_size, file_stat.st_mtime_ns) == self._file_key:
+                return None
+            return self.reload()
+        except Exception as e:
+            logger.error('Failed to reload music media file {}: {}'.format(self._filepath, e))
+            return None
+
+    def reload(self, wait: bool = False, keep_changes: bool = False) -> Optional[Dict[str, int]]:
+        """ Apply the music media added, removed or changed in the html file to the library.
+
+            Music media changed or removed in the file that were also changed in the library since
+            it was last written, as flagged by :meth:`MEDIA.mark_changed`, are in conflict. Unless
+            the changes of the library are to be kept, the changes in the file are taken and the
+            conflicts are logged.
+
+            :param wait:                    Wait for another thread reloading the file instead of leaving the reload to it
+            :type wait:                     bool
+
+            :param keep_changes:            Raise rather than drop the changes of the library in conflict with the file
+            :type keep_changes:             bool
+
+            :returns:                       The number of music media added, replaced and removed or None if another
+                                            thread is reloading
+            :rtype:                         dict | None
+
+            :raises StaleLibraryException:  If the changes of the library are to be kept and some are in conflict.
+                                            The library is left unchanged
+        """
+        if not self._lock.acquire(blocking=wait):
+            return None
+        try:
+            # Read before the file as the file is never older than its version
+            version = read_version(self._filepath) if MEDIA._html_write_lock else None
+            old_blocks = self._blocks
+            old_digests = [digest for digest, _ in old_blocks]
+            with mapped_html_file(self._filepath) as (size, mtime, content):
+                file_key = (size, mtime)
+                block_digests = html_block_digests(content)
+                new_digests = [digest for digest, _, _ in block_digests]
+
+                # Match the blocks of the file to the blocks last seen in order. The blocks left over
+                # are stretches of the file changed in place, added or removed.
+                kept_blocks = {}
+                stretches = []
+                block_matcher = SequenceMatcher(None, old_digests, new_digests, autojunk=False)
+                for tag, old_start, old_end, new_start, new_end in block_matcher.get_opcodes():
+                    if tag == 'equal':
+                        kept_blocks.update(zip(range(new_start, new_end), range(old_start, old_end)))
+                    else:
+                        stretches.append((list(range(old_start, old_end)), list(range(new_start, new_end))))
+
+                # Blocks moved elsewhere in the file keep their music media
+                gone_positions = {}
+                for old_positions, _ in stretches:
+                    for old_position in old_positions:
+                        gone_positions.setdefault(old_digests[old_position], []).append(old_position)
+                for _, new_positions in stretches:
+                    for new_position in new_positions:
+                        if gone_positions.get(new_digests[new_position]):
+                            kept_blocks[new_position] = gone_positions[new_digests[new_position]].pop(0)
+                moved_positions = set(kept_blocks.values())
+                stretches = [([position for position in old_positions if position not in moved_positions],
+                              [position for position in new_positions if position not in kept_blocks])
+                             for old_positions, new_positions in stretches]
+
+                # A music media listed more than once is loaded from all of its blocks. When some of its
+                # blocks go, it is loaded again from the blocks left.
+                gone_media = set(id(old_blocks[position][1]) for old_positions, _ in stretches for position in old_positions
+                                 if old_blocks[position][1] is not None)
+                reloaded_positions = sorted(new_position for new_position, old_position in kept_blocks.items()
+                                            if id(old_blocks[old_position][1]) in gone_media)
+                for new_position in reloaded_positions:
+                    del kept_blocks[new_position]
+                if reloaded_positions:
+                    stretches.append(([], reloaded_positions))
+
+                added_blocks = {}
+                for _, new_positions in stretches:
+                    for new_position in new_positions:
+                        digest, start, end = block_digests[new_position]
+                        if digest not in added_blocks:
+                            added_blocks[digest] = content[start:end]
+
+            block_records = {digest: media_records_from_html(block.decode(locale.getpreferredencoding(False)), parser=self._parser)
+                             for digest, block in added_blocks.items()}
+
+            # Pair the blocks changed in place with the blocks they replace
+            changed_blocks = {}
+            for old_positions, new_positions in stretches:
+                changed_blocks.update(self._pair_changed_blocks(old_blocks, old_positions, new_positions, block_records, new_digests))
+            gone_positions = [position for old_positions, _ in stretches for position in old_positions]
+
+            # Check for music media changed in the library as well before changing it
+            conflicts = []
+            changed_positions = {old_position: new_position for new_position, old_position in changed_blocks.items()}
+            for old_position in gone_positions:
+                media = old_blocks[old_position][1]
+                if media is not None and media in MEDIA._unwritten_media:
+                    if old_position in changed_positions:
+                        conflict = not self._same_as_block(media, new_digests[changed_positions[old_position]])
+                    else:
+                        conflict = self._replaceable(media)  # Removed from the file but not from the library
+                    if conflict:
+                        conflicts.append(media)
+            if conflicts:
+                titles = ', '.join('{} "{}"'.format(media.media_type.value, media.title) for media in conflicts)
+                if keep_changes:
+                    raise StaleLibraryException('Music media changed both in {} and in the library: {}. Not overwriting either change.'.format(
+                        self._filepath, titles))
+                logger.warning('Dropping the changes to music media also changed in {}: {}'.format(self._filepath, titles))
+
+            # Replace the music media of the changed blocks still in the library. The others are added.
+            changed_blocks = {new_position: old_position for new_position, old_position in changed_blocks.items()
+                              if self._replaceable(old_blocks[old_position][1])}
+            blocks = {}
+            for new_position, old_position in changed_blocks.items():
+                blocks[new_position] = MEDIA.replace_media(old_blocks[old_position][1], block_records[new_digests[new_position]][0])
+            replaced_positions = set(changed_blocks.values())
+
+            # Remove the music media whose block is gone
+            removed_count = 0
+            for old_position in gone_positions:
+                media = old_blocks[old_position][1]
+                if old_position not in replaced_positions and self._replaceable(media):
+                    MEDIA.remove_media(media)
+                    removed_count += 1
+
+            # Append the music media of the new blocks and move the unchanged lazily loaded music media to their new place
+            added_positions = []
+            added_records = []
+            for position, (digest, start, end) in enumerate(block_digests):
+                if position in blocks:
+                    continue
+                if position in kept_blocks:
+                    media = old_blocks[kept_blocks[position]][1]
+                    blocks[position] = media
+                    if isinstance(media, _MEDIA) and media._tracks_source is not None:
+                        media._tracks_source = MediaBlockSource(self._filepath, start, end, size, mtime, self._parser, digest)
+                else:
+                    blocks[position] = None
+                    for record in block_records[digest]:
+                        added_positions.append(position)
+                        added_records.append(record)
+            for position, media in zip(added_positions, MEDIA.bulk_load(added_records)):
+                blocks[position] = media
+
+            # Keep the block index in step with the file without parsing the unchanged blocks again
+            entries = []
+            for position, (digest, start, end) in enumerate(block_digests):
+                media = blocks[position]
+                if media is None:
+                    entries.append(BlockIndexEntry(None, None, None, start, end, digest))
+                else:
+                    entries.append(BlockIndexEntry(media.media_type.value, media.index, media.hash, start, end, digest))
+            block_index = MusicMediaBlockIndex(self._filepath, size, mtime, entries, parser=self._parser)
+            try:
+                block_index.save()
+            except OSError as e:
+                logger.warning('Failed to write music media block index for {}: {}'.format(self._filepath, e))
+            self._set_block_index(block_index)
+
+            self._blocks = [(digest, blocks[position]) for position, digest in enumerate(new_digests)]
+            self._file_key = file_key
+            if version is not None and MEDIA._html_data_file == self._filepath:
+                MEDIA._html_version = version
+            if removed_count or changed_blocks or added_records:
+                self._snapshot_stale = True  # Written at shutdown rather than in the request
+                logger.info('Reloaded music media file {}: {} added, {} replaced, {} removed'.format(
+                    self._filepath, len(added_records), len(changed_blocks), removed_count))
+            return {'added': len(added_records), 'replaced': len(changed_blocks), 'removed': removed_count}
+        finally:
+            self._lock.release()
@@ -0,0 +1,217 @@
+"""
+Background writing of the music library to the music media html file.
+
+Writing out the music media html file copies the current file to a backup,
+writes the library and prunes the old backups. Done in a request handler, the
+user of that request waits on the disk. The writer moves the writes to a thread
+of its own. Changes to the library signal the writer and return at once.
+
+The writer waits until the library has been left unchanged for a short delay
+before writing it out, so a burst of changes such as adding several tracks in a
+row is written out once. So that a steady stream of changes is still written
+out, the wait never runs past a maximum delay from the first unwritten change.
+Stopping the writer writes out any change still flagged on the library.
+
+A write refused as the library holds changes in conflict with the file, see
+:class:`StaleLibraryException`, is not retried until the file changes again,
+such as when the conflict is resolved in the file. The conflict is shown in the
+status of the writer meanwhile.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .musicmedia_objects import MEDIA, StaleLibraryException
+
+logger = logging.getLogger(__name__)
+
+
+class MusicMediaWriter():
+    """ Thread writing out the music library when signalled of changes.
+
+        :param filepath:   The file path of the html file to write to
+        :type filepath:    str
+
+        :param delay:      Number of seconds the library must be left unchanged before it is written out
+        :type delay:       float
+
+        :param max_delay:  Maximum number of seconds a change waits to be written out
+        :type max_delay:   float
+    """
+
+    def __init__(self, filepath: str, delay: float = 2.0, max_delay: float = 30.0) -> None:
+        self._filepath = filepath
+        self._delay = delay
+        self._max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._first_signal = None
+        self._last_signal = None
+        self._writing = False
+        self._stopping = False
+        self._writes = 0
+        self._last_write_time = None
+        self._last_write_seconds = None
+        self._last_error = None
+        self._conflict = None
+        self._conflict_file_key = None
+        self._thread = None
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    def start(self) -> None:
+        """ Start the writer thread. """
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='MusicMediaWriter', daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """ Stop the writer thread.
+
+            :param flush:  Write out the changes still waiting to be written before stopping
+            :type flush:   bool
+        """
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def notify(self) -> None:
+        """ Signal the writer of a change to write out. Never waits on the disk. """
+        with self._condition:
+            now = time.monotonic()
+            if self._pending == 0:
+                self._first_signal = now
+            self._last_signal = now
+            self._pending += 1
+            self._condition.notify_all()
+
+    def flush(self) -> bool:
+        """ Write out the changes waiting to be written in the calling thread.
+
+            The library is written out when it is flagged as changed even if the writer was not
+            signalled, such as for changes left in the journal until it is due for compaction,
+            changes replayed from the journal or a failed write.
+
+            :returns:  True if there were changes to write out
+            :rtype:    bool
+        """
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            if self._pending == 0 and not MEDIA.changes_to_write:
+                return False
+            pending = self._take_pending()
+        self._write(pending)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """ Return the state of the writer.
+
+            :returns:  The number of change signals waiting to be written out, whether a write is in
+                       progress, the number of writes, the wall clock time, duration and error of the
+                       last write and the conflict keeping the changes from being written out
+            :rtype:    dict
+        """
+        with self._condition:
+            return {'filepath': self._filepath,
+                    'running': self._thread is not None and self._thread.is_alive(),
+                    'pending': self._pending,
+                    'writing': self._writing,
+                    'writes': self._writes,
+                    'last_write_time': self._last_write_time,
+                    'last_write_seconds': self._last_write_seconds,
+                    'last_error': self._last_error,
+                    'conflict': self._conflict}
+
+    def _take_pending(self) -> int:
+        """ Mark the pending changes as being written. Called holding the condition. """
+        pending = self._pending
+        self._pending = 0
+        self._first_signal = self._last_signal = None
+        self._writing = True
+        return pending
+
+    def _due_in(self) -> Optional[float]:
+        """ Return the seconds until the pending changes are due to be written or None if there are none. """
+        if self._pending == 0:
+            return None
+        due = min(self._last_signal + self._delay, self._first_signal + self._max_delay)
+        return due - time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if self._writing:  # Flushing in another thread
+                        self._condition.wait()
+                        continue
+                    due_in = self._due_in()
+                    if due_in is not None and due_in <= 0:
+                        break
+                    self._condition.wait(due_in)
+                if self._stopping:
+                    return
+                pending = self._take_pending()
+            self._write(pending)
+
+    def _file_key(self) -> Optional[Tuple[int, int]]:
+        """ Return the size and modification time of the html file or None if it cannot be read. """
+        try:
+            file_stat = os.stat(self._filepath)
+        except OSError:
+            return None
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def _write(self, pending: int) -> None:
+        """ Write out the library. Called with the pending changes marked as being written. """
+        if self._conflict is not None and self._file_key() == self._conflict_file_key:
+            # The conflict stands until the file changes again. The changes stay flagged.
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+            return
+
+        start = time.perf_counter()
+        error = None
+        try:
+            MEDIA.changes_to_write = False
+            MEDIA.to_html_file(self._filepath)
+            self._conflict = self._conflict_file_key = None
+        except StaleLibraryException as e:
+            # Not transient so only tried again once the file changes
+            MEDIA.changes_to_write = True
+            error = str(e)
+            self._conflict = error
+            self._conflict_file_key = self._file_key()
+            logger.error('Not writing music media file {} until it changes: {}'.format(self._filepath, e))
+        except Exception as e:
+            # Keep the changes flagged so the next change or library page view tries again
+            MEDIA.changes_to_write = True
+            error = str(e)
+            logger.error('Failed to write music media file {}: {}'.format(self._filepath, e))
+        seconds = time.perf_counter() - start
+        with self._condition:
+            self._writing = False
+            self._last_write_seconds = seconds
+            self._last_error = error
+            if error is None:
+                self._writes += 1
+                self._last_write_time = time.time()
+            self._condition.notify_all()
+        if error is None:
+            logger.info('Wrote music media file {} with {} changes in {:.3f}s'.format(self._filepath, pending, seconds))
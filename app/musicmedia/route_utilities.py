@@ -215,8 +215,18 @@ def get_macmedia_library(media_type):
 
 
 def write_out_changes():
-    """ If there have been Music Media Changes, write them out and reset changes flag """
+    """ If there have been Music Media Changes, write them out and reset changes flag
+
+        When the changes are journaled they are already safe on disk so they are only
+        written out once the journal is due for compaction. When there is a background
+        writer it is left to write them out so the request does not wait on the disk.
+    """
     if MEDIA.changes_to_write:
+        if MEDIA._html_journal is not None and not MEDIA._html_journal.compaction_due():
+            return
+        if MEDIA.html_writer() is not None:
+            MEDIA.html_writer().notify()
+            return
         if app.app.env != 'Test':
             MEDIA.to_html_file(app.app.config['MUSIC_MEDIA_HTML_FILE'])
         MEDIA.changes_to_write = False
\ No newline at end of file
@@ -43,6 +43,30 @@ class BaseConfig():
     MUSIC_MEDIA_DATA_DIR = None
     MUSIC_MEDIA_HTML_FILE = None
     MUSIC_MEDIA_HTML_FILE_RETENTION_COUNT = 20
+    MUSIC_MEDIA_BACKUP_COMPRESSION = 'gzip'  # One of gzip or zstd. Falls back to gzip if zstandard is not installed
+    MUSIC_MEDIA_BACKUP_FULL_EVERY = 50  # Store every this many backups in full. The others only hold the changed blocks
+    MUSIC_MEDIA_STORAGE_FORMAT = 'html'  # One of html, jsonl, msgpack (needs msgpack installed) or sql. With the others the html file is a generated export. sql uses the database
+    MUSIC_MEDIA_ARTIST_NORMALIZED_MATCHING = False  # Credit "Beatles, The" or "the beatles" to the existing artist "The Beatles"
+    MUSIC_MEDIA_ARTIST_ALIASES = None  # JSON file of artist names by alias. See utils/artist_duplicates.py
+    MUSIC_MEDIA_STREAMING_LOAD = False  # Load the music media html file a block at a time
+    MUSIC_MEDIA_PARSER = 'lxml'  # One of lxml, html.parser or html5lib. Falls back to html.parser
+    MUSIC_MEDIA_SNAPSHOT = False  # Keep a binary snapshot of the library next to the music media html file
+    MUSIC_MEDIA_LOAD_WORKERS = 1  # Processes parsing the music media html file. Worth raising for large files
+    MUSIC_MEDIA_RENDER_WORKERS = 1  # Processes rendering the music media when written out. None for one per CPU, 1 for serial. Only used by single threaded processes
+    MUSIC_MEDIA_PARALLEL_RENDER_THRESHOLD = 2000  # Fewest music media to render in parallel. See utils/benchmark_musicmedia_render.py
+    MUSIC_MEDIA_LAZY_TRACKS = False  # Only load music media headers at startup and parse tracks on demand
+    MUSIC_MEDIA_LOAD_PROFILE = False  # Log a report of the phases of loading the music media html file at startup
+    MUSIC_MEDIA_LOAD_PROFILE_MEMORY = False  # Also trace the peak memory of the load. Roughly doubles the load time
+    MUSIC_MEDIA_HOT_RELOAD = False  # Reload music media edited in the music media html file outside of the app
+    MUSIC_MEDIA_HOT_RELOAD_INTERVAL = 2  # Minimum number of seconds between checks of the music media html file
+    MUSIC_MEDIA_JOURNAL = False  # Journal each music media change to disk as it is made and replay the journal at startup
+    MUSIC_MEDIA_JOURNAL_MAX_BYTES = 1024 * 1024  # Write out the music media html file once the journal is this large
+    MUSIC_MEDIA_JOURNAL_MAX_AGE = 3600  # or once the oldest journaled change is this many seconds old
+    MUSIC_MEDIA_WRITE_LOCK = False  # Lock and version the music media html file so workers refresh rather than overwrite each others changes
+    MUSIC_MEDIA_BACKGROUND_WRITE = False  # Write out the music media html file in a background thread rather than in a request
+    MUSIC_MEDIA_WRITE_DELAY = 2  # Seconds the library must be left unchanged before the background thread writes it out
+    MUSIC_MEDIA_WRITE_MAX_DELAY = 30  # Maximum seconds a change waits to be written out by the background thread
+    MUSIC_MEDIA_DIAGNOSTICS = False  # Serve the /load-report and /write-status diagnostics of the music media library
 
 
 LOCAL_DEVELOPMENT = 'DB_USER' in os.environ and 'DB_PASSWORD' in os.environ and 'DATABASE' in os.environ and os.environ['APP_ENV'] != 'Test'
@@ -63,6 +87,14 @@ class DevConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = DATABASE_URI
     MUSIC_MEDIA_DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../data')
     MUSIC_MEDIA_HTML_FILE = os.path.join(MUSIC_MEDIA_DATA_DIR, 'dev_music.html')
+    MUSIC_MEDIA_STREAMING_LOAD = True
+    MUSIC_MEDIA_SNAPSHOT = True
+    MUSIC_MEDIA_LOAD_PROFILE = True
+    MUSIC_MEDIA_HOT_RELOAD = True
+    MUSIC_MEDIA_JOURNAL = True
+    MUSIC_MEDIA_WRITE_LOCK = True
+    MUSIC_MEDIA_BACKGROUND_WRITE = True
+    MUSIC_MEDIA_DIAGNOSTICS = True
 
 
 class AzureConfig(BaseConfig):
@@ -102,4 +134,5 @@ class ProductionConfig(AzureConfig):
 class TestConfig(BaseConfig):
    FLASK_ENV = 'testing'
    TESTING = True
-   WTF_CSRF_ENABLED = False
\ No newline at end of file
+   WTF_CSRF_ENABLED = False
+   MUSIC_MEDIA_DIAGNOSTICS = True
\ No newline at end of file
@@ -243,3 +243,49 @@ class ApiMusicMediaRoutesTestCase(unittest.TestCase):
 
         cassettes_artists_in_response_set = set([cassettes['artists'] for cassettes in cassettes_in_response])
         self.assertIn('Various Artists', cassettes_artists_in_response_set)
+
+    def test_musicmedia_years(self):
+        # Grab the music media of the seventies from the api call
+        response = self.client.get('/api/v1/musicmedia_years/1970/1979', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.mimetype, 'application/json')
+
+        musicmedia_in_response = response.json['data']
+        self.assertEqual(len(musicmedia_in_response), 7)
+        self.assertEqual([musicmedia['year'] for musicmedia in musicmedia_in_response], [1972, 1974, 1974, 1974, 1974, 1978, 1978])
+        self.assertEqual(set([musicmedia['media_type'] for musicmedia in musicmedia_in_response]), set([MediaType.LP.value]))
+
+        # Across media types and limited to one media type
+        response = self.client.get('/api/v1/musicmedia_years/1980/1999', follow_redirects=True)
+        self.assertEqual([musicmedia['media_type'] for musicmedia in response.json['data']],
+                         [MediaType.ELP.value, MediaType.MINI_CD.value] + [MediaType.CD.value] * 4)
+        response = self.client.get('/api/v1/musicmedia_years/1980/1999?media_type=' + MediaType.CD.value, follow_redirects=True)
+        self.assertEqual([musicmedia['year'] for musicmedia in response.json['data']], [1996, 1997, 1997, 1999])
+
+        # An unknown media type is a bad request
+        response = self.client.get('/api/v1/musicmedia_years/1980/1999?media_type=8-track', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_unknown_musicmedia_type(self):
+        response = self.client.get('/api/v1/musicmedia_data/8-track', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_songs(self):
+        # Find a song across the music media from the api call
+        response = self.client.get('/api/v1/songs?title=lucy in the sky with diamonds', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.mimetype, 'application/json')
+
+        songs_in_response = response.json['data']
+        self.assertEqual([(song['media_type'], song['musicmedia']['title'], song['track_id'], song['song_id']) for song in songs_in_response],
+                         [(MediaType.LP.value, "Sgt. Pepper's Lonely Hearts Club Band", 0, 4), (MediaType.CD.value, 'Diamonds', 2, 1)])
+        self.assertEqual([song['artist'] for song in songs_in_response], ['Dianne Steinberg', 'Elton John'])
+        self.assertEqual(set([song['title'] for song in songs_in_response]), set(['Lucy In The Sky With Diamonds']))
+
+        # Limited to one artist
+        response = self.client.get('/api/v1/songs?title=Lucy In The Sky With Diamonds&artist=Elton John', follow_redirects=True)
+        self.assertEqual([song['musicmedia']['title'] for song in response.json['data']], ['Diamonds'])
+
+        # A title is required
+        response = self.client.get('/api/v1/songs', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,231 @@
+import gzip
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_backup import (
+    apply_delta,
+    backup_dir,
+    encode_delta,
+    html_segments,
+    MANIFEST_NAME,
+    mapped_segments,
+    MusicMediaBackupStore,
+    resolve_compression,
+    segment_digests
+)
+from app.musicmedia.musicmedia_objects import LPs, MEDIA
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaBackupTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        with open(self.MUSIC_HTML_FILE, 'rb') as fp:
+            self.html = fp.read()
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        MEDIA.set_html_file_rentention_count(5)
+        shutil.rmtree(self.temp_dir)
+
+    def stored_objects(self):
+        return sorted(name for name in os.listdir(backup_dir(self.html_file)) if name != MANIFEST_NAME)
+
+    def test_resolve_compression(self):
+        self.assertEqual(resolve_compression(), 'gzip')
+        self.assertIn(resolve_compression('zstd'), ('gzip', 'zstd'))
+        with self.assertRaises(ValueError):
+            resolve_compression('lzma')
+
+    def test_add_and_read(self):
+        store = MusicMediaBackupStore(self.html_file)
+        self.assertIsNone(store.latest())
+        entry = store.add(self.html)
+        self.assertEqual(store.read(entry), self.html)
+        self.assertEqual(self.stored_objects(), [entry.object])
+        self.assertTrue(entry.object.endswith('.gz'))
+        self.assertLess(os.path.getsize(backup_dir(self.html_file) / entry.object), len(self.html) / 2)
+
+        # The manifest is read back by a new store
+        self.assertEqual(MusicMediaBackupStore(self.html_file).entries, [entry])
+
+    def test_identical_content_stored_once(self):
+        store = MusicMediaBackupStore(self.html_file)
+        first = store.add(self.html, timestamp=1)
+        self.assertEqual(store.add(self.html, timestamp=2).timestamp, 2)
+        self.assertEqual(len(store.entries), 1)
+
+        changed = store.add(self.html + b'\n', timestamp=3)
+        again = store.add(self.html, timestamp=4)
+        self.assertEqual([entry.timestamp for entry in store.entries], [4, 3, 2])
+        self.assertEqual(again.object, first.object)
+        self.assertEqual(self.stored_objects(), sorted([first.object, changed.object]))
+
+    def test_pruned_from_manifest(self):
+        store = MusicMediaBackupStore(self.html_file, retention_count=2)
+        first = store.add(self.html, timestamp=1)
+        second = store.add(self.html + b'\n', timestamp=2)
+        store.add(self.html, timestamp=3)
+        self.assertEqual(self.stored_objects(), sorted([first.object, second.object]))
+        with patch('pathlib.Path.iterdir', side_effect=AssertionError('Scanned the backup directory')):
+            third = store.add(self.html + b'\n\n', timestamp=4)
+        self.assertEqual([entry.timestamp for entry in store.entries], [4, 3])
+        self.assertEqual(self.stored_objects(), sorted([first.object, third.object]))
+
+    def versions(self, count):
+        """ Return versions of the html file each changing the year of one more music media block. """
+        html = self.html
+        versions = []
+        for year in range(count):
+            html = html.replace(b'<a rel="date">', b'<a rel="date">1', 1).replace(b'<a rel="date">1', b'<a rel="datE">1', 1)
+            versions.append(html + b'<!-- %d -->\n' % year)
+        return versions
+
+    def test_html_segments(self):
+        segments = html_segments(self.html)
+        self.assertEqual(b''.join(segments), self.html)
+        self.assertEqual(len(segments), 22)
+        self.assertTrue(segments[1].startswith(b'<p>'))
+        self.assertEqual(html_segments(b'<html></html>'), [b'<html></html>'])
+
+    def test_mapped_segments(self):
+        with open(self.html_file, 'rb') as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                segments = mapped_segments(content)
+                self.assertEqual([segment.tobytes() for segment in segments], html_segments(self.html))
+                self.assertEqual(segment_digests(segments), segment_digests(html_segments(self.html)))
+                for segment in segments:
+                    segment.release()
+
+    def test_encode_and_apply_delta(self):
+        segments = html_segments(self.html)
+        changed = list(segments)
+        changed[3] = changed[3].replace(b'<a rel="date">', b'<a rel="date">1')
+        del changed[7]
+        changed.insert(12, changed[5])
+        new_html = b''.join(changed)
+        delta = encode_delta(segment_digests(segments), changed, segment_digests(changed))
+        self.assertEqual(apply_delta(self.html, delta), new_html)
+        self.assertLess(len(delta), len(segments[3]) + len(segments[5]) + 200)
+
+    def test_deltas_between_full_backups(self):
+        store = MusicMediaBackupStore(self.html_file, retention_count=100, full_every=4)
+        versions = self.versions(10)
+        entries = [store.add(html, timestamp=timestamp) for timestamp, html in enumerate(versions)]
+        self.assertEqual([entry.base is None for entry in entries], [True, False, False, False] * 2 + [True, False])
+        self.assertEqual(entries[1].base, entries[0].digest)
+        for entry, html in zip(entries, versions):
+            self.assertEqual(store.read(entry), html)
+
+        # Deltas only hold the changed blocks
+        delta_size = os.path.getsize(backup_dir(self.html_file) / entries[1].object)
+        self.assertLess(delta_size, os.path.getsize(backup_dir(self.html_file) / entries[0].object) / 4)
+
+        # Rebuilt by a new store from the manifest
+        self.assertEqual(MusicMediaBackupStore(self.html_file).read(entries[6]), versions[6])
+
+    def test_large_change_stored_in_full(self):
+        store = MusicMediaBackupStore(self.html_file)
+        store.add(self.html)
+        self.assertIsNone(store.add(self.html.replace(b'<a', b'<A')).base)
+
+    def test_pruning_keeps_delta_chains(self):
+        store = MusicMediaBackupStore(self.html_file, retention_count=3, full_every=4)
+        versions = self.versions(6)
+        for timestamp, html in enumerate(versions):
+            store.add(html, timestamp=timestamp)
+        # The oldest kept backup is a delta rebuilt from the full backup at 0
+        self.assertEqual([entry.timestamp for entry in store.entries], [5, 4, 3, 2, 1, 0])
+
+        # Once the oldest kept backup is the full backup at 4, the backups before it are removed
+        store = MusicMediaBackupStore(self.html_file, retention_count=4, full_every=4)
+        for timestamp, html in enumerate(self.versions(3), 6):
+            store.add(html, timestamp=timestamp)
+        self.assertEqual([entry.timestamp for entry in store.entries], [8, 7, 6, 5, 4])
+        self.assertEqual(len(self.stored_objects()), 5)
+        for entry in store.entries:
+            self.assertTrue(store.read(entry))
+
+    def test_missing_delta_base(self):
+        store = MusicMediaBackupStore(self.html_file)
+        store.add(self.html, timestamp=1)
+        entry = store.add(self.versions(1)[0], timestamp=2)
+        os.remove(backup_dir(self.html_file) / store.entries[1].object)
+        with self.assertRaises(OSError):
+            store.read(entry)
+
+    def test_version_1_manifest(self):
+        store = MusicMediaBackupStore(self.html_file)
+        entry = store.add(self.html, timestamp=1)
+        manifest = {'version': 1, 'backups': [{name: value for name, value in entry._asdict().items() if name != 'base'}]}
+        with open(backup_dir(self.html_file) / MANIFEST_NAME, 'w') as fp:
+            json.dump(manifest, fp)
+        store = MusicMediaBackupStore(self.html_file)
+        self.assertEqual(store.entries, [entry])
+        changed = store.add(self.versions(1)[0], timestamp=2)
+        self.assertEqual(changed.base, entry.digest)
+        self.assertEqual(store.read(changed), self.versions(1)[0])
+
+    def test_backup_file_only_reads_changed_file(self):
+        store = MusicMediaBackupStore(self.html_file)
+        entry = store.backup_file()
+        self.assertEqual(store.read(entry), self.html)
+        with patch('builtins.open', side_effect=AssertionError('Read the html file')):
+            self.assertEqual(store.backup_file(), entry)
+
+        with open(self.html_file, 'ab') as fp:
+            fp.write(b'\n')
+        self.assertEqual(store.read(store.backup_file()), self.html + b'\n')
+        self.assertEqual(len(store.entries), 2)
+
+    def test_corrupt_backup(self):
+        store = MusicMediaBackupStore(self.html_file)
+        entry = store.add(self.html)
+        with open(backup_dir(self.html_file) / entry.object, 'wb') as fp:
+            fp.write(gzip.compress(b'<html></html>'))
+        with self.assertRaises(ValueError):
+            store.read(entry)
+
+    def test_unreadable_manifest(self):
+        store = MusicMediaBackupStore(self.html_file)
+        store.add(self.html)
+        with open(backup_dir(self.html_file) / MANIFEST_NAME, 'w') as fp:
+            fp.write('{"version": ')
+        self.assertEqual(MusicMediaBackupStore(self.html_file).entries, [])
+        with open(backup_dir(self.html_file) / MANIFEST_NAME, 'w') as fp:
+            json.dump({'version': -1, 'backups': []}, fp)
+        self.assertEqual(MusicMediaBackupStore(self.html_file).entries, [])
+
+    def test_library_writes_backed_up(self):
+        MEDIA.set_html_file_rentention_count(3)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        christmas = LPs().find_by_title('Christmas')[0]
+        for year in (1991, 1992, 1993):
+            christmas.year = year
+            MEDIA.to_html_file()
+
+        store = MusicMediaBackupStore(self.html_file)
+        self.assertEqual(len(store.entries), 3)
+        with open(self.html_file, 'rb') as fp:
+            self.assertEqual(store.read(store.latest()), fp.read())
+        self.assertIn(b'<a rel="date">1992</a>', store.read(store.entries[1]))
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.split('.')[-1].isdigit()], [])
+
+        # Nothing to back up for an unchanged library
+        MEDIA.to_html_file()
+        self.assertEqual(len(MusicMediaBackupStore(self.html_file).entries), 3)
@@ -0,0 +1,117 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_files import (
+    backup_paths,
+    html_file_is_complete,
+    recover_html_file,
+    write_file_atomically
+)
+from app.musicmedia.musicmedia_objects import _MEDIA, LPs, MEDIA
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaFilesTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        with open(self.MUSIC_HTML_FILE, 'r') as fp:
+            self.html = fp.read()
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, filepath, content):
+        with open(filepath, 'w') as fp:
+            fp.write(content)
+
+    def read(self, filepath):
+        with open(filepath, 'r') as fp:
+            return fp.read()
+
+    def test_write_file_atomically(self):
+        os.chmod(self.html_file, 0o644)
+        write_file_atomically(self.html_file, [b'<html>\n', b'</html>\n'])
+        self.assertEqual(self.read(self.html_file), '<html>\n</html>\n')
+        self.assertEqual(stat.S_IMODE(os.stat(self.html_file).st_mode), 0o644)
+        self.assertEqual(os.listdir(self.temp_dir), ['music.html'])
+
+    def test_failed_write_leaves_file(self):
+        def chunks():
+            yield b'<html>\n'
+            raise OSError('No space left on device')
+
+        with self.assertRaises(OSError):
+            write_file_atomically(self.html_file, chunks())
+        self.assertEqual(self.read(self.html_file), self.html)
+        self.assertEqual(os.listdir(self.temp_dir), ['music.html'])
+
+    def test_failed_library_write_leaves_file(self):
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        with patch.object(_MEDIA, 'to_html', side_effect=MemoryError):
+            with self.assertRaises(MemoryError):
+                MEDIA.to_html_file()
+        self.assertEqual(self.read(self.html_file), self.html)
+
+    def test_html_file_is_complete(self):
+        self.assertTrue(html_file_is_complete(self.html_file))
+        self.assertFalse(html_file_is_complete(os.path.join(self.temp_dir, 'missing.html')))
+        self.write(self.html_file, '')
+        self.assertFalse(html_file_is_complete(self.html_file))
+        self.write(self.html_file, self.html[:len(self.html) // 2])
+        self.assertFalse(html_file_is_complete(self.html_file))
+
+    def test_legacy_backups(self):
+        for timestamp in (9, 10, 1000, 100):
+            self.write('{}.{}'.format(self.html_file, timestamp), self.html)
+        self.write(self.html_file + '.journal', '')
+        self.assertEqual([path.suffix for path in backup_paths(self.html_file)], ['.1000', '.100', '.10', '.9'])
+
+    def test_complete_file_not_recovered(self):
+        self.write(self.html_file + '.100', '<html>\n</html>\n')
+        self.assertIsNone(recover_html_file(self.html_file))
+        self.assertEqual(self.read(self.html_file), self.html)
+
+    def test_recover_from_newest_complete_backup(self):
+        truncated_html = self.html[:len(self.html) // 2]
+        self.write(self.html_file + '.100', self.html)
+        self.write(self.html_file + '.200', truncated_html)
+        self.write(self.html_file, truncated_html)
+
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(self.read(self.html_file), self.html)
+        self.assertEqual(self.read(self.html_file + '.broken'), truncated_html)
+        self.assertEqual(len(LPs().find_by_title('Christmas')), 1)
+
+    def test_recover_from_backup_store(self):
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.to_html_file()
+        saved_html = self.read(self.html_file)
+        self.write(self.html_file + '.100', self.html)
+        self.write(self.html_file, saved_html[:len(saved_html) // 2])
+
+        self.assertTrue(recover_html_file(self.html_file).startswith(self.html_file + '.backups'))
+        self.assertEqual(self.read(self.html_file), saved_html)
+
+    def test_no_backup_to_recover_from(self):
+        self.write(self.html_file, self.html[:len(self.html) // 2])
+        self.assertIsNone(recover_html_file(self.html_file))
+        self.assertFalse(os.path.exists(self.html_file + '.broken'))
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.musicmedia.musicmedia_index import block_index_path, MusicMediaBlockIndex
+from app.musicmedia.musicmedia_objects import LPs, MEDIA, MediaException
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaIndexTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        shutil.rmtree(self.temp_dir)
+
+    def test_build(self):
+        block_index = MusicMediaBlockIndex.build(self.html_file)
+        self.assertEqual(len(block_index.entries), 21)
+        with open(self.html_file, 'rb') as fp:
+            content = fp.read()
+        for entry in block_index.entries:
+            media = block_index.media(entry)
+            self.assertIsNotNone(media)
+            self.assertEqual(block_index.entry(media), entry)
+            self.assertTrue(content.startswith(b'<p>', entry.start))
+        self.assertEqual(block_index.entries[-1].end, len(content))
+
+    def test_read_block(self):
+        block_index = MusicMediaBlockIndex.build(self.html_file)
+        christmas = LPs().find_by_title('Christmas')[0]
+        block = block_index.read_block(christmas)
+        self.assertTrue(block.startswith(b'<p>\n<a rel="lp">\n<h3><a rel="title">Christmas</a></h3>'))
+        self.assertTrue(block.endswith(b'</p>'))
+
+        record = block_index.read_record(christmas)
+        self.assertEqual(record['title'], 'Christmas')
+        self.assertEqual(len(record['tracks']), 2)
+
+    def test_block_matches(self):
+        MEDIA.to_html_file()
+        block_index = MEDIA.html_block_index()
+        for entry in block_index.entries:
+            self.assertTrue(block_index.block_matches(block_index.media(entry)))
+
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        self.assertFalse(block_index.block_matches(christmas))
+
+    def test_unknown_media(self):
+        block_index = MusicMediaBlockIndex.build(self.html_file)
+        christmas = LPs().find_by_title('Christmas')[0]
+        LPs.delete(christmas)
+        new_lp = LPs.create(media_type=christmas.media_type, title='Not In The File', artists=christmas.artists, year=2000)
+        self.assertIsNone(block_index.entry(new_lp))
+        with self.assertRaises(MediaException):
+            block_index.read_block(new_lp)
+
+    def test_file_changed(self):
+        block_index = MusicMediaBlockIndex.build(self.html_file)
+        christmas = LPs().find_by_title('Christmas')[0]
+        with open(self.html_file, 'a') as fp:
+            fp.write('\n')
+        self.assertFalse(block_index.is_current())
+        with self.assertRaises(MediaException):
+            block_index.read_block(christmas)
+
+    def test_persisted(self):
+        self.assertIsNone(MusicMediaBlockIndex.from_file(self.html_file))
+        block_index = MusicMediaBlockIndex.open(self.html_file)
+        self.assertTrue(block_index_path(self.html_file).is_file())
+
+        persisted_index = MusicMediaBlockIndex.from_file(self.html_file)
+        self.assertEqual(persisted_index.entries, block_index.entries)
+        christmas = LPs().find_by_title('Christmas')[0]
+        self.assertEqual(persisted_index.read_block(christmas), block_index.read_block(christmas))
+
+        # Stale or from another version
+        os.utime(self.html_file, ns=(0, 0))
+        self.assertIsNone(MusicMediaBlockIndex.from_file(self.html_file))
+        MusicMediaBlockIndex.open(self.html_file)
+        with open(block_index_path(self.html_file), 'r') as fp:
+            persisted = json.load(fp)
+        persisted['version'] = -1
+        with open(block_index_path(self.html_file), 'w') as fp:
+            json.dump(persisted, fp)
+        self.assertIsNone(MusicMediaBlockIndex.from_file(self.html_file))
+
+    def test_concurrent_saves(self):
+        block_index = MusicMediaBlockIndex.build(self.html_file)
+        saves = [threading.Thread(target=block_index.save) for _ in range(8)]
+        for save in saves:
+            save.start()
+        for save in saves:
+            save.join()
+        self.assertEqual(MusicMediaBlockIndex.from_file(self.html_file).entries, block_index.entries)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['music.html', 'music.index'])
+
+    def test_library_block_index(self):
+        block_index = MEDIA.html_block_index()
+        self.assertIs(MEDIA.html_block_index(), block_index)
+        MEDIA.to_html_file()
+        self.assertIsNot(MEDIA.html_block_index(), block_index)
+        self.assertTrue(MEDIA.html_block_index().is_current())
@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_files import write_file_atomically
+from app.musicmedia.musicmedia_journal import fcntl, journal_path, MusicMediaJournal
+from app.musicmedia.musicmedia_objects import Artists, LPs, MEDIA, MediaType
+
+from test_musicmedia_loader import clean_music_library
+
+
+def journal_change_as_worker(html_file, title, year, journaled, stop):
+    """ Journal a change to the year of an LP as another worker would, running until stopped. """
+    MEDIA.from_html_file(html_file, streaming=True)
+    MEDIA.open_journal(MusicMediaJournal(html_file, worker='other'))
+    lp = LPs().find_by_title(title)[0]
+    lp.year = year
+    MEDIA.mark_changed(lp)
+    journaled.set()
+    stop.wait()
+
+
+class MusicMediaJournalTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        self.load_journaled()
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_journal = None
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        MEDIA.changes_to_write = False
+        shutil.rmtree(self.temp_dir)
+
+    def load_journaled(self, **journal_args):
+        """ Load the html file and replay its journal as at startup. """
+        clean_music_library()
+        MEDIA._html_journal = None
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.journal = MusicMediaJournal(self.html_file, **journal_args)
+        return MEDIA.open_journal(self.journal)
+
+    def assertChangesSurviveRestart(self, applied_count):
+        library_html = MEDIA.to_html()
+        self.assertEqual(self.load_journaled(), applied_count)
+        self.assertEqual(MEDIA.to_html(), library_html)
+
+    def test_no_journal(self):
+        self.assertFalse(journal_path(self.html_file).exists())
+        self.assertEqual(self.journal.replay(), 0)
+        self.assertFalse(self.journal.compaction_due())
+
+    def test_changed_media_replayed_in_place(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.get_song_from_title('Jingle Bells').title = 'Jingle Bell Rock'
+        MEDIA.mark_changed(christmas)
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+
+        self.assertChangesSurviveRestart(2)
+        replayed_christmas = LPs().find_by_title('Christmas')[0]
+        self.assertEqual(replayed_christmas.index, christmas.index)
+        self.assertEqual(replayed_christmas.year, 1999)
+        self.assertIsNotNone(replayed_christmas.get_song_from_title('Jingle Bell Rock'))
+        self.assertTrue(MEDIA.changes_to_write)
+
+        # Changes after the replay follow on from the replayed ones
+        replayed_christmas.year = 2001
+        MEDIA.mark_changed(replayed_christmas)
+        self.assertChangesSurviveRestart(3)
+
+    def test_added_and_deleted_media_replayed(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        LPs.delete(christmas)
+        MEDIA.mark_changed(christmas)
+        new_lp = LPs.create(media_type=MediaType.LP, title='Not In The File', artists=[Artists.create_Artist('New Artist')], year=2000)
+        MEDIA.mark_changed(new_lp)
+
+        self.assertChangesSurviveRestart(2)
+        self.assertEqual(LPs().find_by_title('Christmas'), [])
+        self.assertEqual(LPs().find_by_title('Not In The File')[0].artists[0].name, 'New Artist')
+
+        # Deleting a journaled music media
+        new_lp = LPs().find_by_title('Not In The File')[0]
+        LPs.delete(new_lp)
+        MEDIA.mark_changed(new_lp)
+        self.assertChangesSurviveRestart(3)
+        self.assertEqual(LPs().find_by_title('Not In The File'), [])
+
+    def test_journal_grows_with_the_change(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+        self.assertEqual(self.journal.size, journal_path(self.html_file).stat().st_size)
+        self.assertLess(self.journal.size, 2 * len(christmas.to_html()))
+
+    def test_incomplete_record_discarded(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+        complete_size = self.journal.size
+        with open(journal_path(self.html_file), 'ab') as fp:
+            fp.write(b'{"op": "put", "media_type": "lp", "tar')
+
+        self.assertEqual(self.load_journaled(), 1)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+        self.assertEqual(journal_path(self.html_file).stat().st_size, complete_size)
+
+    def test_compaction(self):
+        self.load_journaled(max_bytes=1024 * 1024, max_age=3600)
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+        self.assertFalse(self.journal.compaction_due())
+        self.journal._first_change_time = time.time() - 3600
+        self.assertTrue(self.journal.compaction_due())
+
+        MEDIA.to_html_file()
+        self.assertEqual(journal_path(self.html_file).stat().st_size, 0)
+        self.assertFalse(self.journal.compaction_due())
+        self.assertChangesSurviveRestart(0)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+
+        self.load_journaled(max_bytes=1)
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 2001
+        MEDIA.mark_changed(christmas)
+        self.assertTrue(self.journal.compaction_due())
+
+    def test_change_while_written_kept(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+        moontan = LPs().find_by_title('Moontan')[0]
+
+        def change_while_written(filepath, chunks):
+            chunks = list(chunks)
+            if moontan.year != 1970:
+                moontan.year = 1970
+                MEDIA.mark_changed(moontan)
+            write_file_atomically(filepath, chunks)
+
+        # Moontan is changed after the library is rendered so only the journal holds the change
+        with patch('app.musicmedia.musicmedia_files.write_file_atomically', side_effect=change_while_written):
+            MEDIA.to_html_file()
+        self.assertGreater(journal_path(self.html_file).stat().st_size, 0)
+        self.assertEqual(self.journal.size, journal_path(self.html_file).stat().st_size)
+        self.assertChangesSurviveRestart(1)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+        self.assertEqual(LPs().find_by_title('Moontan')[0].year, 1970)
+
+        # The next write holds the kept change
+        MEDIA.to_html_file()
+        self.assertEqual(journal_path(self.html_file).stat().st_size, 0)
+        self.assertChangesSurviveRestart(0)
+        self.assertEqual(LPs().find_by_title('Moontan')[0].year, 1970)
+
+    def test_change_rendered_under_render_lock(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        journaled = threading.Event()
+
+        def journal_change():
+            self.journal.record_change(christmas)
+            journaled.set()
+
+        # A write of the html file holding the render lock keeps the change from filling the render cache under it
+        with MEDIA._render_lock:
+            journal_thread = threading.Thread(target=journal_change)
+            journal_thread.start()
+            self.assertFalse(journaled.wait(0.2))
+            self.assertIsNone(christmas._html)
+        journal_thread.join()
+        self.assertIn('1999', christmas._html)
+        self.assertChangesSurviveRestart(1)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+
+    @unittest.skipIf(fcntl is None, 'fcntl is not available')
+    def test_journal_per_worker(self):
+        self.load_journaled(worker='this')
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+
+        context = multiprocessing.get_context('fork')
+        journaled, stop = context.Event(), context.Event()
+        worker = context.Process(target=journal_change_as_worker, args=(self.html_file, 'Moontan', 1970, journaled, stop))
+        worker.start()
+        try:
+            self.assertTrue(journaled.wait(10))
+            # Writing out the html file leaves the journal of the running worker alone
+            MEDIA.to_html_file()
+            self.assertEqual(journal_path(self.html_file, 'this').stat().st_size, 0)
+            self.assertGreater(journal_path(self.html_file, 'other').stat().st_size, 0)
+            self.journal.close()
+            self.assertEqual(self.load_journaled(worker='next'), 0)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertEqual(worker.exitcode, 0)
+        self.journal.close()
+
+        # The journal of the stopped worker is replayed by the next worker and removed once written out
+        self.assertEqual(self.load_journaled(worker='last'), 1)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+        self.assertEqual(LPs().find_by_title('Moontan')[0].year, 1970)
+        MEDIA.to_html_file()
+        self.assertFalse(journal_path(self.html_file, 'other').exists())
+        self.assertFalse(journal_path(self.html_file, 'next').exists())
+        self.journal.close()
+        self.assertEqual(self.load_journaled(worker='after'), 0)
+        self.assertEqual(LPs().find_by_title('Moontan')[0].year, 1970)
+        self.journal.close()
+
+    def test_journal_already_in_html_file(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.mark_changed(christmas)
+        with open(journal_path(self.html_file), 'rb') as fp:
+            journal = fp.read()
+
+        # Stopped after writing out the html file but before emptying the journal
+        MEDIA.to_html_file()
+        with open(journal_path(self.html_file), 'wb') as fp:
+            fp.write(journal)
+        self.assertChangesSurviveRestart(0)
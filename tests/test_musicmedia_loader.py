@@ -0,0 +1,310 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia import musicmedia_loader
+from app.musicmedia.musicmedia_loader import (
+    HTML_PARSER,
+    iter_html_file_headers,
+    iter_html_file_records,
+    iter_html_file_records_parallel,
+    LXML_PARSER,
+    media_records_from_html,
+    parser_available,
+    PARSERS,
+    resolve_parser,
+    split_html_file
+)
+from app.musicmedia.musicmedia_objects import (
+    Artists,
+    CASSETTEs,
+    CDs,
+    ELPs,
+    LPs,
+    MEDIA,
+    MediaException,
+    MINI_CDs
+)
+
+
+def clean_music_library():
+    """ Remove all artists and music media from the library singletons. """
+    Artists._clean_artists()
+    LPs._clean_lps()
+    CASSETTEs._clean_cassettes()
+    CDs._clean_cds()
+    ELPs._clean_elps()
+    MINI_CDs._clean_mini_cds()
+
+
+def dump_music_library():
+    """ Return a plain structure of the whole library which can be compared between loads. """
+    def artist_name(artist):
+        return None if artist is None else (artist.index, artist.name)
+
+    def dump_media(media):
+        if media is None:
+            return None
+        return {'index': media.index,
+                'hash': media.hash,
+                'media_type': media.media_type,
+                'title': media.title,
+                'artists': [artist_name(artist) for artist in media.artists],
+                'artist_particles': media.artist_particles,
+                'classical_composers': None if media.classical_composers is None else [artist_name(artist) for artist in media.classical_composers],
+                'mixer': artist_name(media.mixer),
+                'year': media.year,
+                'tracks': [{'name': track.name,
+                            'track_artist': artist_name(track.track_artist),
+                            'side_mixer': artist_name(track.side_mixer),
+                            'track_year': track.track_year,
+                            'songs': [{'title': song.title,
+                                       'main_artist': artist_name(song.main_artist),
+                                       'exp_main_artist': song.exp_main_artist,
+                                       'main_artist_sequel': song.main_artist_sequel,
+                                       'additional_artists': None if song.additional_artists is None else
+                                       [(additional.prequel, artist_name(additional.artist), additional.sequel) for additional in song.additional_artists],
+                                       'album': song.album,
+                                       'classical_composers': None if song.classical_composers is None else [artist_name(artist) for artist in song.classical_composers],
+                                       'classical_work': song.classical_work,
+                                       'country': song.country,
+                                       'year': song.year,
+                                       'mix': song.mix,
+                                       'featured_in': song.featured_in,
+                                       'parts': song.parts} for song in track.song_list]} for track in media.tracks]}
+
+    def media_keys(media_set):
+        return sorted((media.media_type.value, media.index) for media in media_set)
+
+    artists = sorted(((artist.index, artist.name,
+                       media_keys(artist.lps | artist.cds | artist.cassettes | artist.elps | artist.mini_cds)) for artist in Artists().artists))
+    return {'artists': artists,
+            'lps': [dump_media(media) for media in LPs().lps],
+            'cassettes': [dump_media(media) for media in CASSETTEs().cassettes],
+            'cds': [dump_media(media) for media in CDs().cds],
+            'elps': [dump_media(media) for media in ELPs().elps],
+            'mini_cds': [dump_media(media) for media in MINI_CDs().mini_cds]}
+
+
+class MusicMediaLoaderTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+    LARGE_MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'music.html')
+
+    def tearDown(self):
+        clean_music_library()
+
+    def assert_loaders_match(self, filepath, parser=HTML_PARSER):
+        clean_music_library()
+        MEDIA.from_html_file(filepath)
+        tree_library = dump_music_library()
+        tree_html = MEDIA.to_html()
+
+        clean_music_library()
+        MEDIA.from_html_file(filepath, streaming=True, parser=parser)
+        self.assertEqual(tree_library, dump_music_library())
+        self.assertEqual(tree_html, MEDIA.to_html())
+
+    def test_streaming_load_matches_tree_load(self):
+        self.assert_loaders_match(self.MUSIC_HTML_FILE)
+
+    def test_streaming_load_matches_tree_load_large_file(self):
+        self.assert_loaders_match(self.LARGE_MUSIC_HTML_FILE)
+
+    def test_parser_backends_build_same_library(self):
+        for parser in PARSERS:
+            if parser_available(parser):
+                with self.subTest(parser=parser):
+                    self.assert_loaders_match(self.MUSIC_HTML_FILE, parser=parser)
+
+    def test_parser_backends_build_same_records_large_file(self):
+        # The html.parser backend is checked against the document tree loader above
+        html_parser_records = list(iter_html_file_records(self.LARGE_MUSIC_HTML_FILE, parser=HTML_PARSER))
+        self.assertEqual(len(html_parser_records), 1024)
+        for parser in PARSERS:
+            if parser != HTML_PARSER and parser_available(parser):
+                with self.subTest(parser=parser):
+                    self.assertEqual(html_parser_records, list(iter_html_file_records(self.LARGE_MUSIC_HTML_FILE, parser=parser)))
+
+    def test_parser_fallback(self):
+        with self.assertRaises(MediaException):
+            resolve_parser('html5')
+        if parser_available(LXML_PARSER):
+            self.assertEqual(resolve_parser(None), LXML_PARSER)
+        with patch.object(musicmedia_loader, 'etree', None):
+            self.assertFalse(parser_available(LXML_PARSER))
+            self.assertEqual(resolve_parser(None), HTML_PARSER)
+            self.assertEqual(resolve_parser(LXML_PARSER), HTML_PARSER)
+            self.assertEqual(len(list(iter_html_file_records(self.MUSIC_HTML_FILE, parser=LXML_PARSER))), 21)
+
+    def test_split_html_file(self):
+        with open(self.MUSIC_HTML_FILE, 'rb') as fp:
+            content = fp.read()
+        block_ranges = split_html_file(self.MUSIC_HTML_FILE, 4)
+        self.assertEqual(len(block_ranges), 4)
+        self.assertEqual(block_ranges[0][0], 0)
+        self.assertEqual(block_ranges[-1][1], len(content))
+        for (_, end), (start, _) in zip(block_ranges, block_ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertTrue(content[start:].startswith(b'<p>'))
+        self.assertEqual(len(split_html_file(self.MUSIC_HTML_FILE, 100)), 21)
+
+    def test_parallel_load_matches_serial_load(self):
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True)
+        serial_library = dump_music_library()
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, workers=3)
+        self.assertEqual(serial_library, dump_music_library())
+
+    def test_parallel_records_match_serial_records_large_file(self):
+        self.assertEqual(list(iter_html_file_records(self.LARGE_MUSIC_HTML_FILE)),
+                         list(iter_html_file_records_parallel(self.LARGE_MUSIC_HTML_FILE, workers=4)))
+
+    def test_header_records_match_full_records_large_file(self):
+        full_records = list(iter_html_file_records(self.LARGE_MUSIC_HTML_FILE))
+        header_records = [record for record, _ in iter_html_file_headers(self.LARGE_MUSIC_HTML_FILE)]
+        for record in full_records:
+            record['tracks'] = []
+        self.assertEqual(full_records, header_records)
+
+    def test_lazy_load(self):
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True)
+        eager_html = MEDIA.to_html()
+        eager_credits = {artist.name: sorted(media.title for media in artist.lps | artist.cds | artist.cassettes | artist.elps | artist.mini_cds)
+                         for artist in Artists().artists}
+
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, lazy=True)
+        self.assertTrue(all(lp._tracks_source is not None for lp in LPs().lps))
+        self.assertIsNone(Artists().find_artist('The Puppini Sisters'))
+
+        christmas = LPs().find_by_title('Christmas')[0]
+        self.assertEqual(christmas.get_song_from_title('Jingle Bells').additional_artists[0].artist.name, 'The Puppini Sisters')
+        self.assertIsNone(christmas._tracks_source)
+        self.assertEqual(len(Artists().find_artist('The Puppini Sisters').lps), 1)
+
+        self.assertEqual(eager_html, MEDIA.to_html())
+        lazy_credits = {artist.name: sorted(media.title for media in artist.lps | artist.cds | artist.cassettes | artist.elps | artist.mini_cds)
+                        for artist in Artists().artists}
+        self.assertEqual(eager_credits, lazy_credits)
+
+    def test_lazy_load_file_changed(self):
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True)
+        expected_tracks = [song.title for tracklist in LPs().find_by_title('Christmas')[0].tracks for song in tracklist.song_list]
+        temp_dir = tempfile.mkdtemp()
+        try:
+            html_file = os.path.join(temp_dir, 'music.html')
+            shutil.copyfile(self.MUSIC_HTML_FILE, html_file)
+            clean_music_library()
+            MEDIA.from_html_file(html_file, lazy=True)
+            with open(html_file, 'r') as fp:
+                content = fp.read()
+            # Move the blocks of the file around without changing the Christmas block
+            title_position = content.index('"title">Christmas<')
+            block_start = content.rindex('<p>', 0, title_position)
+            with open(html_file, 'w') as fp:
+                fp.write(content[:block_start] + '\n' + content[block_start:])
+            self.assertEqual([song.title for tracklist in LPs().find_by_title('Christmas')[0].tracks for song in tracklist.song_list], expected_tracks)
+        finally:
+            MEDIA._html_data_file = None
+            shutil.rmtree(temp_dir)
+
+    def test_lazy_load_block_gone(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            html_file = os.path.join(temp_dir, 'music.html')
+            shutil.copyfile(self.MUSIC_HTML_FILE, html_file)
+            clean_music_library()
+            MEDIA.from_html_file(html_file, lazy=True)
+            with open(html_file, 'r') as fp:
+                content = fp.read()
+            title_position = content.index('"title">Christmas<')
+            block_start = content.rindex('<p>', 0, title_position)
+            block_end = content.index('</p>', title_position) + len('</p>')
+            with open(html_file, 'w') as fp:
+                fp.write(content[:block_start] + content[block_end:])
+            with self.assertRaises(MediaException):
+                LPs().find_by_title('Christmas')[0].tracks
+        finally:
+            MEDIA._html_data_file = None
+            shutil.rmtree(temp_dir)
+
+    def test_lazy_load_write_back(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            html_file = os.path.join(temp_dir, 'music.html')
+            shutil.copyfile(self.MUSIC_HTML_FILE, html_file)
+            clean_music_library()
+            MEDIA.from_html_file(html_file, lazy=True)
+            MEDIA.to_html_file()
+            clean_music_library()
+            MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True)
+            with open(html_file, 'r') as fp:
+                self.assertEqual(MEDIA.to_html(), fp.read())
+        finally:
+            MEDIA._html_data_file = None
+            shutil.rmtree(temp_dir)
+
+    def test_bulk_load_matches_record_by_record_load(self):
+        records = list(iter_html_file_records(self.MUSIC_HTML_FILE))
+        clean_music_library()
+        for record in records:
+            MEDIA.from_record(record)
+        LPs.delete(LPs().find_by_title('Christmas')[0])
+        expected_library = dump_music_library()
+
+        # Load onto a library which already has artists, music media and holes
+        clean_music_library()
+        MEDIA.bulk_load(records[:10])
+        christmas = LPs().find_by_title('Christmas')[0]
+        LPs.delete(christmas)
+        loaded_media = MEDIA.bulk_load(records[10:])
+        self.assertEqual(expected_library, dump_music_library())
+        self.assertEqual([media.title for media in loaded_media], [record['title'] for record in records[10:]])
+
+        # Existing music media are reused
+        greatest_hits = LPs().find_by_title('Greatest Hits')[0]
+        greatest_hits_record = [record for record in records if record['title'] == 'Greatest Hits'][0]
+        self.assertIs(MEDIA.bulk_load([greatest_hits_record])[0], greatest_hits)
+        self.assertEqual(len(LPs().find_by_title('Greatest Hits')), 1)
+
+    def test_bulk_load_untrusted_records(self):
+        records = list(iter_html_file_records(self.MUSIC_HTML_FILE))
+        clean_music_library()
+        MEDIA.bulk_load(records, trusted=False)
+        self.assertEqual(LPs().length + CDs().length + ELPs().length + MINI_CDs().length + CASSETTEs().length, 21)
+
+        bad_records = copy.deepcopy(records)
+        bad_records[3]['tracks'][0]['songs'][0]['additional_artists'] = [['with ', '', '']]
+        bad_records[5]['year'] = '1999'
+        for bad_record in (bad_records[3], bad_records[5], {'media_type': 'dvd'}, {'media_type': 'lp', 'title': 'No Artist', 'artists': []}):
+            clean_music_library()
+            with self.assertRaises(MediaException):
+                MEDIA.bulk_load(records[:2] + [bad_record], trusted=False)
+            self.assertEqual(LPs().length, 0)
+            self.assertEqual(len(Artists().artists), 0)
+
+    def test_records_are_streamed_in_file_order(self):
+        records = list(iter_html_file_records(self.MUSIC_HTML_FILE))
+        self.assertEqual(len(records), 21)
+        christmas = [record for record in records if record['title'] == 'Christmas' and record['media_type'] == 'lp'][0]
+        self.assertEqual(christmas['artists'], ['Michael Buble'])
+        self.assertEqual(christmas['tracks'][0]['name'], 'Side A')
+        jingle_bells = [song for song in christmas['tracks'][0]['songs'] if song['title'] == 'Jingle Bells'][0]
+        self.assertEqual(jingle_bells['main_artist'], 'Michael Buble')
+        self.assertEqual(jingle_bells['additional_artists'][0][1], 'The Puppini Sisters')
+
+    def test_bad_media_block(self):
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                with self.assertRaises(ValueError):
+                    media_records_from_html('<p>\n<a rel="dvd"><h3><a rel="title">Bad</a></h3></a>\n</p>', parser=parser)
+                with self.assertRaises(MediaException):
+                    media_records_from_html('<p>\n<b><a rel="title">Bad</a></b>\n</p>', parser=parser)
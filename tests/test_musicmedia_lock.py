@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.musicmedia.musicmedia_lock import fcntl, read_version, version_path, write_lock, write_version
+from app.musicmedia.musicmedia_objects import LPs, MEDIA, StaleLibraryException
+from app.musicmedia.musicmedia_watcher import MusicMediaFileWatcher
+
+from test_musicmedia_loader import clean_music_library
+
+
+def edit_and_write(title, year):
+    """ Change the year of an LP and write out the library as a worker of the application would. """
+    LPs().find_by_title(title)[0].year = year
+    MEDIA.to_html_file()
+
+
+class MusicMediaLockTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        clean_music_library()
+        MEDIA.set_html_write_lock(True)
+
+    def tearDown(self):
+        MEDIA.set_html_write_lock(False)
+        MEDIA._html_version = None
+        MEDIA._html_file_watcher = None
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        clean_music_library()
+        shutil.rmtree(self.temp_dir)
+
+    def read(self):
+        with open(self.html_file, 'r') as fp:
+            return fp.read()
+
+    def load_worker(self, watched=True):
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        if watched:
+            MEDIA._html_file_watcher = MusicMediaFileWatcher(self.html_file, interval=0)
+
+    def write_by_other_worker(self, old, new):
+        html = self.read()
+        self.assertIn(old, html)
+        with open(self.html_file, 'w') as fp:
+            fp.write(html.replace(old, new))
+        write_version(self.html_file, read_version(self.html_file) + 1)
+
+    def test_version(self):
+        self.assertEqual(read_version(self.html_file), 0)
+        write_version(self.html_file, 7)
+        self.assertEqual(read_version(self.html_file), 7)
+        with open(version_path(self.html_file), 'w') as fp:
+            fp.write('not json')
+        self.assertEqual(read_version(self.html_file), 0)
+
+    def test_version_raised_on_write(self):
+        self.load_worker()
+        self.assertEqual(MEDIA._html_version, 0)
+        edit_and_write('Christmas', 1901)
+        edit_and_write('Christmas', 1903)
+        self.assertEqual(read_version(self.html_file), 2)
+        self.assertEqual(MEDIA._html_version, 2)
+
+    def test_stale_library_refreshed_before_writing(self):
+        self.load_worker()
+        self.write_by_other_worker('<a rel="title">Hemispheres</a>', '<a rel="title">Hemispheres Remastered</a>')
+        edit_and_write('Christmas', 1901)
+
+        html = self.read()
+        self.assertIn('Hemispheres Remastered', html)
+        self.assertIn('<a rel="date">1901</a>', html)
+        self.assertEqual(len(LPs().find_by_title('Hemispheres Remastered')), 1)
+        self.assertEqual(read_version(self.html_file), 2)
+
+    def test_stale_library_not_written_without_watcher(self):
+        self.load_worker(watched=False)
+        self.write_by_other_worker('<a rel="title">Hemispheres</a>', '<a rel="title">Hemispheres Remastered</a>')
+        html = self.read()
+        with self.assertRaises(StaleLibraryException):
+            edit_and_write('Christmas', 1901)
+        self.assertEqual(self.read(), html)
+        self.assertEqual(read_version(self.html_file), 1)
+
+    def test_conflicting_change_not_dropped(self):
+        self.load_worker()
+        hemispheres = LPs().find_by_title('Hemispheres')[0]
+        hemispheres.year = 1901
+        MEDIA.mark_changed(hemispheres)
+        self.write_by_other_worker('<a rel="title">Hemispheres</a>', '<a rel="title">Hemispheres Remastered</a>')
+        html = self.read()
+
+        # Neither the change in the file nor the change in the library is dropped
+        with self.assertRaises(StaleLibraryException):
+            edit_and_write('Christmas', 1902)
+        self.assertEqual(self.read(), html)
+        self.assertEqual(read_version(self.html_file), 1)
+        self.assertIs(LPs().find_by_title('Hemispheres')[0], hemispheres)
+        self.assertEqual(hemispheres.year, 1901)
+
+    def test_same_change_is_no_conflict(self):
+        self.load_worker()
+        hemispheres = LPs().find_by_title('Hemispheres')[0]
+        hemispheres.title = 'Hemispheres Remastered'
+        MEDIA.mark_changed(hemispheres)
+        self.write_by_other_worker('<a rel="title">Hemispheres</a>', '<a rel="title">Hemispheres Remastered</a>')
+        edit_and_write('Christmas', 1902)
+        self.assertEqual(len(LPs().find_by_title('Hemispheres Remastered')), 1)
+        self.assertEqual(read_version(self.html_file), 2)
+
+    def test_workers_keep_each_others_changes(self):
+        self.load_worker()
+        context = multiprocessing.get_context('fork')
+        for title, year in (('Christmas', 1901), ('Hemispheres', 1902)):
+            worker = context.Process(target=edit_and_write, args=(title, year))
+            worker.start()
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+        html = self.read()
+        self.assertIn('<a rel="date">1901</a>', html)
+        self.assertIn('<a rel="date">1902</a>', html)
+        self.assertEqual(read_version(self.html_file), 2)
+
+    @unittest.skipIf(fcntl is None, 'fcntl is not available')
+    def test_write_waits_for_lock(self):
+        self.load_worker()
+        writer = threading.Thread(target=edit_and_write, args=('Christmas', 1901))
+        with write_lock(self.html_file):
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            self.assertEqual(read_version(self.html_file), 0)
+        writer.join()
+        self.assertEqual(read_version(self.html_file), 1)
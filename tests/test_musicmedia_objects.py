@@ -1,9 +1,16 @@
 import os
+import shutil
+import tempfile
+import threading
 import unittest
+from unittest.mock import patch
 
 import pytest
 
+from app.musicmedia.musicmedia_backup import html_segments
+from app.musicmedia.musicmedia_index import MusicMediaBlockIndex
 from app.musicmedia.musicmedia_objects import (
+    _MEDIA,
     AdditionalArtist,
     ArtistException,
     Artists,
@@ -13,14 +20,18 @@ from app.musicmedia.musicmedia_objects import (
     LPs,
     LPException,
     MEDIA,
+    media_to_hash,
     MediaType,
     MINI_CDs,
+    normalize_artist_name,
     Song,
     SongException,
     TrackList,
     TrackListException
 )
 
+from test_musicmedia_loader import clean_music_library
+
 
 class MEDIATestCase(unittest.TestCase):
     """
@@ -82,6 +93,141 @@ class MEDIATestCase(unittest.TestCase):
         # set order is mutable over tests.
         self.assertSetEqual(set(['Disco D', 'Various Artists', '  Albums', '  ------', '']), set(str(artists_2).split('\n')))
 
+    def test_Artists_by_name(self):
+        Artists._clean_artists()
+        artist_1 = Artists.create_Artist('Disco D')
+        self.assertIs(Artists.create_Artist('Disco D'), artist_1)
+        self.assertEqual(len(Artists().artists), 1)
+
+        # Renames and deletes keep the lookup by name in step
+        artist_1.update_name('Disco E')
+        self.assertIsNone(Artists.find_artist('Disco D'))
+        self.assertIs(Artists.find_artist('Disco E'), artist_1)
+        artist_2 = Artists.create_Artist('Disco D')
+        self.assertIsNot(artist_2, artist_1)
+
+        # A name shared after a rename is handed over when its holder goes
+        artist_2.update_name('Disco E')
+        self.assertIs(Artists.find_artist('Disco E'), artist_1)
+        Artists.delete_artist(artist_1)
+        self.assertIs(Artists.find_artist('Disco E'), artist_2)
+        Artists.delete_artist(artist_2)
+        self.assertIsNone(Artists.find_artist('Disco E'))
+        self.assertEqual(Artists._artists_by_name, {})
+
+        # Bulk loaded artists are found by name
+        MEDIA.bulk_load([{'media_type': 'lp', 'title': 'Christmas', 'artists': ['Michael Buble'], 'artist_particles': [],
+                          'classical_composers': [], 'mixer': None, 'year': 2011, 'tracks': []}])
+        self.assertIs(Artists.find_artist('Michael Buble'), LPs().find_by_title('Christmas')[0].artists[0])
+        LPs._clean_lps()
+        Artists._clean_artists()
+
+    def test_normalized_artist_names(self):
+        self.assertEqual(normalize_artist_name('The Beatles'), 'beatles')
+        self.assertEqual(normalize_artist_name('Beatles, The'), 'beatles')
+        self.assertEqual(normalize_artist_name(' the  BEATLES '), 'beatles')
+        self.assertEqual(normalize_artist_name('Tiësto'), 'tiesto')
+        self.assertEqual(normalize_artist_name('The The'), 'the the')
+        self.assertEqual(normalize_artist_name('The, The'), 'the, the')
+
+    def test_Artists_normalized_matching(self):
+        normalized_matching = Artists._normalized_matching
+        self.addCleanup(Artists.set_normalized_matching, normalized_matching)
+        self.addCleanup(Artists._clean_artists)
+        Artists._clean_artists()
+
+        Artists.set_normalized_matching(False)
+        self.assertIsNot(Artists.create_Artist('The Beatles'), Artists.create_Artist('Beatles, The'))
+        Artists._clean_artists()
+
+        Artists.set_normalized_matching(True)
+        beatles = Artists.create_Artist('The Beatles')
+        self.assertIs(Artists.create_Artist('The Beatles'), beatles)
+        self.assertIs(Artists.create_Artist('Beatles, The').artist, beatles)
+        self.assertIs(Artists.create_Artist('the beatles ').artist, beatles)
+        self.assertIsNone(Artists.find_artist('Beatles, The'))
+        self.assertEqual(len(Artists().artists), 1)
+        self.assertNotEqual(normalize_artist_name('The The'), normalize_artist_name('The Beatles'))
+
+        # Credits keep the name they are given
+        credit = Artists.create_Artist('Beatles, The')
+        self.assertEqual(credit.name, 'Beatles, The')
+        self.assertEqual(credit.index, beatles.index)
+        self.assertTrue(Artists.artist_exists(credit))
+
+        # Aliases stand for the name of the artist
+        Artists.add_alias('Fab Four', 'The Beatles')
+        self.assertIs(Artists.create_Artist('The Fab Four').artist, beatles)
+        self.assertEqual(Artists.create_Artist('The Fab Four').name, 'The Fab Four')
+        Artists.add_alias('Ziggy Stardust', 'David Bowie')
+        self.assertEqual(Artists.create_Artist('Ziggy Stardust').artist.name, 'David Bowie')
+        self.assertIs(Artists.create_Artist('Ziggy Stardust').artist, Artists.find_artist('David Bowie'))
+
+        # Renamed artists are matched on their new name
+        beatles.update_name('The Quarrymen')
+        self.assertIs(Artists.create_Artist('Quarrymen').artist, beatles)
+        self.assertIsNot(Artists.create_Artist('The Beatles'), beatles)
+
+        # As are bulk loaded artists, keeping the name they are credited under
+        MEDIA.bulk_load([{'media_type': 'lp', 'title': 'Revolver', 'artists': ['Beatles, The'], 'artist_particles': [],
+                          'classical_composers': [], 'mixer': None, 'year': 1966, 'tracks': []},
+                         {'media_type': 'lp', 'title': 'Low', 'artists': ['david bowie'], 'artist_particles': [],
+                          'classical_composers': [], 'mixer': None, 'year': 1977, 'tracks': []}])
+        revolver = LPs().find_by_title('Revolver')[0]
+        self.assertEqual(revolver.artists[0].name, 'Beatles, The')
+        self.assertIs(revolver.artists[0].artist, Artists.find_artist('The Beatles'))
+        self.assertIn(revolver, Artists.find_artist('The Beatles').lps)
+        self.assertIn('<a rel="artist">Beatles, The</a>', revolver.to_html())
+        low = LPs().find_by_title('Low')[0]
+        self.assertEqual(low.artists[0].name, 'david bowie')
+        self.assertIn(low, Artists.find_artist('David Bowie').lps)
+        self.assertEqual(len(Artists().artists), 3)
+        LPs._clean_lps()
+        Artists._clean_artists()
+
+    def test_credit_keeps_spelling(self):
+        normalized_matching = Artists._normalized_matching
+        self.addCleanup(Artists.set_normalized_matching, normalized_matching)
+        Artists._clean_artists()
+        Artists.set_normalized_matching(True)
+        eagles = Artists.create_Artist('The Eagles')
+        credit = Artists.create_Artist('Eagles')
+        lp = LPs().create(MediaType.LP, 'Hotel California', artists=[credit], year=1976)
+        self.assertEqual(lp.artists[0].name, 'Eagles')
+        self.assertIn('<a rel="artist">Eagles</a>', lp.to_html())
+        self.assertIn(lp, eagles.lps)
+        self.assertEqual(len(Artists().artists), 1)
+
+        # Renaming a credit leaves the artist it is credited to in the dictionaries
+        credit.update_name('Eagles, The')
+        self.assertEqual(credit.name, 'Eagles, The')
+        self.assertEqual(eagles.name, 'The Eagles')
+        self.assertIs(Artists.find_artist('The Eagles'), eagles)
+        self.assertIsNone(Artists.find_artist('Eagles, The'))
+        self.assertIs(Artists._artists_by_key['eagles'], eagles)
+        LPs._clean_lps()
+        Artists._clean_artists()
+
+    def test_clean_artists_resets_matching(self):
+        Artists.set_normalized_matching(True)
+        Artists.add_alias('Fab Four', 'The Beatles')
+        Artists._clean_artists()
+        self.assertFalse(Artists._normalized_matching)
+        self.assertEqual(Artists._aliases, {})
+        self.assertEqual(Artists.create_Artist('Fab Four').name, 'Fab Four')
+        Artists._clean_artists()
+
+    def test_likely_duplicate_artists(self):
+        Artists._clean_artists()
+        marley = Artists.create_Artist('Bob Marley And The Wailers')
+        marley_and = Artists.create_Artist('Bob Marley & The Wailers')
+        hammer = Artists.create_Artist('MC Hammer')
+        hammer_dots = Artists.create_Artist('M.C. Hammer')
+        Artists.create_Artist('Madonna')
+        duplicates = Artists.likely_duplicates()
+        self.assertEqual([set(group) for group in duplicates], [{marley, marley_and}, {hammer, hammer_dots}])
+        Artists._clean_artists()
+
     def test_additional_artist(self):
         artist = Artists().create_Artist('Disco D')
         additional_artist = AdditionalArtist(artist, prequel=' and ')
@@ -308,6 +454,41 @@ class MEDIATestCase(unittest.TestCase):
         self.assertIsNotNone(artists.find_artist('The Movement'))
         self.assertEqual(artist_2, artists.find_artist('Dannii Minogue'))
 
+    def test_media_title_and_hash_indexes(self):
+        ELPs._clean_elps()
+        Artists._clean_artists()
+        minogue = Artists.create_Artist('Kylie Minogue')
+        various = Artists.create_Artist('Various Artists')
+        fever = ELPs.create(MediaType.ELP, 'Fever', artists=[minogue], year=2001)
+        fever_2 = ELPs.create(MediaType.ELP, 'Fever', artists=[various], year=1995)
+        self.assertEqual(ELPs.find_by_title('Fever'), [fever, fever_2])
+        self.assertIs(ELPs.find_by_hash(media_to_hash(MediaType.ELP, 'Fever', 'Kylie Minogue')), fever)
+        self.assertIs(ELPs.create(MediaType.ELP, 'Fever', artists=[minogue], year=2001), fever)
+
+        # Title and main artist changes move the media in the indexes
+        fever.title = 'Light Years'
+        self.assertEqual(ELPs.find_by_title('Fever'), [fever_2])
+        self.assertEqual(ELPs.find_by_title('Light Years'), [fever])
+        self.assertIsNone(ELPs.find_by_hash(media_to_hash(MediaType.ELP, 'Fever', 'Kylie Minogue')))
+        self.assertIs(ELPs.create(MediaType.ELP, 'Light Years', artists=[minogue], year=2000), fever)
+        fever_2.artists = [minogue]
+        self.assertIs(ELPs.find_by_hash(media_to_hash(MediaType.ELP, 'Fever', 'Kylie Minogue')), fever_2)
+        self.assertIsNone(ELPs.find_by_hash(media_to_hash(MediaType.ELP, 'Fever', 'Various Artists')))
+
+        # Deleted media leave the indexes
+        ELPs.delete(fever)
+        self.assertFalse(ELPs.exists(fever))
+        self.assertEqual(ELPs.find_by_title('Light Years'), [])
+        self.assertIsNone(ELPs.find_by_hash(fever.hash))
+        self.assertIsNot(ELPs.create(MediaType.ELP, 'Light Years', artists=[minogue], year=2000), fever)
+
+        # Bulk loaded media are indexed
+        MEDIA.bulk_load([{'media_type': 'elp', 'title': 'Fever', 'artists': ['Various Artists'], 'artist_particles': [],
+                          'classical_composers': [], 'mixer': None, 'year': 1995, 'tracks': []}])
+        self.assertEqual(len(ELPs.find_by_title('Fever')), 2)
+        ELPs._clean_elps()
+        Artists._clean_artists()
+
     def test_read_lps_html(self):
         # Test the reading of a music html file to extract all the LPs
         all_artists = Artists()
@@ -368,6 +549,92 @@ class MEDIATestCase(unittest.TestCase):
 
         self.assertListEqual(all_lps.find_by_year(1974), [whos_zoo, moontan, know_your_jazz, not_fragile])
 
+    def test_find_by_year_range(self):
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE)
+        self.assertEqual([(lp.year, lp.title) for lp in LPs.find_by_year_range(1970, 1979)],
+                         [(1972, 'Greatest Hits'), (1974, "Who's Zoo"), (1974, 'Moontan'), (1974, 'Know Your Jazz'), (1974, 'Not Fragile'),
+                          (1978, "Sgt. Pepper's Lonely Hearts Club Band"), (1978, 'Hemispheres')])
+        self.assertEqual(LPs.find_by_year_range(1980, 1989), [])
+        self.assertEqual(MINI_CDs.find_by_year(1994), MINI_CDs.find_by_year_range(1994, 1994))
+        self.assertEqual(len(CASSETTEs.find_by_year(None)), 1)
+
+        # Across all media types, ordered by year
+        found = MEDIA.find_by_year_range(1978, 1996)
+        self.assertEqual([(media.media_type, media.year) for media in found],
+                         [(MediaType.LP, 1978), (MediaType.LP, 1978), (MediaType.ELP, 1984), (MediaType.MINI_CD, 1994), (MediaType.CD, 1996)])
+        self.assertEqual(MEDIA.find_by_year_range(1978, 1996, media_types=[MediaType.ELP]), ELPs.find_by_year_range(1978, 1996))
+
+        # Year changes and deletes keep the years in step
+        hemispheres = LPs.find_by_title('Hemispheres')[0]
+        hemispheres.year = 1985
+        self.assertEqual(LPs.find_by_year_range(1980, 1989), [hemispheres])
+        self.assertNotIn(hemispheres, LPs.find_by_year(1978))
+        LPs.delete(hemispheres)
+        self.assertEqual(LPs.find_by_year_range(1980, 1989), [])
+        self.assertNotIn(1985, LPs._years)
+        clean_music_library()
+
+    def test_normalized_matching_keeps_html(self):
+        music_html_file = os.path.join(self.DATA_DIR, 'music.html')
+        normalized_matching = Artists._normalized_matching
+        self.addCleanup(Artists.set_normalized_matching, normalized_matching)
+        clean_music_library()
+        Artists.set_normalized_matching(False)
+        MEDIA.from_html_file(music_html_file)
+        html = MEDIA.to_html()
+        artist_count = len(Artists().artists)
+        for streaming in (False, True):
+            clean_music_library()
+            Artists.set_normalized_matching(True)
+            MEDIA.from_html_file(music_html_file, streaming=streaming)
+            self.assertLess(len(Artists().artists), artist_count)
+            self.assertEqual(MEDIA.to_html(), html)
+        clean_music_library()
+
+    def test_find_songs(self):
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE)
+        sgt_pepper = LPs.find_by_title("Sgt. Pepper's Lonely Hearts Club Band")[0]
+        diamonds = CDs.find_by_title('Diamonds')[0]
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds'), [(sgt_pepper, 0, 4), (diamonds, 2, 1)])
+        self.assertEqual(MEDIA.find_songs('  lucy in the sky  with diamonds'), [(sgt_pepper, 0, 4), (diamonds, 2, 1)])
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds', artist='Elton John'), [(diamonds, 2, 1)])
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds', artist='The Beatles'), [])
+
+        # Added, renamed and removed songs are kept in the index
+        track = diamonds.tracks[2]
+        lucy = track.song_list[1]
+        lucy.title = 'Lucy In The Sky'
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds'), [(sgt_pepper, 0, 4)])
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky'), [(diamonds, 2, 1)])
+        track.remove_song(lucy)
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky'), [])
+        track.add_song(Song('Lucy In The Sky With Diamonds'))
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds', artist='Elton John'), [(diamonds, 2, len(track.song_list) - 1)])
+
+        # Changes flagged on the music media, as made by the routes, are kept in the index
+        del sgt_pepper.tracks[0].song_list[4]
+        MEDIA.mark_changed(sgt_pepper)
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds'), [(diamonds, 2, len(track.song_list) - 1)])
+
+        # As are new and deleted music media
+        tracklist = TrackList()
+        tracklist.add_song(Song('Lucy In The Sky With Diamonds'))
+        album = LPs.create(MediaType.LP, 'Lucy', artists=[Artists.create_Artist('The Beatles')], year=1967)
+        album.add_track(tracklist)
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds', artist='Beatles, The'), [(album, 0, 0)])
+        CDs.delete(diamonds)
+        self.assertEqual(MEDIA.find_songs('Lucy In The Sky With Diamonds'), [(album, 0, 0)])
+        clean_music_library()
+
+        # The songs of lazily loaded music media are indexed once each
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True, lazy=True)
+        self.assertEqual(len(MEDIA.find_songs('Lucy In The Sky With Diamonds')), 2)
+        self.assertEqual(sum(len(titled_media) for titled_media in MEDIA._songs_by_title.values()),
+                         sum(len(song_titles) for song_titles in MEDIA._song_titles_by_media.values()))
+        clean_music_library()
+
     def test_read_cds_html(self):
         # Test the reading of a music html file to extract all the CDs
         all_artists = Artists()
@@ -505,4 +772,159 @@ class MEDIATestCase(unittest.TestCase):
         self.maxDiff = None
         self.assertEqual(file_html, html_representation)
 
-        # assert (False)  # nosec
\ No newline at end of file
+        # assert (False)  # nosec
+
+
+class MEDIAWriteTestCase(unittest.TestCase):
+    """ Test writing out the library only renders the music media changed since the last write. """
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        self.clean_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        MEDIA.to_html_file()
+
+    def tearDown(self):
+        self.clean_library()
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        MEDIA.changes_to_write = False
+        shutil.rmtree(self.temp_dir)
+
+    def clean_library(self):
+        Artists._clean_artists()
+        LPs._clean_lps()
+        CASSETTEs._clean_cassettes()
+        CDs._clean_cds()
+        ELPs._clean_elps()
+        MINI_CDs._clean_mini_cds()
+
+    def write_html_file(self):
+        """ Write out the library and return the music media rendered and the file content. """
+        with patch.object(_MEDIA, 'to_html', autospec=True, side_effect=_MEDIA.to_html) as media_to_html:
+            MEDIA.to_html_file()
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        self.assertEqual(html, MEDIA.to_html())
+        return [call.args[0] for call in media_to_html.call_args_list], html
+
+    def test_unchanged_library_not_rendered(self):
+        rendered, _ = self.write_html_file()
+        self.assertEqual(rendered, [])
+
+    def test_only_changed_media_rendered(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.get_song_from_title('Jingle Bells').title = 'Jingle Bell Rock'
+        MEDIA.mark_changed(christmas)
+        self.assertTrue(MEDIA.changes_to_write)
+        rendered, html = self.write_html_file()
+        self.assertEqual(rendered, [christmas])
+        self.assertIn('Jingle Bell Rock', html)
+
+    def test_property_changes_rendered(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        moontan = LPs().find_by_title('Moontan')[0]
+        moontan.title = 'Moontan (Remastered)'
+        rendered, html = self.write_html_file()
+        self.assertEqual(set(rendered), {christmas, moontan})
+        self.assertIn('Moontan (Remastered)', html)
+
+    def test_artist_rename_rendered(self):
+        artist = Artists().find_artist('Various Artists')
+        artist.update_name('Various')
+        rendered, _ = self.write_html_file()
+        self.assertEqual(set(rendered), artist.lps | artist.cds | artist.cassettes | artist.elps | artist.mini_cds)
+
+    def test_new_and_deleted_media(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        LPs.delete(christmas)
+        new_lp = LPs.create(media_type=MediaType.LP, title='New LP', artists=[Artists.create_Artist('New Artist')], year=2001)
+        rendered, html = self.write_html_file()
+        self.assertEqual(rendered, [new_lp])
+        self.assertNotIn('<a rel="title">Christmas</a>', html)
+
+    def test_iter_html(self):
+        fragments = list(MEDIA.iter_html())
+        self.assertGreater(len(fragments), len(MEDIA._media_blocks()) * 2)
+        self.assertEqual(''.join(fragments), MEDIA.to_html())
+        christmas = LPs().find_by_title('Christmas')[0]
+        self.assertEqual(''.join(christmas.iter_html()), christmas.to_html())
+        self.assertEqual(''.join(christmas.tracks[0].iter_html()), christmas.tracks[0].to_html())
+        self.assertEqual(''.join(LPs.iter_html()), LPs.to_html())
+
+    def test_written_a_block_at_a_time(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        written = []
+        with patch('app.musicmedia.musicmedia_files.write_file_atomically', side_effect=lambda filepath, chunks: written.extend(chunks)):
+            MEDIA.to_html_file()
+        self.assertEqual(len(written), len(MEDIA._media_blocks()) + 1)
+        self.assertEqual(html_segments(b''.join(written)), written)
+        self.assertEqual(b''.join(written).decode(), MEDIA.to_html())
+
+    def test_rendered_as_written(self):
+        for media, _ in MEDIA._media_blocks():
+            media._html = None
+        last_media = MEDIA._written_media()[-1]
+        rendered_before_end = []
+
+        def write_file_atomically(filepath, chunks):
+            chunks = iter(chunks)
+            next(chunks)
+            next(chunks)
+            rendered_before_end.append(last_media._html is not None)
+            list(chunks)
+
+        # The blocks are rendered as they are written rather than all up front
+        with patch('app.musicmedia.musicmedia_files.write_file_atomically', side_effect=write_file_atomically):
+            MEDIA.to_html_file()
+        self.assertEqual(rendered_before_end, [False])
+        self.assertIsNotNone(last_media._html)
+
+    def test_parallel_render(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        media_count = len(MEDIA._media_blocks())
+        for media, _ in MEDIA._media_blocks():
+            media._html = None
+
+        # Too few music media to pay off
+        self.assertFalse(MEDIA._render_parallel(workers=2, threshold=media_count + 1))
+        self.assertFalse(MEDIA._render_parallel(workers=1, threshold=0))
+        self.assertIsNone(christmas._html)
+
+        self.assertTrue(MEDIA._render_parallel(workers=2, threshold=media_count))
+        with patch.object(_MEDIA, 'to_html', side_effect=AssertionError('Rendered serially')):
+            media_blocks = MEDIA._media_blocks()
+        self.assertEqual(len(media_blocks), media_count)
+        self.assertEqual(MEDIA.HTML_HEADER + ''.join(html for _, html in media_blocks) + MEDIA.HTML_CLOSER, MEDIA.to_html())
+        self.assertIn('<a rel="date">1999</a>', christmas._html)
+
+    def test_no_parallel_render_with_other_threads(self):
+        media_count = len(MEDIA._media_blocks())
+        for media, _ in MEDIA._media_blocks():
+            media._html = None
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            # Forking with another thread running, such as the background writer, could deadlock the workers
+            self.assertFalse(MEDIA._render_parallel(workers=2, threshold=media_count))
+        finally:
+            stop.set()
+            thread.join()
+        self.assertTrue(all(media._html is None for media in MEDIA._written_media()))
+
+    def test_block_index_from_write(self):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        self.write_html_file()
+        block_index = MEDIA.html_block_index()
+        self.assertEqual(block_index.entries, MusicMediaBlockIndex.build(self.html_file).entries)
+        self.assertTrue(block_index.block_matches(christmas))
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.musicmedia.musicmedia_objects import Artists, MEDIA
+from app.musicmedia.musicmedia_profile import format_load_report
+
+from test_musicmedia_loader import clean_music_library, dump_music_library
+
+
+class MusicMediaProfileTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_snapshot = False
+        MEDIA._html_data_file = None
+
+    def assertReportMatchesLibrary(self, report):
+        self.assertEqual(sum(report['media'].values()), 21)
+        self.assertEqual(report['artists']['total'], len(Artists().artists))
+        self.assertEqual(report['artists']['created'], len(Artists().artists))
+        self.assertGreater(report['seconds'], 0)
+
+    def test_no_report_unless_profiled(self):
+        self.assertIsNone(MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True))
+        self.assertIsNone(MEDIA._load_profile)
+
+    def test_tree_load_report(self):
+        report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, profile=True)
+        self.assertEqual(report['loader'], 'tree')
+        self.assertEqual(set(report['phases']), {'read', 'parse', 'media_metadata', 'song_artists', 'artist_lookup', 'create'})
+        self.assertEqual(report['phases']['media_metadata']['calls'], 21)
+        self.assertEqual(report['phases']['create']['calls'], 21)
+        self.assertEqual(report['phases']['read']['calls'], 1)
+        self.assertReportMatchesLibrary(report)
+        self.assertEqual(report['artists']['created'] + report['artists']['reused'], report['phases']['artist_lookup']['calls'])
+        self.assertIsNone(report['peak_traced_bytes'])
+
+    def test_stream_load_report(self):
+        tree_report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, profile=True)
+        tree_library = dump_music_library()
+        clean_music_library()
+        report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True, profile=True)
+        self.assertEqual(tree_library, dump_music_library())
+
+        self.assertEqual(report['loader'], 'stream')
+        self.assertEqual(set(report['phases']), {'parse', 'build', 'artist_lookup', 'commit'})
+        self.assertEqual(report['phases']['build']['calls'], 21)
+        self.assertReportMatchesLibrary(report)
+        self.assertEqual(report['media'], tree_report['media'])
+        self.assertEqual(report['songs'], tree_report['songs'])
+        self.assertGreater(report['songs'], 0)
+
+    def test_lazy_load_report(self):
+        report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, lazy=True, profile=True)
+        self.assertEqual(report['loader'], 'lazy')
+        self.assertEqual(report['songs'], 0)
+        self.assertReportMatchesLibrary(report)
+
+    def test_snapshot_load_report(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            html_file = os.path.join(temp_dir, 'music.html')
+            shutil.copyfile(self.MUSIC_HTML_FILE, html_file)
+            report = MEDIA.from_html_file(html_file, streaming=True, snapshot=True, profile=True)
+            self.assertIn('snapshot_write', report['phases'])
+            clean_music_library()
+            report = MEDIA.from_html_file(html_file, streaming=True, snapshot=True, profile=True)
+            self.assertEqual(report['loader'], 'snapshot')
+            self.assertEqual(set(report['phases']), {'snapshot_read', 'snapshot_restore'})
+            self.assertReportMatchesLibrary(report)
+            self.assertEqual(report['artists']['reused'], 0)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_memory_report(self):
+        report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True, profile=True, profile_memory=True)
+        self.assertGreater(report['peak_traced_bytes'], 0)
+
+    def test_format_load_report(self):
+        report = MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True, profile=True)
+        text = format_load_report(report)
+        self.assertIn('with the stream loader', text)
+        self.assertIn('artist_lookup', text)
+        self.assertIn('artists: {} created'.format(len(Artists().artists)), text)
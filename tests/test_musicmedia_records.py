@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_loader import iter_html_file_records
+from app.musicmedia.musicmedia_objects import LPs, MEDIA
+from app.musicmedia.musicmedia_records import (
+    compact_record,
+    expand_record,
+    html_to_records_file,
+    iter_records_file,
+    msgpack,
+    records_path,
+    resolve_storage_format
+)
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaRecordsTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        self.records = list(iter_html_file_records(self.MUSIC_HTML_FILE))
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._storage_format = 'html'
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, filepath):
+        with open(filepath, 'rb') as fp:
+            return fp.read()
+
+    def test_resolve_storage_format(self):
+        self.assertEqual(resolve_storage_format(), 'html')
+        self.assertEqual(resolve_storage_format('jsonl'), 'jsonl')
+        if msgpack is None:
+            with self.assertRaises(ValueError):
+                resolve_storage_format('msgpack')
+        else:
+            self.assertEqual(resolve_storage_format('msgpack'), 'msgpack')
+        with patch('app.musicmedia.musicmedia_records.msgpack', None):
+            with self.assertRaises(ValueError):
+                resolve_storage_format('msgpack')
+        with self.assertRaises(ValueError):
+            resolve_storage_format('xml')
+        self.assertEqual(records_path(self.html_file, 'jsonl').name, 'music.jsonl')
+
+    def test_compact_record(self):
+        for record in self.records:
+            compacted = compact_record(record)
+            self.assertLess(len(json.dumps(compacted)), len(json.dumps(record)))
+            self.assertEqual(expand_record(json.loads(json.dumps(compacted))), record)
+        christmas = compact_record(next(record for record in self.records if record['title'] == 'Christmas'))
+        self.assertNotIn('mixer', christmas)
+        self.assertNotIn('main_artist', christmas['tracks'][0]['songs'][0])
+
+    def test_media_to_record(self):
+        MEDIA.bulk_load(self.records)
+        christmas = LPs().find_by_title('Christmas')[0]
+        self.assertEqual(christmas.to_record(), next(record for record in self.records if record['title'] == 'Christmas'))
+
+    def convert_both_ways(self, suffix):
+        records_file = os.path.join(self.temp_dir, 'music' + suffix)
+        self.assertEqual(html_to_records_file(self.MUSIC_HTML_FILE, records_file), len(self.records))
+        self.assertEqual(list(iter_records_file(records_file)), self.records)
+
+        # The library written back out is the same as the library written from the html file
+        MEDIA.from_records_file(records_file)
+        from_records = MEDIA.to_html()
+        clean_music_library()
+        MEDIA.from_html_file(self.MUSIC_HTML_FILE, streaming=True)
+        self.assertEqual(from_records, MEDIA.to_html())
+
+    def test_jsonl_round_trip(self):
+        self.convert_both_ways('.jsonl')
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        self.convert_both_ways('.msgpack')
+
+    def test_not_a_records_file(self):
+        with self.assertRaises(ValueError):
+            list(iter_records_file(self.html_file))
+        records_file = os.path.join(self.temp_dir, 'music.jsonl')
+        for content in (b'', b'{"format": "musicmedia-records", "version": 99}\n', b'{"title": "Christmas"}\n'):
+            with open(records_file, 'wb') as fp:
+                fp.write(content)
+            with self.assertRaises(ValueError):
+                list(iter_records_file(records_file))
+
+    def test_library_stored_in_records_file(self):
+        MEDIA.set_storage_format('jsonl')
+        records_file = records_path(self.html_file, 'jsonl')
+
+        # Moved to the records file on the first load
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(list(iter_records_file(records_file)), [media.to_record() for media, _ in MEDIA._media_blocks()])
+
+        # Written out with the html export
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        MEDIA.to_html_file()
+        html = self.read(self.html_file)
+        self.assertIn(b'<a rel="date">1999</a>', html)
+        self.assertGreaterEqual(os.stat(records_file).st_mtime_ns, os.stat(self.html_file).st_mtime_ns)
+
+        # Loaded from the records file without parsing the html file
+        clean_music_library()
+        with patch('app.musicmedia.musicmedia_loader.iter_html_file_records', side_effect=AssertionError('Parsed the html file')):
+            self.assertEqual(MEDIA.from_html_file(self.html_file, streaming=True, profile=True)['loader'], 'records')
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+        self.assertEqual(MEDIA.to_html().encode(), html)
+
+    def test_html_file_changed_by_hand(self):
+        MEDIA.set_storage_format('jsonl')
+        records_file = records_path(self.html_file, 'jsonl')
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        clean_music_library()
+
+        html = self.read(self.html_file).replace(b'<a rel="date">2011</a>', b'<a rel="date">2012</a>', 1)
+        with open(self.html_file, 'wb') as fp:
+            fp.write(html)
+        os.utime(self.html_file, ns=(os.stat(records_file).st_mtime_ns + 1000000, os.stat(records_file).st_mtime_ns + 1000000))
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 2012)
+        self.assertIn(2012, [record['year'] for record in iter_records_file(records_file)])
+
+    def test_html_file_generated_when_missing(self):
+        MEDIA.set_storage_format('jsonl')
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        html = MEDIA.to_html().encode()
+        clean_music_library()
+
+        os.remove(self.html_file)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(self.read(self.html_file), html)
+        self.assertEqual(len(LPs().find_by_title('Christmas')), 1)
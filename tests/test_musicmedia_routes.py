@@ -9,6 +9,8 @@ from app.app import db
 from app.demo_helpers import load_demo_data
 from app.models import User
 from app.musicmedia.musicmedia_objects import Artists, LPs, MEDIA
+from app.musicmedia.musicmedia_writer import MusicMediaWriter
+import config
 
 
 class MusicMediaRoutesTestCase(unittest.TestCase):
@@ -211,6 +213,43 @@ class MusicMediaRoutesTestCase(unittest.TestCase):
         self.assertIn(b'Music Media Library LPs Main Page', response.data)
         self.assertIn(b'Add New LP To Music Media Library', response.data)
 
+    def test_load_report(self):
+        """ Check the report of loading the music media library at startup """
+        load_report = self.app.music_media_load_report
+        try:
+            self.app.music_media_load_report = None
+            response = self.client.get('/load-report', follow_redirects=True)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+            self.app.music_media_load_report = {'loader': 'stream', 'media': {'lp': 9}}
+            response = self.client.get('/load-report', follow_redirects=True)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.json, {'loader': 'stream', 'media': {'lp': 9}})
+        finally:
+            self.app.music_media_load_report = load_report
+
+    def test_write_status(self):
+        """ Check the state of the background writer of the music media library """
+        response = self.client.get('/write-status', follow_redirects=True)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+        MEDIA.set_html_writer(MusicMediaWriter('music.html'))
+        try:
+            response = self.client.get('/write-status', follow_redirects=True)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(response.json['writes'], 0)
+            self.assertEqual(response.json['pending'], 0)
+            self.assertFalse(response.json['running'])
+        finally:
+            MEDIA.set_html_writer(None)
+
+    def test_diagnostics_only_in_development(self):
+        """ Check the diagnostics of the music media library are not served in the deployments """
+        self.assertTrue(config.DevConfig.MUSIC_MEDIA_DIAGNOSTICS)
+        self.assertFalse(config.StagingConfig.MUSIC_MEDIA_DIAGNOSTICS)
+        self.assertFalse(config.ProductionConfig.MUSIC_MEDIA_DIAGNOSTICS)
+
     def test_add_lp(self):
         """ Check we can add an LP to the list of LPs """
 
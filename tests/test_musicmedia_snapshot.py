@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_objects import LPs, MEDIA
+from app.musicmedia.musicmedia_snapshot import snapshot_path, SNAPSHOT_VERSION, write_snapshot
+from test_musicmedia_loader import clean_music_library, dump_music_library
+
+
+class MusicMediaSnapshotTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._html_snapshot = False
+        MEDIA._html_data_file = None
+        shutil.rmtree(self.temp_dir)
+
+    def load_from_snapshot(self):
+        """ Reload the library and return if it came from the snapshot. """
+        clean_music_library()
+        with patch.object(MEDIA, '_from_html_stream', wraps=MEDIA._from_html_stream) as from_html_stream:
+            MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        return not from_html_stream.called
+
+    def test_snapshot_written_and_loaded(self):
+        self.assertFalse(snapshot_path(self.html_file).exists())
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        self.assertTrue(snapshot_path(self.html_file).exists())
+        self.assertEqual(snapshot_path(self.html_file).name, 'music.snapshot')
+        library = dump_music_library()
+
+        self.assertTrue(self.load_from_snapshot())
+        self.assertEqual(library, dump_music_library())
+
+    def test_snapshot_without_snapshots_enabled(self):
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertFalse(snapshot_path(self.html_file).exists())
+
+    def test_stale_snapshot(self):
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+
+        # Same content but a new modification time
+        later = time.time() + 10
+        os.utime(self.html_file, (later, later))
+        self.assertFalse(self.load_from_snapshot())
+
+        # Snapshot was refreshed by the reload
+        self.assertTrue(self.load_from_snapshot())
+
+        # Changed content with the same size and modification time
+        file_stat = os.stat(self.html_file)
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        with open(self.html_file, 'w') as fp:
+            fp.write(html.replace('Christmas', 'Christmaz'))
+        os.utime(self.html_file, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+        self.assertFalse(self.load_from_snapshot())
+        self.assertEqual(len(LPs().find_by_title('Christmaz')), 1)
+
+    def test_unreadable_snapshot(self):
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        library = dump_music_library()
+        with open(snapshot_path(self.html_file), 'wb') as fp:
+            fp.write(b'not a snapshot')
+        self.assertFalse(self.load_from_snapshot())
+        self.assertEqual(library, dump_music_library())
+
+    def test_snapshot_version(self):
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        with patch('app.musicmedia.musicmedia_snapshot.SNAPSHOT_VERSION', SNAPSHOT_VERSION + 1):
+            self.assertFalse(self.load_from_snapshot())
+
+    def test_snapshot_without_render_caches(self):
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        MEDIA.to_html_file()
+        self.assertTrue(all(lp._html is not None for lp in LPs().lps if lp is not None))
+        write_snapshot(self.html_file)
+
+        self.assertTrue(self.load_from_snapshot())
+        self.assertTrue(all(lp._html is None and lp._record_cache is None for lp in LPs().lps if lp is not None))
+
+    def test_snapshot_keeps_index_holes(self):
+        MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        christmas = LPs().find_by_title('Christmas')[0]
+        LPs.delete(christmas)
+        MEDIA.to_html_file()
+        library = dump_music_library()
+        self.assertIn(None, library['lps'])
+
+        self.assertTrue(self.load_from_snapshot())
+        self.assertEqual(library, dump_music_library())
+        self.assertIsNone(LPs().lps[christmas.index])
+
+    def test_snapshots_written_at_the_same_time(self):
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        library = dump_music_library()
+        writers = [threading.Thread(target=write_snapshot, args=(self.html_file,)) for _ in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['music.html', 'music.snapshot'])
+        self.assertTrue(self.load_from_snapshot())
+        self.assertEqual(library, dump_music_library())
+
+    def test_unwritable_snapshot(self):
+        with patch('app.musicmedia.musicmedia_snapshot.write_file_atomically', side_effect=PermissionError('read only')):
+            with self.assertLogs('app.musicmedia.musicmedia_snapshot', level='WARNING'):
+                MEDIA.from_html_file(self.html_file, streaming=True, snapshot=True)
+        self.assertFalse(snapshot_path(self.html_file).exists())
+        self.assertEqual(len(LPs().find_by_title('Christmas')), 1)
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, func, select
+
+from app.musicmedia.musicmedia_loader import iter_html_file_records
+from app.musicmedia.musicmedia_objects import CDs, LPs, MEDIA
+from app.musicmedia.musicmedia_sql import MEDIA_TABLE, MusicMediaSQLStore, SONG
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaSQLStoreTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        self.store = MusicMediaSQLStore(create_engine('sqlite:///' + os.path.join(self.temp_dir, 'music.db')))
+        self.store.create_tables()
+
+    def tearDown(self):
+        clean_music_library()
+        MEDIA._storage_format = 'html'
+        MEDIA._sql_store = None
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        self.store.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def count(self, table):
+        with self.store.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(table)).scalar()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.store.modified_ns())
+        records = list(iter_html_file_records(self.MUSIC_HTML_FILE))
+        MEDIA.bulk_load(records)
+        html = MEDIA.to_html()
+        self.assertEqual(self.store.save(MEDIA._media_blocks()), {'written': len(records), 'moved': 0, 'deleted': 0})
+        self.assertIsNotNone(self.store.modified_ns())
+        self.assertEqual(list(self.store.iter_records()), [media.to_record() for media, _ in MEDIA._media_blocks()])
+
+        clean_music_library()
+        MEDIA.bulk_load(self.store.iter_records())
+        self.assertEqual(MEDIA.to_html(), html)
+
+    def test_only_changes_saved(self):
+        MEDIA.bulk_load(iter_html_file_records(self.MUSIC_HTML_FILE))
+        self.store.save(MEDIA._media_blocks())
+        song_count = self.count(SONG)
+        self.assertEqual(self.store.save(MEDIA._media_blocks()), {'written': 0, 'moved': 0, 'deleted': 0})
+
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1999
+        self.assertEqual(self.store.save(MEDIA._media_blocks()), {'written': 1, 'moved': 0, 'deleted': 0})
+        self.assertEqual(self.count(SONG), song_count)
+        self.assertIn(1999, [record['year'] for record in self.store.iter_records()])
+
+        # The music media after a deleted one move up
+        media_count = self.count(MEDIA_TABLE)
+        cd = CDs()._cds[0]
+        CDs().delete(cd)
+        MEDIA.mark_changed(cd)
+        result = self.store.save(MEDIA._media_blocks())
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['written'], 0)
+        self.assertGreater(result['moved'], 0)
+        self.assertEqual(self.count(MEDIA_TABLE), media_count - 1)
+        self.assertEqual(list(self.store.iter_records()), [media.to_record() for media, _ in MEDIA._media_blocks()])
+
+    def test_library_stored_in_sql(self):
+        MEDIA.set_storage_format('sql')
+        MEDIA.set_sql_store(self.store)
+
+        # Moved to the store on the first load
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(self.count(MEDIA_TABLE), len(MEDIA._media_blocks()))
+
+        # Written out with the html export
+        LPs().find_by_title('Christmas')[0].year = 1999
+        MEDIA.to_html_file()
+        with open(self.html_file, 'rb') as html_fp:
+            html = html_fp.read()
+        self.assertGreaterEqual(self.store.modified_ns(), os.stat(self.html_file).st_mtime_ns)
+
+        # Loaded from the store without parsing the html file
+        clean_music_library()
+        with patch('app.musicmedia.musicmedia_loader.iter_html_file_records', side_effect=AssertionError('Parsed the html file')):
+            self.assertEqual(MEDIA.from_html_file(self.html_file, streaming=True, profile=True)['loader'], 'sql')
+        self.assertEqual(LPs().find_by_title('Christmas')[0].year, 1999)
+        self.assertEqual(MEDIA.to_html().encode(), html)
+
+        # The html file is generated again when missing
+        clean_music_library()
+        os.remove(self.html_file)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        with open(self.html_file, 'rb') as html_fp:
+            self.assertEqual(html_fp.read(), html)
+
+    def test_no_sql_store(self):
+        MEDIA.set_storage_format('sql')
+        with self.assertRaises(ValueError):
+            MEDIA.from_html_file(self.html_file, streaming=True)
@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_objects import Artists, CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs
+from app.musicmedia.musicmedia_loader import html_block_digests
+from app.musicmedia.musicmedia_watcher import MusicMediaFileWatcher
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaWatcherTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        clean_music_library()
+
+    def tearDown(self):
+        MEDIA._html_file_watcher = None
+        MEDIA._html_data_file = None
+        clean_music_library()
+        shutil.rmtree(self.temp_dir)
+
+    def edit_html_file(self, old, new):
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        self.assertIn(old, html)
+        with open(self.html_file, 'w') as fp:
+            fp.write(html.replace(old, new))
+
+    def load_watched(self, lazy=False):
+        MEDIA.from_html_file(self.html_file, streaming=True, lazy=lazy)
+        watcher = MusicMediaFileWatcher(self.html_file, interval=0)
+        MEDIA._html_file_watcher = watcher
+        return watcher
+
+    def assertLibraryMatchesFile(self):
+        def media_html():
+            return sorted(media.to_html() for library_media in (LPs().lps, CASSETTEs().cassettes, CDs().cds, ELPs().elps, MINI_CDs().mini_cds)
+                          for media in library_media if media is not None)
+
+        def credits():
+            return {artist.name: sorted(media.title for media in artist.lps | artist.cds | artist.cassettes | artist.elps | artist.mini_cds)
+                    for artist in Artists().artists}
+
+        reloaded = (media_html(), credits())
+        clean_music_library()
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.assertEqual(reloaded, (media_html(), credits()))
+
+    def test_block_digests(self):
+        with open(self.MUSIC_HTML_FILE, 'rb') as fp:
+            content = fp.read()
+        block_digests = html_block_digests(content)
+        self.assertEqual(len(block_digests), 21)
+        self.assertEqual(len(set(digest for digest, _, _ in block_digests)), 21)
+        self.assertTrue(all(content.startswith(b'<p>', start) for _, start, _ in block_digests))
+
+    def test_unchanged_file_is_not_reloaded(self):
+        watcher = self.load_watched()
+        self.assertIsNone(watcher.check())
+        os.utime(self.html_file, ns=(0, 0))
+        self.assertEqual(watcher.check(), {'added': 0, 'replaced': 0, 'removed': 0})
+
+    def test_changed_media_reloaded(self):
+        watcher = self.load_watched()
+        moontan = LPs().find_by_title('Moontan')[0]
+        lp_count = len(LPs().lps)
+        self.edit_html_file('<a rel="artist">Golden Earing</a>', '<a rel="artist">Golden Earring</a>')
+        self.assertEqual(watcher.check(), {'added': 0, 'replaced': 1, 'removed': 0})
+
+        self.assertFalse(LPs.exists(moontan))
+        # The reloaded music media takes the place of the one it replaces
+        self.assertEqual(LPs().lps[moontan.index].title, 'Moontan')
+        self.assertEqual(LPs().find_by_title('Moontan')[0].index, moontan.index)
+        self.assertEqual(len(LPs().lps), lp_count)
+        self.assertIsNone(Artists().find_artist('Golden Earing'))
+        self.assertEqual(LPs().find_by_title('Moontan')[0].artists[0].name, 'Golden Earring')
+        self.assertLibraryMatchesFile()
+
+    def test_media_keep_their_index(self):
+        watcher = self.load_watched()
+        indexes = {media.title: media.index for media in LPs().lps if media is not None}
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        moontan_start = html.index('<p>\n<a rel="lp">\n<h3><a rel="title">Moontan</a></h3>')
+        moontan_end = html.index('</p>', moontan_start) + len('</p>\n')
+        moontan = html[moontan_start:moontan_end]
+        # Edit a block in place and add a new one before it
+        moontan_again = moontan.replace('Moontan</a></h3>', 'Moontan Again</a></h3>')
+        html = html[:moontan_start] + moontan_again + moontan.replace('Golden Earing', 'Golden Earring') + html[moontan_end:]
+        with open(self.html_file, 'w') as fp:
+            fp.write(html)
+
+        self.assertEqual(watcher.check(), {'added': 1, 'replaced': 1, 'removed': 0})
+        self.assertEqual({media.title: media.index for media in LPs().lps if media is not None and media.title != 'Moontan Again'}, indexes)
+        self.assertEqual(LPs().find_by_title('Moontan Again')[0].index, max(indexes.values()) + 1)
+        self.assertLibraryMatchesFile()
+
+    def test_conflicting_change_reported(self):
+        watcher = self.load_watched()
+        moontan = LPs().find_by_title('Moontan')[0]
+        moontan.year = 1901
+        MEDIA.mark_changed(moontan)
+        self.edit_html_file('<a rel="artist">Golden Earing</a>', '<a rel="artist">Golden Earring</a>')
+        with self.assertLogs('app.musicmedia.musicmedia_watcher', level='WARNING') as logs:
+            self.assertEqual(watcher.check(), {'added': 0, 'replaced': 1, 'removed': 0})
+        self.assertIn('lp "Moontan"', logs.output[0])
+        self.assertEqual(LPs().find_by_title('Moontan')[0].year, 1974)
+
+    def test_media_listed_twice(self):
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        moontan_start = html.index('<p>\n<a rel="lp">\n<h3><a rel="title">Moontan</a></h3>')
+        moontan_end = html.index('</p>', moontan_start) + len('</p>\n')
+        moontan = html[moontan_start:moontan_end]
+        with open(self.html_file, 'w') as fp:
+            fp.write(html.replace('</body>', moontan + '</body>'))
+        watcher = self.load_watched()
+        moontan_media = LPs().find_by_title('Moontan')[0]
+
+        self.assertEqual(len(watcher._blocks), 22)
+
+        # Moving one of the blocks keeps the music media
+        with open(self.html_file, 'w') as fp:
+            fp.write(html[:moontan_start] + moontan + moontan + html[moontan_end:])
+        self.assertEqual(watcher.check(), {'added': 0, 'replaced': 0, 'removed': 0})
+        self.assertTrue(LPs.exists(moontan_media))
+
+        # Dropping one of the blocks loads the music media again from the other
+        with open(self.html_file, 'w') as fp:
+            fp.write(html)
+        self.assertEqual(watcher.check(), {'added': 1, 'replaced': 0, 'removed': 1})
+        self.assertFalse(LPs.exists(moontan_media))
+        self.assertEqual(len(LPs().find_by_title('Moontan')), 1)
+        self.assertLibraryMatchesFile()
+
+    def test_snapshot_written_at_shutdown(self):
+        watcher = self.load_watched()
+        MEDIA._html_snapshot = True
+        self.addCleanup(setattr, MEDIA, '_html_snapshot', False)
+        self.assertFalse(watcher.write_stale_snapshot())
+        self.edit_html_file('<a rel="artist">Golden Earing</a>', '<a rel="artist">Golden Earring</a>')
+        with patch('app.musicmedia.musicmedia_watcher.write_snapshot') as write_snapshot:
+            self.assertEqual(watcher.check(), {'added': 0, 'replaced': 1, 'removed': 0})
+            write_snapshot.assert_not_called()
+            self.assertTrue(watcher.write_stale_snapshot())
+            write_snapshot.assert_called_once_with(self.html_file)
+            self.assertFalse(watcher.write_stale_snapshot())
+
+    def test_added_and_removed_media_reloaded(self):
+        watcher = self.load_watched()
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        christmas_start = html.index('<p>\n<a rel="lp">\n<h3><a rel="title">Christmas</a></h3>')
+        christmas_end = html.index('</p>', christmas_start) + len('</p>\n')
+        christmas = html[christmas_start:christmas_end]
+        html = html[:christmas_start] + html[christmas_end:]
+        html = html.replace('</body>', christmas.replace('Christmas</a></h3>', 'Christmas Again</a></h3>') + '</body>')
+        with open(self.html_file, 'w') as fp:
+            fp.write(html)
+
+        self.assertEqual(watcher.check(), {'added': 1, 'replaced': 0, 'removed': 1})
+        self.assertEqual(LPs().find_by_title('Christmas'), [])
+        christmas_again = LPs().find_by_title('Christmas Again')[0]
+        thalia = Artists().find_artist('Thalia')
+        self.assertEqual(thalia.lps, {christmas_again})
+        self.assertEqual(Artists().find_artist('Michael Buble').lps, {christmas_again})
+        self.assertLibraryMatchesFile()
+
+    def test_removed_media_artists_fixed_up(self):
+        watcher = self.load_watched()
+        with open(self.html_file, 'r') as fp:
+            html = fp.read()
+        christmas_start = html.index('<p>\n<a rel="lp">\n<h3><a rel="title">Christmas</a></h3>')
+        christmas_end = html.index('</p>', christmas_start) + len('</p>\n')
+        with open(self.html_file, 'w') as fp:
+            fp.write(html[:christmas_start] + html[christmas_end:])
+
+        self.assertEqual(watcher.check(), {'added': 0, 'replaced': 0, 'removed': 1})
+        for name in ('Michael Buble', 'The Puppini Sisters', 'Shania Twain', 'Thalia'):
+            self.assertIsNone(Artists().find_artist(name))
+        for artist in Artists().artists:
+            for media in artist.lps:
+                self.assertTrue(LPs.exists(media))
+
+    def test_lazy_media_follow_their_block(self):
+        watcher = self.load_watched(lazy=True)
+        self.edit_html_file('<a rel="artist">Golden Earing</a>', '<a rel="artist">Golden Earring</a>')
+        self.assertEqual(watcher.check(), {'added': 0, 'replaced': 1, 'removed': 0})
+
+        christmas = LPs().find_by_title('Christmas')[0]
+        self.assertIsNotNone(christmas._tracks_source)
+        self.assertEqual(christmas.get_song_from_title('Jingle Bells').additional_artists[0].artist.name, 'The Puppini Sisters')
+        self.assertLibraryMatchesFile()
+
+    def test_own_writes_not_reloaded(self):
+        watcher = self.load_watched()
+        MEDIA.to_html_file()
+        self.assertIsNone(watcher.check())
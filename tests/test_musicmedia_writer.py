@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.musicmedia.musicmedia_objects import LPs, MEDIA, StaleLibraryException
+from app.musicmedia.musicmedia_writer import MusicMediaWriter
+
+from test_musicmedia_loader import clean_music_library
+
+
+class MusicMediaWriterTestCase(unittest.TestCase):
+
+    DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+    MUSIC_HTML_FILE = os.path.join(DATA_DIR, 'test_music.html')
+
+    def setUp(self):
+        clean_music_library()
+        self.temp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.temp_dir, 'music.html')
+        shutil.copyfile(self.MUSIC_HTML_FILE, self.html_file)
+        MEDIA.from_html_file(self.html_file, streaming=True)
+        self.writer = None
+
+    def tearDown(self):
+        if self.writer is not None:
+            self.writer.stop(flush=False)
+        clean_music_library()
+        MEDIA._html_writer = None
+        MEDIA._html_data_file = None
+        MEDIA._html_block_index = None
+        MEDIA.changes_to_write = False
+        shutil.rmtree(self.temp_dir)
+
+    def start_writer(self, delay=0.2, max_delay=5.0):
+        self.writer = MusicMediaWriter(self.html_file, delay=delay, max_delay=max_delay)
+        MEDIA._html_writer = self.writer
+        self.writer.start()
+        return self.writer
+
+    def wait_for_writes(self, writes, timeout=5.0):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            status = self.writer.status()
+            if status['writes'] >= writes and status['pending'] == 0 and not status['writing']:
+                return status
+            time.sleep(0.01)
+        self.fail('Timed out waiting for the writer: {}'.format(self.writer.status()))
+
+    def change_christmas(self, year):
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = year
+        MEDIA.mark_changed(christmas)
+
+    def test_burst_written_once(self):
+        self.start_writer()
+        for year in range(1990, 2000):
+            self.change_christmas(year)
+        self.assertEqual(self.writer.status()['pending'], 10)
+
+        status = self.wait_for_writes(1)
+        self.assertEqual(status['writes'], 1)
+        self.assertIsNotNone(status['last_write_time'])
+        self.assertGreater(status['last_write_seconds'], 0)
+        self.assertIsNone(status['last_error'])
+        self.assertFalse(MEDIA.changes_to_write)
+        with open(self.html_file, 'r') as fp:
+            self.assertIn('<a rel="date">1999</a>', fp.read())
+
+        # Nothing more to write
+        time.sleep(0.3)
+        self.assertEqual(self.writer.status()['writes'], 1)
+
+    def test_steady_changes_written_by_max_delay(self):
+        self.start_writer(delay=0.2, max_delay=0.5)
+        end = time.monotonic() + 1.0
+        year = 1990
+        while time.monotonic() < end:
+            self.change_christmas(year)
+            year += 1
+            time.sleep(0.05)
+        self.assertGreaterEqual(self.writer.status()['writes'], 1)
+
+    def test_changes_do_not_wait_on_the_disk(self):
+        self.start_writer(delay=0)
+        with patch.object(MEDIA, 'to_html_file', side_effect=lambda filepath: time.sleep(0.5)):
+            start = time.monotonic()
+            self.change_christmas(1990)
+            self.change_christmas(1991)
+            self.assertLess(time.monotonic() - start, 0.25)
+            self.wait_for_writes(1)
+
+    def test_stop_flushes(self):
+        self.start_writer(delay=60)
+        self.change_christmas(1990)
+        self.writer.stop()
+        status = self.writer.status()
+        self.assertFalse(status['running'])
+        self.assertEqual(status['writes'], 1)
+        self.assertEqual(status['pending'], 0)
+        self.assertFalse(self.writer.flush())
+
+    def test_stop_flushes_unsignalled_changes(self):
+        self.start_writer(delay=60)
+        christmas = LPs().find_by_title('Christmas')[0]
+        christmas.year = 1990
+        MEDIA.changes_to_write = True  # Flagged without signalling the writer as for a journaled change
+        self.writer.stop()
+        self.assertEqual(self.writer.status()['writes'], 1)
+        self.assertFalse(MEDIA.changes_to_write)
+        with open(self.html_file, 'r') as fp:
+            self.assertIn('<a rel="date">1990</a>', fp.read())
+        self.assertFalse(self.writer.flush())
+
+    def test_failed_write(self):
+        self.start_writer(delay=0)
+        os.remove(self.html_file)  # Nothing to back up
+        self.change_christmas(1990)
+        end = time.monotonic() + 5.0
+        while self.writer.status()['last_error'] is None and time.monotonic() < end:
+            time.sleep(0.01)
+        status = self.writer.status()
+        self.assertIsNotNone(status['last_error'])
+        self.assertEqual(status['writes'], 0)
+        self.assertTrue(MEDIA.changes_to_write)
+
+    def test_conflict_not_retried_until_file_changes(self):
+        self.writer = MusicMediaWriter(self.html_file)
+        self.change_christmas(1990)
+        conflict = StaleLibraryException('Music media changed both in the file and in the library')
+        with patch.object(MEDIA, 'to_html_file', side_effect=[conflict, None]) as to_html_file:
+            with self.assertLogs('app.musicmedia.musicmedia_writer', level='ERROR'):
+                self.writer.flush()
+            self.assertEqual(self.writer.status()['conflict'], str(conflict))
+            self.assertTrue(MEDIA.changes_to_write)
+
+            # Tried again only once the file changes
+            self.writer.flush()
+            self.assertEqual(to_html_file.call_count, 1)
+            self.assertEqual(self.writer.status()['conflict'], str(conflict))
+            os.utime(self.html_file, ns=(0, 0))
+            self.writer.flush()
+            self.assertEqual(to_html_file.call_count, 2)
+        status = self.writer.status()
+        self.assertIsNone(status['conflict'])
+        self.assertEqual(status['writes'], 1)
+        self.assertFalse(MEDIA.changes_to_write)
@@ -0,0 +1,40 @@
+#! /usr/bin/env python3
+
+import json
+import os
+import sys
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_objects import Artists, MEDIA  # noqa: E402
+
+
+def media_count(artist):
+    return len(artist.lps) + len(artist.cds) + len(artist.cassettes) + len(artist.elps) + len(artist.mini_cds)
+
+
+@click.command('List the artists of a music media html file whose names likely stand for the same artist.')
+@click.option('-f', '--html-file', type=str, required=True, help='Music media html file to look for duplicate artists in.')
+@click.option('--aliases', is_flag=True, default=False, help='Print the duplicates as aliases to the artist with the most media.')
+def artist_duplicates(html_file, aliases=False):
+    # Load without normalized matching so the duplicates are not already merged
+    Artists.set_normalized_matching(False)
+    MEDIA.from_html_file(html_file, streaming=True)
+    duplicates = Artists.likely_duplicates()
+    if aliases:
+        suggested = {}
+        for group in duplicates:
+            canonical = group[0]
+            for artist in group[1:]:
+                suggested[artist.name] = canonical.name
+        print(json.dumps(suggested, indent=4, ensure_ascii=False, sort_keys=True))
+        return
+    for group in duplicates:
+        print(', '.join('{} ({})'.format(artist.name, media_count(artist)) for artist in group))
+    print('{} groups of likely duplicate artists in {} artists'.format(len(duplicates), len(Artists().artists)))
+
+
+if __name__ == '__main__':
+    artist_duplicates()
@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+
+import os
+import random
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_objects import Artists  # noqa: E402
+
+
+def scan_artists(artist_name):
+    """ Find an artist by name the way Artists.find_artist used to, by scanning the set of all artists. """
+    for artist in Artists._artists:
+        if artist.name == artist_name:
+            return artist
+
+
+def time_lookups(find, names):
+    start = time.perf_counter()
+    for name in names:
+        find(name)
+    return time.perf_counter() - start
+
+
+@click.command('Time creating and finding artists by name in growing artist registries.')
+@click.option('-s', '--sizes', type=str, default='1000,10000,50000', help='Comma separated list of artist counts.')
+@click.option('-l', '--lookups', type=int, default=2000, help='Number of artist names looked up at each size.')
+@click.option('--scan-limit', type=int, default=50000, help='Largest artist count to also time the scan of the set of all artists.')
+def benchmark(sizes='1000,10000,50000', lookups=2000, scan_limit=50000):
+    print('| {:>8} | {:>12} | {:>12} | {:>14} | {:>14} | {:>10} |'.format(
+        'Artists', 'Create (s)', 'Create us', 'Find us', 'Scan us', 'Speedup'))
+    print('|{}|{}|{}|{}|{}|{}|'.format('-' * 10, '-' * 14, '-' * 14, '-' * 16, '-' * 16, '-' * 12))
+    for size in [int(size) for size in sizes.split(',')]:
+        Artists._clean_artists()
+        names = ['Artist {}'.format(index) for index in range(size)]
+        start = time.perf_counter()
+        for name in names:
+            Artists.create_Artist(name)
+        create_seconds = time.perf_counter() - start
+
+        # Half of the names looked up are missing as for artists mentioned for the first time
+        lookup_names = [random.choice(names) if index % 2 else 'Missing {}'.format(index) for index in range(lookups)]  # nosec
+        find_seconds = time_lookups(Artists.find_artist, lookup_names)
+        scan = speedup = 'skipped'
+        if size <= scan_limit:
+            scan_seconds = time_lookups(scan_artists, lookup_names)
+            scan = '{:.2f}'.format(1e6 * scan_seconds / lookups)
+            speedup = '{:.0f}x'.format(scan_seconds / find_seconds)
+        print('| {:>8} | {:>12.3f} | {:>12.2f} | {:>14.2f} | {:>14} | {:>10} |'.format(
+            size, create_seconds, 1e6 * create_seconds / size, 1e6 * find_seconds / lookups, scan, speedup))
+    Artists._clean_artists()
+
+
+if __name__ == '__main__':
+    benchmark()
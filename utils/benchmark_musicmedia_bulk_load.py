@@ -0,0 +1,91 @@
+#! /usr/bin/env python3
+
+import copy
+import os
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_loader import iter_html_file_records  # noqa: E402
+from app.musicmedia.musicmedia_objects import Artists, CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs  # noqa: E402
+
+
+def clean_music_library():
+    Artists._clean_artists()
+    LPs._clean_lps()
+    CASSETTEs._clean_cassettes()
+    CDs._clean_cds()
+    ELPs._clean_elps()
+    MINI_CDs._clean_mini_cds()
+
+
+def rename_record(record, suffix):
+    """ Return a copy of a media record with all titles and artist names made unique by a suffix. """
+    def rename(name):
+        return None if name is None else '{} {}'.format(name, suffix)
+
+    record = copy.deepcopy(record)
+    record['title'] = rename(record['title'])
+    record['artists'] = [rename(name) for name in record['artists']]
+    record['classical_composers'] = [rename(name) for name in record['classical_composers']]
+    record['mixer'] = rename(record['mixer'])
+    for track in record['tracks']:
+        track['track_artist'] = rename(track['track_artist'])
+        track['side_mixer'] = rename(track['side_mixer'])
+        for song in track['songs']:
+            song['main_artist'] = rename(song['main_artist'])
+            if song['additional_artists'] is not None:
+                song['additional_artists'] = [[prequel, rename(name), sequel] for prequel, name, sequel in song['additional_artists']]
+            if song['classical_composers'] is not None:
+                song['classical_composers'] = [rename(name) for name in song['classical_composers']]
+    return record
+
+
+def library_records(records, size):
+    """ Return size media records made by repeating the passed records under new names. """
+    return [rename_record(records[index % len(records)], '#{}'.format(index // len(records))) for index in range(size)]
+
+
+def time_load(load, records):
+    clean_music_library()
+    start = time.perf_counter()
+    load(records)
+    seconds = time.perf_counter() - start
+    artist_count = len(Artists().artists)
+    clean_music_library()
+    return seconds, artist_count
+
+
+def record_by_record(records):
+    for record in records:
+        MEDIA.from_record(record)
+
+
+@click.command('Time loading growing music libraries with bulk loading and record by record.')
+@click.option('-f', '--filepath', type=str, required=True, help='Music media html file to take the media records from.')
+@click.option('-s', '--sizes', type=str, default='1000,10000,100000', help='Comma separated list of library sizes.')
+@click.option('--serial-limit', type=int, default=10000, help='Largest library size to also load record by record.')
+@click.option('--headers-only', is_flag=True, default=False, help='Drop the tracks of the media records.')
+def benchmark(filepath=None, sizes='1000,10000,100000', serial_limit=10000, headers_only=False):
+    records = list(iter_html_file_records(filepath))
+    if headers_only:
+        for record in records:
+            record['tracks'] = []
+
+    print('| {:>8} | {:>8} | {:>12} | {:>14} | {:>14} |'.format('Items', 'Artists', 'Bulk (s)', 'Bulk us/item', 'Serial (s)'))
+    print('|{}|{}|{}|{}|{}|'.format('-' * 10, '-' * 10, '-' * 14, '-' * 16, '-' * 16))
+    for size in [int(size) for size in sizes.split(',')]:
+        size_records = library_records(records, size)
+        bulk_seconds, artist_count = time_load(MEDIA.bulk_load, size_records)
+        serial = 'skipped'
+        if size <= serial_limit:
+            serial = '{:.3f}'.format(time_load(record_by_record, size_records)[0])
+        print('| {:>8} | {:>8} | {:>12.3f} | {:>14.1f} | {:>14} |'.format(size, artist_count, bulk_seconds, 1e6 * bulk_seconds / size, serial))
+        del size_records
+
+
+if __name__ == '__main__':
+    benchmark()
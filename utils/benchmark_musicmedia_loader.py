@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_loader import iter_html_file_records, iter_html_file_records_parallel, parser_available, PARSERS  # noqa: E402
+from app.musicmedia.musicmedia_objects import Artists, CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs  # noqa: E402
+
+
+def clean_music_library():
+    Artists._clean_artists()
+    LPs._clean_lps()
+    CASSETTEs._clean_cassettes()
+    CDs._clean_cds()
+    ELPs._clean_elps()
+    MINI_CDs._clean_mini_cds()
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        clean_music_library()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    clean_music_library()
+    return min(timings)
+
+
+@click.command('Time loading a music media html file with each parser backend.')
+@click.option('-f', '--filepath', type=str, required=True, help='Music media html file to load.')
+@click.option('-r', '--repeat', type=int, default=3, help='Number of runs to take the best time from.')
+@click.option('-w', '--workers', type=int, default=0, help='Also time a parallel load with this many worker processes.')
+@click.option('--records-only', is_flag=True, default=False, help='Only parse media records without building the library.')
+def benchmark(filepath=None, repeat=3, workers=0, records_only=False):
+    rows = []
+    if not records_only:
+        rows.append(('tree (bs4 html.parser)', best_time(lambda: MEDIA.from_html_file(filepath), repeat)))
+    for parser in PARSERS:
+        if not parser_available(parser):
+            rows.append(('stream ({})'.format(parser), None))
+        elif records_only:
+            rows.append(('stream ({})'.format(parser), best_time(lambda: sum(1 for _ in iter_html_file_records(filepath, parser=parser)), repeat)))
+        else:
+            rows.append(('stream ({})'.format(parser), best_time(lambda: MEDIA.from_html_file(filepath, streaming=True, parser=parser), repeat)))
+    if workers > 1:
+        loader = 'parallel ({} workers)'.format(workers)
+        if records_only:
+            rows.append((loader, best_time(lambda: sum(1 for _ in iter_html_file_records_parallel(filepath, workers=workers)), repeat)))
+        else:
+            rows.append((loader, best_time(lambda: MEDIA.from_html_file(filepath, workers=workers), repeat)))
+
+    print('| {:<24} | {:>10} |'.format('Loader', 'Seconds'))
+    print('|{}|{}|'.format('-' * 26, '-' * 12))
+    for loader, seconds in rows:
+        print('| {:<24} | {:>10} |'.format(loader, 'n/a' if seconds is None else '{:.3f}'.format(seconds)))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_loader import iter_html_file_records  # noqa: E402
+from app.musicmedia.musicmedia_objects import CASSETTEs, CDs, ELPs, LPs, MEDIA, MINI_CDs  # noqa: E402
+from benchmark_musicmedia_bulk_load import clean_music_library, library_records  # noqa: E402
+
+
+def clear_rendered_html():
+    for library_media in (CASSETTEs._cassettes, CDs._cds, LPs._lps, ELPs._elps, MINI_CDs._mini_cds):
+        for media in library_media:
+            if media is not None:
+                media._html = None
+
+
+def best_render_time(workers, repeat):
+    """ Return the best time to render the whole library with a number of worker processes. """
+    timings = []
+    for _ in range(repeat):
+        clear_rendered_html()
+        start = time.perf_counter()
+        if workers > 1:
+            MEDIA._render_parallel(workers=workers, threshold=0)
+        MEDIA._media_blocks()  # Renders whatever is left serially
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@click.command('Time rendering growing music libraries serially and in parallel to find where parallel rendering pays off.')
+@click.option('-f', '--filepath', type=str, required=True, help='Music media html file to take the media records from.')
+@click.option('-s', '--sizes', type=str, default='1000,5000,10000,20000,50000', help='Comma separated list of library sizes.')
+@click.option('-w', '--workers', type=int, default=os.cpu_count() or 1, help='Number of worker processes to render with.')
+@click.option('-r', '--repeat', type=int, default=3, help='Number of runs to take the best time from.')
+def benchmark(filepath=None, sizes='1000,5000,10000,20000,50000', workers=os.cpu_count() or 1, repeat=3):
+    records = list(iter_html_file_records(filepath))
+    MEDIA.set_render_workers(1)  # Only render in parallel when asked to
+    threshold = None
+
+    print('| {:>8} | {:>12} | {:>14} | {:>8} |'.format('Items', 'Serial (s)', 'Parallel (s)', 'Speedup'))
+    print('|{}|{}|{}|{}|'.format('-' * 10, '-' * 14, '-' * 16, '-' * 10))
+    for size in [int(size) for size in sizes.split(',')]:
+        clean_music_library()
+        MEDIA.bulk_load(library_records(records, size))
+        serial_seconds = best_render_time(1, repeat)
+        parallel_seconds = best_render_time(workers, repeat)
+        if threshold is None and parallel_seconds < serial_seconds:
+            threshold = size
+        print('| {:>8} | {:>12.3f} | {:>14.3f} | {:>8.2f} |'.format(size, serial_seconds, parallel_seconds, serial_seconds / parallel_seconds))
+    clean_music_library()
+
+    if threshold is None:
+        print('\nRendering with {} workers did not pay off at any of the library sizes'.format(workers))
+    else:
+        print('\nRendering with {} workers paid off from {} music media. Set MUSIC_MEDIA_PARALLEL_RENDER_THRESHOLD to it'.format(workers, threshold))
+
+
+if __name__ == '__main__':
+    benchmark()
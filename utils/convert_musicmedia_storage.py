@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_files import write_file_atomically  # noqa: E402
+from app.musicmedia.musicmedia_objects import MEDIA  # noqa: E402
+from app.musicmedia.musicmedia_records import html_to_records_file, records_format  # noqa: E402
+
+
+@click.group(help='Convert the music library between an html file and a jsonl or msgpack records file.')
+def convert():
+    pass
+
+
+@convert.command('to-records', help='Convert a music media html file to a records file.')
+@click.option('-i', '--input', 'html_filepath', type=str, required=True, help='Music media html file.')
+@click.option('-o', '--output', 'filepath', type=str, required=True, help='Records file ending in .jsonl or .msgpack.')
+@click.option('-p', '--parser', type=str, default=None, help='Parser backend reading the html file.')
+def to_records(html_filepath, filepath, parser):
+    try:
+        records_format(filepath)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--output')
+    count = html_to_records_file(html_filepath, filepath, parser=parser)
+    click.echo('Converted {} music media from {} to {}'.format(count, html_filepath, filepath), err=True)
+
+
+@convert.command('to-html', help='Convert a records file to a music media html file.')
+@click.option('-i', '--input', 'filepath', type=str, required=True, help='Records file ending in .jsonl or .msgpack.')
+@click.option('-o', '--output', 'html_filepath', type=str, required=True, help='Music media html file.')
+def to_html(filepath, html_filepath):
+    media = MEDIA.from_records_file(filepath)
+    write_file_atomically(html_filepath, MEDIA._html_file_segments(MEDIA._media_blocks()))
+    click.echo('Converted {} music media from {} to {}'.format(len(media), filepath, html_filepath), err=True)
+
+
+if __name__ == '__main__':
+    convert()
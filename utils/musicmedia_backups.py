@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import datetime
+import os
+import sys
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from app.musicmedia.musicmedia_backup import MusicMediaBackupStore  # noqa: E402
+
+
+def find_backup(store, backup):
+    """ Return the backup at a position newest first, or taken at a timestamp, in a backup store. """
+    entries = store.entries
+    if backup.isdigit() and int(backup) < len(entries):
+        return entries[int(backup)]
+    for entry in entries:
+        if str(entry.timestamp) == backup or str(int(entry.timestamp)) == backup:
+            return entry
+    raise click.BadParameter('No backup {} of {}'.format(backup, store.filepath), param_hint='BACKUP')
+
+
+@click.group(help='List and rebuild the backups of a music media html file.')
+@click.option('-f', '--filepath', type=str, required=True, help='Music media html file.')
+@click.pass_context
+def backups(ctx, filepath):
+    ctx.obj = MusicMediaBackupStore(filepath)
+
+
+@backups.command('list', help='List the backups newest first.')
+@click.pass_obj
+def list_backups(store):
+    for position, entry in enumerate(store.entries):
+        kind = 'full' if entry.base is None else 'delta'
+        stored_size = os.path.getsize(store.directory / entry.object) if (store.directory / entry.object).exists() else 0
+        click.echo('{:>4}  {}  {:.6f}  {:>10} bytes  {:<5} {:>9} bytes stored  {}'.format(
+            position, datetime.datetime.fromtimestamp(entry.timestamp).isoformat(sep=' ', timespec='seconds'),
+            entry.timestamp, entry.size, kind, stored_size, entry.digest[:16]))
+
+
+@backups.command('rebuild', help='Rebuild a backup by its position in the list or its timestamp.')
+@click.argument('backup')
+@click.option('-o', '--output', type=str, default=None, help='File to write the rebuilt backup to. Defaults to standard output.')
+@click.option('--restore', is_flag=True, default=False, help='Replace the music media html file with the rebuilt backup.')
+@click.pass_obj
+def rebuild_backup(store, backup, output, restore):
+    entry = find_backup(store, backup)
+    try:
+        content = store.read(entry)
+    except (OSError, ValueError) as e:
+        raise click.ClickException('Cannot rebuild backup {}: {}'.format(backup, e))
+    if restore:
+        store.restore(entry)
+        click.echo('Restored {} from the backup taken at {}'.format(store.filepath, entry.timestamp), err=True)
+    elif output is not None:
+        with open(output, 'wb') as output_fp:
+            output_fp.write(content)
+    else:
+        click.get_binary_stream('stdout').write(content)
+
+
+if __name__ == '__main__':
+    backups()